@@ -2,6 +2,7 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 import os
+import socket
 
 STRING_TO_BOOL_DICT = {"True", "true", "yes", "1"}
 
@@ -18,3 +19,103 @@ class Settings:
 
     # Kubernetes config.
     KUBERNETES_SERVICE_DEBUG = os.getenv("KUBERNETES_SERVICE_DEBUG") in STRING_TO_BOOL_DICT
+    # The namespace and unique name of this replica of the operator, used in the leases of the operator.
+    OPERATOR_NAMESPACE = os.getenv("POD_NAMESPACE", "default")
+    OPERATOR_IDENTITY = os.getenv("POD_NAME", socket.gethostname())
+
+    # Reconcile config.
+    # Either "threads", to check each cluster in a worker thread, or "asyncio", to check the clusters as coroutines on
+    # a single event loop. The latter allows checking many more clusters concurrently with the same amount of threads.
+    EXECUTION_MODE = os.getenv("EXECUTION_MODE", "threads")
+    # The amount of clusters that may be checked in parallel. Each cluster is only checked by one worker at a time.
+    RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", "4"))
+    # The amount of threads that run the blocking Kubernetes and Mongo calls in the asyncio execution mode. Each step of
+    # a cluster check is awaited separately, so this limits the calls in flight, not the clusters being checked.
+    ASYNC_IO_THREADS = int(os.getenv("ASYNC_IO_THREADS", "8"))
+    # The delay in seconds before a failed cluster is checked again. It doubles after every consecutive failure.
+    RECONCILE_RETRY_BASE_DELAY = float(os.getenv("RECONCILE_RETRY_BASE_DELAY", "1"))
+    RECONCILE_RETRY_MAX_DELAY = float(os.getenv("RECONCILE_RETRY_MAX_DELAY", "300"))
+    # The maximum rate (per second) and burst at which failed clusters are checked again, across all clusters.
+    RECONCILE_RETRY_QPS = float(os.getenv("RECONCILE_RETRY_QPS", "10"))
+    RECONCILE_RETRY_BURST = int(os.getenv("RECONCILE_RETRY_BURST", "100"))
+
+    # The maximum rate (per second) and burst of the requests to the Kubernetes API, across all threads.
+    KUBERNETES_QPS = float(os.getenv("KUBERNETES_QPS", "50"))
+    KUBERNETES_BURST = int(os.getenv("KUBERNETES_BURST", "100"))
+    # How many times a request that was throttled (HTTP 429) or failed on the server (HTTP 5xx) is retried, and the
+    # delay in seconds before the first retry, which doubles for every next retry.
+    KUBERNETES_RETRIES = int(os.getenv("KUBERNETES_RETRIES", "5"))
+    KUBERNETES_RETRY_BASE_DELAY = float(os.getenv("KUBERNETES_RETRY_BASE_DELAY", "0.5"))
+    KUBERNETES_RETRY_MAX_DELAY = float(os.getenv("KUBERNETES_RETRY_MAX_DELAY", "30"))
+
+    # The maximum amount of concurrent requests to the Kubernetes API, and of concurrent commands to each replica set.
+    # The actual limits adapt to the latency: they shrink when the calls get slower than this many times the average.
+    # The limits start at the initial amount, until the latency is known.
+    KUBERNETES_MAX_CONCURRENCY = int(os.getenv("KUBERNETES_MAX_CONCURRENCY", "32"))
+    KUBERNETES_INITIAL_CONCURRENCY = int(os.getenv("KUBERNETES_INITIAL_CONCURRENCY", "16"))
+    MONGO_MAX_CONCURRENCY = int(os.getenv("MONGO_MAX_CONCURRENCY", "8"))
+    MONGO_INITIAL_CONCURRENCY = int(os.getenv("MONGO_INITIAL_CONCURRENCY", "4"))
+    CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", "2"))
+    # The amount of seconds between the removals of resources whose cluster was removed. The resources created by the
+    # operator are owned by their cluster, so this is only a fallback for the garbage collection of Kubernetes.
+    GARBAGE_COLLECTION_INTERVAL = float(os.getenv("GARBAGE_COLLECTION_INTERVAL", "3600"))
+
+    # The maximum amount of objects requested per page when listing the Mongo objects or their resources. The pages
+    # are processed one at a time, so this limits the memory used for a list.
+    LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "500"))
+
+    # Resources that were written with the current desired state are not updated, except on every this many checks of
+    # the same resource. Those updates undo any changes made to the resources by hand. Set to 0 to never force them.
+    RESOURCE_FULL_UPDATE_CHECKS = int(os.getenv("RESOURCE_FULL_UPDATE_CHECKS", "10"))
+
+    # The amount of seconds between the writes of the observed state to the status of the Mongo objects. All changes
+    # of a cluster within this interval are combined into a single write.
+    STATUS_WRITE_INTERVAL = float(os.getenv("STATUS_WRITE_INTERVAL", "10"))
+
+    # Leader election config.
+    # When enabled, only the replica of the operator that holds the lease checks the clusters. The other replicas keep
+    # their caches and Mongo connections warm, so they can take over as soon as the lease expires.
+    LEADER_ELECTION = os.getenv("LEADER_ELECTION") in STRING_TO_BOOL_DICT
+    LEADER_ELECTION_LEASE_NAME = os.getenv("LEADER_ELECTION_LEASE_NAME", "mongo-operator")
+    # The timings below are used for the leases of the leader election and of the sharding.
+    # The amount of seconds after which a lease that has not been renewed may be taken over by another replica.
+    LEADER_ELECTION_LEASE_DURATION = int(os.getenv("LEADER_ELECTION_LEASE_DURATION", "15"))
+    # The amount of seconds the leader keeps trying to renew its lease before it gives up leading.
+    LEADER_ELECTION_RENEW_DEADLINE = float(os.getenv("LEADER_ELECTION_RENEW_DEADLINE", "10"))
+    # The amount of seconds between the attempts to acquire or renew the lease.
+    LEADER_ELECTION_RETRY_PERIOD = float(os.getenv("LEADER_ELECTION_RETRY_PERIOD", "2"))
+
+    # Sharding config.
+    # When enabled, all replicas of the operator check clusters. Each replica announces itself with a lease, and checks
+    # the clusters it owns on a consistent hash ring of the replicas. The clusters are rebalanced when replicas join or
+    # leave.
+    SHARDING = os.getenv("SHARDING") in STRING_TO_BOOL_DICT
+    SHARDING_GROUP_NAME = os.getenv("SHARDING_GROUP_NAME", "mongo-operator-shard")
+    # The amount of points each replica gets on the hash ring. More points give a more even distribution.
+    SHARDING_VIRTUAL_NODES = int(os.getenv("SHARDING_VIRTUAL_NODES", "100"))
+
+    # Tracing config.
+    # When set to "jsonlines", the spans of the cluster checks, Kubernetes calls, Mongo commands and backups are
+    # appended to the tracing file, one JSON object per line. Tracing is disabled by default.
+    TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+    TRACING_FILE = os.getenv("TRACING_FILE", "/tmp/mongo-operator-spans.jsonl")
+
+    # Profiling config.
+    # SIGUSR1 profiles the cluster checks during the next loops of the operator, SIGUSR2 writes a memory snapshot and
+    # the stacks of all threads. The results are written to the profiling directory, to be copied out of the pod.
+    PROFILING_DIR = os.getenv("PROFILING_DIR", "/tmp/mongo-operator-profiles")
+    PROFILING_LOOPS = int(os.getenv("PROFILING_LOOPS", "10"))
+    # When enabled, the profiling is also available on the `/debug/` endpoints of the admin server.
+    PROFILING_ENDPOINTS = os.getenv("PROFILING_ENDPOINTS") in STRING_TO_BOOL_DICT
+
+    # Admin server config.
+    # The operator serves its Prometheus metrics on `/metrics` of a small HTTP server in the operator process.
+    ADMIN_SERVER = os.getenv("ADMIN_SERVER", "true") in STRING_TO_BOOL_DICT
+    ADMIN_PORT = int(os.getenv("ADMIN_PORT", "8080"))
+    # The liveness probe on `/healthz` fails when the main loop made no progress for this amount of seconds, e.g. when
+    # it hangs on an unreachable replica set. The readiness probe on `/readyz` succeeds once the Mongo objects are
+    # loaded into the cache.
+    LIVENESS_THRESHOLD = float(os.getenv("LIVENESS_THRESHOLD", "300"))
+    # The liveness probe also fails when the check of a single cluster has been running for this amount of seconds,
+    # e.g. when a worker hangs on a call without timeout. It includes the backup, so it must exceed the longest backup.
+    RECONCILE_LIVENESS_THRESHOLD = float(os.getenv("RECONCILE_LIVENESS_THRESHOLD", "3600"))
@@ -0,0 +1,132 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import argparse
+import gc
+import json
+import tracemalloc
+from copy import deepcopy
+from time import process_time
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import yaml
+from kubernetes.client import ApiClient
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.models.ResourceView import ResourceView
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+
+
+class RawResponse(NamedTuple):
+    """ The part of a response that the client reads when it deserializes the response. """
+    data: bytes
+
+
+class DeserializationBenchmark:
+    """
+    Compares the CPU time and memory of reading the services, stateful sets and secrets of the clusters from the raw
+    JSON responses of the Kubernetes API, deserializing them into the models of the client as it does by default, or
+    parsing them into the read-only views that the operator uses.
+    """
+
+    # the types of the models of the resources the operator reads on every check, by the name of the resource.
+    MODEL_TYPES = {"service": "V1Service", "stateful_set": "V1beta1StatefulSet", "secret": "V1Secret"}
+
+    CLUSTER_DEFINITION_FILE = "examples/mongo-3-replicas.yaml"
+
+    def __init__(self, count: int = 1000, rounds: int = 3) -> None:
+        """
+        :param count: The amount of resources of each kind that is read in each round.
+        :param rounds: The amount of rounds, of which the fastest one is reported.
+        """
+        self.count = count
+        self.rounds = rounds
+        self.api_client = ApiClient()
+        with open(self.CLUSTER_DEFINITION_FILE) as definition_file:
+            self.cluster_dict = yaml.safe_load(definition_file)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Reads the resources of each kind with both paths.
+        :return: For each kind and path, the CPU seconds and the allocated bytes per 1,000 resources, and how many times
+            faster and smaller the views are.
+        """
+        result: Dict[str, Any] = {"count": self.count, "rounds": self.rounds}
+        for kind, model_type in self.MODEL_TYPES.items():
+            responses = self.createResponses(kind)
+            models = self._measure(lambda response: self.api_client.deserialize(response, model_type), responses)
+            views = self._measure(lambda response: ResourceView.fromJson(response.data), responses)
+            result[kind] = {"models": models, "views": views,
+                            "cpu_ratio": models["cpu_seconds"] / max(views["cpu_seconds"], 1e-9),
+                            "memory_ratio": models["memory_bytes"] / max(views["memory_bytes"], 1)}
+        return result
+
+    def createResponses(self, kind: str) -> List[RawResponse]:
+        """
+        Creates the raw responses of a fleet of clusters, as the Kubernetes API would send them.
+        :param kind: The name of the resource, see `MODEL_TYPES`.
+        :return: A response for each cluster.
+        """
+        responses = []
+        for index in range(self.count):
+            cluster_dict = deepcopy(self.cluster_dict)
+            cluster_dict["metadata"]["name"] = "mongo-cluster-{}".format(index)
+            cluster_object = V1MongoClusterConfiguration(**cluster_dict)
+            if kind == "secret":
+                resource = KubernetesResources.createSecret("{}-admin-credentials".format(cluster_object.metadata.name),
+                                                            cluster_object.metadata.namespace,
+                                                            {"username": "root", "password": "cm9vdA=="})
+                resource.data, resource.string_data = resource.string_data, None
+            elif kind == "service":
+                resource = KubernetesResources.createService(cluster_object)
+            else:
+                resource = KubernetesResources.createStatefulSet(cluster_object)
+            resource.metadata.uid = "uid-{}".format(index)
+            resource.metadata.resource_version = str(index)
+            body = self.api_client.sanitize_for_serialization(resource)
+            responses.append(RawResponse(json.dumps(body).encode()))
+        return responses
+
+    def _measure(self, read: Callable[[RawResponse], Any], responses: List[RawResponse]) -> Dict[str, float]:
+        """
+        Reads all responses in each round, keeping the results in memory like the checkers do during a loop.
+        :param read: The function that reads a response.
+        :param responses: The responses to read.
+        :return: The CPU seconds and the allocated bytes of the fastest round, per 1,000 resources.
+        """
+        cpu_seconds = []
+        for _ in range(self.rounds):
+            gc.collect()
+            start = process_time()
+            results = [read(response) for response in responses]
+            cpu_seconds.append(process_time() - start)
+            del results
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            results = [read(response) for response in responses]
+            memory_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del results
+
+        scale = 1000 / len(responses)
+        return {"cpu_seconds": min(cpu_seconds) * scale, "memory_bytes": memory_bytes * scale,
+                "peak_memory_bytes": peak_bytes * scale}
+
+
+def main() -> None:
+    """
+    Runs the benchmark, printing the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description=DeserializationBenchmark.__doc__)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    result = DeserializationBenchmark(args.count, args.rounds).run()
+    print(json.dumps(result, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import logging
+import platform
+import statistics
+from timeit import Timer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBenchmarkRunner:
+    """
+    Times small functions like pytest-benchmark does: each function is called in rounds, with enough calls per round
+    to be measured precisely, and the statistics of the duration per call are kept.
+    The results can be saved as a JSON baseline, and compared with a previous baseline to find regressions.
+    """
+
+    def __init__(self, rounds: int = 20, min_round_time: float = 0.01) -> None:
+        """
+        :param rounds: The amount of times each function is timed.
+        :param min_round_time: The minimal amount of seconds each round takes, by repeating the call.
+        """
+        self.rounds = rounds
+        self.min_round_time = min_round_time
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    def run(self, name: str, func: Callable[[], Any]) -> Dict[str, float]:
+        """
+        Times the given function, storing the statistics under the given name.
+        :param name: The name of the benchmark.
+        :param func: The function to time, without arguments.
+        :return: The statistics of the duration per call in seconds: min, max, mean, median and stddev, and the
+            amount of rounds and of calls per round.
+        """
+        timer = Timer(func)
+        iterations, _ = timer.autorange()  # at least 0.2 seconds, which we scale down to the minimal round time.
+        iterations = max(1, int(iterations * self.min_round_time / 0.2))
+        durations = [duration / iterations for duration in timer.repeat(self.rounds, iterations)]
+        self.results[name] = {
+            "min": min(durations),
+            "max": max(durations),
+            "mean": statistics.mean(durations),
+            "median": statistics.median(durations),
+            "stddev": statistics.stdev(durations) if len(durations) > 1 else 0.0,
+            "rounds": self.rounds,
+            "iterations": iterations,
+        }
+        logging.info("%s: %.2f µs per call.", name, self.results[name]["median"] * 1e6)
+        return self.results[name]
+
+    def save(self, file_name: str) -> None:
+        """
+        Saves the results as a baseline, with the machine they were measured on.
+        :param file_name: The JSON file to write.
+        """
+        baseline = {"machine": self.getMachineInfo(), "benchmarks": self.results}
+        with open(file_name, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+
+    def compare(self, file_name: str, threshold: float) -> List[Tuple[str, float, float]]:
+        """
+        Compares the minimal durations with the ones in a baseline. The fastest round is the one that is least
+        influenced by other processes on the machine, so it is the most stable between runs.
+        :param file_name: The JSON baseline file.
+        :param threshold: The fraction the minimal duration may grow before it is a regression, e.g. 0.2 for 20%.
+        :return: The name, baseline duration and current duration of each benchmark that regressed.
+        """
+        with open(file_name) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["machine"] != self.getMachineInfo():
+            logging.warning("The baseline was measured on %s, which may not be comparable.", baseline["machine"])
+        regressions = []
+        for name, result in sorted(self.results.items()):
+            expected: Optional[float] = baseline["benchmarks"].get(name, {}).get("min")
+            if expected is None:
+                logging.warning("%s is not in the baseline.", name)
+            elif result["min"] > expected * (1 + threshold):
+                regressions.append((name, expected, result["min"]))
+        return regressions
+
+    def formatTable(self) -> str:
+        """
+        :return: A table with the statistics of each benchmark, in microseconds.
+        """
+        header = ("benchmark", "min µs", "median µs", "mean µs", "stddev µs", "ops/s")
+        rows = [header] + [(
+            name,
+            "{:.2f}".format(result["min"] * 1e6),
+            "{:.2f}".format(result["median"] * 1e6),
+            "{:.2f}".format(result["mean"] * 1e6),
+            "{:.2f}".format(result["stddev"] * 1e6),
+            "{:.0f}".format(1 / result["median"]),
+        ) for name, result in sorted(self.results.items())]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+        return "\n".join("  ".join(cell.ljust(widths[0]) if column == 0 else cell.rjust(widths[column])
+                                   for column, cell in enumerate(row)) for row in rows)
+
+    @staticmethod
+    def getMachineInfo() -> Dict[str, str]:
+        """
+        :return: The machine and Python version the benchmarks run on.
+        """
+        return {"machine": platform.machine(), "processor": platform.processor(),
+                "python": platform.python_implementation() + " " + platform.python_version()}
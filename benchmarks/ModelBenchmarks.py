@@ -0,0 +1,120 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+import sys
+from copy import deepcopy
+from typing import Any, Callable, Dict
+
+import yaml
+from kubernetes.client import ApiClient
+
+from benchmarks.MicroBenchmarkRunner import MicroBenchmarkRunner
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.informers.MongoObjectInformer import MongoObjectInformer
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.models.fields import lowercase_to_pascal, pascal_to_lowercase
+
+
+class ModelBenchmarks:
+    """
+    Micro-benchmarks of the hot paths that run for every Mongo object on every check: parsing the objects into models,
+    validating and comparing the models, and building and deserializing the Kubernetes resources.
+    The Mongo object is a fully configured cluster as it is returned by the Kubernetes API.
+    """
+
+    CLUSTER_DEFINITION_FILE = "examples/mongo-3-replicas.yaml"
+    DEFAULT_BASELINE = "benchmarks/baselines/model-benchmarks.json"
+
+    def __init__(self) -> None:
+        with open(self.CLUSTER_DEFINITION_FILE) as definition_file:
+            self.cluster_dict = yaml.safe_load(definition_file)
+        self.cluster_dict["metadata"].update({
+            "uid": "f4c5a1f8-2f6e-11e9-9c4b-42010a840006",
+            "resourceVersion": "1281377",
+            "generation": 4,
+            "creationTimestamp": "2019-02-12T10:08:24Z",
+            "selfLink": "/apis/operators.ultimaker.com/v1/namespaces/mongo-operator-cluster/mongos/mongo-cluster",
+        })
+        self.cluster_dict["spec"]["mongodb"].update({
+            "mongo_name": "mongo", "storage_name": "mongo-storage", "storage_size": "30Gi",
+            "storage_data_path": "/data/db", "storage_class_name": "ssd", "cpu_request": "50m",
+            "memory_request": "32Mi", "wired_tiger_cache_size": "0.25",
+        })
+        self.cluster_dict["status"] = {"observedGeneration": 4, "primary": "mongo-cluster-0"}
+        self.cluster_object = V1MongoClusterConfiguration(**self.cluster_dict)
+        self.stateful_set_dict = ApiClient().sanitize_for_serialization(
+            KubernetesResources.createStatefulSet(self.cluster_object))
+        self.field_names = self._collectKeys(self.cluster_dict) + self._collectKeys(self.stateful_set_dict)
+
+    def getBenchmarks(self) -> Dict[str, Callable[[], Any]]:
+        """
+        :return: The functions to time by name.
+        """
+        cluster_copy = V1MongoClusterConfiguration(**deepcopy(self.cluster_dict))
+        lowercase_names = [pascal_to_lowercase(name) for name in self.field_names]
+        return {
+            "parse_configuration": lambda: MongoObjectInformer._parseConfiguration(  # pylint: disable=W0212
+                self.cluster_dict),
+            "model_init": lambda: V1MongoClusterConfiguration(**self.cluster_dict),
+            "model_validate": self.cluster_object.validate,
+            "model_to_dict": self.cluster_object.to_dict,
+            "model_eq": lambda: self.cluster_object == cluster_copy,
+            "pascal_to_lowercase": lambda: [pascal_to_lowercase(name) for name in self.field_names],
+            "lowercase_to_pascal": lambda: [lowercase_to_pascal(name) for name in lowercase_names],
+            "create_service": lambda: KubernetesResources.createService(self.cluster_object),
+            "create_stateful_set": lambda: KubernetesResources.createStatefulSet(self.cluster_object),
+            "deserialize_stateful_set": lambda: KubernetesResources.deserialize(self.stateful_set_dict,
+                                                                                "V1beta1StatefulSet"),
+        }
+
+    @classmethod
+    def _collectKeys(cls, value: Any) -> list:
+        """
+        :param value: A dictionary or list, possibly nested.
+        :return: All dictionary keys in the value, in the order they are found.
+        """
+        if isinstance(value, dict):
+            return [key for item_key, item in value.items() for key in [item_key] + cls._collectKeys(item)]
+        if isinstance(value, list):
+            return [key for item in value for key in cls._collectKeys(item)]
+        return []
+
+
+def main() -> None:
+    """
+    Runs the micro-benchmarks, optionally saving the results as baseline or comparing them with a baseline.
+    Exits with status 1 if any benchmark regressed.
+    """
+    parser = argparse.ArgumentParser(description=ModelBenchmarks.__doc__)
+    parser.add_argument("--filter", default="", help="Only run the benchmarks whose name contains this text.")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--save", nargs="?", const=ModelBenchmarks.DEFAULT_BASELINE,
+                        help="Save the results as baseline, by default in %(const)s.")
+    parser.add_argument("--compare", nargs="?", const=ModelBenchmarks.DEFAULT_BASELINE,
+                        help="Compare the results with a baseline, by default %(const)s.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="The fraction the minimal duration may grow before it is a regression.")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(module)s:%(lineno)s: %(message)s", level=args.log_level)
+
+    runner = MicroBenchmarkRunner(rounds=args.rounds)
+    for name, func in sorted(ModelBenchmarks().getBenchmarks().items()):
+        if args.filter in name:
+            runner.run(name, func)
+    print(runner.formatTable())
+
+    if args.save:
+        runner.save(args.save)
+    if args.compare:
+        regressions = runner.compare(args.compare, args.threshold)
+        for name, expected, actual in regressions:
+            print("{} regressed from {:.2f} µs to {:.2f} µs ({:+.0%}).".format(
+                name, expected * 1e6, actual * 1e6, actual / expected - 1))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import resource
+from collections import Counter
+from contextlib import contextmanager
+from copy import deepcopy
+from time import perf_counter
+from typing import Any, Dict, Iterator, List
+from unittest.mock import patch
+
+import yaml
+from kubernetes.client import Configuration
+
+from Settings import Settings
+from benchmarks.fakes.FakeKubernetesApiServer import FakeKubernetesApiServer
+from benchmarks.fakes.FakeMongoServer import FakeMongoServer
+from mongoOperator.ClusterManager import ClusterManager
+from mongoOperator.helpers.BackupHelper import BackupHelper
+
+
+class ScaleBenchmark:
+    """
+    Measures how the cluster manager scales with the amount of Mongo objects, against a fake Kubernetes API server and
+    fake replica sets in the same process. Each loop checks all clusters once. The first loop creates the resources
+    of the clusters and initiates their replica sets, the next loops are the periodic checks.
+    The backups are not run, as they are separate processes that do not depend on the amount of clusters.
+    """
+
+    MONGO_OBJECTS = ("apis/" + Settings.CUSTOM_OBJECT_API_GROUP + "/" + Settings.CUSTOM_OBJECT_API_VERSION,
+                     Settings.CUSTOM_OBJECT_RESOURCE_PLURAL)
+    CLUSTER_DEFINITION_FILE = "examples/mongo-3-replicas.yaml"
+    NAMESPACES = 10
+
+    def __init__(self, fleet_size: int, loops: int = 5, api_latency: float = 0.001, mongo_latency: float = 0.001,
+                 workers: int = Settings.RECONCILE_WORKERS, execution_mode: str = Settings.EXECUTION_MODE) -> None:
+        """
+        :param fleet_size: The amount of Mongo objects.
+        :param loops: The amount of times all clusters are checked, at least 2.
+        :param api_latency: The amount of seconds each request to the fake Kubernetes API waits.
+        :param mongo_latency: The amount of seconds each command to the fake replica sets waits.
+        :param workers: The amount of clusters that are checked in parallel.
+        :param execution_mode: Either "threads" or "asyncio", see `ClusterManager`.
+        """
+        self.fleet_size = fleet_size
+        self.loops = max(2, loops)
+        self.api_latency = api_latency
+        self.mongo_latency = mongo_latency
+        self.workers = workers
+        self.execution_mode = execution_mode
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Runs the benchmark in the current process.
+        :return: The results, see `_summarize`.
+        """
+        api_server = FakeKubernetesApiServer(self.api_latency)
+        mongo_server = FakeMongoServer(self.mongo_latency)
+        api_server.start()
+        try:
+            self.createMongoObjects(api_server, self.fleet_size)
+            with self.useFakes(api_server.url, mongo_server):
+                manager = ClusterManager(self.workers, resync_interval=3600.0, execution_mode=self.execution_mode)
+                manager.start()
+                try:
+                    # the informer starts its watch in the background, which should not be counted in the first loop.
+                    api_server.waitForWatchers(self.MONGO_OBJECTS, 1)
+                    startup_api_calls = api_server.popRequestCounts()
+                    loops = [self._runLoop(manager, api_server, mongo_server) for _ in range(self.loops)]
+                finally:
+                    manager.stop()
+                    self.endWatch(api_server, self.fleet_size)
+        finally:
+            api_server.stop()
+        return self._summarize(startup_api_calls, loops)
+
+    def runIsolated(self) -> Dict[str, Any]:
+        """
+        Runs the benchmark in a new process, so its peak memory usage is not influenced by other benchmarks.
+        :return: The results, see `_summarize`.
+        """
+        pool = multiprocessing.get_context("spawn").Pool(1)
+        try:
+            return pool.apply(self.run)
+        finally:
+            pool.close()
+            pool.join()
+
+    @classmethod
+    def createMongoObjects(cls, api_server: FakeKubernetesApiServer, fleet_size: int) -> None:
+        """
+        Creates the given amount of Mongo objects, divided over a few namespaces.
+        :param api_server: The fake Kubernetes API server.
+        :param fleet_size: The amount of Mongo objects.
+        """
+        with open(cls.CLUSTER_DEFINITION_FILE) as definition_file:
+            definition = yaml.safe_load(definition_file)
+        for index in range(fleet_size):
+            body = deepcopy(definition)
+            body["metadata"]["name"] = "mongo-cluster-{}".format(index)
+            body["metadata"]["labels"] = {"app": body["metadata"]["name"]}
+            namespace = "benchmark-{}".format(index % cls.NAMESPACES)
+            api_server.createObject(cls.MONGO_OBJECTS, namespace, body)
+
+    @classmethod
+    def endWatch(cls, api_server: FakeKubernetesApiServer, fleet_size: int) -> None:
+        """
+        Changes a Mongo object, so a stopped informer receives an event and ends its watch.
+        :param api_server: The fake Kubernetes API server.
+        :param fleet_size: The amount of Mongo objects.
+        """
+        if fleet_size:
+            api_server.updateObject(cls.MONGO_OBJECTS, "benchmark-0", "mongo-cluster-0",
+                                    {"metadata": {"annotations": {"benchmark": "done"}}})
+
+    @staticmethod
+    @contextmanager
+    def useFakes(api_url: str, mongo_server: FakeMongoServer) -> Iterator[None]:
+        """
+        Context manager in which the operator connects to the fake servers.
+        :param api_url: The URL of the fake Kubernetes API server.
+        :param mongo_server: The fake replica sets.
+        """
+        previous_configuration = Configuration._default  # pylint: disable=protected-access
+        configuration = Configuration()
+        configuration.host = api_url
+
+        async def backupAsync(*args, **kwargs):
+            pass
+
+        with patch("mongoOperator.services.KubernetesService.load_incluster_config",
+                   lambda: Configuration.set_default(configuration)), \
+                patch("mongoOperator.services.MongoService.MongoClient", mongo_server.createClient), \
+                patch.object(BackupHelper, "backup"), patch.object(BackupHelper, "backupAsync", backupAsync):
+            try:
+                yield
+            finally:
+                # set_default would store a copy, so we restore the previous default itself.
+                Configuration._default = previous_configuration  # pylint: disable=protected-access
+
+    @staticmethod
+    def _runLoop(manager: ClusterManager, api_server: FakeKubernetesApiServer,
+                 mongo_server: FakeMongoServer) -> Dict[str, Any]:
+        """
+        Checks all clusters once, waiting until all checks are done.
+        :return: The duration of the loop, and the amount of API requests and Mongo commands it took.
+        """
+        api_server.popRequestCounts()
+        mongo_server.popCommandCounts()
+        start = perf_counter()
+        manager.checkExistingClusters()
+        manager.waitForChecks()
+        return {"seconds": perf_counter() - start, "api_calls": api_server.popRequestCounts(),
+                "mongo_commands": mongo_server.popCommandCounts()}
+
+    def _summarize(self, startup_api_calls: Counter, loops: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        :param startup_api_calls: The amount of API requests of starting the cluster manager.
+        :param loops: The results of each loop.
+        :return: The results of the benchmark. The latencies, throughput and amounts per loop are of the periodic
+            checks, after the first loop.
+        """
+        periodic = loops[1:]
+        durations = sorted(loop["seconds"] for loop in periodic)
+        p50 = self._percentile(durations, 50)
+        return {
+            "fleet_size": self.fleet_size,
+            "loops": self.loops,
+            "execution_mode": self.execution_mode,
+            "workers": self.workers,
+            "api_latency": self.api_latency,
+            "mongo_latency": self.mongo_latency,
+            "first_loop_seconds": loops[0]["seconds"],
+            "loop_seconds_p50": p50,
+            "loop_seconds_p99": self._percentile(durations, 99),
+            "clusters_per_second": self.fleet_size / p50 if p50 else 0.0,
+            "startup_api_calls": dict(startup_api_calls),
+            "first_loop_api_calls": dict(loops[0]["api_calls"]),
+            "api_calls_per_loop": self._average([loop["api_calls"] for loop in periodic]),
+            "mongo_commands_per_loop": self._average([loop["mongo_commands"] for loop in periodic]),
+            # the peak resident set size of the process, in kilobytes on Linux.
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], percentile: float) -> float:
+        """
+        :param sorted_values: The values, in ascending order.
+        :param percentile: The percentile, between 0 and 100.
+        :return: The nearest-rank percentile of the values.
+        """
+        return sorted_values[max(0, math.ceil(percentile / 100 * len(sorted_values)) - 1)]
+
+    @staticmethod
+    def _average(counts: List[Counter]) -> Dict[str, float]:
+        """
+        :param counts: The amounts per loop.
+        :return: The average amounts per loop.
+        """
+        return {key: value / len(counts) for key, value in sorted(sum(counts, Counter()).items())}
+
+
+def _formatTable(results: List[Dict[str, Any]]) -> str:
+    """
+    :param results: The results of each fleet size.
+    :return: A table with the main results.
+    """
+    header = ("clusters", "first loop s", "loop p50 s", "loop p99 s", "clusters/s", "API calls/loop",
+              "Mongo cmds/loop", "peak RSS MB")
+    rows = [header] + [(
+        str(result["fleet_size"]),
+        "{:.3f}".format(result["first_loop_seconds"]),
+        "{:.3f}".format(result["loop_seconds_p50"]),
+        "{:.3f}".format(result["loop_seconds_p99"]),
+        "{:.1f}".format(result["clusters_per_second"]),
+        "{:.1f}".format(sum(result["api_calls_per_loop"].values())),
+        "{:.1f}".format(sum(result["mongo_commands_per_loop"].values())),
+        "{:.1f}".format(result["peak_rss_mb"]),
+    ) for result in results]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main() -> None:
+    """
+    Runs the benchmark for each of the given fleet sizes, printing a table and optionally writing the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description=ScaleBenchmark.__doc__)
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--loops", type=int, default=5)
+    parser.add_argument("--api-latency", type=float, default=0.001)
+    parser.add_argument("--mongo-latency", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=Settings.RECONCILE_WORKERS)
+    parser.add_argument("--execution-mode", default=Settings.EXECUTION_MODE, choices=["threads", "asyncio"])
+    parser.add_argument("--output", help="The JSON file to which the results are written.")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(module)s:%(lineno)s: %(message)s", level=args.log_level)
+
+    results = []
+    for fleet_size in args.fleet_sizes:
+        benchmark = ScaleBenchmark(fleet_size, args.loops, args.api_latency, args.mongo_latency, args.workers,
+                                   args.execution_mode)
+        logging.warning("Checking %s clusters %s times...", fleet_size, benchmark.loops)
+        results.append(benchmark.runIsolated())
+    print(_formatTable(results))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import logging
+import multiprocessing
+import statistics
+import sys
+from time import perf_counter
+from typing import Any, Dict, List
+
+from benchmarks.fakes.FakeKubernetesApiServer import FakeKubernetesApiServer
+
+# This module is imported by the new processes, so it may not import the operator itself: that is what we measure.
+
+
+class StartupBenchmark:
+    """
+    Measures how long a new operator process takes until it checked all existing clusters once, against a fake
+    Kubernetes API server and fake replica sets. This is the gap after a failover in which no cluster is managed.
+    The startup consists of importing the operator and of the first reconcile: loading the Mongo objects, creating
+    their resources and initiating their replica sets.
+    """
+
+    # the modules that are only needed by backups and restores, so the operator should not import them at startup.
+    LAZY_MODULES = ("google.cloud.storage", "croniter")
+
+    # the maximum amount of seconds the import of the operator may take. Most of it is spent importing Kubernetes.
+    IMPORT_SECONDS_BUDGET = 1.5
+
+    def __init__(self, fleet_size: int = 10, runs: int = 5, api_latency: float = 0.001,
+                 mongo_latency: float = 0.001) -> None:
+        """
+        :param fleet_size: The amount of Mongo objects.
+        :param runs: The amount of processes that are started one after another.
+        :param api_latency: The amount of seconds each request to the fake Kubernetes API waits.
+        :param mongo_latency: The amount of seconds each command to the fake replica sets waits.
+        """
+        self.fleet_size = fleet_size
+        self.runs = runs
+        self.api_latency = api_latency
+        self.mongo_latency = mongo_latency
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Starts the operator in a new process for each run.
+        :return: The median and minimum durations in seconds of the import, the first reconcile and both, and the lazy
+            modules that were imported at startup.
+        """
+        from benchmarks.ScaleBenchmark import ScaleBenchmark  # this process is not measured, so it may import all.
+        api_server = FakeKubernetesApiServer(self.api_latency)
+        api_server.start()
+        try:
+            ScaleBenchmark.createMongoObjects(api_server, self.fleet_size)
+            runs = [self._runProcess(api_server) for _ in range(self.runs)]
+        finally:
+            api_server.stop()
+
+        result = {"fleet_size": self.fleet_size, "runs": self.runs, "api_latency": self.api_latency,
+                  "mongo_latency": self.mongo_latency, "lazy_modules_imported": runs[0]["lazy_modules_imported"]}
+        for name in ("import_seconds", "reconcile_seconds", "total_seconds"):
+            durations = [run[name] for run in runs]
+            result[name + "_median"] = statistics.median(durations)
+            result[name + "_min"] = min(durations)
+        return result
+
+    def _runProcess(self, api_server: FakeKubernetesApiServer) -> Dict[str, Any]:
+        """
+        Starts the operator in a new process and waits until it checked all clusters.
+        :param api_server: The fake Kubernetes API server, with the Mongo objects.
+        :return: The results of the process, see `startOperator`.
+        """
+        from benchmarks.ScaleBenchmark import ScaleBenchmark
+        pool = multiprocessing.get_context("spawn").Pool(1)
+        try:
+            return pool.apply(startOperator, (api_server.url, self.mongo_latency))
+        finally:
+            ScaleBenchmark.endWatch(api_server, self.fleet_size)
+            pool.close()
+            pool.join()
+
+
+def startOperator(api_url: str, mongo_latency: float) -> Dict[str, Any]:
+    """
+    Imports the operator and checks all clusters once. This runs in a new process.
+    :param api_url: The URL of the fake Kubernetes API server.
+    :param mongo_latency: The amount of seconds each command to the fake replica sets waits.
+    :return: The duration in seconds of the import, of the first reconcile and of both, and the lazy modules that were
+        imported.
+    """
+    start = perf_counter()
+    from mongoOperator.MongoOperator import MongoOperator  # noqa: F401 pylint: disable=unused-import
+    import_seconds = perf_counter() - start
+    lazy_modules = [name for name in StartupBenchmark.LAZY_MODULES if name in sys.modules]
+
+    from benchmarks.ScaleBenchmark import ScaleBenchmark
+    from benchmarks.fakes.FakeMongoServer import FakeMongoServer
+    from mongoOperator.ClusterManager import ClusterManager
+    with ScaleBenchmark.useFakes(api_url, FakeMongoServer(mongo_latency)):
+        start = perf_counter()
+        manager = ClusterManager(resync_interval=3600.0)
+        manager.start()
+        try:
+            manager.waitForSync()
+            manager.checkExistingClusters()
+            manager.waitForChecks()
+            reconcile_seconds = perf_counter() - start
+        finally:
+            manager.stop()
+    return {"import_seconds": import_seconds, "reconcile_seconds": reconcile_seconds,
+            "total_seconds": import_seconds + reconcile_seconds, "lazy_modules_imported": lazy_modules}
+
+
+def main() -> None:
+    """
+    Runs the benchmark, printing the results as JSON. Exits with status 1 if the import exceeds the budget.
+    """
+    parser = argparse.ArgumentParser(description=StartupBenchmark.__doc__)
+    parser.add_argument("--fleet-size", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--api-latency", type=float, default=0.001)
+    parser.add_argument("--mongo-latency", type=float, default=0.001)
+    parser.add_argument("--import-budget", type=float, default=StartupBenchmark.IMPORT_SECONDS_BUDGET,
+                        help="The maximum median duration of the import in seconds.")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(module)s:%(lineno)s: %(message)s", level=args.log_level)
+
+    result = StartupBenchmark(args.fleet_size, args.runs, args.api_latency, args.mongo_latency).run()
+    print(json.dumps(result, indent=2, sort_keys=True))
+    errors: List[str] = []
+    if result["import_seconds_median"] > args.import_budget:
+        errors.append("The import took {:.3f} seconds, more than the budget of {:.3f} seconds.".format(
+            result["import_seconds_median"], args.import_budget))
+    if result["lazy_modules_imported"]:
+        errors.append("These modules should not be imported at startup: {}.".format(result["lazy_modules_imported"]))
+    for error in errors:
+        print(error)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
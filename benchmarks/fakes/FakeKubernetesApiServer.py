@@ -0,0 +1,256 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from base64 import b64encode
+from collections import Counter
+from copy import deepcopy
+from http.server import HTTPServer
+from queue import Queue
+from socketserver import ThreadingMixIn
+from threading import Condition, Lock, Thread
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from benchmarks.fakes.FakeKubernetesRequestHandler import FakeKubernetesRequestHandler
+
+# format: (API prefix, resource plural), e.g. ("api/v1", "services").
+Collection = Tuple[str, str]
+
+
+class FakeKubernetesApiServer(ThreadingMixIn, HTTPServer):
+    """
+    In-process fake of the Kubernetes API server, holding the objects in memory.
+    It implements the REST endpoints of any resource type in a generic way: listing with label selectors, watching,
+    getting, creating, patching, replacing and deleting objects, and patching their status subresource.
+    Each request waits for the configured latency first, so the API server of a real cluster can be simulated.
+    """
+
+    daemon_threads = True
+    CREATION_TIMESTAMP = "2019-01-01T00:00:00Z"
+    # the metadata fields that are managed by the server, and cannot be changed by the clients.
+    SERVER_METADATA = ("name", "namespace", "uid", "generation", "creationTimestamp")
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0) -> None:
+        """
+        :param latency: The amount of seconds each request waits before it is handled.
+        :param host: The address to listen on.
+        :param port: The port to listen on, 0 to pick a free port.
+        """
+        super().__init__((host, port), FakeKubernetesRequestHandler)
+        self.latency = latency
+        self.request_counts: Counter = Counter()  # format: {"verb resource": amount of requests}
+        self._lock = Lock()
+        self._resource_version = 0
+        self._collections: Dict[Collection, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        self._watchers: Dict[Collection, List[Queue]] = {}
+        self._watchers_changed = Condition(self._lock)
+        self._thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        :return: The base URL of the server, to be used as host in the Kubernetes client configuration.
+        """
+        return "http://{}:{}".format(*self.server_address)
+
+    def start(self) -> None:
+        """
+        Starts serving requests in a background thread.
+        """
+        self._thread = Thread(target=self.serve_forever, name="FakeKubernetesApiServer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops serving requests, ending the open watches, and closes the socket.
+        """
+        with self._lock:
+            for watchers in self._watchers.values():
+                for watcher in watchers:
+                    watcher.put(None)
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+        self.server_close()
+
+    def popRequestCounts(self) -> Counter:
+        """
+        :return: The amount of requests per verb and resource since the previous call.
+        """
+        with self._lock:
+            counts, self.request_counts = self.request_counts, Counter()
+        return counts
+
+    def countRequest(self, verb: str, resource: str) -> None:
+        """
+        :param verb: The verb of the request, like "list" or "patch".
+        :param resource: The plural of the resource, followed by the subresource if any.
+        """
+        with self._lock:
+            self.request_counts["{} {}".format(verb, resource)] += 1
+
+    def listObjects(self, collection: Collection, namespace: Optional[str] = None,
+                    label_selector: Optional[str] = None, limit: Optional[int] = None,
+                    continue_token: Optional[str] = None, metadata_only: bool = False) -> Dict[str, Any]:
+        """
+        :param collection: The collection of the objects.
+        :param namespace: The namespace of the objects, or None for all namespaces.
+        :param label_selector: The labels the objects must have, in the format "key=value,other=value".
+        :param limit: The maximum amount of objects to return, or None to return all.
+        :param continue_token: The token of the previous page, which is the offset of this page.
+        :param metadata_only: Whether to only return the metadata of the objects, like a PartialObjectMetadataList.
+        :return: The list response, containing the objects, the current resource version and the token of the next
+            page if there are more objects.
+        """
+        labels = dict(item.split("=", 1) for item in label_selector.split(",")) if label_selector else {}
+        offset = int(continue_token or 0)
+        with self._lock:
+            items = [deepcopy({"metadata": body["metadata"]} if metadata_only else body)
+                     for (item_namespace, _), body in self._collections.get(collection, {}).items()
+                     if namespace in (None, item_namespace)
+                     and labels.items() <= body["metadata"].get("labels", {}).items()]
+            metadata = {"resourceVersion": str(self._resource_version)}
+        if limit and offset + limit < len(items):
+            metadata["continue"] = str(offset + limit)
+        return {"metadata": metadata, "items": items[offset:offset + limit] if limit else items[offset:]}
+
+    def getObject(self, collection: Collection, namespace: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        :param collection: The collection of the object.
+        :param namespace: The namespace of the object.
+        :param name: The name of the object.
+        :return: The object, or None if it does not exist.
+        """
+        with self._lock:
+            body = self._collections.get(collection, {}).get((namespace, name))
+            return deepcopy(body) if body is not None else None
+
+    def createObject(self, collection: Collection, namespace: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        :param collection: The collection of the object.
+        :param namespace: The namespace of the object.
+        :param body: The object to create.
+        :return: The created object, or None if it already exists.
+        """
+        body = self._encodeStringData(deepcopy(body))
+        metadata = body.setdefault("metadata", {})
+        metadata.update(namespace=namespace or None, uid=str(uuid4()), generation=1,
+                        creationTimestamp=self.CREATION_TIMESTAMP)
+        with self._lock:
+            objects = self._collections.setdefault(collection, {})
+            if (namespace, metadata["name"]) in objects:
+                return None
+            objects[(namespace, metadata["name"])] = body
+            return self._notify(collection, "ADDED", body)
+
+    def updateObject(self, collection: Collection, namespace: str, name: str, body: Dict[str, Any],
+                     merge: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        :param collection: The collection of the object.
+        :param namespace: The namespace of the object.
+        :param name: The name of the object.
+        :param body: The patch, or the new object.
+        :param merge: Whether the body is merged into the existing object, or replaces it.
+        :return: The updated object, or None if it does not exist.
+        """
+        with self._lock:
+            current = self._collections.get(collection, {}).get((namespace, name))
+            if current is None:
+                return None
+            updated = self._encodeStringData(self._merge(deepcopy(current), body) if merge else deepcopy(body))
+            metadata = updated.setdefault("metadata", {})
+            for key in self.SERVER_METADATA:
+                metadata[key] = current["metadata"][key]
+            if updated.get("spec") != current.get("spec"):
+                updated["metadata"]["generation"] = current["metadata"]["generation"] + 1
+            self._collections[collection][(namespace, name)] = updated
+            return self._notify(collection, "MODIFIED", updated)
+
+    def deleteObject(self, collection: Collection, namespace: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        :param collection: The collection of the object.
+        :param namespace: The namespace of the object.
+        :param name: The name of the object.
+        :return: The deleted object, or None if it does not exist.
+        """
+        with self._lock:
+            body = self._collections.get(collection, {}).pop((namespace, name), None)
+            return self._notify(collection, "DELETED", body) if body is not None else None
+
+    def addWatcher(self, collection: Collection) -> Queue:
+        """
+        :param collection: The collection to watch.
+        :return: A queue that receives the watch events of the collection, and None when the server stops.
+        """
+        watcher: Queue = Queue()
+        with self._lock:
+            self._watchers.setdefault(collection, []).append(watcher)
+            self._watchers_changed.notify_all()
+        return watcher
+
+    def waitForWatchers(self, collection: Collection, count: int, timeout: float = 10.0) -> bool:
+        """
+        Waits until the given amount of clients watch the collection.
+        :param collection: The watched collection.
+        :param count: The amount of watchers to wait for.
+        :param timeout: The maximum amount of seconds to wait.
+        :return: Whether there are enough watchers.
+        """
+        with self._lock:
+            return self._watchers_changed.wait_for(lambda: len(self._watchers.get(collection, [])) >= count, timeout)
+
+    def removeWatcher(self, collection: Collection, watcher: Queue) -> None:
+        """
+        :param collection: The watched collection.
+        :param watcher: The queue returned by `addWatcher`.
+        """
+        with self._lock:
+            self._watchers[collection].remove(watcher)
+
+    def _notify(self, collection: Collection, event_type: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Gives the changed object a new resource version, and sends it to the watchers of its collection.
+        Must be called while holding the lock.
+        :param collection: The collection of the object.
+        :param event_type: The type of the watch event.
+        :param body: The changed object.
+        :return: A copy of the changed object.
+        """
+        self._resource_version += 1
+        body["metadata"]["resourceVersion"] = str(self._resource_version)
+        for watcher in self._watchers.get(collection, []):
+            watcher.put({"type": event_type, "object": deepcopy(body)})
+        logging.debug("%s %s/%s", event_type, collection[1], body["metadata"]["name"])
+        return deepcopy(body)
+
+    @staticmethod
+    def _encodeStringData(body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Moves the `stringData` of a secret into its base64 encoded `data`, like Kubernetes does.
+        :param body: The object that is stored.
+        :return: The same object.
+        """
+        string_data = body.pop("stringData", None) or {}
+        if string_data:
+            body.setdefault("data", {}).update({key: b64encode(value.encode()).decode()
+                                                for key, value in string_data.items()})
+        return body
+
+    @classmethod
+    def _merge(cls, target: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merges a patch into an object like a JSON merge patch: dictionaries are merged, null values are removed and
+        other values are replaced.
+        :param target: The object that is changed.
+        :param patch: The patch to apply.
+        :return: The changed object.
+        """
+        for key, value in patch.items():
+            if value is None:
+                target.pop(key, None)
+            elif isinstance(value, dict) and isinstance(target.get(key), dict):
+                cls._merge(target[key], value)
+            else:
+                target[key] = value
+        return target
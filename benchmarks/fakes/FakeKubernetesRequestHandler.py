@@ -0,0 +1,172 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import logging
+import re
+from http.server import BaseHTTPRequestHandler
+from time import sleep
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# the parsed path of a request, e.g. /api/v1/namespaces/default/services/mongo-cluster.
+ApiRequest = NamedTuple("ApiRequest", [("collection", Tuple[str, str]), ("namespace", Optional[str]),
+                                       ("name", Optional[str]), ("subresource", Optional[str]),
+                                       ("query", Dict[str, str])])
+
+
+class FakeKubernetesRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests to the fake Kubernetes API server, storing the objects in the server.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # the headers and body are written separately, which would be delayed by the Nagle algorithm.
+    disable_nagle_algorithm = True
+
+    PATH_PATTERN = re.compile(r"^/(?P<prefix>api/v\w+|apis/[^/]+/[^/]+)(?:/namespaces/(?P<namespace>[^/]+))?"
+                              r"/(?P<plural>[^/]+)(?:/(?P<name>[^/]+))?(?:/(?P<subresource>[^/]+))?$")
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        Gets, lists or watches objects.
+        """
+        request = self._parseRequest()
+        if request is None:
+            return
+        if request.name:
+            self._countRequest("get", request)
+            self._respond(self.server.getObject(request.collection, request.namespace, request.name))
+        elif request.query.get("watch", "").lower() == "true":
+            self._countRequest("watch", request)
+            self._watch(request)
+        else:
+            self._countRequest("list", request)
+            limit = request.query.get("limit")
+            self._respond(self.server.listObjects(request.collection, request.namespace,
+                                                  request.query.get("labelSelector"), int(limit) if limit else None,
+                                                  request.query.get("continue"),
+                                                  "as=PartialObjectMetadataList" in self.headers.get("Accept", "")))
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """
+        Creates an object.
+        """
+        request = self._parseRequest()
+        if request is not None:
+            self._countRequest("create", request)
+            body = self.server.createObject(request.collection, request.namespace, self._readBody())
+            self._respond(body, status=201, error_status=409, error_reason="AlreadyExists")
+
+    def do_PATCH(self) -> None:  # pylint: disable=invalid-name
+        """
+        Patches an object, or its status when the status subresource is requested.
+        """
+        request = self._parseRequest()
+        if request is not None:
+            self._countRequest("patch", request)
+            patch = self._readBody()
+            if request.subresource == "status":
+                patch = {"status": patch.get("status")}
+            self._respond(self.server.updateObject(request.collection, request.namespace, request.name, patch))
+
+    def do_PUT(self) -> None:  # pylint: disable=invalid-name
+        """
+        Replaces an object.
+        """
+        request = self._parseRequest()
+        if request is not None:
+            self._countRequest("update", request)
+            self._respond(self.server.updateObject(request.collection, request.namespace, request.name,
+                                                   self._readBody(), merge=False))
+
+    def do_DELETE(self) -> None:  # pylint: disable=invalid-name
+        """
+        Deletes an object.
+        """
+        request = self._parseRequest()
+        if request is not None:
+            self._countRequest("delete", request)
+            self._readBody()
+            deleted = self.server.deleteObject(request.collection, request.namespace, request.name)
+            self._respond(deleted and {"kind": "Status", "apiVersion": "v1", "status": "Success"})
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        """
+        Logs the requests at debug level instead of writing them to stderr.
+        """
+        logging.debug("Fake Kubernetes API: " + format, *args)
+
+    def _parseRequest(self) -> Optional[ApiRequest]:
+        """
+        Waits for the latency of the server and parses the path of the request.
+        :return: The parsed request, or None if the path is unknown, in which case a 404 response has been sent.
+        """
+        sleep(self.server.latency)
+        url = urlparse(self.path)
+        match = self.PATH_PATTERN.match(url.path)
+        if not match:
+            self._readBody()
+            self._respond(None)
+            return None
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return ApiRequest((match.group("prefix"), match.group("plural")), match.group("namespace"),
+                          match.group("name"), match.group("subresource"), query)
+
+    def _countRequest(self, verb: str, request: ApiRequest) -> None:
+        """
+        :param verb: The verb of the request.
+        :param request: The parsed request.
+        """
+        resource = request.collection[1]
+        self.server.countRequest(verb, resource + "/" + request.subresource if request.subresource else resource)
+
+    def _readBody(self) -> Dict[str, Any]:
+        """
+        :return: The JSON body of the request, or an empty dict if there is no body.
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length).decode()) if length else {}
+
+    def _respond(self, body: Optional[Dict[str, Any]], status: int = 200, error_status: int = 404,
+                 error_reason: str = "NotFound") -> None:
+        """
+        Sends a JSON response.
+        :param body: The body of the response, or None to respond with an error status.
+        :param status: The HTTP status of a successful response.
+        :param error_status: The HTTP status if there is no body.
+        :param error_reason: The reason of the error.
+        """
+        if body is None:
+            status = error_status
+            body = {"kind": "Status", "apiVersion": "v1", "status": "Failure", "reason": error_reason,
+                    "code": error_status}
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _watch(self, request: ApiRequest) -> None:
+        """
+        Streams the watch events of the requested collection, one JSON object per line, until the server stops or the
+        client disconnects.
+        :param request: The parsed request.
+        """
+        watcher = self.server.addWatcher(request.collection)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in iter(watcher.get, None):
+                line = json.dumps(event).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            logging.debug("Fake Kubernetes API: the client of the watch disconnected.")
+        finally:
+            self.server.removeWatcher(request.collection, watcher)
+            self.close_connection = True
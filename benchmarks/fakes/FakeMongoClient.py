@@ -0,0 +1,41 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from benchmarks.fakes.FakeMongoServer import FakeMongoServer  # noqa: F401 pylint: disable=cyclic-import
+
+
+class FakeMongoClient:
+    """
+    Client of the fake Mongo server, with the parts of the interface of `pymongo.MongoClient` used by the operator.
+    """
+
+    def __init__(self, server: "FakeMongoServer", replica_set: Optional[str]) -> None:
+        """
+        :param server: The fake server that responds to the commands.
+        :param replica_set: The name of the replica set to connect to, None for a single host.
+        """
+        self._server = server
+        self._replica_set = replica_set
+
+    @property
+    def admin(self) -> "FakeMongoClient":
+        """
+        :return: The admin database, on which the operator runs all its commands.
+        """
+        return self
+
+    def command(self, command: str, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Runs an admin command on the fake server.
+        :param command: The name of the command.
+        :return: The response of the command.
+        """
+        return self._server.runCommand(self._replica_set, command, *args, **kwargs)
+
+    def close(self) -> None:
+        """
+        Closes the client. The fake client has no connections, so there is nothing to close.
+        """
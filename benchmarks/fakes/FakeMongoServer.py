@@ -0,0 +1,87 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections import Counter
+from threading import Lock
+from time import sleep
+from typing import Any, Dict, List, Optional, Set, Union
+
+from pymongo.errors import OperationFailure
+
+from benchmarks.fakes.FakeMongoClient import FakeMongoClient
+from mongoOperator.services.MongoService import MongoService
+
+
+class FakeMongoServer:
+    """
+    In-process fake of the Mongo replica sets, responding to the admin commands that the operator sends.
+    A replica set is unknown until it is initiated, like a real replica set that has no configuration yet.
+    Each command waits for the configured latency first.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        :param latency: The amount of seconds each command waits before it is handled.
+        """
+        self.latency = latency
+        self.command_counts: Counter = Counter()  # format: {command name: amount of commands}
+        self._lock = Lock()
+        self._members: Dict[str, List[str]] = {}  # format: {replica set name: member hosts}
+        self._users: Dict[str, Set[str]] = {}  # format: {replica set name: user names}
+
+    def createClient(self, host: Union[str, List[str]], replicaSet: Optional[str] = None,  # pylint: disable=C0103
+                     **kwargs) -> FakeMongoClient:
+        """
+        Creates a client like `pymongo.MongoClient`, so this method can replace it.
+        :param host: The host or hosts to connect to.
+        :param replicaSet: The name of the replica set.
+        :param kwargs: The other options of the client, which are ignored.
+        :return: The client.
+        """
+        return FakeMongoClient(self, replicaSet)
+
+    def popCommandCounts(self) -> Counter:
+        """
+        :return: The amount of commands per command name since the previous call.
+        """
+        with self._lock:
+            counts, self.command_counts = self.command_counts, Counter()
+        return counts
+
+    def runCommand(self, replica_set: Optional[str], command: str, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Responds to an admin command.
+        :param replica_set: The name of the replica set the client connected to, None for a single host.
+        :param command: The name of the command.
+        :param args: The arguments of the command.
+        :param kwargs: The options of the command.
+        :return: The response of the command.
+        :raise OperationFailure: If the replica set is not initiated, or the command is unknown.
+        """
+        sleep(self.latency)
+        with self._lock:
+            self.command_counts[command] += 1
+            if command in ("replSetInitiate", "replSetReconfig"):
+                config = args[0]
+                self._members[config["_id"]] = [member["host"] for member in config["members"]]
+                return {"ok": 1.0}
+            if replica_set not in self._members:
+                raise OperationFailure(MongoService.NO_REPLICA_SET_RESPONSE)
+            if command == "replSetGetStatus":
+                return self._getStatus(replica_set)
+            if command == "usersInfo":
+                users = self._users.get(replica_set, set())
+                return {"users": [{"user": args[0]["user"]}] if args[0]["user"] in users else [], "ok": 1.0}
+            if command == "createUser":
+                self._users.setdefault(replica_set, set()).add(args[0])
+                return {"ok": 1.0}
+        raise OperationFailure("no such command: '{}'".format(command))
+
+    def _getStatus(self, replica_set: str) -> Dict[str, Any]:
+        """
+        :param replica_set: The name of the replica set.
+        :return: The status of the replica set, in which the first member is the primary.
+        """
+        members = [{"_id": index, "name": host, "health": 1.0, "stateStr": "PRIMARY" if index == 0 else "SECONDARY"}
+                   for index, host in enumerate(self._members[replica_set])]
+        return {"set": replica_set, "members": members, "ok": 1.0}
@@ -1,86 +1,276 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
-from typing import Dict, List, Tuple, Optional
+from time import monotonic
+from typing import Any, Callable, Optional, Union
 
-from mongoOperator.helpers.resourceCheckers.AdminSecretChecker import AdminSecretChecker
-from mongoOperator.helpers.BackupHelper import BackupHelper
-from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
-from mongoOperator.helpers.resourceCheckers.ServiceChecker import ServiceChecker
-from mongoOperator.helpers.resourceCheckers.StatefulSetChecker import StatefulSetChecker
+from Settings import Settings
+from mongoOperator.helpers.AsyncReconcileWorkerPool import AsyncReconcileWorkerPool
+from mongoOperator.helpers.ClusterReconciler import ClusterReconciler
+from mongoOperator.helpers.ClusterScheduler import ClusterScheduler
+from mongoOperator.helpers.ClusterStatusWriter import ClusterStatusWriter
+from mongoOperator.helpers.Metrics import Metrics
+from mongoOperator.helpers.Profiler import Profiler
+from mongoOperator.helpers.ReconcileWorkerPool import ReconcileWorkerPool
+from mongoOperator.helpers.ReplicaCoordinator import ReplicaCoordinator
+from mongoOperator.helpers.informers.MongoObjectInformer import MongoObjectInformer
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+from mongoOperator.helpers.tracing.Tracer import Tracer
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from mongoOperator.services.KubernetesService import KubernetesService
-from mongoOperator.services.MongoService import MongoService
 
 
 class ClusterManager:
     """ Manager that periodically checks the status of the MongoDB objects in the cluster. """
 
-    def __init__(self) -> None:
-        self._cluster_versions: Dict[Tuple[str, str], str] = {}  # format: {(cluster_name, namespace): resource_version}
-        self._kubernetes_service = KubernetesService()
-        self._mongo_service = MongoService(self._kubernetes_service)
-        self._backup_checker = BackupHelper(self._kubernetes_service)
-        self._resource_checkers: List[BaseResourceChecker] = [
-            ServiceChecker(self._kubernetes_service),
-            StatefulSetChecker(self._kubernetes_service),
-            AdminSecretChecker(self._kubernetes_service),
-        ]
+    ASYNCIO_EXECUTION_MODE = "asyncio"
+
+    def __init__(self, workers: int = Settings.RECONCILE_WORKERS, resync_interval: float = 5.0,
+                 execution_mode: str = Settings.EXECUTION_MODE, profiler: Optional[Profiler] = None) -> None:
+        """
+        :param workers: The amount of clusters that may be checked in parallel.
+        :param resync_interval: The amount of seconds between the periodic checks of each cluster.
+        :param execution_mode: Either "threads", to check each cluster in a worker thread, or "asyncio", to check the
+            clusters as coroutines on a single event loop.
+        :param profiler: The profiler that may profile the cluster checks on demand.
+        """
+        self._profiler = profiler if profiler is not None else Profiler()
+        self._scheduler = ClusterScheduler(resync_interval)
+        kubernetes_service = KubernetesService()
+        self._coordinator = ReplicaCoordinator(kubernetes_service)
+        self._informer = MongoObjectInformer(kubernetes_service)
+        self._status_writer = ClusterStatusWriter(kubernetes_service,
+                                                  has_cluster=lambda key: self._informer.getCluster(key) is not None)
+        self._reconciler = ClusterReconciler(kubernetes_service, self._status_writer, is_owner=self.ownsCluster)
+        self._worker_pool = self._createWorkerPool(execution_mode, workers)
+        Metrics.WORK_QUEUE_DEPTH.set_function(lambda: len(self._worker_pool.queue))
+
+    @property
+    def is_active(self) -> bool:
+        """
+        :return: Whether this replica of the operator should check clusters. This is always True without leader
+            election or sharding.
+        """
+        return self._coordinator.is_active
+
+    @property
+    def has_synced(self) -> bool:
+        """
+        :return: Whether the Mongo objects have been loaded into the local cache.
+        """
+        return self._informer.has_synced
+
+    def ownsCluster(self, cluster_object: V1MongoClusterConfiguration) -> bool:
+        """
+        :param cluster_object: The cluster object from the YAML file.
+        :return: Whether this replica of the operator should check the given cluster.
+        """
+        return self._ownsKey((cluster_object.metadata.name, cluster_object.metadata.namespace))
+
+    def start(self) -> None:
+        """
+        Starts loading the Mongo objects into the local cache and watching them for changes in the background. The
+        clusters of each page of the list are marked as changed right away, see `waitForSync`.
+        If leader election is enabled, we also start competing for the lease. If sharding is enabled, we join the
+        other replicas.
+        """
+        self._informer.start()
+        self._status_writer.start()
+        self._coordinator.start()
+
+    def waitForSync(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all Mongo objects have been loaded into the local cache.
+        :param timeout: The maximum amount of seconds to wait, or None to wait indefinitely.
+        :return: Whether the cache is synced.
+        """
+        return self._informer.waitForSync(timeout)
+
+    def stop(self) -> None:
+        """
+        Stops watching the Mongo objects for changes and stops the workers once their current checks are done.
+        Our leases are released so another replica can take over right away, after the pending status is written.
+        """
+        self._status_writer.stop()
+        self._coordinator.stop()
+        self._informer.stop()
+        self._worker_pool.shutdown(wait=False)
 
     def checkExistingClusters(self) -> None:
         """
         Check all Mongo objects and see if the sub objects are available.
         If they are not, they should be (re-)created to ensure the cluster is in the expected state.
+        The clusters are checked in parallel by the worker pool, this method does not wait for the checks to finish.
+        """
+        self._informer.popChangedKeys()  # all clusters are checked, so there is no need to check the changed ones.
+        cluster_keys = [key for key in self._informer.listKeys() if self._ownsKey(key)]
+        logging.info("Checking %s mongo objects.", len(cluster_keys))
+        for key in cluster_keys:
+            self._worker_pool.submit(key)
+
+    def runDueTasks(self) -> None:
+        """
+        Submits the clusters whose periodic check or backup is due to the workers, and collects garbage when it is due.
+        All clusters are checked when we just became active, or when the clusters were divided again over the replicas.
+        Replicas that are not active only warm up their connections to the replica sets.
+        """
+        if self._coordinator.popAssignmentChange():
+            self.checkExistingClusters()
+        elif not self.is_active:
+            self._warmUp()
+            return
+
+        for key in self._scheduler.popDueChecks():
+            self._submit(key)
+        if self._scheduler.popGarbageCollection() and self._coordinator.isCoordinator():
+            self.collectGarbage()
+
+    def getSecondsUntilNextTask(self) -> float:
+        """
+        :return: The amount of seconds until the next task should be run by `runDueTasks`.
+        """
+        # the leadership or the division of the clusters may change at any time, so we check it every retry period.
+        retry_period = self._coordinator.retry_period
+        if not self.is_active:
+            return retry_period
+        return min(self._scheduler.getSecondsUntilNextTask(), float("inf") if retry_period is None else retry_period)
+
+    def checkChangedClusters(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits for changes in the Mongo objects, submitting each cluster to the workers as soon as it has been changed.
+        :param timeout: The amount of seconds to keep waiting for changes. By default, we wait until the next task
+            is due.
         """
-        mongo_objects = self._kubernetes_service.listMongoObjects()
-        logging.info("Checking %s mongo objects.", len(mongo_objects["items"]))
-        for cluster_dict in mongo_objects["items"]:
-            cluster_object = self._parseConfiguration(cluster_dict)
-            if cluster_object:
-                self._checkCluster(cluster_object)
+        if timeout is None:
+            timeout = self.getSecondsUntilNextTask()
+        logging.debug("Waiting %.3f seconds for changes.", timeout)
+        deadline = monotonic() + timeout
+        remaining = timeout
+        while remaining > 0:
+            for key in self._informer.waitForChanges(remaining):
+                self._submit(key)
+            remaining = deadline - monotonic()
+
+    def waitForChecks(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the workers finished checking all submitted clusters.
+        :param timeout: The maximum amount of seconds to wait, or None to wait indefinitely.
+        :return: True if all checks are done, False if the timeout expired.
+        """
+        return self._worker_pool.join(timeout)
+
+    def getOldestCheckStart(self) -> Optional[float]:
+        """
+        :return: The monotonic time at which the longest running cluster check started, or None if no cluster is being
+            checked.
+        """
+        return self._worker_pool.queue.getOldestProcessingTime()
 
     def collectGarbage(self) -> None:
         """
         Cleans up any resources that are left after a cluster has been removed.
         """
-        for checker in self._resource_checkers:
-            checker.cleanResources()
+        self._reconciler.collectGarbage()
+
+    def _createWorkerPool(self, execution_mode: str, workers: int
+                          ) -> Union[ReconcileWorkerPool, AsyncReconcileWorkerPool]:
+        """
+        Creates the pool of workers that checks the clusters.
+        :param execution_mode: Either "threads" or "asyncio", see `__init__`.
+        :param workers: The amount of clusters that may be checked in parallel.
+        :return: The worker pool.
+        """
+        if execution_mode == self.ASYNCIO_EXECUTION_MODE:
+            # the Kubernetes and Mongo clients are blocking, so their calls are run in the executor of the pool.
+            return AsyncReconcileWorkerPool(self._checkClusterByKeyAsync, workers)
+        return ReconcileWorkerPool(self._checkClusterByKey, workers)
+
+    def _checkClusterByKey(self, key: ObjectKey) -> None:
+        """
+        Checks the cluster with the given key, as it is currently known in the cache.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        cluster_object = self._getOwnedCluster(key)
+        if cluster_object:
+            with self._profiler.profile():
+                with ClusterReconciler.measureStep("reconcile", cluster=key[0], namespace=key[1]):
+                    self._reconciler.checkCluster(cluster_object)
+            self._scheduleNextCheck(key, cluster_object)
+
+    async def _checkClusterByKeyAsync(self, key: ObjectKey) -> None:
+        """
+        Checks the cluster with the given key like `_checkClusterByKey`, without blocking the event loop.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        cluster_object = self._getOwnedCluster(key)
+        if cluster_object:
+            with ClusterReconciler.measureStep("reconcile", cluster=key[0], namespace=key[1]):
+                await self._reconciler.checkClusterAsync(cluster_object, self._runBlocking,
+                                                         self._worker_pool.executor)
+            self._scheduleNextCheck(key, cluster_object)
+
+    async def _runBlocking(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Runs a blocking function in the executor of the worker pool, so the event loop can continue with other clusters
+        meanwhile.
+        The spans started by the function are children of the current span, and it is profiled if that was requested.
+        :param func: The function to run.
+        :param args: The arguments of the function.
+        :return: The result of the function.
+        """
+        bound_func = Tracer.bind(func)
+
+        def run() -> Any:
+            with self._profiler.profile():
+                return bound_func(*args)
+        return await asyncio.get_event_loop().run_in_executor(self._worker_pool.executor, run)
+
+    def _getOwnedCluster(self, key: ObjectKey) -> Optional[V1MongoClusterConfiguration]:
+        """
+        Gets the cluster with the given key from the cache, cancelling its periodic check if it should not be checked.
+        :param key: The key of the cluster, in the format (name, namespace).
+        :return: The cluster object, or None if it was removed or if it is not owned by this replica.
+        """
+        if not self._ownsKey(key):
+            logging.info("Not checking cluster %s as it is not owned by this replica.", key)
+            self._scheduler.cancel(key)
+            return None
+        cluster_object = self._informer.getCluster(key)
+        if not cluster_object:
+            logging.info("Cluster object %s has been removed.", key)
+            self._reconciler.forget(key)
+            self._scheduler.cancel(key)
+        return cluster_object
+
+    def _ownsKey(self, key: ObjectKey) -> bool:
+        """
+        :param key: The key of the cluster, in the format (name, namespace).
+        :return: Whether this replica of the operator should check the given cluster.
+        """
+        return self._coordinator.ownsKey(key)
+
+    def _submit(self, key: ObjectKey) -> None:
+        """
+        Submits the given cluster to the workers, if this replica owns it.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        if self._ownsKey(key):
+            self._worker_pool.submit(key)
 
-    def _checkCluster(self, cluster_object: V1MongoClusterConfiguration, force: bool = False) -> None:
+    def _warmUp(self) -> None:
         """
-        Checks whether the given cluster is configured and updated.
+        Connects to all replica sets in the cache, so we can take over right away when we start leading.
+        """
+        for cluster_object in self._informer.listClusters():
+            self._reconciler.warmUp(cluster_object)
+
+    def _scheduleNextCheck(self, key: ObjectKey, cluster_object: V1MongoClusterConfiguration) -> None:
+        """
+        Schedules the next periodic check of the given cluster, or its next backup if that is due earlier.
+        Failed checks are not scheduled, as they are retried by the worker pool.
+        :param key: The key of the cluster.
         :param cluster_object: The cluster object from the YAML file.
-        :param force: If this is True, we will re-update the cluster even if it has been checked before.
-        """
-        key = cluster_object.metadata.name, cluster_object.metadata.namespace
-
-        if self._cluster_versions.get(key) == cluster_object.metadata.resource_version and not force:
-            logging.debug("Cluster object %s has been checked already in version %s.",
-                          key, cluster_object.metadata.resource_version)
-            # we still want to check the replicas to make sure everything is working.
-            self._mongo_service.checkOrCreateReplicaSet(cluster_object)
-        else:
-            for checker in self._resource_checkers:
-                checker.checkResource(cluster_object)
-            self._mongo_service.checkOrCreateReplicaSet(cluster_object)
-            self._mongo_service.createUsers(cluster_object)
-            self._cluster_versions[key] = cluster_object.metadata.resource_version
-
-        self._backup_checker.backupIfNeeded(cluster_object)
-
-    @staticmethod
-    def _parseConfiguration(cluster_dict: Dict[str, any]) -> Optional[V1MongoClusterConfiguration]:
-        """
-        Tries to parse the given cluster configuration, returning None if the object cannot be parsed.
-        :param cluster_dict: The dictionary containing the configuration.
-        :return: The cluster configuration model, if valid, or None.
-        """
-        try:
-            result = V1MongoClusterConfiguration(**cluster_dict)
-            result.validate()
-            return result
-        except ValueError as err:
-            meta = cluster_dict.get("metadata", {})
-            logging.error("Could not validate cluster configuration for %s @ ns/%s: %s. The cluster will be ignored.",
-                          meta.get("name"), meta.get("namespace"), err)
+        """
+        self._scheduler.scheduleCheck(key, self._reconciler.getSecondsUntilNextBackup(cluster_object))
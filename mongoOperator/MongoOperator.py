@@ -2,9 +2,16 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 import logging
-from time import sleep
+from typing import Optional
 
+from Settings import Settings
 from mongoOperator.ClusterManager import ClusterManager
+from mongoOperator.helpers.Metrics import Metrics
+from mongoOperator.helpers.Profiler import Profiler
+from mongoOperator.helpers.admin.AdminServer import AdminServer
+from mongoOperator.helpers.admin.HealthChecker import HealthChecker
+from mongoOperator.helpers.tracing.JsonLinesSpanExporter import JsonLinesSpanExporter
+from mongoOperator.helpers.tracing.Tracer import Tracer
 
 
 class MongoOperator:
@@ -14,26 +21,79 @@ class MongoOperator:
 
     def __init__(self, sleep_per_run: float = 5.0) -> None:
         """
-        :param sleep_per_run: How many seconds we should sleep after each run.
+        :param sleep_per_run: How many seconds there are between the periodic checks of each cluster.
         """
         self._sleep_per_run = sleep_per_run
+        self._profiler = Profiler()
 
     def run_forever(self) -> None:
         """
         Runs the mongo operator forever (until a kill command is received).
         """
-        checker = ClusterManager()
+        checker = ClusterManager(resync_interval=self._sleep_per_run, profiler=self._profiler)
+        health_checker = HealthChecker(lambda: checker.has_synced, checker.getOldestCheckStart)
+        admin_server = self._startAdminServer(health_checker)
+        self._startTracing()
+        self._profiler.installSignalHandlers()
         try:
+            checker.start()
             while True:
-                logging.info("**** Running Cluster Check ****")
-                try:
-                    checker.checkExistingClusters()
-                    checker.collectGarbage()
-                except Exception as global_exception:
-                    logging.exception(global_exception)
-                    raise
-                logging.info("Checks done, waiting %s seconds", self._sleep_per_run)
-                sleep(self._sleep_per_run)
+                self._runOnce(checker, health_checker)
+                health_checker.beat()
         except KeyboardInterrupt:
             logging.info("Application interrupted...")
+        finally:
+            checker.stop()
+            Tracer.setExporter(None)
+            if admin_server is not None:
+                admin_server.stop()
         logging.info("Done running operator")
+
+    def _runOnce(self, checker: ClusterManager, health_checker: HealthChecker) -> None:
+        """
+        Runs the due tasks of the cluster manager, and then waits for changes in the clusters until the next task.
+        :param checker: The cluster manager.
+        :param health_checker: The health checker, that decides how long we may wait without making progress.
+        """
+        try:
+            # the clusters are checked when they change, or when their periodic check or backup is due.
+            checker.runDueTasks()
+            # we stop waiting in time for the next heartbeat, so the liveness probe succeeds while we are idle.
+            checker.checkChangedClusters(min(checker.getSecondsUntilNextTask(), health_checker.heartbeat_interval))
+            self._profiler.onLoopDone()
+        except Exception as global_exception:  # pylint: disable=broad-except
+            # a failing run should not stop the operator, the next run will try again.
+            logging.exception(global_exception)
+
+    def _startAdminServer(self, health_checker: HealthChecker) -> Optional[AdminServer]:
+        """
+        Starts the HTTP server with the metrics and health endpoints, and the profiling endpoints if they are enabled.
+        :param health_checker: The health checker that handles the liveness and readiness probes.
+        :return: The started server, or None if it is disabled.
+        """
+        if not Settings.ADMIN_SERVER:
+            return None
+        admin_server = AdminServer(Settings.ADMIN_PORT)
+        admin_server.addRoute("/metrics", Metrics.export)
+        admin_server.addRoute("/healthz", health_checker.checkLiveness)
+        admin_server.addRoute("/readyz", health_checker.checkReadiness)
+        if Settings.PROFILING_ENDPOINTS:
+            admin_server.addRoute("/debug/profile", lambda: AdminServer.textResponse(
+                "Profiling the next {} loops to {}\n".format(self._profiler.loops, self._profiler.startCpuProfile())))
+            admin_server.addRoute("/debug/memory", lambda: AdminServer.textResponse(
+                "Wrote {}\n".format(self._profiler.takeMemorySnapshot())))
+            admin_server.addRoute("/debug/threads", lambda: AdminServer.textResponse(
+                "Wrote {}\n".format(self._profiler.dumpThreads())))
+        admin_server.start()
+        return admin_server
+
+    @staticmethod
+    def _startTracing() -> None:
+        """
+        Starts sending the spans to the configured exporter, if any.
+        """
+        if Settings.TRACING_EXPORTER == "jsonlines":
+            logging.info("Writing the tracing spans to %s.", Settings.TRACING_FILE)
+            Tracer.setExporter(JsonLinesSpanExporter(Settings.TRACING_FILE))
+        elif Settings.TRACING_EXPORTER:
+            logging.warning("Unknown tracing exporter %s, tracing is disabled.", Settings.TRACING_EXPORTER)
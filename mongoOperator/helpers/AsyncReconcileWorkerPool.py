@@ -0,0 +1,143 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread, current_thread, main_thread
+from typing import Awaitable, Callable, Optional, Set
+
+from Settings import Settings
+from mongoOperator.helpers.WorkQueue import WorkQueue
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+from mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter import ExponentialBackoffRateLimiter
+from mongoOperator.helpers.rateLimiters.TokenBucketRateLimiter import TokenBucketRateLimiter
+
+
+class AsyncReconcileWorkerPool:
+    """
+    Pool that reconciles clusters as coroutines on a single event loop, taking the keys from a work queue.
+    It behaves like the `ReconcileWorkerPool`, but a check that is waiting for I/O does not hold a thread. This allows
+    checking many clusters concurrently with a fixed amount of threads: one runs the event loop, one waits for keys on
+    the queue, and the reconcile coroutine runs its blocking calls in the executor of the pool.
+    """
+
+    def __init__(self, reconcile: Callable[[ObjectKey], Awaitable[None]], workers: int,
+                 queue: Optional[WorkQueue] = None, io_threads: int = Settings.ASYNC_IO_THREADS) -> None:
+        """
+        :param reconcile: The coroutine function that reconciles a single key.
+        :param workers: The maximum amount of keys that are reconciled concurrently.
+        :param queue: The work queue to use, by default a queue is created based on the settings.
+        :param io_threads: The amount of threads in the executor, that run the blocking calls of the reconciliations.
+        """
+        self._reconcile = reconcile
+        self._worker_count = workers
+        if queue is None:
+            queue = WorkQueue(
+                ExponentialBackoffRateLimiter(Settings.RECONCILE_RETRY_BASE_DELAY, Settings.RECONCILE_RETRY_MAX_DELAY),
+                TokenBucketRateLimiter(Settings.RECONCILE_RETRY_QPS, Settings.RECONCILE_RETRY_BURST),
+            )
+        self._queue = queue
+        self._executor = ThreadPoolExecutor(io_threads)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+        self._thread_lock = Lock()
+
+    @property
+    def queue(self) -> WorkQueue:
+        """
+        :return: The work queue of this pool.
+        """
+        return self._queue
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        :return: The executor in which the reconcile coroutine should run its blocking calls.
+        """
+        return self._executor
+
+    def submit(self, key: ObjectKey) -> None:
+        """
+        Schedules the reconciliation of the given key.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        self._startLoop()
+        self._queue.add(key)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all submitted keys have been reconciled. Failed keys that will be retried later are not waited for.
+        :param timeout: The maximum amount of seconds to wait, or None to wait indefinitely.
+        :return: True if all keys were reconciled, False if the timeout expired.
+        """
+        return self._queue.waitUntilIdle(timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops taking keys from the queue. Keys that were not picked up yet are discarded.
+        :param wait: Whether to wait for the running reconciliations to finish.
+        """
+        self._queue.shutDown()
+        if wait and self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def _startLoop(self) -> None:
+        """
+        Starts the event loop in a background thread the first time a key is submitted.
+        """
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            if current_thread() is main_thread():
+                # before Python 3.8, subprocesses can only be awaited when the child watcher was attached to the loop
+                # from the main thread.
+                asyncio.get_child_watcher().attach_loop(self._loop)
+            self._thread = Thread(target=self._runLoop, name="ReconcileLoop", daemon=True)
+            self._thread.start()
+
+    def _runLoop(self) -> None:
+        """
+        Runs the event loop until the queue is shut down and the running reconciliations are done.
+        """
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._work())
+        finally:
+            self._loop.close()
+
+    async def _work(self) -> None:
+        """
+        Starts reconciling keys from the queue, as long as less than the maximum amount of keys are being reconciled.
+        """
+        semaphore = asyncio.Semaphore(self._worker_count)
+        running: Set[asyncio.Future] = set()
+        with ThreadPoolExecutor(1) as queue_executor:
+            while True:
+                await semaphore.acquire()
+                key = await self._loop.run_in_executor(queue_executor, self._queue.get)
+                if key is None:
+                    break
+                task = asyncio.ensure_future(self._run(key, semaphore))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        await asyncio.gather(*running)
+
+    async def _run(self, key: ObjectKey, semaphore: asyncio.Semaphore) -> None:
+        """
+        Reconciles the given key, scheduling a retry if it failed.
+        :param key: The key of the cluster.
+        :param semaphore: The semaphore that limits the amount of concurrent reconciliations, released when done.
+        """
+        try:
+            await self._reconcile(key)
+            self._queue.forget(key)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.exception("Could not check cluster %s (attempt %s), it will be retried later: %s",
+                              key, self._queue.numRequeues(key) + 1, err)
+            self._queue.addRateLimited(key)
+        finally:
+            self._queue.done(key)
+            semaphore.release()
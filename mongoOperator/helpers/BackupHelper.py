@@ -1,19 +1,22 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import asyncio
 import json
 import logging
 import os
 from base64 import b64decode
-from subprocess import check_output, CalledProcessError, SubprocessError
+from concurrent.futures import Executor
+from subprocess import check_output, CalledProcessError, PIPE, SubprocessError
 
-from croniter import croniter
 from datetime import datetime
-from google.cloud.storage import Client as StorageClient
-from google.oauth2.service_account import Credentials as ServiceCredentials
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from mongoOperator.helpers.ClusterStatusWriter import ClusterStatusWriter
+from mongoOperator.helpers.GoogleCloudStorage import GoogleCloudStorage
+from mongoOperator.helpers.Metrics import Metrics
 from mongoOperator.helpers.MongoResources import MongoResources
+from mongoOperator.helpers.tracing.Tracer import Tracer
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from mongoOperator.services.KubernetesService import KubernetesService
 
@@ -32,12 +35,17 @@ class BackupHelper:
         """
         return datetime.utcnow()
 
-    def __init__(self, kubernetes_service: KubernetesService):
+    def __init__(self, kubernetes_service: KubernetesService, status_writer: Optional[ClusterStatusWriter] = None):
         """
         :param kubernetes_service: The kubernetes service.
+        :param status_writer: The writer to which the date of the last backup is reported, if any.
         """
         self.kubernetes_service = kubernetes_service
+        self._status_writer = status_writer
         self._last_backups = {}  # type: Dict[Tuple[str, str], datetime]  # format: {(cluster_name, namespace): date}
+        # the next backup date is only calculated again when the cron or the last backup changed.
+        # format: {(cluster_name, namespace): (cron, last_backup, next_backup)}
+        self._next_backups = {}  # type: Dict[Tuple[str, str], Tuple[str, datetime, datetime]]
 
     def backupIfNeeded(self, cluster_object: V1MongoClusterConfiguration) -> bool:
         """
@@ -46,27 +54,131 @@ class BackupHelper:
         :return: Whether a backup was created or not.
         """
         now = self._utcNow()
+        if not self._isBackupDue(cluster_object, now):
+            return False
+        self.backup(cluster_object, now)
+        self._setLastBackup(cluster_object, now)
+        return True
 
-        cluster_key = (cluster_object.metadata.name, cluster_object.metadata.namespace)
-        last_backup = self._last_backups.get(cluster_key)
-        next_backup = croniter(cluster_object.spec.backups.cron, last_backup, datetime).get_next() \
-            if last_backup else now
+    async def backupIfNeededAsync(self, cluster_object: V1MongoClusterConfiguration,
+                                  executor: Optional[Executor] = None) -> bool:
+        """
+        Checks whether a backup is needed for the cluster, backing it up if necessary without blocking the event loop.
+        :param cluster_object: The cluster object from the YAML file.
+        :param executor: The executor in which the blocking calls are run, by default the executor of the event loop.
+        :return: Whether a backup was created or not.
+        """
+        now = self._utcNow()
+        if not self._isBackupDue(cluster_object, now):
+            return False
+        await self.backupAsync(cluster_object, now, executor)
+        self._setLastBackup(cluster_object, now)
+        return True
+
+    def _setLastBackup(self, cluster_object: V1MongoClusterConfiguration, now: datetime) -> None:
+        """
+        Remembers when the given cluster was backed up, reporting it to the status writer if any.
+        :param cluster_object: The cluster object from the YAML file.
+        :param now: The date of the backup.
+        """
+        self._last_backups[(cluster_object.metadata.name, cluster_object.metadata.namespace)] = now
+        if self._status_writer is not None:
+            self._status_writer.update(cluster_object, lastBackup=now.isoformat() + "Z")
 
+    def _isBackupDue(self, cluster_object: V1MongoClusterConfiguration, now: datetime) -> bool:
+        """
+        :param cluster_object: The cluster object from the YAML file.
+        :param now: The current date.
+        :return: Whether the cluster should be backed up now.
+        """
+        next_backup = self.getNextBackupDate(cluster_object) or now
         if next_backup <= now:
-            self.backup(cluster_object, now)
-            self._last_backups[cluster_key] = now
             return True
-
         logging.info("Cluster %s @ ns/%s will need a backup at %s.", cluster_object.metadata.name,
                      cluster_object.metadata.namespace, next_backup.isoformat())
         return False
 
+    def getNextBackupDate(self, cluster_object: V1MongoClusterConfiguration) -> Optional[datetime]:
+        """
+        Calculates when the next backup of the given cluster is due.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The date of the next backup in UTC, or None if the cluster has not been backed up yet.
+        """
+        cluster_key = (cluster_object.metadata.name, cluster_object.metadata.namespace)
+        last_backup = self._last_backups.get(cluster_key)
+        if not last_backup:
+            return None
+
+        cron = cluster_object.spec.backups.cron
+        cached_cron, cached_last_backup, next_backup = self._next_backups.get(cluster_key, (None, None, None))
+        if cached_cron != cron or cached_last_backup != last_backup:
+            from croniter import croniter  # imported when needed, as it is only used by clusters with backups.
+            next_backup = croniter(cron, last_backup, datetime).get_next()
+            self._next_backups[cluster_key] = (cron, last_backup, next_backup)
+        return next_backup
+
+    def getSecondsUntilNextBackup(self, cluster_object: V1MongoClusterConfiguration) -> float:
+        """
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The amount of seconds until the next backup of the given cluster is due, 0 if it is due already.
+        """
+        next_backup = self.getNextBackupDate(cluster_object)
+        return max(0.0, (next_backup - self._utcNow()).total_seconds()) if next_backup else 0.0
+
     def backup(self, cluster_object: V1MongoClusterConfiguration, now: datetime):
         """
         Creates a new backup for the given cluster saving it in the cloud storage.
         :param cluster_object: The cluster object from the YAML file.
         :param now: The current date, used in the date format.
         """
+        with Metrics.TRANSFER_DURATION.labels(operation="backup").time():
+            hostname, backup_file = self._prepareBackup(cluster_object, now)
+            try:
+                with Tracer.span("backup.dump", host=hostname):
+                    backup_output = check_output(self._getBackupCommand(hostname, backup_file))
+            except CalledProcessError as err:
+                raise self._createBackupError(hostname, backup_file, err.returncode, err.stderr, err.stdout)
+
+            logging.debug("Backup output: %s", backup_output)
+
+            with Tracer.span("backup.upload", file=backup_file):
+                self._uploadBackup(cluster_object, backup_file)
+            Metrics.TRANSFER_BYTES.labels(operation="backup").inc(os.path.getsize(backup_file))
+            os.remove(backup_file)
+
+    async def backupAsync(self, cluster_object: V1MongoClusterConfiguration, now: datetime,
+                          executor: Optional[Executor] = None) -> None:
+        """
+        Creates a new backup for the given cluster saving it in the cloud storage, like `backup`.
+        The event loop is not blocked while `mongodump` runs, and the upload is run in the given executor.
+        :param cluster_object: The cluster object from the YAML file.
+        :param now: The current date, used in the date format.
+        :param executor: The executor in which the upload is run, by default the executor of the event loop.
+        """
+        with Metrics.TRANSFER_DURATION.labels(operation="backup").time():
+            hostname, backup_file = self._prepareBackup(cluster_object, now)
+            with Tracer.span("backup.dump", host=hostname):
+                process = await asyncio.create_subprocess_exec(*self._getBackupCommand(hostname, backup_file),
+                                                               stdout=PIPE, stderr=PIPE)
+                backup_output, backup_error = await process.communicate()
+            if process.returncode:
+                raise self._createBackupError(hostname, backup_file, process.returncode, backup_error, backup_output)
+
+            logging.debug("Backup output: %s", backup_output)
+
+            with Tracer.span("backup.upload", file=backup_file):
+                await asyncio.get_event_loop().run_in_executor(executor, self._uploadBackup, cluster_object,
+                                                               backup_file)
+            Metrics.TRANSFER_BYTES.labels(operation="backup").inc(os.path.getsize(backup_file))
+            os.remove(backup_file)
+
+    def _prepareBackup(self, cluster_object: V1MongoClusterConfiguration, now: datetime) -> Tuple[str, str]:
+        """
+        Decides where the given cluster is backed up from and to.
+        :param cluster_object: The cluster object from the YAML file.
+        :param now: The current date, used in the date format.
+        :return: A tuple with the host name of the Mongo pod and the location of the backup file.
+        """
         backup_file = "/tmp/" + self.BACKUP_FILE_FORMAT.format(namespace=cluster_object.metadata.namespace,
                                                                name=cluster_object.metadata.name,
                                                                date=now.strftime("%Y-%m-%d_%H%M%S"))
@@ -77,17 +189,30 @@ class BackupHelper:
 
         logging.info("Backing up cluster %s @ ns/%s from %s to %s.", cluster_object.metadata.name,
                      cluster_object.metadata.namespace, hostname, backup_file)
+        return hostname, backup_file
 
-        try:
-            backup_output = check_output(["mongodump", "--host", hostname, "--gzip", "--archive=" + backup_file])
-        except CalledProcessError as err:
-            raise SubprocessError("Could not backup '{}' to '{}'. Return code: {}\n stderr: '{}'\n stdout: '{}'"
-                                  .format(hostname, backup_file, err.returncode, err.stderr, err.stdout))
-
-        logging.debug("Backup output: %s", backup_output)
+    @staticmethod
+    def _getBackupCommand(hostname: str, backup_file: str) -> List[str]:
+        """
+        :param hostname: The host name of the Mongo pod to back up.
+        :param backup_file: The location where the backup file will be written to.
+        :return: The `mongodump` command line.
+        """
+        return ["mongodump", "--host", hostname, "--gzip", "--archive=" + backup_file]
 
-        self._uploadBackup(cluster_object, backup_file)
-        os.remove(backup_file)
+    @staticmethod
+    def _createBackupError(hostname: str, backup_file: str, return_code: int, stderr: Optional[bytes],
+                           stdout: Optional[bytes]) -> SubprocessError:
+        """
+        :param hostname: The host name of the Mongo pod that was backed up.
+        :param backup_file: The location where the backup file was written to.
+        :param return_code: The return code of `mongodump`.
+        :param stderr: The error output of `mongodump`, if captured.
+        :param stdout: The output of `mongodump`.
+        :return: The error raised when `mongodump` failed.
+        """
+        return SubprocessError("Could not backup '{}' to '{}'. Return code: {}\n stderr: '{}'\n stdout: '{}'"
+                               .format(hostname, backup_file, return_code, stderr, stdout))
 
     def _uploadBackup(self, cluster_object: V1MongoClusterConfiguration, backup_file: str) -> None:
         """
@@ -125,8 +250,7 @@ class BackupHelper:
         :param key: The key to save the file in the cloud storage.
         :param file_name: The local file that will be uploaded.
         """
-        credentials = ServiceCredentials.from_service_account_info(credentials)
-        gcs_client = StorageClient(credentials.project_id, credentials)
+        gcs_client = GoogleCloudStorage.createClient(credentials)
         bucket = gcs_client.bucket(bucket_name)
         bucket.blob(key).upload_from_filename(file_name)
         logging.info("Backup uploaded to gcs://%s/%s", bucket_name, key)
@@ -0,0 +1,177 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from mongoOperator.helpers.BackupHelper import BackupHelper
+from mongoOperator.helpers.ClusterStatusWriter import ClusterStatusWriter
+from mongoOperator.helpers.Metrics import Metrics
+from mongoOperator.helpers.informers.MongoObjectInformer import MongoObjectInformer
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+from mongoOperator.helpers.resourceCheckers.AdminSecretChecker import AdminSecretChecker
+from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
+from mongoOperator.helpers.resourceCheckers.ServiceChecker import ServiceChecker
+from mongoOperator.helpers.resourceCheckers.StatefulSetChecker import StatefulSetChecker
+from mongoOperator.helpers.tracing.Tracer import Tracer
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
+from mongoOperator.services.MongoService import MongoService
+
+
+class ClusterReconciler:
+    """
+    Brings a single cluster in the expected state: its Kubernetes resources, its replica set, its users, its restore
+    and its backup. The cluster manager decides which clusters are checked and when, and runs this in its workers.
+    The ownership of the cluster is checked again before each step, so a check that was already running when the
+    cluster was handed off to another replica of the operator stops at the next step.
+    """
+
+    def __init__(self, kubernetes_service: KubernetesService, status_writer: ClusterStatusWriter,
+                 is_owner: Callable[[V1MongoClusterConfiguration], bool]) -> None:
+        """
+        :param kubernetes_service: The kubernetes service.
+        :param status_writer: The writer to which the observed state of the clusters is reported.
+        :param is_owner: Function returning whether this replica of the operator should check the given cluster.
+        """
+        self._kubernetes_service = kubernetes_service
+        self._status_writer = status_writer
+        self._is_owner = is_owner
+        self._cluster_versions: Dict[ObjectKey, str] = {}  # format: {(cluster_name, namespace): generation}
+        self._mongo_service = MongoService(kubernetes_service, is_owner=is_owner, status_writer=status_writer)
+        self._backup_checker = BackupHelper(kubernetes_service, status_writer=status_writer)
+        self._resource_checkers: List[BaseResourceChecker] = [
+            ServiceChecker(kubernetes_service),
+            StatefulSetChecker(kubernetes_service),
+            AdminSecretChecker(kubernetes_service),
+        ]
+
+    def checkCluster(self, cluster_object: V1MongoClusterConfiguration, force: bool = False) -> None:
+        """
+        Checks whether the given cluster is configured and updated, and backs it up if that is due.
+        :param cluster_object: The cluster object from the YAML file.
+        :param force: If this is True, we will re-update the cluster even if it has been checked before.
+        """
+        self.reconcileCluster(cluster_object, force)
+        if self._isHandedOff(cluster_object):
+            return
+        with self.measureStep("backup"):
+            self._backup_checker.backupIfNeeded(cluster_object)
+
+    async def checkClusterAsync(self, cluster_object: V1MongoClusterConfiguration,
+                                run_blocking: Callable[..., Awaitable[Any]], executor: Optional[Executor]) -> None:
+        """
+        Checks the given cluster like `checkCluster`, without blocking the event loop.
+        Each step awaits its blocking Kubernetes or Mongo calls separately, so other clusters can continue in between.
+        The amount of calls that run at the same time is limited by the threads of the executor.
+        :param cluster_object: The cluster object from the YAML file.
+        :param run_blocking: Coroutine function that runs a blocking function with its arguments in a thread.
+        :param executor: The executor in which the blocking calls of the backup are run.
+        """
+        for step, func in self._getReconcileSteps(cluster_object):
+            if self._isHandedOff(cluster_object):
+                return
+            with self.measureStep(step):
+                await run_blocking(func, cluster_object)
+        if self._isHandedOff(cluster_object):
+            return
+        with self.measureStep("backup"):
+            await self._backup_checker.backupIfNeededAsync(cluster_object, executor)
+
+    def reconcileCluster(self, cluster_object: V1MongoClusterConfiguration, force: bool = False) -> None:
+        """
+        Checks whether the given cluster is configured and updated, without backing it up.
+        :param cluster_object: The cluster object from the YAML file.
+        :param force: If this is True, we will re-update the cluster even if it has been checked before.
+        """
+        for step, func in self._getReconcileSteps(cluster_object, force):
+            if self._isHandedOff(cluster_object):
+                return
+            with self.measureStep(step):
+                func(cluster_object)
+
+    def _isHandedOff(self, cluster_object: V1MongoClusterConfiguration) -> bool:
+        """
+        Checks whether the given cluster was handed off to another replica of the operator while it was being checked.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: True if this replica should not continue with the check, False otherwise.
+        """
+        if self._is_owner(cluster_object):
+            return False
+        logging.info("Stopping the check of cluster %s as it was handed off to another replica.",
+                     (cluster_object.metadata.name, cluster_object.metadata.namespace))
+        return True
+
+    def _getReconcileSteps(self, cluster_object: V1MongoClusterConfiguration, force: bool = False
+                           ) -> Iterator[Tuple[str, Callable[[V1MongoClusterConfiguration], Any]]]:
+        """
+        Generates the steps that check whether the given cluster is configured and updated.
+        The caller runs each step before getting the next one, so the cluster is only marked as checked once all steps
+        before that succeeded.
+        :param cluster_object: The cluster object from the YAML file.
+        :param force: If this is True, we will re-update the cluster even if it has been checked before.
+        :return: The name and the function of each step. The function is called with the cluster object.
+        """
+        key = cluster_object.metadata.name, cluster_object.metadata.namespace
+        generation = MongoObjectInformer.getGeneration(cluster_object)
+
+        if self._cluster_versions.get(key) == generation and not force:
+            logging.debug("Cluster object %s has been checked already in generation %s.", key, generation)
+            # we still want to check the replicas to make sure everything is working.
+            yield "replicaSet", self._mongo_service.checkOrCreateReplicaSet
+        else:
+            for checker in self._resource_checkers:
+                yield type(checker).__name__, checker.checkResource
+            yield "replicaSet", self._mongo_service.checkOrCreateReplicaSet
+            yield "users", self._mongo_service.createUsers
+            self._cluster_versions[key] = generation
+            self._status_writer.update(cluster_object, observedGeneration=cluster_object.metadata.generation)
+
+        # restores that failed when the replica set became ready are retried here.
+        yield "restore", self._mongo_service.restoreIfNeeded
+
+    def forget(self, key: ObjectKey) -> None:
+        """
+        Forgets everything we know about a cluster that has been removed.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        self._cluster_versions.pop(key, None)
+        self._status_writer.forget(key)
+
+    def getSecondsUntilNextBackup(self, cluster_object: V1MongoClusterConfiguration) -> float:
+        """
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The amount of seconds until the next backup of the given cluster is due, 0 if it is due already.
+        """
+        return self._backup_checker.getSecondsUntilNextBackup(cluster_object)
+
+    def warmUp(self, cluster_object: V1MongoClusterConfiguration) -> None:
+        """
+        Connects to the replica set of the given cluster, so we can check it right away when we start owning it.
+        :param cluster_object: The cluster object from the YAML file.
+        """
+        self._mongo_service.connect(cluster_object)
+
+    def collectGarbage(self) -> None:
+        """
+        Cleans up any resources that are left after a cluster has been removed.
+        The clusters are listed once for all resource types, so this takes a constant amount of requests.
+        """
+        # the resources are listed before the clusters, so the resources of a cluster that was just created are kept.
+        resource_keys = [(checker, checker.listResourceKeys()) for checker in self._resource_checkers]
+        cluster_keys = self._kubernetes_service.listMongoObjectKeys()
+        for checker, checker_resource_keys in resource_keys:
+            checker.deleteOrphans(checker_resource_keys, cluster_keys)
+
+    @staticmethod
+    @contextmanager
+    def measureStep(step: str, **attributes) -> Iterator[None]:
+        """
+        Context manager that measures the duration of a step of the cluster check, and records it as a span.
+        :param step: The name of the step.
+        :param attributes: Details of the step for the span.
+        """
+        with Tracer.span(step, **attributes), Metrics.RECONCILE_DURATION.labels(step=step).time():
+            yield
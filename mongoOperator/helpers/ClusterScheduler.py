@@ -0,0 +1,80 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from time import monotonic
+from typing import List, Optional
+
+from Settings import Settings
+from mongoOperator.helpers.DeadlineScheduler import DeadlineScheduler
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+
+
+class ClusterScheduler:
+    """
+    Decides when the periodic tasks of the operator are due: the check of each cluster, and the garbage collection.
+    A cluster is checked again after the resync interval, or earlier if its next backup is due before that.
+    """
+
+    def __init__(self, resync_interval: float,
+                 garbage_collection_interval: float = Settings.GARBAGE_COLLECTION_INTERVAL) -> None:
+        """
+        :param resync_interval: The amount of seconds between the periodic checks of each cluster.
+        :param garbage_collection_interval: The amount of seconds between the garbage collections.
+        """
+        self.resync_interval = resync_interval
+        self.garbage_collection_interval = garbage_collection_interval
+        self._checks = DeadlineScheduler()  # format: {(cluster_name, namespace): deadline of the next check}
+        self._next_garbage_collection = 0.0  # the first garbage collection is due right away.
+
+    def __len__(self) -> int:
+        """
+        :return: The amount of clusters whose next check is scheduled.
+        """
+        return len(self._checks)
+
+    def scheduleCheck(self, key: ObjectKey, seconds_until_backup: float) -> None:
+        """
+        Schedules the next periodic check of the given cluster, or its next backup if that is due earlier.
+        :param key: The key of the cluster, in the format (name, namespace).
+        :param seconds_until_backup: The amount of seconds until the next backup of the cluster is due.
+        """
+        self._checks.schedule(key, monotonic() + min(self.resync_interval, seconds_until_backup))
+
+    def cancel(self, key: ObjectKey) -> None:
+        """
+        Cancels the periodic check of the given cluster.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        self._checks.cancel(key)
+
+    def getDeadline(self, key: ObjectKey) -> Optional[float]:
+        """
+        :param key: The key of the cluster, in the format (name, namespace).
+        :return: When the next check of the given cluster is due, or None if it is not scheduled.
+        """
+        return self._checks.getDeadline(key)
+
+    def popDueChecks(self) -> List[ObjectKey]:
+        """
+        :return: The keys of the clusters whose periodic check is due, earliest first. They are no longer scheduled.
+        """
+        return self._checks.popDue(monotonic())
+
+    def popGarbageCollection(self) -> bool:
+        """
+        Checks whether the garbage collection is due, scheduling the next one if it is. A failing garbage collection is
+        therefore only tried again at the next interval.
+        :return: Whether the garbage should be collected now.
+        """
+        now = monotonic()
+        if now < self._next_garbage_collection:
+            return False
+        self._next_garbage_collection = now + self.garbage_collection_interval
+        return True
+
+    def getSecondsUntilNextTask(self) -> float:
+        """
+        :return: The amount of seconds until the next check or garbage collection is due, 0 if one is due already.
+        """
+        next_deadline = min(self._next_garbage_collection, self._checks.nextDeadline() or float("inf"))
+        return max(0.0, next_deadline - monotonic())
@@ -0,0 +1,126 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Optional
+
+from kubernetes.client.rest import ApiException
+
+from Settings import Settings
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
+
+
+class ClusterStatusWriter:
+    """
+    Writes the observed state of the clusters to the status of their Mongo objects.
+    The state is reported on every check, so the updates are collected in memory and written by a background thread
+    once per interval: all updates of a cluster within an interval result in a single patch, and fields that have not
+    changed since the last write are not written at all.
+    """
+
+    NOT_FOUND_STATUS = 404
+
+    def __init__(self, kubernetes_service: KubernetesService, interval: float = Settings.STATUS_WRITE_INTERVAL,
+                 has_cluster: Callable[[ObjectKey], bool] = lambda key: False) -> None:
+        """
+        :param kubernetes_service: The kubernetes service.
+        :param interval: The amount of seconds between the writes.
+        :param has_cluster: Function returning whether the Mongo object with the given key still exists. A write that
+            is not found for an existing object means the status subresource is missing, and it is retried later.
+        """
+        self.kubernetes_service = kubernetes_service
+        self.interval = interval
+        self._has_cluster = has_cluster
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+        self._pending: Dict[ObjectKey, Dict[str, any]] = {}  # format: {(cluster_name, namespace): {field: value}}
+        self._written: Dict[ObjectKey, Dict[str, any]] = {}  # format: {(cluster_name, namespace): {field: value}}
+
+    def update(self, cluster_object: V1MongoClusterConfiguration, **fields) -> None:
+        """
+        Schedules the given status fields to be written at the next interval.
+        :param cluster_object: The cluster object from the YAML file.
+        :param fields: The status fields with their new values.
+        """
+        key = cluster_object.metadata.name, cluster_object.metadata.namespace
+        with self._lock:
+            written = self._written.get(key, {})
+            pending = self._pending.setdefault(key, {})
+            for field, value in fields.items():
+                if field in written and written[field] == value:
+                    pending.pop(field, None)
+                else:
+                    pending[field] = value
+            if not pending:
+                del self._pending[key]
+
+    def forget(self, key: ObjectKey) -> None:
+        """
+        Forgets the status of a cluster that was removed.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        with self._lock:
+            self._pending.pop(key, None)
+            self._written.pop(key, None)
+
+    def flush(self) -> None:
+        """
+        Writes the pending status fields of all clusters, one patch per cluster.
+        Writes that failed are tried again at the next interval, unless the cluster was removed.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for key, status in pending.items():
+            self._write(key, status)
+
+    def start(self) -> None:
+        """
+        Starts writing the status every interval in a background thread.
+        """
+        self._thread = Thread(target=self._runForever, name="ClusterStatusWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread, writing the pending status fields one last time.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(self.interval)
+        self.flush()
+
+    def _write(self, key: ObjectKey, status: Dict[str, any]) -> None:
+        """
+        Writes the given status fields of a single cluster.
+        :param key: The key of the cluster, in the format (name, namespace).
+        :param status: The status fields to write.
+        """
+        name, namespace = key
+        try:
+            self.kubernetes_service.patchMongoObjectStatus(name, namespace, status)
+        except Exception as err:  # pylint: disable=broad-except
+            if isinstance(err, ApiException) and err.status == self.NOT_FOUND_STATUS and not self._has_cluster(key):
+                logging.info("Not writing status of cluster %s @ ns/%s as it has been removed.", name, namespace)
+                self.forget(key)
+                return
+            # a cluster that still exists is not found while the status subresource is being added to its definition.
+            logging.warning("Could not write status of cluster %s @ ns/%s, it will be retried later: %s",
+                            name, namespace, err)
+            with self._lock:
+                pending = self._pending.setdefault(key, {})
+                for field, value in status.items():
+                    pending.setdefault(field, value)  # updates that came in meanwhile are newer.
+            return
+        with self._lock:
+            self._written.setdefault(key, {}).update(status)
+
+    def _runForever(self) -> None:
+        """
+        Writes the pending status fields every interval, until we are stopped.
+        """
+        while not self._stopped.wait(self.interval):
+            self.flush()
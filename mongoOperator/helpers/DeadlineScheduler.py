@@ -0,0 +1,86 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import heapq
+from itertools import count
+from threading import Lock
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class DeadlineScheduler:
+    """
+    Thread-safe scheduler that keeps the next deadline of each key in a min-heap.
+    Scheduling and popping a key costs O(log n), and the next deadline is known in O(1), so the caller can sleep until
+    work is due instead of polling every key.
+    Each key has at most one deadline. Replaced and cancelled deadlines are removed lazily from the heap.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        """
+        :return: The amount of scheduled keys.
+        """
+        with self._lock:
+            return len(self._deadlines)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """
+        Schedules the given key, replacing its previous deadline.
+        :param key: The key to schedule.
+        :param deadline: The time at which the key is due, as returned by `time.monotonic`.
+        """
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, next(self._sequence), key))
+
+    def cancel(self, key: Hashable) -> None:
+        """
+        Removes the deadline of the given key, if any.
+        :param key: The key to cancel.
+        """
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def getDeadline(self, key: Hashable) -> Optional[float]:
+        """
+        :param key: The key.
+        :return: The deadline of the given key, or None if it is not scheduled.
+        """
+        with self._lock:
+            return self._deadlines.get(key)
+
+    def nextDeadline(self) -> Optional[float]:
+        """
+        :return: The earliest deadline, or None if nothing is scheduled.
+        """
+        with self._lock:
+            self._dropStale()
+            return self._heap[0][0] if self._heap else None
+
+    def popDue(self, now: float) -> List[Hashable]:
+        """
+        Removes and returns the keys that are due.
+        :param now: The current time, as returned by `time.monotonic`.
+        :return: The keys whose deadline is at or before the given time, earliest first.
+        """
+        due = []
+        with self._lock:
+            self._dropStale()
+            while self._heap and self._heap[0][0] <= now:
+                _deadline, _sequence, key = heapq.heappop(self._heap)
+                del self._deadlines[key]
+                due.append(key)
+                self._dropStale()
+        return due
+
+    def _dropStale(self) -> None:
+        """
+        Removes the entries at the top of the heap that were replaced or cancelled. The lock must be held by the caller.
+        """
+        while self._heap and self._deadlines.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
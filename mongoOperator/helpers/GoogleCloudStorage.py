@@ -0,0 +1,23 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import Any
+
+
+class GoogleCloudStorage:
+    """
+    Creates the clients of Google Cloud Storage, in which the backups are stored.
+    The Google Cloud libraries take long to import and are only needed when a backup or restore runs, so they are
+    imported when the first client is created instead of when the operator starts.
+    """
+
+    @staticmethod
+    def createClient(credentials: dict) -> Any:
+        """
+        :param credentials: The Google cloud storage service credentials retrieved from the Kubernetes secret.
+        :return: A `google.cloud.storage.Client` of the project of the service account.
+        """
+        from google.cloud.storage import Client as StorageClient
+        from google.oauth2.service_account import Credentials as ServiceCredentials
+        service_credentials = ServiceCredentials.from_service_account_info(credentials)
+        return StorageClient(service_credentials.project_id, service_credentials)
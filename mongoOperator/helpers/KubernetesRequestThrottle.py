@@ -0,0 +1,121 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from functools import wraps
+from time import sleep
+from typing import Callable, Optional, TypeVar
+
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.Metrics import Metrics
+from mongoOperator.helpers.ThrottleConfig import ThrottleConfig
+from mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter import ExponentialBackoffRateLimiter
+from mongoOperator.helpers.rateLimiters.TokenBucketRateLimiter import TokenBucketRateLimiter
+
+ResultType = TypeVar("ResultType")
+
+
+class KubernetesRequestThrottle:
+    """
+    Limits the rate of the requests to the Kubernetes API with a token bucket that is shared by all threads, so a burst
+    of cluster checks, e.g. after the operator restarted, does not overload the API server.
+    Requests that were throttled by the API server (HTTP 429) or failed on its side (HTTP 5xx) are retried with an
+    exponential backoff, waiting at least as long as the server asked for in its Retry-After header.
+    """
+
+    TOO_MANY_REQUESTS_STATUS = 429
+
+    def __init__(self, config: ThrottleConfig = ThrottleConfig(), wait: Callable[[float], None] = sleep) -> None:
+        """
+        :param config: The rate limit and the retries of the requests.
+        :param wait: Function that waits the given amount of seconds, used for testing.
+        """
+        self.retries = config.retries
+        self._rate_limiter = TokenBucketRateLimiter(config.qps, config.burst)
+        self._backoff = ExponentialBackoffRateLimiter(config.base_delay, config.max_delay)
+        self._wait = wait
+
+    def wrap(self, request: Callable[..., ResultType]) -> Callable[..., ResultType]:
+        """
+        :param request: The function that sends a request, i.e. `RESTClientObject.request` of the Kubernetes client.
+        :return: The function wrapped so each request is throttled and retried, see `call`.
+        """
+        @wraps(request)
+        def throttled(*args, **kwargs):
+            return self.call(request, *args, **kwargs)
+        return throttled
+
+    def call(self, request: Callable[..., ResultType], *args, **kwargs) -> ResultType:
+        """
+        Sends a request once the rate limit allows it, retrying it if it was throttled or failed on the server.
+        :param request: The function that sends the request.
+        :param args: The positional arguments of the function.
+        :param kwargs: The keyword arguments of the function.
+        :return: The result of the function.
+        :raise ApiException: If the request failed with another status, or still failed after the last retry.
+        """
+        retry_key = object()  # the backoff of each request is independent of the other requests.
+        try:
+            while True:
+                self._waitForRateLimit()
+                try:
+                    return request(*args, **kwargs)
+                except ApiException as err:
+                    delay = self._getRetryDelay(err, retry_key)
+                    if delay is None:
+                        raise
+                    logging.warning("Kubernetes API responded with %s %s, retrying in %.2f seconds.", err.status,
+                                    err.reason, delay)
+                self._wait(delay)
+        finally:
+            self._backoff.forget(retry_key)
+
+    def _waitForRateLimit(self) -> None:
+        """
+        Waits until the rate limit allows the next request.
+        """
+        delay = self._rate_limiter.reserve()
+        Metrics.KUBERNETES_THROTTLE_WAIT.observe(delay)
+        if delay > 0:
+            self._wait(delay)
+
+    def _getRetryDelay(self, err: ApiException, retry_key: object) -> Optional[float]:
+        """
+        :param err: The error returned by the API server.
+        :param retry_key: The key of the request in the backoff.
+        :return: The amount of seconds to wait before retrying the request, or None if it should not be retried.
+        """
+        if not self.isRetryable(err) or self._backoff.numRequeues(retry_key) >= self.retries:
+            return None
+        Metrics.KUBERNETES_REQUEST_RETRIES.labels(status=str(err.status)).inc()
+        return max(self._backoff.when(retry_key), self.getRetryAfter(err))
+
+    @classmethod
+    def isRetryable(cls, err: ApiException) -> bool:
+        """
+        :param err: The error returned by the API server.
+        :return: Whether the request was throttled or failed on the server, so it may succeed when it is retried.
+        """
+        return err.status == cls.TOO_MANY_REQUESTS_STATUS or 500 <= (err.status or 0) < 600
+
+    @classmethod
+    def isOverloaded(cls, err: Exception) -> bool:
+        """
+        :param err: The error raised by a request.
+        :return: Whether the error means the API server is overloaded, e.g. because it throttled the request or the
+            connection timed out.
+        """
+        return not isinstance(err, ApiException) or cls.isRetryable(err)
+
+    @staticmethod
+    def getRetryAfter(err: ApiException) -> float:
+        """
+        :param err: The error returned by the API server.
+        :return: The amount of seconds the server asked us to wait in the Retry-After header, or 0 if it did not.
+        """
+        retry_after = (err.headers or {}).get("Retry-After")
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):  # the header is missing or it contains a date, which Kubernetes never sends.
+            return 0.0
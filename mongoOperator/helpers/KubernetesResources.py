@@ -1,13 +1,22 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import json
+import re
+from hashlib import sha256
+
 from kubernetes import client
 from kubernetes.client import models as k8s_models
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, TypeVar
 
 from Settings import Settings
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 
+ResourceType = TypeVar("ResourceType")
+
+# A function that deserializes the data of a swagger type, or None if the data is used as is, e.g. for a string.
+Deserializer = Optional[Callable[[any], any]]
+
 
 class KubernetesResources:
     """ Helper class responsible for creating the Kubernetes model objects. """
@@ -37,26 +46,103 @@ class KubernetesResources:
     DEFAULT_MEMORY_REQUEST = "1Gi"
     DEFAULT_CACHE_SIZE = "0.25"
 
+    # The annotation with the hash of the manifest that was rendered by the operator, used to skip updates that would
+    # not change anything.
+    DESIRED_STATE_ANNOTATION = Settings.CUSTOM_OBJECT_API_GROUP + "/desired-state-hash"
+
     @classmethod
     def createSecret(cls, secret_name: str, namespace: str, secret_data: Dict[str, str],
-                     labels: Optional[Dict[str, str]] = None) -> client.V1Secret:
+                     labels: Optional[Dict[str, str]] = None,
+                     owner: Optional[V1MongoClusterConfiguration] = None) -> client.V1Secret:
         """
         Creates a secret object.
         :param secret_name: The name of the secret.
         :param namespace: The name space for the secret.
         :param secret_data: The secret data.
         :param labels: Optional labels for this secret, defaults to the default labels (see `cls.createDefaultLabels`).
+        :param owner: Optional cluster object that owns the secret, so the secret is deleted together with it.
         :return: The secret model object.
         """
-        return client.V1Secret(
+        metadata = client.V1ObjectMeta(
+            name=secret_name,
+            namespace=namespace,
+            labels=cls.createDefaultLabels(secret_name) if labels is None else labels,
+            owner_references=cls.createOwnerReferences(owner) if owner else None,
+        )
+        # the values of the secret are generated, so only the keys are part of the desired state.
+        metadata.annotations = {
+            cls.DESIRED_STATE_ANNOTATION: cls.hashDesiredState(
+                client.V1Secret(metadata=metadata, string_data=dict.fromkeys(secret_data, ""))
+            )
+        }
+        return client.V1Secret(metadata=metadata, string_data=secret_data)
+
+    @classmethod
+    def createLease(cls, name: str, namespace: str, lease_spec: client.V1beta1LeaseSpec,
+                    labels: Optional[Dict[str, str]] = None) -> client.V1beta1Lease:
+        """
+        Creates a lease object.
+        :param name: The name of the lease.
+        :param namespace: The name space for the lease.
+        :param lease_spec: The specification of the lease.
+        :param labels: Optional labels for this lease, defaults to the default labels (see `cls.createDefaultLabels`).
+        :return: The lease model object.
+        """
+        return client.V1beta1Lease(
             metadata=client.V1ObjectMeta(
-                name=secret_name,
+                name=name,
                 namespace=namespace,
-                labels=cls.createDefaultLabels(secret_name) if labels is None else labels
+                labels=cls.createDefaultLabels(name) if labels is None else labels
             ),
-            string_data=secret_data,
+            spec=lease_spec,
         )
 
+    @staticmethod
+    def createOwnerReferences(cluster_object: V1MongoClusterConfiguration) -> Optional[List[client.V1OwnerReference]]:
+        """
+        Creates the owner references to the given cluster, so Kubernetes deletes the object together with the cluster.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The owner references, or None if the cluster object has no UID.
+        """
+        if not cluster_object.metadata.uid:
+            return None
+        return [client.V1OwnerReference(
+            api_version=cluster_object.api_version,
+            kind=cluster_object.kind,
+            name=cluster_object.metadata.name,
+            uid=cluster_object.metadata.uid,
+            controller=True,
+            block_owner_deletion=True,
+        )]
+
+    @staticmethod
+    def hashDesiredState(resource: any) -> str:
+        """
+        Hashes the given manifest, so it can be compared with the manifest that was written before.
+        :param resource: The Kubernetes model object, without the desired state annotation.
+        :return: The hexadecimal hash.
+        """
+        manifest = json.dumps(resource.to_dict(), sort_keys=True, default=str)
+        return sha256(manifest.encode()).hexdigest()
+
+    @classmethod
+    def getDesiredStateHash(cls, resource: any) -> Optional[str]:
+        """
+        :param resource: The Kubernetes model object.
+        :return: The hash of the desired state that was stored in the resource, if any.
+        """
+        return (resource.metadata.annotations or {}).get(cls.DESIRED_STATE_ANNOTATION)
+
+    @classmethod
+    def _annotateDesiredState(cls, resource: ResourceType) -> ResourceType:
+        """
+        Stores the hash of the given manifest in its annotations.
+        :param resource: The Kubernetes model object.
+        :return: The same object.
+        """
+        resource.metadata.annotations = {cls.DESIRED_STATE_ANNOTATION: cls.hashDesiredState(resource)}
+        return resource
+
     @staticmethod
     def createDefaultLabels(name: str = None) -> Dict[str, str]:
         """
@@ -81,11 +167,12 @@ class KubernetesResources:
         name = cluster_object.metadata.name
 
         # Create service.
-        return client.V1Service(
+        return cls._annotateDesiredState(client.V1Service(
             metadata=client.V1ObjectMeta(
                 name=name,
                 namespace=cluster_object.metadata.namespace,
                 labels=cls.createDefaultLabels(name),
+                owner_references=cls.createOwnerReferences(cluster_object),
             ),
             spec=client.V1ServiceSpec(
                 cluster_ip="None",  # create headless service, no load-balancing and a single service IP
@@ -96,7 +183,7 @@ class KubernetesResources:
                     protocol="TCP"
                 )],
             ),
-        )
+        ))
 
     @classmethod
     def createStatefulSet(cls, cluster_object: V1MongoClusterConfiguration) -> client.V1beta1StatefulSet:
@@ -150,9 +237,10 @@ class KubernetesResources:
         )
 
         # Create stateful set.
-        return client.V1beta1StatefulSet(
+        return cls._annotateDesiredState(client.V1beta1StatefulSet(
             metadata = client.V1ObjectMeta(name=name, namespace=cluster_object.metadata.namespace,
-                                           labels=cls.createDefaultLabels(name)),
+                                           labels=cls.createDefaultLabels(name),
+                                           owner_references=cls.createOwnerReferences(cluster_object)),
             spec = client.V1beta1StatefulSetSpec(
                 replicas = cluster_object.spec.mongodb.replicas,
                 service_name = name,
@@ -169,7 +257,7 @@ class KubernetesResources:
                     ),
                 )],
             ),
-        )
+        ))
 
     @classmethod
     def createLabelSelector(cls, labels: Dict[str, str]) -> str:
@@ -180,6 +268,13 @@ class KubernetesResources:
         """
         return ",".join("{}={}".format(k, v) for k, v in labels.items() if v)
 
+    # the swagger types of lists and dictionaries, e.g. "list[V1Container]" or "dict(str, str)".
+    LIST_TYPE_PATTERN = re.compile(r"^list\[(.+)\]$")
+    DICT_TYPE_PATTERN = re.compile(r"^dict\(([^,]+), (.+)\)$")
+
+    # the compiled deserializers, by swagger type. See `getDeserializer`.
+    _deserializers: Dict[str, Deserializer] = {}
+
     @classmethod
     def deserialize(cls, data: dict, model_name: str) -> any:
         """
@@ -188,14 +283,98 @@ class KubernetesResources:
         :param model_name: The name of the model.
         :return: An instance of the model with the given name.
         """
-        model_class = getattr(k8s_models, model_name, None)
-        if not model_class or not isinstance(data, dict):
-            return data
-        kwargs = {}
-        if model_class.swagger_types is not None:
-            for attr, attr_type in model_class.swagger_types.items():
-                if model_class.attribute_map.get(attr):
-                    value = data.get(model_class.attribute_map[attr])
-                    kwargs[attr] = cls.deserialize(value, attr_type)
-
-        return model_class(**kwargs)
+        deserializer = cls.getDeserializer(model_name)
+        return data if deserializer is None else deserializer(data)
+
+    @classmethod
+    def getDeserializer(cls, type_name: str) -> Deserializer:
+        """
+        Gets the deserializer of the given swagger type, compiling it the first time the type is deserialized.
+        The swagger types and attribute maps of the models are only resolved while compiling, so deserializing the
+        same type again only walks the compiled attributes.
+        :param type_name: The swagger type, e.g. "V1beta1StatefulSet", "list[V1Container]" or "str".
+        :return: The deserializer of the type, or None if the data is used as is.
+        """
+        try:
+            return cls._deserializers[type_name]
+        except KeyError:
+            compiled: Dict[str, Deserializer] = {}
+            deserializer = cls._compileDeserializer(type_name, compiled)
+            # the deserializers are only shared once they are complete. Threads compiling the same type at the same
+            # time compile equal deserializers, so it does not matter which of them is kept.
+            cls._deserializers.update(compiled)
+            return deserializer
+
+    @classmethod
+    def _compileDeserializer(cls, type_name: str, compiled: Dict[str, Deserializer]) -> Deserializer:
+        """
+        Compiles the deserializer of the given swagger type, and of all types it contains.
+        :param type_name: The swagger type.
+        :param compiled: The deserializers that were compiled for the type so far, by swagger type. The models may
+            contain themselves, e.g. "V1beta1JSONSchemaProps", so each model is compiled only once.
+        :return: The deserializer of the type, or None if the data is used as is.
+        """
+        if type_name in compiled:
+            return compiled[type_name]
+        if type_name in cls._deserializers:
+            return cls._deserializers[type_name]
+
+        list_match = cls.LIST_TYPE_PATTERN.match(type_name)
+        dict_match = cls.DICT_TYPE_PATTERN.match(type_name)
+        model_class = getattr(k8s_models, type_name, None)
+        if list_match:
+            compiled[type_name] = cls._compileList(cls._compileDeserializer(list_match.group(1), compiled))
+        elif dict_match:
+            compiled[type_name] = cls._compileDict(cls._compileDeserializer(dict_match.group(2), compiled))
+        elif model_class:
+            cls._compileModel(type_name, model_class, compiled)
+        else:
+            compiled[type_name] = None
+        return compiled[type_name]
+
+    @classmethod
+    def _compileModel(cls, type_name: str, model_class: type, compiled: Dict[str, Deserializer]) -> None:
+        """
+        Compiles the deserializer of a model, resolving the JSON key and the deserializer of each of its attributes.
+        :param type_name: The swagger type of the model.
+        :param model_class: The class of the model.
+        :param compiled: The deserializers that were compiled so far, to which the model is added.
+        """
+        attributes: List[tuple] = []  # format: [(attribute name, JSON key, deserializer)]
+
+        def deserializeModel(data: any) -> any:
+            if not isinstance(data, dict):
+                return data
+            kwargs = {}
+            for attr, key, deserializer in attributes:
+                value = data.get(key)
+                kwargs[attr] = value if deserializer is None or value is None else deserializer(value)
+            return model_class(**kwargs)
+
+        # the model is added before its attributes are compiled, so the attributes may contain the model itself.
+        compiled[type_name] = deserializeModel
+        for attr, attr_type in (model_class.swagger_types or {}).items():
+            key = model_class.attribute_map.get(attr)
+            if key:
+                attributes.append((attr, key, cls._compileDeserializer(attr_type, compiled)))
+
+    @staticmethod
+    def _compileList(item_deserializer: Deserializer) -> Deserializer:
+        """
+        :param item_deserializer: The deserializer of the items of the list.
+        :return: The deserializer of the list, or None if the items are used as is.
+        """
+        if item_deserializer is None:
+            return None
+        return lambda data: [item_deserializer(item) for item in data] if isinstance(data, list) else data
+
+    @staticmethod
+    def _compileDict(value_deserializer: Deserializer) -> Deserializer:
+        """
+        :param value_deserializer: The deserializer of the values of the dictionary. The keys are always strings.
+        :return: The deserializer of the dictionary, or None if the values are used as is.
+        """
+        if value_deserializer is None:
+            return None
+        return lambda data: {key: value_deserializer(value) for key, value in data.items()} \
+            if isinstance(data, dict) else data
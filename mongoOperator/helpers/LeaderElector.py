@@ -0,0 +1,115 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+
+from kubernetes.client import V1beta1LeaseSpec
+from kubernetes.client.rest import ApiException
+
+from Settings import Settings
+from mongoOperator.helpers.LeaseConfig import LeaseConfig
+from mongoOperator.helpers.LeaseHolder import LeaseHolder
+from mongoOperator.services.LeaseService import LeaseService
+
+
+class LeaderElector(LeaseHolder):
+    """
+    Elects a single leader among the replicas of the operator, using a `coordination.k8s.io` lease.
+    The leader renews the lease every retry period. Other replicas take over the lease once it has not been renewed for
+    the lease duration.
+    """
+
+    def __init__(self, lease_service: LeaseService,
+                 lease_name: str = Settings.LEADER_ELECTION_LEASE_NAME,
+                 config: LeaseConfig = LeaseConfig()) -> None:
+        """
+        :param lease_service: The service with which the leases are read and written.
+        :param lease_name: The name of the lease.
+        :param config: The identity of this replica and the timings of the lease.
+        """
+        super().__init__(lease_service, config)
+        self.lease_name = lease_name
+
+    @property
+    def is_leader(self) -> bool:
+        """
+        :return: Whether this replica currently holds the lease.
+        """
+        return self._holdsLease()
+
+    def start(self) -> None:
+        """
+        Starts trying to acquire the lease in a background thread, renewing it once it is acquired.
+        """
+        logging.info("Starting leader election for lease %s @ ns/%s as %s.", self.lease_name, self.config.namespace,
+                     self.config.identity)
+        self._startThread("LeaderElector")
+
+    def stop(self) -> None:
+        """
+        Stops the leader election, releasing the lease if we hold it so another replica can take over right away.
+        """
+        self._stopThread()  # make sure the lease is not renewed after we released it.
+        if not self.is_leader:
+            return
+        self._setRenewed(False)
+        try:
+            lease = self.lease_service.getLease(self.lease_name, self.config.namespace)
+            if lease.spec.holder_identity == self.config.identity:
+                lease.spec.holder_identity = None
+                lease.spec.lease_duration_seconds = 1
+                self.lease_service.replaceLease(lease)
+                logging.info("Released lease %s @ ns/%s.", self.lease_name, self.config.namespace)
+        except ApiException as err:
+            logging.warning("Could not release lease %s @ ns/%s: %s", self.lease_name, self.config.namespace, err)
+
+    def tryAcquireOrRenew(self) -> bool:
+        """
+        Tries to acquire the lease, or to renew it if we hold it already.
+        :return: Whether we hold the lease.
+        :raise ApiException: If the lease could not be read or written, e.g. on a conflict with another replica.
+        """
+        now = self._utcNow()
+        try:
+            lease = self.lease_service.getLease(self.lease_name, self.config.namespace)
+        except ApiException as err:
+            if err.status != self.NOT_FOUND_STATUS:
+                raise
+            self.lease_service.createLease(self.lease_name, self.config.namespace, V1beta1LeaseSpec(
+                holder_identity=self.config.identity, lease_duration_seconds=self.config.lease_duration,
+                acquire_time=now, renew_time=now, lease_transitions=0,
+            ))
+            return self._setRenewed()
+
+        spec = lease.spec
+        if spec.holder_identity and spec.holder_identity != self.config.identity and not self._isExpired(lease):
+            return self._setRenewed(False)
+
+        if spec.holder_identity != self.config.identity:
+            logging.info("Taking over lease %s @ ns/%s from %s.", self.lease_name, self.config.namespace,
+                         spec.holder_identity)
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.holder_identity = self.config.identity
+        spec.lease_duration_seconds = self.config.lease_duration
+        spec.renew_time = now
+        self.lease_service.replaceLease(lease)
+        return self._setRenewed()
+
+    def _runForever(self) -> None:
+        """
+        Tries to acquire or renew the lease every retry period, until the leader election is stopped.
+        """
+        was_leader = False
+        while not self._stopped.is_set():
+            try:
+                self.tryAcquireOrRenew()
+            except Exception as err:  # pylint: disable=broad-except
+                logging.warning("Could not acquire or renew lease %s @ ns/%s: %s", self.lease_name,
+                                self.config.namespace, err)
+            is_leader = self.is_leader
+            if is_leader != was_leader:
+                logging.info("%s leading the Mongo operator as %s.", "Started" if is_leader else "Stopped",
+                             self.config.identity)
+                was_leader = is_leader
+            self._stopped.wait(self.config.retry_period)
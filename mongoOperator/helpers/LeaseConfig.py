@@ -0,0 +1,23 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import NamedTuple
+
+from Settings import Settings
+
+
+class LeaseConfig(NamedTuple):
+    """
+    The identity of this replica of the operator and the timings of its leases, shared by the leader election and the
+    sharding.
+    """
+    # the unique name of this replica.
+    identity: str = Settings.OPERATOR_IDENTITY
+    # the namespace of the leases.
+    namespace: str = Settings.OPERATOR_NAMESPACE
+    # the amount of seconds after which a lease that was not renewed may be taken over.
+    lease_duration: int = Settings.LEADER_ELECTION_LEASE_DURATION
+    # the amount of seconds the holder keeps trying to renew its lease before it considers the lease lost.
+    renew_deadline: float = Settings.LEADER_ELECTION_RENEW_DEADLINE
+    # the amount of seconds between the attempts to acquire or renew the lease.
+    retry_period: float = Settings.LEADER_ELECTION_RETRY_PERIOD
@@ -0,0 +1,114 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from abc import abstractmethod
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Dict, Iterable, Optional, Tuple
+
+from kubernetes.client import V1beta1Lease
+
+from mongoOperator.helpers.LeaseConfig import LeaseConfig
+from mongoOperator.services.LeaseService import LeaseService
+
+
+class LeaseHolder:
+    """
+    Base class for the replicas of the operator that hold a `coordination.k8s.io` lease, which they renew every retry
+    period in a background thread. A holder that could not renew its lease for the renew deadline considers the lease
+    lost, which is always before another replica may take it over.
+    To be independent of clock skew between the replicas, the expiry of another holder's lease is measured from the
+    moment we observed its last change, not from the renew time in the lease.
+    """
+
+    NOT_FOUND_STATUS = 404
+
+    def __init__(self, lease_service: LeaseService, config: LeaseConfig) -> None:
+        """
+        :param lease_service: The service with which the leases are read and written.
+        :param config: The identity of this replica and the timings of the leases.
+        """
+        self.lease_service = lease_service
+        self.config = config
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+        self._renewed_at: Optional[float] = None  # when we last acquired or renewed our lease.
+        # format: {lease_name: ((holder, renew_time), monotonic time at which we observed the record)}
+        self._observed: Dict[str, Tuple[Tuple[str, datetime], float]] = {}
+
+    @staticmethod
+    def _utcNow() -> datetime:
+        """
+        :return: The current date in UTC timezone, as the lease requires timezone aware dates.
+        """
+        return datetime.now(timezone.utc)
+
+    @property
+    def retry_period(self) -> float:
+        """
+        :return: The amount of seconds between the attempts to acquire or renew the lease.
+        """
+        return self.config.retry_period
+
+    def _holdsLease(self) -> bool:
+        """
+        :return: Whether we acquired or renewed our lease within the renew deadline.
+        """
+        with self._lock:
+            return self._renewed_at is not None and monotonic() - self._renewed_at < self.config.renew_deadline
+
+    def _setRenewed(self, renewed: bool = True) -> bool:
+        """
+        Marks our lease as acquired or renewed just now, or as lost.
+        :param renewed: Whether we hold the lease.
+        :return: Whether we hold the lease.
+        """
+        with self._lock:
+            self._renewed_at = monotonic() if renewed else None
+        return renewed
+
+    def _isExpired(self, lease: V1beta1Lease) -> bool:
+        """
+        Checks whether the lease of another holder has expired, based on when we observed its last renewal.
+        :param lease: The lease.
+        :return: Whether the lease may be taken over.
+        """
+        record = (lease.spec.holder_identity, lease.spec.renew_time)
+        observed_record, observed_at = self._observed.get(lease.metadata.name, (None, None))
+        if record != observed_record:
+            observed_at = monotonic()
+            self._observed[lease.metadata.name] = (record, observed_at)
+        return monotonic() - observed_at > (lease.spec.lease_duration_seconds or self.config.lease_duration)
+
+    def _forgetRemovedLeases(self, lease_names: Iterable[str]) -> None:
+        """
+        Forgets what we observed of the leases that no longer exist.
+        :param lease_names: The names of the leases that still exist.
+        """
+        lease_names = set(lease_names)
+        self._observed = {name: observed for name, observed in self._observed.items() if name in lease_names}
+
+    def _startThread(self, name: str) -> None:
+        """
+        Starts renewing the lease in a background thread.
+        :param name: The name of the thread.
+        """
+        self._thread = Thread(target=self._runForever, name=name, daemon=True)
+        self._thread.start()
+
+    def _stopThread(self) -> None:
+        """
+        Stops the background thread, waiting for its current attempt so the lease is not renewed after we return.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(self.config.retry_period)
+
+    @abstractmethod
+    def _runForever(self) -> None:
+        """
+        Acquires or renews the lease every retry period, until we are stopped.
+        """
+        raise NotImplementedError
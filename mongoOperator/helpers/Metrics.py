@@ -0,0 +1,87 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import inspect
+from functools import wraps
+from time import monotonic
+from typing import Callable, Tuple, TypeVar
+
+from kubernetes.client.rest import ApiException
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+ClassType = TypeVar("ClassType", bound=type)
+
+
+class Metrics:
+    """
+    The Prometheus metrics of the operator, exported by the admin server on `/metrics`.
+    """
+
+    PREFIX = "mongo_operator_"
+
+    # backups and restores of big clusters may take hours, so they need larger buckets than the default ones.
+    TRANSFER_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0, float("inf"))
+
+    RECONCILE_DURATION = Histogram(PREFIX + "reconcile_duration_seconds",
+                                   "Duration of the steps of a cluster check, the reconcile step is the whole check.",
+                                   ["step"])
+    KUBERNETES_REQUEST_DURATION = Histogram(PREFIX + "kubernetes_request_duration_seconds",
+                                            "Duration of the calls to the Kubernetes API.", ["method"])
+    KUBERNETES_REQUEST_ERRORS = Counter(PREFIX + "kubernetes_request_errors",
+                                        "Failed calls to the Kubernetes API, by HTTP status.", ["method", "status"])
+    KUBERNETES_THROTTLE_WAIT = Histogram(PREFIX + "kubernetes_throttle_wait_seconds",
+                                         "Time the requests to the Kubernetes API waited for the rate limit.")
+    KUBERNETES_REQUEST_RETRIES = Counter(PREFIX + "kubernetes_request_retries",
+                                         "Retried requests to the Kubernetes API, by HTTP status.", ["status"])
+    KUBERNETES_CONCURRENCY_LIMIT = Gauge(PREFIX + "kubernetes_concurrency_limit",
+                                         "The current limit of concurrent requests to the Kubernetes API.")
+    MONGO_COMMAND_DURATION = Histogram(PREFIX + "mongo_command_duration_seconds",
+                                       "Duration of the commands sent to the Mongo clusters.", ["command"])
+    MONGO_COMMAND_FAILURES = Counter(PREFIX + "mongo_command_failures",
+                                     "Failed commands sent to the Mongo clusters.", ["command"])
+    TRANSFER_DURATION = Histogram(PREFIX + "transfer_duration_seconds", "Duration of the backups and restores.",
+                                  ["operation"], buckets=TRANSFER_BUCKETS)
+    TRANSFER_BYTES = Counter(PREFIX + "transfer_bytes", "Size of the backed up and restored archives.",
+                             ["operation"])
+    WORK_QUEUE_DEPTH = Gauge(PREFIX + "work_queue_depth", "Amount of clusters waiting to be checked.")
+
+    @staticmethod
+    def export() -> Tuple[int, str, bytes]:
+        """
+        :return: The HTTP status, content type and body of the metrics page in the Prometheus text format.
+        """
+        return 200, CONTENT_TYPE_LATEST, generate_latest()
+
+    @staticmethod
+    def instrumentKubernetesCalls(service_class: ClassType) -> ClassType:
+        """
+        Class decorator that measures the duration and errors of each public method of the given class.
+        :param service_class: The class to instrument.
+        :return: The same class, with its methods replaced.
+        """
+        for name, method in list(vars(service_class).items()):
+            if inspect.isfunction(method) and not name.startswith("_"):
+                setattr(service_class, name, Metrics._timeKubernetesCall(name, method))
+        return service_class
+
+    @staticmethod
+    def _timeKubernetesCall(name: str, method: Callable) -> Callable:
+        """
+        :param name: The name of the method, used as label.
+        :param method: The method that calls the Kubernetes API.
+        :return: The method wrapped so its duration and errors are measured.
+        """
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = monotonic()
+            try:
+                return method(*args, **kwargs)
+            except ApiException as err:
+                Metrics.KUBERNETES_REQUEST_ERRORS.labels(method=name, status=str(err.status)).inc()
+                raise
+            except Exception:
+                Metrics.KUBERNETES_REQUEST_ERRORS.labels(method=name, status="error").inc()
+                raise
+            finally:
+                Metrics.KUBERNETES_REQUEST_DURATION.labels(method=name).observe(monotonic() - start)
+        return timed
@@ -0,0 +1,41 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from Settings import Settings
+
+
+class Pagination:
+    """
+    Helpers to request the lists of the Kubernetes API in pages of `Settings.LIST_PAGE_SIZE` items.
+    """
+
+    @staticmethod
+    def getPageQuery(continue_token: Optional[str]) -> List[Tuple[str, Any]]:
+        """
+        :param continue_token: The token returned in the metadata of the previous page, if any.
+        :return: The query parameters to request the next page of a list.
+        """
+        query_params = [("limit", Settings.LIST_PAGE_SIZE)]
+        if continue_token:
+            query_params.append(("continue", continue_token))
+        return query_params
+
+    @staticmethod
+    def iteratePages(list_page: Callable[..., Dict[str, Any]], *args, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        Lists all pages of a list call. Each page is only requested after the previous one has been processed, so the
+        first items can be handled before the whole list has been received, and only one page is kept in memory.
+        :param list_page: A list method that accepts a `continue_token`, e.g. `KubernetesService.listMongoObjects`.
+        :param args: The positional arguments of the list method.
+        :param kwargs: The keyword arguments of the list method.
+        :return: A generator of the list responses.
+        """
+        continue_token = None
+        while True:
+            page = list_page(*args, continue_token=continue_token, **kwargs)
+            yield page
+            continue_token = page.get("metadata", {}).get("continue")
+            if not continue_token:
+                return
@@ -0,0 +1,165 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import traceback
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock
+from typing import Iterator, Optional
+
+from Settings import Settings
+
+
+class Profiler:
+    """
+    Looks inside the running operator on demand, writing the results to files that can be copied out of the pod.
+    - The CPU profile measures the cluster checks during the next loops of the operator. The checks run in several
+      threads, so each check is profiled separately and the results are combined.
+    - Memory snapshots are taken with tracemalloc, which is started at the first snapshot. Each next snapshot is
+      compared with the previous one, showing where the memory grew.
+    - The thread dump shows what every thread is doing, including the monitor threads of pymongo.
+    """
+
+    TOP_ENTRIES = 50
+
+    def __init__(self, output_dir: str = Settings.PROFILING_DIR, loops: int = Settings.PROFILING_LOOPS) -> None:
+        """
+        :param output_dir: The directory in which the results are written.
+        :param loops: The amount of loops of the operator that are profiled each time the CPU profile is started.
+        """
+        self.output_dir = output_dir
+        self.loops = loops
+        self._lock = Lock()
+        self._loops_left = 0
+        self._stats: Optional[pstats.Stats] = None
+        self._cpu_profile_file: Optional[str] = None
+        self._memory_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def is_profiling(self) -> bool:
+        """
+        :return: Whether the cluster checks are being profiled.
+        """
+        return self._loops_left > 0
+
+    def installSignalHandlers(self) -> None:
+        """
+        Starts the CPU profile on SIGUSR1, and dumps the memory and the threads on SIGUSR2.
+        This must be called from the main thread.
+        """
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.startCpuProfile())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: (self.takeMemorySnapshot(), self.dumpThreads()))
+
+    def startCpuProfile(self) -> str:
+        """
+        Starts profiling the cluster checks for the configured amount of loops.
+        :return: The file to which the profile will be written.
+        """
+        with self._lock:
+            if not self.is_profiling:
+                self._stats = None
+                self._cpu_profile_file = self._getFileName("cpu", "prof")
+                self._loops_left = self.loops
+        logging.info("Profiling the next %s loops to %s.", self.loops, self._cpu_profile_file)
+        return self._cpu_profile_file
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        """
+        Context manager that profiles the code in its body if the CPU profile was started.
+        """
+        if not self.is_profiling:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+
+    def onLoopDone(self) -> None:
+        """
+        Counts the loops of the operator, writing the CPU profile after the last profiled loop.
+        """
+        with self._lock:
+            if not self.is_profiling:
+                return
+            self._loops_left -= 1
+            if self.is_profiling:
+                return
+            stats, self._stats = self._stats, None
+        if stats is None:
+            logging.info("No cluster was checked while profiling, not writing %s.", self._cpu_profile_file)
+            return
+        stats.dump_stats(self._cpu_profile_file)
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats("cumulative").print_stats(self.TOP_ENTRIES)
+        self._writeFile(self._cpu_profile_file + ".txt", summary.getvalue())
+        logging.info("Wrote CPU profile to %s.", self._cpu_profile_file)
+
+    def takeMemorySnapshot(self) -> str:
+        """
+        Writes the biggest allocations to a file, and how they changed since the previous snapshot.
+        :return: The file that was written.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        snapshot = tracemalloc.take_snapshot()
+        lines = ["Top {} allocations:".format(self.TOP_ENTRIES)]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:self.TOP_ENTRIES]]
+        if self._memory_snapshot is not None:
+            lines += ["", "Top {} differences with the previous snapshot:".format(self.TOP_ENTRIES)]
+            lines += [str(stat) for stat in snapshot.compare_to(self._memory_snapshot, "lineno")[:self.TOP_ENTRIES]]
+        self._memory_snapshot = snapshot
+        return self._writeFile(self._getFileName("memory", "txt"), "\n".join(lines) + "\n")
+
+    def dumpThreads(self) -> str:
+        """
+        Writes the current stack of every thread to a file.
+        :return: The file that was written.
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        lines = []
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            lines.append("Thread {} ({}):".format(names.get(ident, "unknown"), ident))
+            lines += [line.rstrip("\n") for line in traceback.format_stack(frame)]
+            lines.append("")
+        return self._writeFile(self._getFileName("threads", "txt"), "\n".join(lines))
+
+    def _getFileName(self, kind: str, extension: str) -> str:
+        """
+        :param kind: The kind of result.
+        :param extension: The file extension.
+        :return: The location of a new result file, in the output directory that is created if needed.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        date = datetime.utcnow().strftime("%Y%m%d-%H%M%S-%f")
+        return os.path.join(self.output_dir, "{}-{}.{}".format(kind, date, extension))
+
+    def _writeFile(self, file_name: str, contents: str) -> str:
+        """
+        Writes a result file.
+        :param file_name: The location of the file.
+        :param contents: The contents of the file.
+        :return: The location of the file.
+        """
+        with open(file_name, "w") as result_file:
+            result_file.write(contents)
+        logging.info("Wrote %s.", file_name)
+        return file_name
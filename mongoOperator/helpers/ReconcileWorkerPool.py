@@ -0,0 +1,108 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from threading import Lock, Thread
+from typing import Callable, List, Optional
+
+from Settings import Settings
+from mongoOperator.helpers.WorkQueue import WorkQueue
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+from mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter import ExponentialBackoffRateLimiter
+from mongoOperator.helpers.rateLimiters.TokenBucketRateLimiter import TokenBucketRateLimiter
+
+
+class ReconcileWorkerPool:
+    """
+    Pool of worker threads that reconciles clusters in parallel, taking the keys from a work queue.
+    Each key is reconciled by at most one worker at a time. If a key is submitted while it is being reconciled, it
+    will be reconciled once more after the current run finished.
+    Keys that fail to reconcile are retried later with a per-key exponential backoff.
+    """
+
+    def __init__(self, reconcile: Callable[[ObjectKey], None], workers: int, queue: Optional[WorkQueue] = None) -> None:
+        """
+        :param reconcile: The function that reconciles a single key.
+        :param workers: The maximum amount of keys that are reconciled in parallel.
+        :param queue: The work queue to use, by default a queue is created based on the settings.
+        """
+        self._reconcile = reconcile
+        self._worker_count = workers
+        if queue is None:
+            queue = WorkQueue(
+                ExponentialBackoffRateLimiter(Settings.RECONCILE_RETRY_BASE_DELAY, Settings.RECONCILE_RETRY_MAX_DELAY),
+                TokenBucketRateLimiter(Settings.RECONCILE_RETRY_QPS, Settings.RECONCILE_RETRY_BURST),
+            )
+        self._queue = queue
+        self._workers: List[Thread] = []
+        self._workers_lock = Lock()
+
+    @property
+    def queue(self) -> WorkQueue:
+        """
+        :return: The work queue of this pool.
+        """
+        return self._queue
+
+    def submit(self, key: ObjectKey) -> None:
+        """
+        Schedules the reconciliation of the given key.
+        :param key: The key of the cluster, in the format (name, namespace).
+        """
+        self._startWorkers()
+        self._queue.add(key)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all submitted keys have been reconciled. Failed keys that will be retried later are not waited for.
+        :param timeout: The maximum amount of seconds to wait, or None to wait indefinitely.
+        :return: True if all keys were reconciled, False if the timeout expired.
+        """
+        return self._queue.waitUntilIdle(timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the workers. Keys that were not picked up by a worker yet are discarded.
+        :param wait: Whether to wait for the running reconciliations to finish.
+        """
+        self._queue.shutDown()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _startWorkers(self) -> None:
+        """
+        Starts the worker threads the first time a key is submitted.
+        """
+        with self._workers_lock:
+            if self._workers:
+                return
+            for index in range(self._worker_count):
+                worker = Thread(target=self._work, name="ReconcileWorker_{}".format(index), daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self) -> None:
+        """
+        Reconciles keys from the queue until the queue is shut down.
+        """
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            self._run(key)
+
+    def _run(self, key: ObjectKey) -> None:
+        """
+        Reconciles the given key, scheduling a retry if it failed.
+        :param key: The key of the cluster.
+        """
+        try:
+            self._reconcile(key)
+            self._queue.forget(key)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.exception("Could not check cluster %s (attempt %s), it will be retried later: %s",
+                              key, self._queue.numRequeues(key) + 1, err)
+            self._queue.addRateLimited(key)
+        finally:
+            self._queue.done(key)
@@ -0,0 +1,96 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import List, Optional, Union
+
+from Settings import Settings
+from mongoOperator.helpers.LeaderElector import LeaderElector
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+from mongoOperator.helpers.sharding.ShardManager import ShardManager
+from mongoOperator.services.KubernetesService import KubernetesService
+from mongoOperator.services.LeaseService import LeaseService
+
+
+class ReplicaCoordinator:
+    """
+    Decides which clusters this replica of the operator checks, when there are multiple replicas.
+    With leader election only the leader checks clusters, with sharding each replica checks the clusters it owns on the
+    hash ring. Without either, this replica checks all clusters.
+    """
+
+    def __init__(self, kubernetes_service: KubernetesService) -> None:
+        """
+        :param kubernetes_service: The kubernetes service.
+        """
+        lease_service = LeaseService(kubernetes_service)
+        self._leader_elector = LeaderElector(lease_service) if Settings.LEADER_ELECTION else None
+        self._shard_manager = ShardManager(lease_service) if Settings.SHARDING else None
+        self._was_active = False
+        self._shard_version: Optional[int] = None
+
+    @property
+    def is_active(self) -> bool:
+        """
+        :return: Whether this replica of the operator should check clusters. This is always True without leader
+            election or sharding.
+        """
+        if self._leader_elector is not None and not self._leader_elector.is_leader:
+            return False
+        return self._shard_manager is None or self._shard_manager.is_active
+
+    @property
+    def retry_period(self) -> Optional[float]:
+        """
+        :return: The amount of seconds after which the leadership or the division of the clusters may have changed, or
+            None if neither leader election nor sharding is enabled.
+        """
+        return min((lease_holder.retry_period for lease_holder in self._getLeaseHolders()), default=None)
+
+    def ownsKey(self, key: ObjectKey) -> bool:
+        """
+        :param key: The key of the cluster, in the format (name, namespace).
+        :return: Whether this replica of the operator should check the given cluster.
+        """
+        return self.is_active and (self._shard_manager is None or self._shard_manager.ownsKey(key))
+
+    def isCoordinator(self) -> bool:
+        """
+        :return: Whether this replica should run the tasks that are not bound to a cluster, like garbage collection.
+        """
+        return self.is_active and (self._shard_manager is None or self._shard_manager.isCoordinator())
+
+    def popAssignmentChange(self) -> bool:
+        """
+        Checks whether the clusters owned by this replica may have changed since the last call, because we just became
+        active or because the clusters were divided again over the replicas.
+        :return: Whether all clusters should be checked.
+        """
+        if not self.is_active:
+            self._was_active = False
+            return False
+        shard_version = self._shard_manager.version if self._shard_manager is not None else None
+        if self._was_active and shard_version == self._shard_version:
+            return False
+        self._was_active = True
+        self._shard_version = shard_version
+        return True
+
+    def start(self) -> None:
+        """
+        Starts competing for the lease if leader election is enabled, and joins the other replicas if sharding is.
+        """
+        for lease_holder in self._getLeaseHolders():
+            lease_holder.start()
+
+    def stop(self) -> None:
+        """
+        Releases our leases, so another replica can take over right away.
+        """
+        for lease_holder in self._getLeaseHolders():
+            lease_holder.stop()
+
+    def _getLeaseHolders(self) -> List[Union[LeaderElector, ShardManager]]:
+        """
+        :return: The leader elector and shard manager that are enabled.
+        """
+        return [holder for holder in (self._leader_elector, self._shard_manager) if holder is not None]
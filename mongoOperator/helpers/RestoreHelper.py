@@ -5,12 +5,10 @@ import json
 import logging
 import os
 from base64 import b64decode
-from subprocess import check_output, CalledProcessError
-
-from time import sleep
-from google.cloud.storage import Client as StorageClient
-from google.oauth2.service_account import Credentials as ServiceCredentials
+from subprocess import check_output, CalledProcessError, SubprocessError
 
+from mongoOperator.helpers.GoogleCloudStorage import GoogleCloudStorage
+from mongoOperator.helpers.Metrics import Metrics
 from mongoOperator.helpers.MongoResources import MongoResources
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from mongoOperator.services.KubernetesService import KubernetesService
@@ -25,8 +23,6 @@ class RestoreHelper:
     DEFAULT_BACKUP_PREFIX = "backups"
     BACKUP_FILE_FORMAT = "mongodb-backup-{namespace}-{name}-{date}.archive.gz"
     LATEST_BACKUP_KEY = "latest"
-    RESTORE_RETRIES = 4
-    RESTORE_WAIT = 15.0
 
     def __init__(self, kubernetes_service: KubernetesService) -> None:
         """
@@ -71,8 +67,7 @@ class RestoreHelper:
         :param key: The prefix of tha backups
         :return: The location of the last backup file.
         """
-        credentials = ServiceCredentials.from_service_account_info(credentials)
-        gcs_client = StorageClient(credentials.project_id, credentials)
+        gcs_client = GoogleCloudStorage.createClient(credentials)
         bucket = gcs_client.get_bucket(bucket_name)
         blobs = bucket.list_blobs(prefix=key)
 
@@ -111,34 +106,34 @@ class RestoreHelper:
         Creates a new backup for the given cluster saving it in the cloud storage.
         :param cluster_object: The cluster object from the YAML file.
         :param backup_file: The filename of the backup we want to restore.
+        :raise SubprocessError: If the restore failed.
         """
         hostnames = MongoResources.getMemberHostnames(cluster_object)
 
         logging.info("Restoring backup file %s to cluster %s @ ns/%s.", backup_file, cluster_object.metadata.name,
                      cluster_object.metadata.namespace)
 
-        # Download the backup file from the bucket
-        downloaded_file = self._downloadBackup(cluster_object, backup_file)
+        with Metrics.TRANSFER_DURATION.labels(operation="restore").time():
+            # Download the backup file from the bucket
+            downloaded_file = self._downloadBackup(cluster_object, backup_file)
 
-        # Wait for the replica set to become ready
-        for _ in range(self.RESTORE_RETRIES):
             try:
                 logging.info("Running mongorestore --host %s --gzip --archive=%s", ",".join(hostnames), downloaded_file)
                 restore_output = check_output(["mongorestore", "--host", ",".join(hostnames), "--gzip",
                                                "--archive=" + downloaded_file])
-                logging.info("Restore output: %s", restore_output)
+            except CalledProcessError as err:
+                raise SubprocessError("Could not restore '{}'. Return code: {}\n stderr: '{}'\n stdout: '{}'"
+                                      .format(backup_file, err.returncode, err.stderr, err.stdout))
 
-                try:
-                    os.remove(downloaded_file)
-                except OSError as err:
-                    logging.error("Unable to remove '%s': %s", downloaded_file, err.strerror)
+            logging.info("Restore output: %s", restore_output)
+            Metrics.TRANSFER_BYTES.labels(operation="restore").inc(os.path.getsize(downloaded_file))
 
-                return True
-            except CalledProcessError as err:
-                logging.error("Could not restore '%s', attempt %d. Return code: %s stderr: '%s' stdout: '%s'",
-                              backup_file, _, err.returncode, err.stderr, err.stdout)
-                sleep(self.RESTORE_WAIT)
-        raise TimeoutError("Could not restore '{}' after {} retries!".format(backup_file, self.RESTORE_RETRIES))
+        try:
+            os.remove(downloaded_file)
+        except OSError as err:
+            logging.error("Unable to remove '%s': %s", downloaded_file, err.strerror)
+
+        return True
 
     def _downloadBackup(self, cluster_object: V1MongoClusterConfiguration, backup_file: str) -> str:
         """
@@ -166,8 +161,7 @@ class RestoreHelper:
         :param file_name: The file that will be downloaded.
         :return: The location of the downloaded file.
         """
-        credentials = ServiceCredentials.from_service_account_info(credentials)
-        gcs_client = StorageClient(credentials.project_id, credentials)
+        gcs_client = GoogleCloudStorage.createClient(credentials)
         bucket = gcs_client.get_bucket(bucket_name)
         logging.info("Going to download gcs://%s/%s", bucket_name, key)
 
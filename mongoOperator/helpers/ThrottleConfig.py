@@ -0,0 +1,22 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import NamedTuple
+
+from Settings import Settings
+
+
+class ThrottleConfig(NamedTuple):
+    """
+    The rate limit of the requests to the Kubernetes API and how the failed requests are retried.
+    """
+    # the maximum amount of requests per second.
+    qps: float = Settings.KUBERNETES_QPS
+    # the amount of requests that may be sent at once.
+    burst: int = Settings.KUBERNETES_BURST
+    # the maximum amount of times a request is retried.
+    retries: int = Settings.KUBERNETES_RETRIES
+    # the delay in seconds before the first retry, which doubles for every next retry.
+    base_delay: float = Settings.KUBERNETES_RETRY_BASE_DELAY
+    # the maximum delay in seconds between retries, unless the server asks for a longer one.
+    max_delay: float = Settings.KUBERNETES_RETRY_MAX_DELAY
@@ -0,0 +1,183 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+from threading import Condition
+from time import monotonic
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from mongoOperator.helpers.DeadlineScheduler import DeadlineScheduler
+from mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter import ExponentialBackoffRateLimiter
+from mongoOperator.helpers.rateLimiters.TokenBucketRateLimiter import TokenBucketRateLimiter
+
+
+class WorkQueue:
+    """
+    Thread-safe, deduplicating and rate limited work queue, modelled after the client-go work queue.
+    A key is only queued once, no matter how often it is added, and is never handed to two consumers at the same time.
+    When a key is added while it is being processed, it is queued again once the processing is done.
+    Failed keys can be re-added after a delay, which is the maximum of a per-key exponential backoff and a global token
+    bucket, so retries never block a consumer and a single failing key cannot flood the queue.
+    """
+
+    def __init__(self, backoff: ExponentialBackoffRateLimiter, bucket: TokenBucketRateLimiter,
+                 clock: Callable[[], float] = monotonic) -> None:
+        """
+        :param backoff: The per-key rate limiter used for failed keys.
+        :param bucket: The global rate limiter used for failed keys.
+        :param clock: Function returning the current time in seconds, used for testing.
+        """
+        self._backoff = backoff
+        self._bucket = bucket
+        self._clock = clock
+        self._condition = Condition()
+        self._queue: Dict[Hashable, None] = OrderedDict()  # the keys that are ready, in the order they were added.
+        # format: {key: (time the processing started, whether the key was added again while processing)}
+        self._processing: Dict[Hashable, Tuple[float, bool]] = {}
+        self._waiting = DeadlineScheduler()  # the keys that are added once their delay passed.
+        self._shutting_down = False
+
+    def __len__(self) -> int:
+        """
+        :return: The amount of keys that are ready to be processed.
+        """
+        with self._condition:
+            return len(self._queue)
+
+    def add(self, key: Hashable) -> None:
+        """
+        Adds a key to the queue, unless it is already queued.
+        :param key: The key to add.
+        """
+        with self._condition:
+            self._add(key)
+
+    def addAfter(self, key: Hashable, delay: float) -> None:
+        """
+        Adds a key to the queue after the given delay.
+        If the key is already waiting to be added, the earliest of both moments is used.
+        :param key: The key to add.
+        :param delay: The amount of seconds to wait.
+        """
+        with self._condition:
+            if delay <= 0:
+                self._add(key)
+                return
+            ready_at = self._clock() + delay
+            waiting_since = self._waiting.getDeadline(key)
+            if self._shutting_down or (waiting_since is not None and waiting_since <= ready_at):
+                return
+            self._waiting.schedule(key, ready_at)
+            self._condition.notify_all()
+
+    def addRateLimited(self, key: Hashable) -> None:
+        """
+        Adds a key to the queue once the rate limiters allow it.
+        :param key: The key to add.
+        """
+        self.addAfter(key, max(self._backoff.when(key), self._bucket.reserve()))
+
+    def forget(self, key: Hashable) -> None:
+        """
+        Resets the backoff of the given key, e.g. because it was processed successfully.
+        :param key: The key.
+        """
+        self._backoff.forget(key)
+
+    def numRequeues(self, key: Hashable) -> int:
+        """
+        :param key: The key.
+        :return: The amount of times the key was re-added because of a failure since it was last forgotten.
+        """
+        return self._backoff.numRequeues(key)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Hashable]:
+        """
+        Takes the next key from the queue, waiting until one is available.
+        The caller must call `done` with the key once it is processed.
+        :param timeout: The maximum amount of seconds to wait, or None to wait indefinitely.
+        :return: The key, or None if the timeout expired or the queue was shut down.
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while not self._shutting_down:
+                now = self._clock()
+                self._promoteWaiting(now)
+                if self._queue:
+                    key, _unused = self._queue.popitem(last=False)
+                    self._processing[key] = (now, False)
+                    return key
+                wait = self._getWaitTime(now, deadline)
+                if wait is not None and wait <= 0:
+                    return None
+                self._condition.wait(wait)
+        return None
+
+    def done(self, key: Hashable) -> None:
+        """
+        Marks the processing of the key as done, queueing it again if it was added in the meantime.
+        :param key: The key.
+        """
+        with self._condition:
+            _started_at, added = self._processing.pop(key, (None, False))
+            if added:
+                self._queue[key] = None
+            self._condition.notify_all()
+
+    def getOldestProcessingTime(self) -> Optional[float]:
+        """
+        :return: The time at which the key that has been processed the longest was taken from the queue, or None if no
+            key is being processed.
+        """
+        with self._condition:
+            return min((started_at for started_at, _added in self._processing.values()), default=None)
+
+    def waitUntilIdle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until no keys are queued or being processed. Keys waiting to be re-added are not taken into account.
+        :param timeout: The maximum amount of seconds to wait, or None to wait indefinitely.
+        :return: True if the queue is idle, False if the timeout expired.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._processing and (self._shutting_down or not self._queue), timeout
+            )
+
+    def shutDown(self) -> None:
+        """
+        Shuts down the queue. Consumers waiting for a key receive None, and keys that are still queued are discarded.
+        """
+        with self._condition:
+            self._shutting_down = True
+            self._condition.notify_all()
+
+    def _add(self, key: Hashable) -> None:
+        """
+        Adds a key to the queue. The condition lock must be held by the caller.
+        :param key: The key to add.
+        """
+        if self._shutting_down or key in self._queue:
+            return
+        if key in self._processing:
+            self._processing[key] = (self._processing[key][0], True)
+            return
+        self._queue[key] = None
+        self._condition.notify_all()
+
+    def _promoteWaiting(self, now: float) -> None:
+        """
+        Moves the delayed keys that are ready into the queue. The condition lock must be held by the caller.
+        :param now: The current time.
+        """
+        for key in self._waiting.popDue(now):
+            self._add(key)
+
+    def _getWaitTime(self, now: float, deadline: Optional[float]) -> Optional[float]:
+        """
+        Calculates how long a consumer may wait for the condition before it has to check the queue again.
+        :param now: The current time.
+        :param deadline: The time at which the consumer stops waiting, if any.
+        :return: The amount of seconds to wait, or None to wait until notified.
+        """
+        moments = [moment for moment in (self._waiting.nextDeadline(), deadline) if moment is not None]
+        return min(moments) - now if moments else None
@@ -0,0 +1,37 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+
+class AdminRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests to the admin server, by calling the handler that was registered for the requested path.
+    """
+
+    NOT_FOUND_STATUS = 404
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        Responds to a GET request.
+        """
+        handler = self.server.routes.get(urlsplit(self.path).path)
+        if handler is None:
+            status, content_type, body = self.NOT_FOUND_STATUS, "text/plain", b"Not found\n"
+        else:
+            status, content_type, body = handler()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        """
+        Logs the requests at debug level, as they are made periodically by Prometheus and by the probes.
+        :param format: The message format.
+        :param args: The message arguments.
+        """
+        logging.debug("Admin server: " + format, *args)
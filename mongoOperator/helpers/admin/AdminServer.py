@@ -0,0 +1,73 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Thread
+from typing import Callable, Dict, Optional, Tuple
+
+from Settings import Settings
+from mongoOperator.helpers.admin.AdminRequestHandler import AdminRequestHandler
+
+# format: () -> (HTTP status, content type, body)
+RouteHandler = Callable[[], Tuple[int, str, bytes]]
+
+
+class AdminServer(ThreadingMixIn, HTTPServer):
+    """
+    Small HTTP server that runs in the operator process and serves the metrics, health and admin endpoints.
+    Each endpoint is a function registered for a path, called in the thread of the request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = Settings.ADMIN_PORT, host: str = "") -> None:
+        """
+        :param port: The port to listen on, 0 to pick a free port.
+        :param host: The address to listen on, by default all interfaces so Prometheus and the probes can reach it.
+        """
+        super().__init__((host, port), AdminRequestHandler)
+        self.routes: Dict[str, RouteHandler] = {}
+        self._thread: Optional[Thread] = None
+
+    @property
+    def port(self) -> int:
+        """
+        :return: The port the server listens on.
+        """
+        return self.server_address[1]
+
+    def addRoute(self, path: str, handler: RouteHandler) -> None:
+        """
+        Registers the handler of a path.
+        :param path: The path of the endpoint, e.g. "/metrics".
+        :param handler: Function returning the HTTP status, content type and body of the response.
+        """
+        self.routes[path] = handler
+
+    @staticmethod
+    def textResponse(text: str, status: int = 200) -> Tuple[int, str, bytes]:
+        """
+        :param text: The body of the response.
+        :param status: The HTTP status of the response.
+        :return: The HTTP status, content type and body of a plain text response.
+        """
+        return status, "text/plain; charset=utf-8", text.encode()
+
+    def start(self) -> None:
+        """
+        Starts serving requests in a background thread.
+        """
+        logging.info("Starting admin server on port %s with endpoints %s.", self.port, sorted(self.routes))
+        self._thread = Thread(target=self.serve_forever, name="AdminServer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops serving requests and closes the socket.
+        """
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+        self.server_close()
@@ -0,0 +1,91 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from time import monotonic
+from typing import Callable, Optional, Tuple
+
+from Settings import Settings
+from mongoOperator.helpers.admin.AdminServer import AdminServer
+
+
+class HealthChecker:
+    """
+    Serves the liveness and readiness probes of Kubernetes.
+    The main loop of the operator reports its progress with a heartbeat, and the operator is live as long as the last
+    heartbeat is more recent than the liveness threshold, and no cluster check has been running for longer than the
+    reconcile threshold. The workers run outside the main loop, so a stuck worker does not stop the heartbeat.
+    The operator is ready once the Mongo objects are loaded into the cache.
+    Both only look at the state in memory, so the probes never call the Kubernetes API.
+    """
+
+    UNHEALTHY_STATUS = 503
+
+    def __init__(self, is_synced: Callable[[], bool],
+                 get_oldest_check: Callable[[], Optional[float]] = lambda: None,
+                 liveness_threshold: float = Settings.LIVENESS_THRESHOLD,
+                 reconcile_threshold: float = Settings.RECONCILE_LIVENESS_THRESHOLD,
+                 clock: Callable[[], float] = monotonic) -> None:
+        """
+        :param is_synced: Function returning whether the Mongo objects have been loaded into the cache.
+        :param get_oldest_check: Function returning when the longest running cluster check started, if any.
+        :param liveness_threshold: The amount of seconds without a heartbeat after which the operator is not live.
+        :param reconcile_threshold: The amount of seconds a cluster check may run before the operator is not live.
+        :param clock: Function returning the current time in seconds, used for testing.
+        """
+        self.liveness_threshold = liveness_threshold
+        self.reconcile_threshold = reconcile_threshold
+        self._is_synced = is_synced
+        self._get_oldest_check = get_oldest_check
+        self._clock = clock
+        self._last_heartbeat = clock()  # the startup counts as progress, so the operator is live while it starts.
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """
+        :return: The maximum amount of seconds between the heartbeats of the main loop, so an idle operator stays live.
+        """
+        return self.liveness_threshold / 3
+
+    def beat(self) -> None:
+        """
+        Reports that the main loop made progress.
+        """
+        self._last_heartbeat = self._clock()
+
+    def getSecondsSinceHeartbeat(self) -> float:
+        """
+        :return: The amount of seconds since the main loop last made progress.
+        """
+        return self._clock() - self._last_heartbeat
+
+    def getSecondsSinceOldestCheck(self) -> float:
+        """
+        :return: The amount of seconds the longest running cluster check has been running, 0 if none is running.
+        """
+        started_at = self._get_oldest_check()
+        return 0.0 if started_at is None else self._clock() - started_at
+
+    def checkLiveness(self) -> Tuple[int, str, bytes]:
+        """
+        Handles the liveness probe.
+        :return: The HTTP status, content type and body of the response, with status 503 if the main loop or a cluster
+            check is stuck.
+        """
+        seconds = self.getSecondsSinceHeartbeat()
+        if seconds > self.liveness_threshold:
+            return AdminServer.textResponse("The main loop made no progress for {:.1f} seconds.\n".format(seconds),
+                                            status=self.UNHEALTHY_STATUS)
+        check_seconds = self.getSecondsSinceOldestCheck()
+        if check_seconds > self.reconcile_threshold:
+            return AdminServer.textResponse("A cluster check has been running for {:.1f} seconds.\n"
+                                            .format(check_seconds), status=self.UNHEALTHY_STATUS)
+        return AdminServer.textResponse("The main loop made progress {:.1f} seconds ago.\n".format(seconds))
+
+    def checkReadiness(self) -> Tuple[int, str, bytes]:
+        """
+        Handles the readiness probe.
+        :return: The HTTP status, content type and body of the response, with status 503 if the cache is not synced.
+        """
+        if not self._is_synced():
+            return AdminServer.textResponse("The Mongo objects are not loaded yet.\n", status=self.UNHEALTHY_STATUS)
+        return AdminServer.textResponse("Ready.\n")
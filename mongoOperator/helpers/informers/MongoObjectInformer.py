@@ -0,0 +1,261 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from threading import Condition, Event, Thread
+from typing import Dict, List, Optional, Set
+
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.Pagination import Pagination
+from mongoOperator.helpers.informers.ObjectStore import ObjectStore, ObjectKey
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
+
+
+class MongoObjectInformer:
+    """
+    Keeps a local cache of the Mongo objects in the cluster.
+    The objects are listed once, after which a watch is kept open from the returned resource version so only changes
+    have to be received. The keys of the objects that changed are collected, so they can be checked right away.
+    The list is received in pages, and the objects of each page are marked as changed before the next page is listed.
+    """
+
+    # Kubernetes returns HTTP 410 Gone when the resource version we are watching from is too old.
+    GONE_STATUS = 410
+
+    # How many seconds we wait before reconnecting after the watch failed unexpectedly.
+    WATCH_RETRY_WAIT = 5.0
+
+    def __init__(self, kubernetes_service: KubernetesService) -> None:
+        """
+        :param kubernetes_service: The kubernetes service.
+        """
+        self._kubernetes_service = kubernetes_service
+        self._store = ObjectStore()
+        self._changed_keys: Set[ObjectKey] = set()
+        self._changed_condition = Condition()
+        self._stopped = Event()
+        self._resource_version: Optional[str] = None
+        self._thread: Optional[Thread] = None
+
+    @property
+    def has_synced(self) -> bool:
+        """
+        :return: Whether the initial list of objects has been loaded into the cache.
+        """
+        return self._resource_version is not None
+
+    def start(self) -> None:
+        """
+        Starts listing all Mongo objects and watching for changes in a background thread. See `waitForSync`.
+        """
+        self._stopped.clear()
+        self._thread = Thread(target=self._watchForever, name="MongoObjectInformer", daemon=True)
+        self._thread.start()
+
+    def waitForSync(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all pages of the initial list have been loaded into the cache.
+        :param timeout: The maximum amount of seconds to wait, or None to wait indefinitely.
+        :return: Whether the cache is synced.
+        """
+        with self._changed_condition:
+            return self._changed_condition.wait_for(lambda: self.has_synced, timeout)
+
+    def stop(self) -> None:
+        """
+        Stops watching for changes. The watch thread will stop after receiving its next event.
+        """
+        self._stopped.set()
+
+    def getCluster(self, key: ObjectKey) -> Optional[V1MongoClusterConfiguration]:
+        """
+        Gets a cluster object from the cache.
+        :param key: The key of the cluster, in the format (name, namespace).
+        :return: The cluster object, or None if it does not exist.
+        """
+        return self._store.get(key)
+
+    def listKeys(self) -> List[ObjectKey]:
+        """
+        Lists the keys of the cluster objects in the cache.
+        :return: The keys, in the format (name, namespace).
+        """
+        return self._store.keys()
+
+    def listClusters(self) -> List[V1MongoClusterConfiguration]:
+        """
+        Lists the cluster objects in the cache.
+        :return: The cluster objects.
+        """
+        return self._store.list()
+
+    def popChangedKeys(self) -> Set[ObjectKey]:
+        """
+        Gets the keys of the clusters that changed since the last call, without waiting.
+        :return: The set of cluster keys.
+        """
+        return self.waitForChanges(timeout=0)
+
+    def waitForChanges(self, timeout: float) -> Set[ObjectKey]:
+        """
+        Waits until any cluster object changed or the timeout expired.
+        :param timeout: The maximum amount of seconds to wait.
+        :return: The keys of the clusters that changed since the last call.
+        """
+        with self._changed_condition:
+            if not self._changed_keys and timeout > 0:
+                self._changed_condition.wait(timeout)
+            changed_keys, self._changed_keys = self._changed_keys, set()
+        return changed_keys
+
+    def relist(self) -> None:
+        """
+        Lists all Mongo objects page by page, replacing the contents of the cache.
+        """
+        listed_keys: Set[ObjectKey] = set()
+        changed_count = 0
+        resource_version = ""
+        for page in Pagination.iteratePages(self._kubernetes_service.listMongoObjects):
+            changed_count += self._putPage(page["items"], listed_keys)
+            resource_version = page.get("metadata", {}).get("resourceVersion", "")
+
+        removed_keys = set(self._store.keys()) - listed_keys
+        for key in removed_keys:
+            self._store.delete(key)
+        self._markChanged(removed_keys)
+
+        logging.info("Listed %s mongo objects at version %s, %s changed.", len(listed_keys), resource_version,
+                     changed_count + len(removed_keys))
+        with self._changed_condition:
+            self._resource_version = resource_version
+            self._changed_condition.notify_all()
+
+    def _putPage(self, cluster_dicts: List[Dict[str, any]], listed_keys: Set[ObjectKey]) -> int:
+        """
+        Puts the objects of a page of the list into the cache, so the changed clusters can be checked right away.
+        :param cluster_dicts: The objects in the page.
+        :param listed_keys: The keys of the objects that were listed so far, to which the keys of the page are added.
+        :return: The amount of objects that changed.
+        """
+        changed_keys = set()
+        for cluster_object in filter(None, map(self._parseConfiguration, cluster_dicts)):
+            key = ObjectStore.getKey(cluster_object)
+            listed_keys.add(key)
+            if self._hasChanged(self._store.put(cluster_object), cluster_object):
+                changed_keys.add(key)
+        self._markChanged(changed_keys)
+        return len(changed_keys)
+
+    def _watchForever(self) -> None:
+        """
+        Keeps watching for changes until the informer is stopped, reconnecting if the watch fails.
+        """
+        while not self._stopped.is_set():
+            try:
+                if not self.has_synced:
+                    self.relist()
+                self._watch()
+            except Exception as err:  # pylint: disable=broad-except
+                self._handleWatchError(err)
+
+    def _handleWatchError(self, err: Exception) -> None:
+        """
+        Handles an error that happened while watching. If our resource version is too old, the next watch will start
+        with a new list of the objects. Otherwise we wait a moment before reconnecting.
+        :param err: The error that happened.
+        """
+        if isinstance(err, ApiException) and err.status == self.GONE_STATUS:
+            logging.info("Resource version %s is too old, the mongo objects will be listed again.",
+                         self._resource_version)
+            self._resource_version = None
+        else:
+            logging.exception("Watching the mongo objects failed: %s", err)
+            self._stopped.wait(self.WATCH_RETRY_WAIT)
+
+    def _watch(self) -> None:
+        """
+        Watches the mongo objects from the last known resource version, handling each event that is received.
+        :raise ApiException: If the watch fails or an error event is received.
+        """
+        logging.debug("Watching mongo objects from version %s", self._resource_version)
+        for event in self._kubernetes_service.watchMongoObjects(resource_version=self._resource_version):
+            if self._stopped.is_set():
+                return
+            self._handleEvent(event)
+
+    def _handleEvent(self, event: Dict[str, any]) -> None:
+        """
+        Updates the cache with the received watch event.
+        :param event: The watch event, containing the "type" and the "raw_object".
+        :raise ApiException: If an error event is received.
+        """
+        event_type = event["type"]
+        raw_object = event["raw_object"]
+        if event_type == "ERROR":
+            raise ApiException(status=raw_object.get("code"), reason=raw_object.get("message"))
+
+        metadata = raw_object.get("metadata", {})
+        key = metadata.get("name"), metadata.get("namespace")
+        self._resource_version = metadata.get("resourceVersion", self._resource_version)
+        logging.debug("Received %s event for mongo object %s at version %s", event_type, key, self._resource_version)
+
+        cluster_object = None if event_type == "DELETED" else self._parseConfiguration(raw_object)
+        if cluster_object is None:
+            if self._store.delete(key) is not None:
+                self._markChanged({key})
+        elif self._hasChanged(self._store.put(cluster_object), cluster_object):
+            self._markChanged({key})
+
+    def _markChanged(self, keys: Set[ObjectKey]) -> None:
+        """
+        Adds the given keys to the changed keys, waking up anyone waiting for changes.
+        :param keys: The keys of the clusters that changed.
+        """
+        if not keys:
+            return
+        with self._changed_condition:
+            self._changed_keys.update(keys)
+            self._changed_condition.notify_all()
+
+    @staticmethod
+    def _hasChanged(previous: Optional[V1MongoClusterConfiguration], current: V1MongoClusterConfiguration) -> bool:
+        """
+        Checks whether the specification of the cluster object changed compared to the previously known version.
+        Changes to the status, like the ones written by the operator itself, do not cause the cluster to be checked.
+        :param previous: The previous cluster object, if any.
+        :param current: The current cluster object.
+        :return: True if the cluster was added or changed, False otherwise.
+        """
+        if previous is None:
+            return True
+        return MongoObjectInformer.getGeneration(previous) != MongoObjectInformer.getGeneration(current)
+
+    @staticmethod
+    def getGeneration(cluster_object: V1MongoClusterConfiguration) -> str:
+        """
+        Gets the version of the specification of the given cluster object.
+        :param cluster_object: The cluster object.
+        :return: The generation of the object, which only changes when its specification changes. Objects without a
+            generation fall back to their resource version, which changes on every write.
+        """
+        if cluster_object.metadata.generation is None:
+            return cluster_object.metadata.resource_version
+        return str(cluster_object.metadata.generation)
+
+    @staticmethod
+    def _parseConfiguration(cluster_dict: Dict[str, any]) -> Optional[V1MongoClusterConfiguration]:
+        """
+        Tries to parse the given cluster configuration, returning None if the object cannot be parsed.
+        :param cluster_dict: The dictionary containing the configuration.
+        :return: The cluster configuration model, if valid, or None.
+        """
+        try:
+            result = V1MongoClusterConfiguration(**cluster_dict)
+            result.validate()
+            return result
+        except ValueError as err:
+            meta = cluster_dict.get("metadata", {})
+            logging.error("Could not validate cluster configuration for %s @ ns/%s: %s. The cluster will be ignored.",
+                          meta.get("name"), meta.get("namespace"), err)
@@ -0,0 +1,70 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+
+ObjectKey = Tuple[str, str]  # format: (name, namespace)
+
+
+class ObjectStore:
+    """
+    Thread-safe local cache of Kubernetes objects, keyed by name and namespace.
+    """
+
+    def __init__(self) -> None:
+        self._lock = RLock()
+        self._items: Dict[ObjectKey, any] = {}
+
+    @staticmethod
+    def getKey(item: any) -> ObjectKey:
+        """
+        Gets the key of the given object.
+        :param item: The Kubernetes object.
+        :return: The key of the object, in the format (name, namespace).
+        """
+        return item.metadata.name, item.metadata.namespace
+
+    def get(self, key: ObjectKey) -> Optional[any]:
+        """
+        Gets the object with the given key.
+        :param key: The key of the object.
+        :return: The object if it is in the store, None otherwise.
+        """
+        with self._lock:
+            return self._items.get(key)
+
+    def keys(self) -> List[ObjectKey]:
+        """
+        :return: The keys of all objects in the store.
+        """
+        with self._lock:
+            return list(self._items.keys())
+
+    def list(self) -> List[any]:
+        """
+        :return: All objects in the store.
+        """
+        with self._lock:
+            return list(self._items.values())
+
+    def put(self, item: any) -> Optional[any]:
+        """
+        Adds or replaces an object in the store.
+        :param item: The object to be stored.
+        :return: The object that was previously stored with the same key, if any.
+        """
+        key = self.getKey(item)
+        with self._lock:
+            previous = self._items.get(key)
+            self._items[key] = item
+            return previous
+
+    def delete(self, key: ObjectKey) -> Optional[any]:
+        """
+        Removes the object with the given key from the store.
+        :param key: The key of the object.
+        :return: The object that was removed, if any.
+        """
+        with self._lock:
+            return self._items.pop(key, None)
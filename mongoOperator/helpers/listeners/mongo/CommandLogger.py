@@ -5,9 +5,11 @@ import logging
 
 from pymongo.monitoring import CommandStartedEvent, CommandListener, CommandSucceededEvent, CommandFailedEvent
 
+from mongoOperator.helpers.Metrics import Metrics
+
 
 class CommandLogger(CommandListener):
-    """ Simple logger for mongo commands being executed in the cluster. """
+    """ Simple logger for mongo commands being executed in the cluster, which also measures their duration. """
 
     def started(self, event: CommandStartedEvent) -> None:
         """
@@ -24,6 +26,7 @@ class CommandLogger(CommandListener):
         """
         logging.debug("Command %s with request id %s on server %s succeeded in %s microseconds",
                       event.command_name, event.request_id, event.connection_id, event.duration_micros)
+        Metrics.MONGO_COMMAND_DURATION.labels(command=event.command_name).observe(event.duration_micros / 1e6)
 
     def failed(self, event: CommandFailedEvent) -> None:
         """
@@ -32,3 +35,5 @@ class CommandLogger(CommandListener):
         """
         logging.debug("Command %s with request id %s on server %s failed in %s microseconds",
                       event.command_name, event.request_id, event.connection_id, event.duration_micros)
+        Metrics.MONGO_COMMAND_DURATION.labels(command=event.command_name).observe(event.duration_micros / 1e6)
+        Metrics.MONGO_COMMAND_FAILURES.labels(command=event.command_name).inc()
@@ -0,0 +1,134 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from functools import wraps
+from threading import Condition
+from time import monotonic
+from typing import Callable, Optional, TypeVar
+
+from mongoOperator.helpers.rateLimiters.ConcurrencyLimitConfig import ConcurrencyLimitConfig
+
+ResultType = TypeVar("ResultType")
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Thread-safe limit of the amount of concurrent calls to a server, that adapts to the latency of the server with
+    additive increase and multiplicative decrease (AIMD).
+    The latency of each call is compared with the baseline, a moving average of the previous latencies. While the
+    calls are about as fast as the baseline and the limit is being used, the limit grows by one for each call. When a
+    call is much slower than the baseline or fails because the server is overloaded, the limit is multiplied by the
+    backoff ratio, so fewer calls are sent to a degraded server instead of piling on more. Like TCP, the limit
+    decreases at most once per window of `limit` calls, as the concurrent calls are usually slow for the same reason.
+    """
+
+    def __init__(self, config: ConcurrencyLimitConfig, is_overloaded: Callable[[Exception], bool] = lambda err: True,
+                 clock: Callable[[], float] = monotonic) -> None:
+        """
+        :param config: The bounds of the limit and how quickly it adapts.
+        :param is_overloaded: Function returning whether the error raised by a call means the server is overloaded.
+        :param clock: Function returning the current time in seconds, used for testing.
+        """
+        self.config = config
+        self._is_overloaded = is_overloaded
+        self._clock = clock
+        self._condition = Condition()
+        self._limit = float(min(max(config.initial_limit, config.min_limit), config.max_limit))
+        self._in_flight = 0
+        self._calls_since_decrease = 0
+        self._baseline: Optional[float] = None
+
+    @property
+    def limit(self) -> int:
+        """
+        :return: The current maximum amount of concurrent calls.
+        """
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        :return: The amount of calls that are currently running.
+        """
+        return self._in_flight
+
+    def wrap(self, func: Callable[..., ResultType]) -> Callable[..., ResultType]:
+        """
+        :param func: The function that calls the server.
+        :return: The function wrapped so its calls are limited, see `call`.
+        """
+        @wraps(func)
+        def limited(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return limited
+
+    def call(self, func: Callable[..., ResultType], *args, **kwargs) -> ResultType:
+        """
+        Calls the given function once there are less concurrent calls than the limit, and adapts the limit to the
+        latency and error of the call.
+        :param func: The function that calls the server.
+        :param args: The positional arguments of the function.
+        :param kwargs: The keyword arguments of the function.
+        :return: The result of the function.
+        """
+        self.acquire()
+        start = self._clock()
+        overloaded = False
+        try:
+            return func(*args, **kwargs)
+        except Exception as err:
+            overloaded = self._is_overloaded(err)
+            raise
+        finally:
+            self.release(self._clock() - start, overloaded)
+
+    def acquire(self) -> None:
+        """
+        Waits until there are less concurrent calls than the limit, and registers a new call.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    def release(self, latency: float, overloaded: bool = False) -> None:
+        """
+        Registers that a call finished, adapting the limit.
+        :param latency: The duration of the call in seconds.
+        :param overloaded: Whether the call failed because the server is overloaded.
+        """
+        with self._condition:
+            was_saturated = self._in_flight * 2 >= self._limit
+            self._in_flight -= 1
+            self._calls_since_decrease += 1
+            if overloaded or self._isSlow(latency):
+                self._decrease()
+            elif was_saturated:
+                self._limit = min(float(self.config.max_limit), self._limit + 1)
+            if not overloaded:
+                self._updateBaseline(latency)
+            self._condition.notify_all()
+
+    def _decrease(self) -> None:
+        """
+        Multiplies the limit by the backoff ratio, unless it already decreased during the current window of calls.
+        """
+        if self._calls_since_decrease >= self._limit:
+            self._limit = max(float(self.config.min_limit), self._limit * self.config.backoff_ratio)
+            self._calls_since_decrease = 0
+
+    def _isSlow(self, latency: float) -> bool:
+        """
+        :param latency: The duration of a call in seconds.
+        :return: Whether the call was much slower than the baseline.
+        """
+        return self._baseline is not None and latency > self._baseline * self.config.latency_tolerance
+
+    def _updateBaseline(self, latency: float) -> None:
+        """
+        Adds the given latency to the moving average.
+        :param latency: The duration of a call in seconds.
+        """
+        if self._baseline is None:
+            self._baseline = latency
+        else:
+            self._baseline += (latency - self._baseline) * self.config.smoothing
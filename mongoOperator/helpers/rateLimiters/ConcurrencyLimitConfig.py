@@ -0,0 +1,24 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import NamedTuple
+
+from Settings import Settings
+
+
+class ConcurrencyLimitConfig(NamedTuple):
+    """
+    The bounds of an adaptive concurrency limit and how quickly it adapts to the latency of the server.
+    """
+    # the maximum amount of concurrent calls.
+    max_limit: int
+    # the amount of concurrent calls before any latency is known, within the minimum and maximum.
+    initial_limit: int
+    # the minimum amount of concurrent calls.
+    min_limit: int = 1
+    # how many times slower than the baseline a call may be before the limit decreases.
+    latency_tolerance: float = Settings.CONCURRENCY_LATENCY_TOLERANCE
+    # the factor with which the limit is multiplied when it decreases.
+    backoff_ratio: float = 0.9
+    # the weight of each latency in the baseline.
+    smoothing: float = 0.05
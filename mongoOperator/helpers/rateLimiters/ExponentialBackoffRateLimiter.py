@@ -0,0 +1,53 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import random
+from threading import Lock
+from typing import Dict, Hashable
+
+
+class ExponentialBackoffRateLimiter:
+    """
+    Rate limiter that doubles the delay for each consecutive failure of the same item, up to a maximum.
+    A random jitter is added to the delay so items that failed at the same moment are not all retried together.
+    """
+
+    def __init__(self, base_delay: float, max_delay: float, jitter: float = 0.1) -> None:
+        """
+        :param base_delay: The delay in seconds after the first failure.
+        :param max_delay: The maximum delay in seconds.
+        :param jitter: The maximum fraction of the delay that is randomly added to it.
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._lock = Lock()
+        self._failures: Dict[Hashable, int] = {}
+
+    def when(self, item: Hashable) -> float:
+        """
+        Registers a failure of the given item.
+        :param item: The item that failed.
+        :return: The amount of seconds to wait before retrying the item.
+        """
+        with self._lock:
+            failures = self._failures.get(item, 0)
+            self._failures[item] = failures + 1
+        delay = min(self.max_delay, self.base_delay * 2 ** failures)
+        return min(self.max_delay, delay * (1 + random.uniform(0, self.jitter)))
+
+    def forget(self, item: Hashable) -> None:
+        """
+        Resets the failures of the given item, e.g. because it succeeded.
+        :param item: The item.
+        """
+        with self._lock:
+            self._failures.pop(item, None)
+
+    def numRequeues(self, item: Hashable) -> int:
+        """
+        :param item: The item.
+        :return: The amount of consecutive failures of the given item.
+        """
+        with self._lock:
+            return self._failures.get(item, 0)
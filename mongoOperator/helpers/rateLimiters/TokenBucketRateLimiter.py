@@ -0,0 +1,39 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import Lock
+from time import monotonic
+from typing import Callable
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket that limits the rate of an action across all callers.
+    The bucket starts full with `burst` tokens and is refilled with `rate` tokens per second.
+    Every reservation takes a token, even when the bucket is empty, so callers are delayed in the order they arrived.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = monotonic) -> None:
+        """
+        :param rate: The amount of tokens added to the bucket each second.
+        :param burst: The maximum amount of tokens in the bucket.
+        :param clock: Function returning the current time in seconds, used for testing.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._lock = Lock()
+        self._tokens = float(burst)
+        self._last_update = clock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token from the bucket.
+        :return: The amount of seconds the caller has to wait before the action may be executed.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._last_update) * self.rate)
+            self._last_update = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
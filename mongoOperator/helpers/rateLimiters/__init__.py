@@ -0,0 +1 @@
+# Copyright (c) 2018 Ultimaker
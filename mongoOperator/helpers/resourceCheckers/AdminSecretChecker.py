@@ -5,10 +5,13 @@ import os
 from base64 import b64encode
 
 from kubernetes.client import V1Secret, V1Status
-from typing import List, Dict
+from typing import Dict, Iterator
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.Pagination import Pagination
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
 
 
 class AdminSecretChecker(BaseResourceChecker):
@@ -20,6 +23,9 @@ class AdminSecretChecker(BaseResourceChecker):
     # Name of the secret for each cluster.
     NAME_FORMAT = "{}-admin-credentials"
 
+    # The keys of the data in the secret.
+    SECRET_KEYS = ("username", "password")
+
     @classmethod
     def getClusterName(cls, resource_name: str) -> str:
         return resource_name.replace(cls.NAME_FORMAT.format(""), "")
@@ -34,8 +40,10 @@ class AdminSecretChecker(BaseResourceChecker):
         """Generates a root user with a random secure password to use in secrets."""
         return {"username": "root", "password": b64encode(os.urandom(33)).decode()}
 
-    def listResources(self) -> List[V1Secret]:
-        return self.kubernetes_service.listAllSecretsWithLabels().items
+    def listResourceMetadata(self) -> Iterator[Dict[str, any]]:
+        for page in Pagination.iteratePages(self.kubernetes_service.listMetadataWithLabels,
+                                            KubernetesService.SECRETS_PATH):
+            yield from (item["metadata"] for item in page["items"])
 
     def getResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
         name = self.getSecretName(cluster_object.metadata.name)
@@ -43,11 +51,20 @@ class AdminSecretChecker(BaseResourceChecker):
 
     def createResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
         name = self.getSecretName(cluster_object.metadata.name)
-        return self.kubernetes_service.createSecret(name, cluster_object.metadata.namespace, self._generateSecretData())
+        return self.kubernetes_service.createSecret(name, cluster_object.metadata.namespace, self._generateSecretData(),
+                                                    owner=cluster_object)
 
     def updateResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Secret:
+        # the credentials are kept, as the admin user of the replica set was created with them.
+        name = self.getSecretName(cluster_object.metadata.name)
+        return self.kubernetes_service.updateSecret(name, cluster_object.metadata.namespace, self.SECRET_KEYS,
+                                                    owner=cluster_object)
+
+    def getDesiredStateHash(self, cluster_object: V1MongoClusterConfiguration) -> str:
         name = self.getSecretName(cluster_object.metadata.name)
-        return self.kubernetes_service.updateSecret(name, cluster_object.metadata.namespace, self._generateSecretData())
+        secret = KubernetesResources.createSecret(name, cluster_object.metadata.namespace,
+                                                  dict.fromkeys(self.SECRET_KEYS, ""), owner=cluster_object)
+        return KubernetesResources.getDesiredStateHash(secret)
 
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         secret_name = self.getSecretName(cluster_name)
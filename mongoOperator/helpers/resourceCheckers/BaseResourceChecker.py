@@ -6,8 +6,10 @@ from abc import abstractmethod
 
 from kubernetes.client import V1Status
 from kubernetes.client.rest import ApiException
-from typing import TypeVar, List
+from typing import TypeVar, Dict, Iterator, Set, Tuple
 
+from Settings import Settings
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from mongoOperator.services.KubernetesService import KubernetesService
 
@@ -17,10 +19,22 @@ GenericType = TypeVar("GenericType")
 class BaseResourceChecker:
     """
     Base class for services that can check Kubernetes resources.
+    A resource is only updated when the hash of the desired state in its annotation differs from the current one. As
+    the hash does not change when the live resource is edited by hand, such drift is only corrected by the full update
+    that is forced on every `full_update_checks` checks of the same resource.
     """
 
-    def __init__(self, kubernetes_service: KubernetesService):
+    def __init__(self, kubernetes_service: KubernetesService,
+                 full_update_checks: int = Settings.RESOURCE_FULL_UPDATE_CHECKS):
+        """
+        :param kubernetes_service: The kubernetes service.
+        :param full_update_checks: Every this many checks, the resource is updated even if it seems up to date.
+            Zero disables the forced updates.
+        """
         self.kubernetes_service = kubernetes_service
+        self.full_update_checks = full_update_checks
+        # format: {(cluster_name, namespace): amount of checks since the last update}
+        self._checks_since_update: Dict[Tuple[str, str], int] = {}
 
     @staticmethod
     def getClusterName(resource_name: str) -> str:
@@ -34,6 +48,7 @@ class BaseResourceChecker:
     def checkResource(self, cluster_object: V1MongoClusterConfiguration) -> GenericType:
         """
         Checks whether the resource is up-to-date in Kubernetes, creating or updating it if necessary.
+        The resource is not updated when the desired state it was last written with did not change.
         :param cluster_object: The cluster object from the YAML file.
         :return: An instance of the resource.
         """
@@ -44,7 +59,10 @@ class BaseResourceChecker:
             if api_exception.status != 404:
                 raise
 
-        if resource:
+        if resource and self.isUpToDate(resource, cluster_object):
+            logging.debug("%s for %s @ ns/%s is up to date.", type(self).__name__, cluster_object.metadata.name,
+                          cluster_object.metadata.namespace)
+        elif resource:
             # We update the resource to ensure it is up to date.
             resource = self.updateResource(cluster_object)
         else:
@@ -56,29 +74,56 @@ class BaseResourceChecker:
                      cluster_object.metadata.namespace, resource.metadata.resource_version)
         return resource
 
+    def isUpToDate(self, resource: GenericType, cluster_object: V1MongoClusterConfiguration) -> bool:
+        """
+        Checks whether the resource was written with the current desired state of the cluster, and was not due for a
+        full update.
+        :param resource: The existing resource.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: Whether the update of the resource may be skipped.
+        """
+        key = cluster_object.metadata.name, cluster_object.metadata.namespace
+        checks = self._checks_since_update.pop(key, 0) + 1
+        if KubernetesResources.getDesiredStateHash(resource) != self.getDesiredStateHash(cluster_object):
+            return False
+        if self.full_update_checks and checks >= self.full_update_checks:
+            logging.info("%s for %s @ ns/%s is updated to undo any manual changes.", type(self).__name__, *key)
+            return False
+        self._checks_since_update[key] = checks
+        return True
+
     def cleanResources(self) -> None:
         """
         Deletes any resources for which the original cluster cannot be found.
         """
-        for resource in self.listResources():
-            resource_name = resource.metadata.name
-            cluster_name = self.getClusterName(resource_name)
-            namespace = resource.metadata.namespace
-            try:
-                self.kubernetes_service.getMongoObject(cluster_name, namespace)
-                continue
-            except ApiException as api_exception:
-                if api_exception.status != 404:
-                    raise
-
-            # The service exists but the Mongo object it belonged to does not, we have to delete it.
+        # the resources are listed before the clusters, so the resources of a cluster that was just created are kept.
+        resource_keys = self.listResourceKeys()
+        self.deleteOrphans(resource_keys, self.kubernetes_service.listMongoObjectKeys())
+
+    def listResourceKeys(self) -> Set[Tuple[str, str]]:
+        """
+        Lists the clusters of the existing resources. Only the keys are kept, not the resources themselves.
+        :return: The cluster name and namespace of each resource.
+        """
+        return {(self.getClusterName(metadata["name"]), metadata["namespace"])
+                for metadata in self.listResourceMetadata()}
+
+    def deleteOrphans(self, resource_keys: Set[Tuple[str, str]], cluster_keys: Set[Tuple[str, str]]) -> None:
+        """
+        Deletes the resources whose cluster does not exist.
+        :param resource_keys: The cluster name and namespace of each resource, listed before the clusters.
+        :param cluster_keys: The name and namespace of each existing cluster.
+        """
+        for cluster_name, namespace in sorted(resource_keys - cluster_keys):
+            # The resource exists but the Mongo object it belonged to does not, we have to delete it.
             self.deleteResource(cluster_name, namespace)
+            self._checks_since_update.pop((cluster_name, namespace), None)
 
     @abstractmethod
-    def listResources(self) -> List[GenericType]:
+    def listResourceMetadata(self) -> Iterator[Dict[str, any]]:
         """
-        Retrieves a list of resource objects.
-        :return: The list of available resources.
+        Retrieves the metadata of the resource objects, page by page. The rest of the objects is not received.
+        :return: A generator of the metadata of the available resources.
         """
         raise NotImplementedError
 
@@ -110,6 +155,15 @@ class BaseResourceChecker:
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def getDesiredStateHash(self, cluster_object: V1MongoClusterConfiguration) -> str:
+        """
+        Hashes the manifest that would be written for the given cluster.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The hash of the desired state.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         """
@@ -1,12 +1,15 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, Iterator
 
 from kubernetes.client import V1Service, V1Status
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.Pagination import Pagination
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
 
 
 class ServiceChecker(BaseResourceChecker):
@@ -15,8 +18,10 @@ class ServiceChecker(BaseResourceChecker):
     The inherited methods do not have documentation, see the parent class for more details.
     """
 
-    def listResources(self) -> List[V1Service]:
-        return self.kubernetes_service.listAllServicesWithLabels().items
+    def listResourceMetadata(self) -> Iterator[Dict[str, any]]:
+        for page in Pagination.iteratePages(self.kubernetes_service.listMetadataWithLabels,
+                                            KubernetesService.SERVICES_PATH):
+            yield from (item["metadata"] for item in page["items"])
 
     def getResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Service:
         return self.kubernetes_service.getService(cluster_object.metadata.name, cluster_object.metadata.namespace)
@@ -27,5 +32,8 @@ class ServiceChecker(BaseResourceChecker):
     def updateResource(self, cluster_object: V1MongoClusterConfiguration) -> V1Service:
         return self.kubernetes_service.updateService(cluster_object)
 
+    def getDesiredStateHash(self, cluster_object: V1MongoClusterConfiguration) -> str:
+        return KubernetesResources.getDesiredStateHash(KubernetesResources.createService(cluster_object))
+
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         return self.kubernetes_service.deleteService(cluster_name, namespace)
@@ -1,12 +1,15 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, Iterator
 
 from kubernetes.client import V1StatefulSet, V1Status
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.Pagination import Pagination
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
 
 
 class StatefulSetChecker(BaseResourceChecker):
@@ -15,8 +18,10 @@ class StatefulSetChecker(BaseResourceChecker):
     The inherited methods do not have documentation, see the parent class for more details.
     """
 
-    def listResources(self) -> List[V1StatefulSet]:
-        return self.kubernetes_service.listAllStatefulSetsWithLabels().items
+    def listResourceMetadata(self) -> Iterator[Dict[str, any]]:
+        for page in Pagination.iteratePages(self.kubernetes_service.listMetadataWithLabels,
+                                            KubernetesService.STATEFUL_SETS_PATH):
+            yield from (item["metadata"] for item in page["items"])
 
     def getResource(self, cluster_object: V1MongoClusterConfiguration) -> V1StatefulSet:
         return self.kubernetes_service.getStatefulSet(cluster_object.metadata.name, cluster_object.metadata.namespace)
@@ -27,5 +32,8 @@ class StatefulSetChecker(BaseResourceChecker):
     def updateResource(self, cluster_object: V1MongoClusterConfiguration) -> V1StatefulSet:
         return self.kubernetes_service.updateStatefulSet(cluster_object)
 
+    def getDesiredStateHash(self, cluster_object: V1MongoClusterConfiguration) -> str:
+        return KubernetesResources.getDesiredStateHash(KubernetesResources.createStatefulSet(cluster_object))
+
     def deleteResource(self, cluster_name: str, namespace: str) -> V1Status:
         return self.kubernetes_service.deleteStatefulSet(cluster_name, namespace)
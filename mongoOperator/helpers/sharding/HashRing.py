@@ -0,0 +1,44 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from bisect import bisect
+from hashlib import md5
+from typing import Iterable, List, Optional
+
+
+class HashRing:
+    """
+    Consistent hash ring that divides keys over a set of members.
+    Each member is placed on the ring a number of times (virtual nodes), and a key is owned by the first member
+    clockwise from the hash of the key. When a member joins or leaves, only the keys of that member move.
+    """
+
+    def __init__(self, members: Iterable[str], virtual_nodes: int = 100) -> None:
+        """
+        :param members: The unique names of the members.
+        :param virtual_nodes: The amount of points each member gets on the ring.
+        """
+        self.members: List[str] = sorted(set(members))
+        points = sorted((self._hash("{}#{}".format(member, index)), member)
+                        for member in self.members for index in range(virtual_nodes))
+        self._hashes = [point_hash for point_hash, _ in points]
+        self._owners = [member for _, member in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        """
+        Hashes the given value. MD5 is used for its even distribution and stability across processes, not for security.
+        :param value: The value to hash.
+        :return: The hash as integer.
+        """
+        return int(md5(value.encode()).hexdigest()[:16], 16)
+
+    def getOwner(self, key: str) -> Optional[str]:
+        """
+        :param key: The key.
+        :return: The member that owns the given key, or None if the ring has no members.
+        """
+        if not self._hashes:
+            return None
+        index = bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._owners[index]
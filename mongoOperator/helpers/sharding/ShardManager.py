@@ -0,0 +1,206 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from typing import Dict, List
+
+from kubernetes.client import V1beta1Lease, V1beta1LeaseSpec
+from kubernetes.client.rest import ApiException
+
+from Settings import Settings
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.LeaseConfig import LeaseConfig
+from mongoOperator.helpers.LeaseHolder import LeaseHolder
+from mongoOperator.helpers.informers.ObjectStore import ObjectKey
+from mongoOperator.helpers.sharding.HashRing import HashRing
+from mongoOperator.services.LeaseService import LeaseService
+
+
+class ShardManager(LeaseHolder):
+    """
+    Divides the clusters over all active replicas of the operator.
+    Every replica holds a lease of its own, renewed every retry period. All replicas list the leases of the group and
+    put the members whose lease did not expire on a consistent hash ring, which decides which replica owns a cluster.
+    A replica that could not renew its own lease for the renew deadline does not own any cluster.
+    Clusters that move to this replica are handed off: we only start checking them once the ring has not changed for
+    the renew deadline. By then the previous owner has either seen the new ring, or stopped owning clusters because
+    it could not renew its lease. A check that the previous owner was still running stops before its next step, so
+    two replicas only check the same cluster at most briefly during rebalancing, when a single step of the previous
+    owner takes longer than the renew deadline.
+    """
+
+    GROUP_LABEL = "shard-group"
+
+    def __init__(self, lease_service: LeaseService,
+                 group_name: str = Settings.SHARDING_GROUP_NAME,
+                 config: LeaseConfig = LeaseConfig(),
+                 virtual_nodes: int = Settings.SHARDING_VIRTUAL_NODES) -> None:
+        """
+        :param lease_service: The service with which the leases are read and written.
+        :param group_name: The name of the group of replicas, used as label and as prefix of the lease names.
+        :param config: The identity of this replica and the timings of the leases.
+        :param virtual_nodes: The amount of points each replica gets on the hash ring.
+        """
+        super().__init__(lease_service, config)
+        self.group_name = group_name
+        self.virtual_nodes = virtual_nodes
+        # the rings we observed since the last handoff, oldest first. A cluster is only owned if it is ours in all.
+        self._rings = [HashRing([], virtual_nodes)]
+        self._ring_changed_at = 0.0  # the time of the renewal at which we observed the last ring.
+        self._version = 0
+
+    @property
+    def lease_name(self) -> str:
+        """
+        :return: The name of our own lease.
+        """
+        return "{}-{}".format(self.group_name, self.config.identity)
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        """
+        :return: The labels of the leases of the group.
+        """
+        return dict(KubernetesResources.createDefaultLabels(), **{self.GROUP_LABEL: self.group_name})
+
+    @property
+    def is_active(self) -> bool:
+        """
+        :return: Whether our own lease is valid, so we may check the clusters we own.
+        """
+        return self._holdsLease()
+
+    @property
+    def version(self) -> int:
+        """
+        :return: A number that changes every time the clusters owned by this replica may have changed: when the
+            members of the ring changed, and when a handoff completed.
+        """
+        with self._lock:
+            return self._version
+
+    @property
+    def members(self) -> List[str]:
+        """
+        :return: The sorted identities of the active replicas.
+        """
+        with self._lock:
+            return self._rings[-1].members
+
+    def ownsKey(self, key: ObjectKey) -> bool:
+        """
+        :param key: The key of the cluster, in the format (name, namespace).
+        :return: Whether this replica should check the given cluster.
+        """
+        name, namespace = key
+        ring_key = "{}/{}".format(namespace, name)
+        with self._lock:
+            owners = {ring.getOwner(ring_key) for ring in self._rings}
+        return owners == {self.config.identity} and self.is_active
+
+    def isCoordinator(self) -> bool:
+        """
+        :return: Whether this replica should run the tasks that are not bound to a cluster, like garbage collection.
+        """
+        members = self.members
+        return bool(members) and members[0] == self.config.identity and self.is_active
+
+    def start(self) -> None:
+        """
+        Starts renewing our lease and watching the other members in a background thread.
+        """
+        logging.info("Joining shard group %s @ ns/%s as %s.", self.group_name, self.config.namespace,
+                     self.config.identity)
+        self._startThread("ShardManager")
+
+    def stop(self) -> None:
+        """
+        Stops renewing our lease, and deletes it so the other replicas take over our clusters right away.
+        """
+        self._stopThread()  # make sure the lease is not renewed after we deleted it.
+        self._setRenewed(False)
+        try:
+            self.lease_service.deleteLease(self.lease_name, self.config.namespace)
+        except ApiException as err:
+            logging.warning("Could not delete lease %s @ ns/%s: %s", self.lease_name, self.config.namespace, err)
+
+    def sync(self) -> None:
+        """
+        Renews our lease and updates the hash ring with the active members of the group.
+        :raise ApiException: If the leases could not be read or written.
+        """
+        self._renew()
+        leases = self.lease_service.listLeasesWithLabels(self.config.namespace, self.labels).items
+        members = {self.config.identity}
+        for lease in leases:
+            holder = lease.spec.holder_identity
+            if holder and holder != self.config.identity and not self._isExpired(lease):
+                members.add(holder)
+        self._forgetRemovedLeases(lease.metadata.name for lease in leases)
+        self._updateRing(members)
+        if self.isCoordinator():
+            self._deleteExpiredLeases(leases)
+
+    def _renew(self) -> None:
+        """
+        Renews our lease, creating it if needed.
+        """
+        now = self._utcNow()
+        try:
+            lease = self.lease_service.getLease(self.lease_name, self.config.namespace)
+        except ApiException as err:
+            if err.status != self.NOT_FOUND_STATUS:
+                raise
+            self.lease_service.createLease(self.lease_name, self.config.namespace, V1beta1LeaseSpec(
+                holder_identity=self.config.identity, lease_duration_seconds=self.config.lease_duration,
+                acquire_time=now, renew_time=now,
+            ), self.labels)
+        else:
+            lease.spec.holder_identity = self.config.identity
+            lease.spec.lease_duration_seconds = self.config.lease_duration
+            lease.spec.renew_time = now
+            self.lease_service.replaceLease(lease)
+        self._setRenewed()
+
+    def _updateRing(self, members: set) -> None:
+        """
+        Rebuilds the hash ring if the members changed, and completes the handoff once the ring has not changed for the
+        renew deadline. The time is measured between our own renewals.
+        :param members: The identities of the active members.
+        """
+        with self._lock:
+            if set(self._rings[-1].members) != members:
+                self._rings.append(HashRing(members, self.virtual_nodes))
+                self._ring_changed_at = self._renewed_at
+                self._version += 1
+                logging.info("The members of shard group %s changed to %s.", self.group_name, sorted(members))
+            elif len(self._rings) > 1 and self._renewed_at - self._ring_changed_at >= self.config.renew_deadline:
+                del self._rings[:-1]
+                self._version += 1
+                logging.info("Completed the handoff of the clusters in shard group %s.", self.group_name)
+
+    def _deleteExpiredLeases(self, leases: List[V1beta1Lease]) -> None:
+        """
+        Deletes the leases of the members that are gone, so they are not listed over and over again.
+        :param leases: The leases of the group.
+        """
+        members = self.members
+        for lease in leases:
+            if lease.spec.holder_identity != self.config.identity and lease.spec.holder_identity not in members:
+                try:
+                    self.lease_service.deleteLease(lease.metadata.name, self.config.namespace)
+                except ApiException as err:
+                    logging.warning("Could not delete expired lease %s @ ns/%s: %s", lease.metadata.name,
+                                    self.config.namespace, err)
+
+    def _runForever(self) -> None:
+        """
+        Synchronizes the members every retry period, until we are stopped.
+        """
+        while not self._stopped.is_set():
+            try:
+                self.sync()
+            except Exception as err:  # pylint: disable=broad-except
+                logging.warning("Could not synchronize shard group %s @ ns/%s: %s", self.group_name,
+                                self.config.namespace, err)
+            self._stopped.wait(self.config.retry_period)
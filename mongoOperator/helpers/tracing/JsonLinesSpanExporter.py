@@ -0,0 +1,39 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+from threading import Lock
+
+from mongoOperator.helpers.tracing.Span import Span
+from mongoOperator.helpers.tracing.SpanExporter import SpanExporter
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Appends the spans to a file, one JSON object per line, so they can be analyzed offline.
+    """
+
+    def __init__(self, file_name: str) -> None:
+        """
+        :param file_name: The location of the file.
+        """
+        self.file_name = file_name
+        self._lock = Lock()
+        self._file = open(file_name, "a")
+
+    def export(self, span: Span) -> None:
+        """
+        Writes the span to the file.
+        :param span: The span.
+        """
+        line = json.dumps(span.toDict(), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        """
+        Closes the file.
+        """
+        with self._lock:
+            self._file.close()
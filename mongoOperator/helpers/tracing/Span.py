@@ -0,0 +1,66 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import random
+from time import monotonic, time
+from typing import Dict, Optional
+
+
+class Span:  # pylint: disable=too-many-instance-attributes
+    """
+    A timed operation within a trace, e.g. the check of a cluster or a single call to the Kubernetes API.
+    Spans started within another span are its children and share its trace ID.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes) -> None:
+        """
+        :param name: The name of the operation.
+        :param parent: The span in which this span was started, if any.
+        :param attributes: Details of the operation, like the name of the cluster.
+        """
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else "{:032x}".format(random.getrandbits(128))
+        self.span_id = "{:016x}".format(random.getrandbits(64))
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes: Dict[str, any] = attributes
+        # the wall clock time is exported, the monotonic time measures the duration regardless of clock changes.
+        self.started_at = time()
+        self._started_monotonic = monotonic()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def setAttribute(self, key: str, value: any) -> None:
+        """
+        Adds a detail to the span.
+        :param key: The name of the attribute.
+        :param value: The value of the attribute.
+        """
+        self.attributes[key] = value
+
+    def setError(self, error: BaseException) -> None:
+        """
+        Marks the operation as failed.
+        :param error: The error that was raised.
+        """
+        self.error = "{}: {}".format(type(error).__name__, error)
+
+    def end(self) -> None:
+        """
+        Marks the operation as finished.
+        """
+        self.duration = monotonic() - self._started_monotonic
+
+    def toDict(self) -> Dict[str, any]:
+        """
+        :return: A JSON serializable dictionary of the span.
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.started_at,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
@@ -0,0 +1,23 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from mongoOperator.helpers.tracing.Span import Span
+
+
+class SpanExporter:
+    """
+    Base class of the destinations of the finished spans.
+    """
+
+    def export(self, span: Span) -> None:
+        """
+        Sends a finished span to the destination. This is called in the thread that finished the span, so it should
+        be quick.
+        :param span: The span.
+        """
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """
+        Releases the resources of the exporter, after which no more spans are exported.
+        """
@@ -0,0 +1,137 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import inspect
+from contextlib import contextmanager
+from functools import wraps
+from threading import local
+from typing import Callable, Iterator, List, Optional, TypeVar
+from weakref import WeakKeyDictionary
+
+from mongoOperator.helpers.tracing.Span import Span
+from mongoOperator.helpers.tracing.SpanExporter import SpanExporter
+
+ClassType = TypeVar("ClassType", bound=type)
+
+# asyncio.current_task was added in Python 3.7, and asyncio.Task.current_task was removed in Python 3.9.
+CURRENT_TASK = getattr(asyncio, "current_task", None) or getattr(asyncio.Task, "current_task")
+
+
+class Tracer:
+    """
+    Records the spans of the operator and sends them to the configured exporter.
+    A span is the child of the span that is active in the current thread, or in the current asyncio task when it is
+    started from a coroutine, so concurrent checks do not mix up their spans. Nothing is recorded without an exporter.
+    """
+
+    _exporter: Optional[SpanExporter] = None
+    _thread_stacks = local()
+    _task_stacks: "WeakKeyDictionary[asyncio.Task, List[Span]]" = WeakKeyDictionary()
+
+    @classmethod
+    def setExporter(cls, exporter: Optional[SpanExporter]) -> None:
+        """
+        Changes where the spans are sent to, shutting down the previous exporter.
+        :param exporter: The new exporter, or None to stop tracing.
+        """
+        previous, cls._exporter = cls._exporter, exporter
+        if previous is not None:
+            previous.shutdown()
+
+    @classmethod
+    def currentSpan(cls) -> Optional[Span]:
+        """
+        :return: The span that is active in the current thread or task, if any.
+        """
+        stack = cls._getStack()
+        return stack[-1] if stack else None
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Context manager that records a span around the code in its body.
+        :param name: The name of the operation.
+        :param attributes: Details of the operation, like the name of the cluster.
+        :return: The span, or None if tracing is disabled.
+        """
+        exporter = cls._exporter
+        if exporter is None:
+            yield None
+            return
+        stack = cls._getStack()
+        span = Span(name, stack[-1] if stack else None, **attributes)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as err:
+            span.setError(err)
+            raise
+        finally:
+            stack.pop()
+            span.end()
+            exporter.export(span)
+
+    @classmethod
+    def bind(cls, func: Callable) -> Callable:
+        """
+        Binds a function to the current span, so the spans it starts in another thread are children of that span.
+        :param func: The function, e.g. one that is run in an executor.
+        :return: The function, wrapped so it runs with the current span active.
+        """
+        parent = cls.currentSpan()
+        if parent is None:
+            return func
+
+        @wraps(func)
+        def bound(*args, **kwargs):
+            stack = cls._getStack()
+            stack.append(parent)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stack.pop()
+        return bound
+
+    @classmethod
+    def traceMethods(cls, prefix: str) -> Callable[[ClassType], ClassType]:
+        """
+        Creates a class decorator that records a span for each call to a public method of the class.
+        :param prefix: The prefix of the span names, which end with the name of the method.
+        :return: The class decorator.
+        """
+        def decorate(traced_class: ClassType) -> ClassType:
+            for name, method in list(vars(traced_class).items()):
+                if inspect.isfunction(method) and not name.startswith("_"):
+                    setattr(traced_class, name, cls._traceCall(prefix + name, method))
+            return traced_class
+        return decorate
+
+    @classmethod
+    def _traceCall(cls, span_name: str, method: Callable) -> Callable:
+        """
+        :param span_name: The name of the spans.
+        :param method: The method to trace.
+        :return: The method wrapped so each call is recorded as a span.
+        """
+        @wraps(method)
+        def traced(*args, **kwargs):
+            with cls.span(span_name):
+                return method(*args, **kwargs)
+        return traced
+
+    @classmethod
+    def _getStack(cls) -> List[Span]:
+        """
+        :return: The active spans of the current asyncio task, or of the current thread outside of a task.
+        """
+        try:
+            task = CURRENT_TASK()
+        except RuntimeError:  # there is no event loop in this thread.
+            task = None
+        if task is not None:
+            return cls._task_stacks.setdefault(task, [])
+        if not hasattr(cls._thread_stacks, "spans"):
+            cls._thread_stacks.spans = []
+        return cls._thread_stacks.spans
@@ -0,0 +1,30 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+
+class ObjectMetaView(NamedTuple):
+    """
+    Read-only view of the metadata of a Kubernetes object, with only the fields the operator reads.
+    The names of the fields are the same as in `V1ObjectMeta`, so the view can be used instead of the model.
+    """
+    name: Optional[str]
+    namespace: Optional[str]
+    uid: Optional[str]
+    resource_version: Optional[str]
+    labels: Optional[Mapping[str, str]]
+    annotations: Optional[Mapping[str, str]]
+
+    @classmethod
+    def fromDict(cls, metadata: Dict[str, Any]) -> "ObjectMetaView":
+        """
+        :param metadata: The metadata of the object, as received from the Kubernetes API.
+        :return: The view of the metadata.
+        """
+        labels = metadata.get("labels")
+        annotations = metadata.get("annotations")
+        return cls(metadata.get("name"), metadata.get("namespace"), metadata.get("uid"),
+                   metadata.get("resourceVersion"), labels and MappingProxyType(labels),
+                   annotations and MappingProxyType(annotations))
@@ -0,0 +1,50 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Union
+
+from mongoOperator.models.ObjectMetaView import ObjectMetaView
+
+
+class ResourceView(NamedTuple):
+    """
+    Read-only view of a Kubernetes resource, e.g. a service, stateful set or secret, with only the fields the operator
+    reads. Parsing the JSON of a response into a view is much faster and uses much less memory than deserializing it
+    into the models of the Kubernetes client, which are created recursively for every field of the resource.
+    The names of the fields are the same as in the models, so the view can be used instead of the model.
+    """
+    metadata: ObjectMetaView
+    data: Optional[Mapping[str, str]]  # only secrets have data.
+
+    @classmethod
+    def fromDict(cls, body: Dict[str, Any]) -> "ResourceView":
+        """
+        :param body: The resource, as received from the Kubernetes API.
+        :return: The view of the resource.
+        """
+        data = body.get("data")
+        return cls(ObjectMetaView.fromDict(body.get("metadata") or {}), data and MappingProxyType(data))
+
+    @classmethod
+    def fromJson(cls, content: Union[bytes, str]) -> "ResourceView":
+        """
+        :param content: The body of a response of the Kubernetes API.
+        :return: The view of the resource.
+        """
+        return cls.fromDict(json.loads(content))
+
+    @classmethod
+    def fromResponse(cls, response: Any) -> "ResourceView":
+        """
+        Parses the raw JSON of a response into a view, releasing the connection afterwards.
+        The resources are read on every check of every cluster, and deserializing them into the models of the client
+        costs much more CPU and memory than the JSON itself, see `benchmarks.DeserializationBenchmark`.
+        :param response: The response received with `_preload_content=False`.
+        :return: The view of the resource.
+        """
+        try:
+            return cls.fromJson(response.data)
+        finally:
+            response.release_conn()
@@ -6,23 +6,35 @@ from time import sleep
 from unittest.mock import patch
 import yaml
 
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Iterator, Set, Tuple
 
 from kubernetes.config import load_incluster_config
 from kubernetes import client
-from kubernetes.client import Configuration, V1DeleteOptions, V1ServiceList, V1StatefulSetList, V1SecretList, \
-    V1beta1CustomResourceDefinition
+from kubernetes.client import Configuration, V1DeleteOptions, V1beta1CustomResourceDefinition, V1ObjectMeta, V1Secret
 from kubernetes.client.rest import ApiException
+from kubernetes.watch import Watch
 
 from Settings import Settings
 from mongoOperator.helpers.IgnoreIfExists import IgnoreIfExists
+from mongoOperator.helpers.KubernetesRequestThrottle import KubernetesRequestThrottle
 from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.Metrics import Metrics
+from mongoOperator.helpers.Pagination import Pagination
+from mongoOperator.helpers.rateLimiters.AdaptiveConcurrencyLimiter import AdaptiveConcurrencyLimiter
+from mongoOperator.helpers.rateLimiters.ConcurrencyLimitConfig import ConcurrencyLimitConfig
+from mongoOperator.helpers.tracing.Tracer import Tracer
+from mongoOperator.models.ResourceView import ResourceView
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 
 
+@Tracer.traceMethods("kubernetes.")
+@Metrics.instrumentKubernetesCalls
 class KubernetesService:
     """
     Bundled methods for interacting with the Kubernetes API.
+    The duration and errors of every method are exported as metrics, and every call is recorded as a span.
+    The requests are rate limited and retried by a `KubernetesRequestThrottle`, and their concurrency is limited by an
+    `AdaptiveConcurrencyLimiter`.
     """
 
     DEFAULT_LABELS = KubernetesResources.createDefaultLabels()
@@ -32,6 +44,19 @@ class KubernetesService:
     LIST_CUSTOM_OBJECTS_RETRIES = 3
     LIST_CUSTOM_OBJECTS_WAIT = 5.0
 
+    MONGO_OBJECT_DEFINITION_NAME = Settings.CUSTOM_OBJECT_RESOURCE_PLURAL + "." + Settings.CUSTOM_OBJECT_API_GROUP
+
+    # the API paths of the resources in all namespaces, see `listMetadataWithLabels`.
+    SERVICES_PATH = "/api/v1/services"
+    STATEFUL_SETS_PATH = "/apis/apps/v1beta1/statefulsets"
+    SECRETS_PATH = "/api/v1/secrets"
+
+    # asks Kubernetes to only return the metadata of the listed objects. Clusters older than 1.15 only support v1beta1,
+    # and the ones older than 1.12 ignore both and return the complete objects.
+    METADATA_LIST_ACCEPT = ",".join(["application/json;as=PartialObjectMetadataList;v=v1;g=meta.k8s.io",
+                                     "application/json;as=PartialObjectMetadataList;v=v1beta1;g=meta.k8s.io",
+                                     "application/json"])
+
     def __init__(self):
         # Create Kubernetes config.
         load_incluster_config()
@@ -39,49 +64,90 @@ class KubernetesService:
         config.debug = Settings.KUBERNETES_SERVICE_DEBUG
         self.api_client = client.ApiClient(config)
 
+        # every request, including the watches, is rate limited and retried when the API server is overloaded.
+        # each attempt also waits for the concurrency limit, which adapts to the latency of the API server.
+        self._request_throttle = KubernetesRequestThrottle()
+        limit_config = ConcurrencyLimitConfig(Settings.KUBERNETES_MAX_CONCURRENCY,
+                                              Settings.KUBERNETES_INITIAL_CONCURRENCY)
+        self._concurrency_limiter = AdaptiveConcurrencyLimiter(limit_config,
+                                                               is_overloaded=KubernetesRequestThrottle.isOverloaded)
+        Metrics.KUBERNETES_CONCURRENCY_LIMIT.set_function(lambda: self._concurrency_limiter.limit)
+        rest_client = self.api_client.rest_client
+        rest_client.request = self._request_throttle.wrap(self._concurrency_limiter.wrap(rest_client.request))
+
         # Re-usable API client instances.
         self.core_api = client.CoreV1Api(self.api_client)
         self.custom_objects_api = client.CustomObjectsApi(self.api_client)
         self.extensions_api = client.ApiextensionsV1beta1Api(self.api_client)
         self.apps_api = client.AppsV1beta1Api(self.api_client)
 
+        # The definition of our custom resource, cached after it has been found. See `listMongoObjects`.
+        self._mongo_object_definition: Optional[V1beta1CustomResourceDefinition] = None
+
     def createMongoObjectDefinition(self) -> V1beta1CustomResourceDefinition:
-        """Create the custom resource definition."""
-        available_resources = {crd.spec.names.plural: crd for crd in
-                               self.extensions_api.list_custom_resource_definition().items}
-        if Settings.CUSTOM_OBJECT_RESOURCE_PLURAL in available_resources:
-            return available_resources[Settings.CUSTOM_OBJECT_RESOURCE_PLURAL]
-
-        # Create it if our CRD doesn't exists yet.
-        logging.info("Custom resource definition %s not found in cluster (available: %s), creating it...",
-                     Settings.CUSTOM_OBJECT_RESOURCE_PLURAL, available_resources)
-        with open("mongo_crd.yaml") as custom_resource_file:
-            definition_dict = yaml.load(custom_resource_file)
-        body = KubernetesResources.deserialize(definition_dict, "V1beta1CustomResourceDefinition")
+        """
+        Gets the custom resource definition, creating it if it does not exist yet.
+        The definition is only requested the first time, afterwards the cached definition is returned.
+        :return: The custom resource definition.
+        """
+        if self._mongo_object_definition is None:
+            self._mongo_object_definition = self._readOrCreateDefinition()
+        return self._mongo_object_definition
 
+    def _readOrCreateDefinition(self) -> V1beta1CustomResourceDefinition:
+        """
+        Gets the custom resource definition by name, creating it if it does not exist yet.
+        Definitions created by older versions of the operator lack the status subresource, so it is added to them.
+        :return: The custom resource definition.
+        """
         # issue with kubernetes causes status.condition==null, which raises an exception and breaks the connection.
         # by ignoring the validation of this field in the client, we can keep the connection open.
         with patch("kubernetes.client.models.v1beta1_custom_resource_definition_status.V1beta1CustomResourceDefinitionStatus.conditions"):  # noqa: E501 pylint: disable=C0301
+            try:
+                definition = self.extensions_api.read_custom_resource_definition(self.MONGO_OBJECT_DEFINITION_NAME)
+            except ApiException as api_exception:
+                if api_exception.status != 404:
+                    raise
+            else:
+                subresources = definition.spec.subresources
+                if subresources is not None and subresources.status is not None:
+                    return definition
+                logging.info("Custom resource definition %s has no status subresource, adding it...",
+                             self.MONGO_OBJECT_DEFINITION_NAME)
+                return self.extensions_api.patch_custom_resource_definition(
+                    self.MONGO_OBJECT_DEFINITION_NAME, {"spec": {"subresources": {"status": {}}}}
+                )
+
+            # Create it if our CRD doesn't exists yet.
+            logging.info("Custom resource definition %s not found in cluster, creating it...",
+                         self.MONGO_OBJECT_DEFINITION_NAME)
+            with open("mongo_crd.yaml") as custom_resource_file:
+                definition_dict = yaml.load(custom_resource_file)
+            body = KubernetesResources.deserialize(definition_dict, "V1beta1CustomResourceDefinition")
             return self.extensions_api.create_custom_resource_definition(body)
 
-    def listMongoObjects(self, **kwargs) -> Dict[str, any]:
+    def listMongoObjects(self, continue_token: Optional[str] = None) -> Dict[str, any]:
         """
-        Get all Kubernetes objects of our custom resource type.
-        IMPORTANT: Kubernetes uses the :return: value to deserialize the results, so it must be a class name.
-        :param kwargs: Additional API flags.
-        :return: dict(str, object)
+        Get a page of the Kubernetes objects of our custom resource type, see `Pagination.iteratePages`.
+        The custom objects API of the client cannot limit the list, so we call the API ourselves.
+        :param continue_token: The token returned in the metadata of the previous page, if any.
+        :return: The list response, with the "items" and "metadata" containing the "resourceVersion" and "continue".
         """
-        definition = self.createMongoObjectDefinition()
-        for _ in range(self.LIST_CUSTOM_OBJECTS_RETRIES):
+        query_params = Pagination.getPageQuery(continue_token)
+        path_params = {"group": Settings.CUSTOM_OBJECT_API_GROUP, "version": Settings.CUSTOM_OBJECT_API_VERSION,
+                       "plural": Settings.CUSTOM_OBJECT_RESOURCE_PLURAL}
+        for _attempt in range(self.LIST_CUSTOM_OBJECTS_RETRIES):
+            definition = self.createMongoObjectDefinition()
             try:
                 logging.debug("Listing resources based on definition %s", definition.metadata.uid)
-                return self.custom_objects_api.list_cluster_custom_object(Settings.CUSTOM_OBJECT_API_GROUP,
-                                                                          Settings.CUSTOM_OBJECT_API_VERSION,
-                                                                          Settings.CUSTOM_OBJECT_RESOURCE_PLURAL,
-                                                                          **kwargs)
+                return self.api_client.call_api("/apis/{group}/{version}/{plural}", "GET", path_params, query_params,
+                                                {"Accept": "application/json"}, response_type="object",
+                                                auth_settings=["BearerToken"], _return_http_data_only=True)
             except ApiException as api_exception:
                 if api_exception.status != 404:
                     raise
+                # the cached definition may have been removed, so we get or create it again.
+                self._mongo_object_definition = None
                 logging.info("Could not list the custom Mongo objects: %s. The definition is probably being "
                              "initialized, we wait %s seconds.", api_exception.reason, self.LIST_CUSTOM_OBJECTS_WAIT)
                 sleep(self.LIST_CUSTOM_OBJECTS_WAIT)
@@ -89,6 +155,30 @@ class KubernetesService:
         raise TimeoutError("Could not list the custom mongo objects after {} retries"
                            .format(self.LIST_CUSTOM_OBJECTS_RETRIES))
 
+    def listMongoObjectKeys(self) -> Set[Tuple[str, str]]:
+        """
+        Lists the names of all Kubernetes objects of our custom resource type.
+        :return: A set with the name and namespace of each object.
+        """
+        return {(item["metadata"]["name"], item["metadata"]["namespace"])
+                for page in Pagination.iteratePages(self.listMongoObjects) for item in page["items"]}
+
+    def watchMongoObjects(self, resource_version: Optional[str] = None, **kwargs) -> Iterator[Dict[str, any]]:
+        """
+        Watches the Kubernetes objects of our custom resource type for changes.
+        :param resource_version: The resource version from which to start watching, as returned by the list call.
+        :param kwargs: Additional API flags.
+        :return: A generator of watch events, each containing the event "type" and the "raw_object".
+        """
+        if resource_version:
+            kwargs["resource_version"] = resource_version
+        logging.debug("Watching custom mongo objects from version %s", resource_version)
+        return Watch().stream(self.custom_objects_api.list_cluster_custom_object,
+                              Settings.CUSTOM_OBJECT_API_GROUP,
+                              Settings.CUSTOM_OBJECT_API_VERSION,
+                              Settings.CUSTOM_OBJECT_RESOURCE_PLURAL,
+                              **kwargs)
+
     def getMongoObject(self, name: str, namespace: str) -> V1MongoClusterConfiguration:
         """
         Get a single Kubernetes Mongo object.
@@ -102,58 +192,86 @@ class KubernetesService:
                                                                     Settings.CUSTOM_OBJECT_RESOURCE_PLURAL,
                                                                     name)
 
-    def listAllServicesWithLabels(self, labels: Optional[Dict[str, str]] = None) -> V1ServiceList:
-        """Get all services with the given labels."""
-        label_selector = KubernetesResources.createLabelSelector(labels or self.DEFAULT_LABELS)
-        logging.debug("Getting all services with labels %s", label_selector)
-        return self.core_api.list_service_for_all_namespaces(label_selector=label_selector)
-
-    def listAllStatefulSetsWithLabels(self, labels: Dict[str, str] = None) -> V1StatefulSetList:
-        """Get all stateful sets with the given labels."""
-        label_selector = KubernetesResources.createLabelSelector(labels or self.DEFAULT_LABELS)
-        logging.debug("Getting all stateful sets with labels %s", label_selector)
-        return self.apps_api.list_stateful_set_for_all_namespaces(label_selector=label_selector)
+    def patchMongoObjectStatus(self, name: str, namespace: str, status: Dict[str, any]) -> Dict[str, any]:
+        """
+        Patches the status of a Kubernetes Mongo object. The status is a subresource, so this does not change the
+        generation of the object.
+        :param name: The name of the object.
+        :param namespace: The namespace of the object.
+        :param status: The status fields to merge into the current status.
+        :return: The updated custom resource object.
+        """
+        logging.debug("Patching status of mongo object %s @ ns/%s with %s.", name, namespace, status)
+        return self.custom_objects_api.patch_namespaced_custom_object_status(Settings.CUSTOM_OBJECT_API_GROUP,
+                                                                             Settings.CUSTOM_OBJECT_API_VERSION,
+                                                                             namespace,
+                                                                             Settings.CUSTOM_OBJECT_RESOURCE_PLURAL,
+                                                                             name,
+                                                                             {"status": status})
 
-    def listAllSecretsWithLabels(self, labels: Dict[str, str] = None) -> V1SecretList:
-        """Get al secrets with the given labels."""
+    def listMetadataWithLabels(self, path: str, labels: Optional[Dict[str, str]] = None,
+                               continue_token: Optional[str] = None) -> Dict[str, any]:
+        """
+        Get a page of the metadata of the resources with the given labels in all namespaces, see
+        `Pagination.iteratePages`.
+        Only the metadata of the objects is received, so e.g. the data of the secrets is never kept in memory.
+        :param path: The API path of the resources, e.g. `SECRETS_PATH`.
+        :param labels: The labels of the resources, by default the labels of all resources created by the operator.
+        :param continue_token: The token returned in the metadata of the previous page, if any.
+        :return: The list response, with the "items" containing the "metadata" of each resource.
+        """
         label_selector = KubernetesResources.createLabelSelector(labels or self.DEFAULT_LABELS)
-        logging.debug("Getting all secrets with labels %s", label_selector)
-        return self.core_api.list_secret_for_all_namespaces(label_selector=label_selector)
+        logging.debug("Getting the metadata of all %s with labels %s", path, label_selector)
+        query_params = [("labelSelector", label_selector)] + Pagination.getPageQuery(continue_token)
+        return self.api_client.call_api(path, "GET", {}, query_params, {"Accept": self.METADATA_LIST_ACCEPT},
+                                        response_type="object", auth_settings=["BearerToken"],
+                                        _return_http_data_only=True)
 
-    def getSecret(self, secret_name: str, namespace: str) -> client.V1Secret:
+    def getSecret(self, secret_name: str, namespace: str) -> ResourceView:
         """
         Retrieves the secret with the given name.
         :param secret_name: The name of the secret.
         :param namespace: The namespace of the secret.
-        :return: The secret object.
+        :return: A read-only view of the secret, see `ResourceView.fromResponse`.
         """
-        return self.core_api.read_namespaced_secret(secret_name, namespace)
+        return ResourceView.fromResponse(self.core_api.read_namespaced_secret(secret_name, namespace,
+                                                                              _preload_content=False))
 
     def createSecret(self, secret_name: str, namespace: str, secret_data: Dict[str, str],
-                     labels: Optional[Dict[str, str]] = None) -> Optional[client.V1Secret]:
+                     labels: Optional[Dict[str, str]] = None,
+                     owner: Optional[V1MongoClusterConfiguration] = None) -> Optional[client.V1Secret]:
         """
         Creates a new Kubernetes secret.
         :param secret_name: Unique name of the secret.
         :param namespace: Namespace to add secret to.
         :param secret_data: The data to store in the secret as key/value pair dict.
         :param labels: Optional labels for this secret, defaults to the default labels (see `cls.createDefaultLabels`).
+        :param owner: Optional cluster object that owns the secret, so the secret is deleted together with it.
         :return: The secret if successful, None otherwise.
         """
-        secret_body = KubernetesResources.createSecret(secret_name, namespace, secret_data, labels)
+        secret_body = KubernetesResources.createSecret(secret_name, namespace, secret_data, labels, owner)
         logging.info("Creating secret %s in namespace %s", secret_name, namespace)
         with IgnoreIfExists():
             return self.core_api.create_namespaced_secret(namespace, secret_body)
 
-    def updateSecret(self, secret_name: str, namespace: str, secret_data: Dict[str, str]) -> client.V1Secret:
+    def updateSecret(self, secret_name: str, namespace: str, secret_keys: Iterable[str],
+                     owner: Optional[V1MongoClusterConfiguration] = None) -> client.V1Secret:
         """
-        Updates the given Kubernetes secret.
+        Updates the metadata of the given Kubernetes secret. The data of the secret is kept, so credentials that are
+        already in use are not changed.
         :param secret_name: Unique name of the secret.
         :param namespace: Namespace to add secret to.
-        :param secret_data: The data to store in the secret as key/value pair dict.
+        :param secret_keys: The keys of the data in the secret, which are part of its desired state.
+        :param owner: Optional cluster object that owns the secret, so the secret is deleted together with it.
         :return: The secret if successful, None otherwise.
         """
-        secret = self.getSecret(secret_name, namespace)
-        secret.string_data = secret_data
+        existing_metadata = self.getSecret(secret_name, namespace).metadata
+        desired_metadata = KubernetesResources.createSecret(secret_name, namespace, dict.fromkeys(secret_keys, ""),
+                                                            owner=owner).metadata
+        secret = V1Secret(metadata=V1ObjectMeta(
+            annotations=dict(existing_metadata.annotations or {}, **desired_metadata.annotations),
+            owner_references=desired_metadata.owner_references,
+        ))
         logging.info("Updating secret %s @ ns/%s", secret_name, namespace)
         return self.core_api.patch_namespaced_secret(secret_name, namespace, secret)
 
@@ -168,14 +286,14 @@ class KubernetesService:
         logging.info("Deleting secret %s @ ns/%s.", name, namespace)
         return self.core_api.delete_namespaced_secret(name, namespace, body)
 
-    def getService(self, name: str, namespace: str) -> client.V1Service:
+    def getService(self, name: str, namespace: str) -> ResourceView:
         """
         Gets an existing service from the cluster.
         :param name: The name of the service to get.
         :param namespace: The namespace in which to get the service.
-        :return: The service object if it exists, otherwise None.
+        :return: A read-only view of the service, see `ResourceView.fromResponse`.
         """
-        return self.core_api.read_namespaced_service(name, namespace)
+        return ResourceView.fromResponse(self.core_api.read_namespaced_service(name, namespace, _preload_content=False))
 
     def createService(self, cluster_object: V1MongoClusterConfiguration) -> Optional[client.V1Service]:
         """
@@ -217,14 +335,15 @@ class KubernetesService:
             # pylint: disable=E1120
             return self.core_api.delete_namespaced_service(name, namespace)
 
-    def getStatefulSet(self, name: str, namespace: str) -> client.V1beta1StatefulSet:
+    def getStatefulSet(self, name: str, namespace: str) -> ResourceView:
         """
         Get an existing stateful set from the cluster.
         :param name: The name of the stateful set to get.
         :param namespace: The namespace in which to get the stateful set.
-        :return: The stateful set object if existing, otherwise None.
+        :return: A read-only view of the stateful set, see `ResourceView.fromResponse`.
         """
-        return self.apps_api.read_namespaced_stateful_set(name, namespace)
+        return ResourceView.fromResponse(self.apps_api.read_namespaced_stateful_set(name, namespace,
+                                                                                    _preload_content=False))
 
     def createStatefulSet(self, cluster_object: V1MongoClusterConfiguration) -> Optional[client.V1beta1StatefulSet]:
         """
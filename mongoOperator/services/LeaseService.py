@@ -0,0 +1,80 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+from typing import Dict, Optional
+
+from kubernetes import client
+from kubernetes.client import V1DeleteOptions
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.helpers.Metrics import Metrics
+from mongoOperator.helpers.tracing.Tracer import Tracer
+from mongoOperator.services.KubernetesService import KubernetesService
+
+
+@Tracer.traceMethods("kubernetes.")
+@Metrics.instrumentKubernetesCalls
+class LeaseService:
+    """
+    Bundled methods for interacting with the `coordination.k8s.io` leases, used by the leader election and sharding.
+    The requests go through the API client of the `KubernetesService`, so they share its rate and concurrency limits.
+    """
+
+    def __init__(self, kubernetes_service: KubernetesService) -> None:
+        """
+        :param kubernetes_service: The kubernetes service.
+        """
+        self.coordination_api = client.CoordinationV1beta1Api(kubernetes_service.api_client)
+
+    def getLease(self, name: str, namespace: str) -> client.V1beta1Lease:
+        """
+        Gets an existing lease from the cluster.
+        :param name: The name of the lease to get.
+        :param namespace: The namespace in which to get the lease.
+        :return: The lease object.
+        """
+        return self.coordination_api.read_namespaced_lease(name, namespace)
+
+    def listLeasesWithLabels(self, namespace: str, labels: Dict[str, str]) -> client.V1beta1LeaseList:
+        """
+        Gets all leases with the given labels.
+        :param namespace: The namespace in which to list the leases.
+        :param labels: The labels the leases must have.
+        :return: The lease list.
+        """
+        label_selector = KubernetesResources.createLabelSelector(labels)
+        return self.coordination_api.list_namespaced_lease(namespace, label_selector=label_selector)
+
+    def createLease(self, name: str, namespace: str, lease_spec: client.V1beta1LeaseSpec,
+                    labels: Optional[Dict[str, str]] = None) -> client.V1beta1Lease:
+        """
+        Creates a new lease. Fails with a conflict if the lease already exists.
+        :param name: The name of the lease.
+        :param namespace: The namespace in which to create the lease.
+        :param lease_spec: The specification of the lease.
+        :param labels: Optional labels for this lease, defaults to the default labels (see `cls.createDefaultLabels`).
+        :return: The created lease object.
+        """
+        body = KubernetesResources.createLease(name, namespace, lease_spec, labels)
+        logging.info("Creating lease %s @ ns/%s", name, namespace)
+        return self.coordination_api.create_namespaced_lease(namespace, body)
+
+    def replaceLease(self, lease: client.V1beta1Lease) -> client.V1beta1Lease:
+        """
+        Replaces the given lease. Fails with a conflict if the lease was changed since it was read.
+        :param lease: The lease object, as it was retrieved with `getLease` and updated afterwards.
+        :return: The updated lease object.
+        """
+        logging.debug("Updating lease %s @ ns/%s", lease.metadata.name, lease.metadata.namespace)
+        return self.coordination_api.replace_namespaced_lease(lease.metadata.name, lease.metadata.namespace, lease)
+
+    def deleteLease(self, name: str, namespace: str) -> client.V1Status:
+        """
+        Deletes the given lease.
+        :param name: Name of the lease to delete.
+        :param namespace: Namespace in which to delete the lease.
+        :return: The deletion status.
+        """
+        logging.info("Deleting lease %s @ ns/%s.", name, namespace)
+        return self.coordination_api.delete_namespaced_lease(name, namespace, V1DeleteOptions())
@@ -2,12 +2,14 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 import logging
-from time import sleep
-from typing import Dict, Optional, List
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
 
+from Settings import Settings
+from mongoOperator.helpers.ClusterStatusWriter import ClusterStatusWriter
 from mongoOperator.helpers.resourceCheckers.AdminSecretChecker import AdminSecretChecker
 from mongoOperator.helpers.MongoResources import MongoResources
 from mongoOperator.helpers.RestoreHelper import RestoreHelper
@@ -15,6 +17,9 @@ from mongoOperator.helpers.listeners.mongo.CommandLogger import CommandLogger
 from mongoOperator.helpers.listeners.mongo.HeartbeatListener import HeartbeatListener
 from mongoOperator.helpers.listeners.mongo.ServerLogger import ServerLogger
 from mongoOperator.helpers.listeners.mongo.TopologyListener import TopologyListener
+from mongoOperator.helpers.rateLimiters.AdaptiveConcurrencyLimiter import AdaptiveConcurrencyLimiter
+from mongoOperator.helpers.rateLimiters.ConcurrencyLimitConfig import ConcurrencyLimitConfig
+from mongoOperator.helpers.tracing.Tracer import Tracer
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
 from mongoOperator.services.KubernetesService import KubernetesService
 
@@ -25,17 +30,26 @@ class MongoService:
     # name of the container
     CONTAINER = "mongodb"
     NO_REPLICA_SET_RESPONSE = "no replset config has been received"
+    PRIMARY_STATE = "PRIMARY"
 
-    # after creating a new object definition we can get handshake failures.
-    # below we can configure how many times we retry and how long we wait in between.
-    MONGO_COMMAND_RETRIES = 4
-    MONGO_COMMAND_WAIT = 15.0
-
-    def __init__(self, kubernetes_service: KubernetesService) -> None:
+    def __init__(self, kubernetes_service: KubernetesService,
+                 is_owner: Optional[Callable[[V1MongoClusterConfiguration], bool]] = None,
+                 status_writer: Optional[ClusterStatusWriter] = None) -> None:
+        """
+        :param kubernetes_service: The kubernetes service.
+        :param is_owner: Function returning whether this replica of the operator should check the given cluster.
+            Replicas that do not own a cluster may keep their connection open, but do not act on its events.
+        :param status_writer: The writer to which the members of the replica sets are reported, if any.
+        """
         self._kubernetes_service = kubernetes_service
+        self._status_writer = status_writer
+        self._is_owner = is_owner or (lambda cluster_object: True)
         self._restore_helper = RestoreHelper(self._kubernetes_service)
         self._connected_replica_sets: Dict[str, MongoClient] = {}
-        self._restored_cluster_names: List[str] = []
+        self._concurrency_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        # the names of the replica sets that were restored or are being restored.
+        self._restored_cluster_names: Set[str] = set()
+        self._restore_lock = Lock()
 
     def checkOrCreateReplicaSet(self, cluster_object: V1MongoClusterConfiguration) -> None:
         """
@@ -61,6 +75,7 @@ class MongoService:
 
             logging.info("The replica set %s @ ns/%s seems to be working properly with %s/%s pods.",
                          cluster_name, namespace, len(create_status_response["members"]), replicas)
+            self._reportMembers(cluster_object, create_status_response["members"])
 
             # The amount of replicas is not the same as configured, we need to fix this
             if replicas != len(create_status_response["members"]):
@@ -73,6 +88,18 @@ class MongoService:
             # If the replica set is not initialized yet, we initialize it
             self._initializeReplicaSet(cluster_object)
 
+    def _reportMembers(self, cluster_object: V1MongoClusterConfiguration, members: List[Dict[str, Any]]) -> None:
+        """
+        Reports the members of the replica set and its primary to the status writer, if any.
+        :param cluster_object: The cluster object from the YAML file.
+        :param members: The members as returned by the replica set status command.
+        """
+        if self._status_writer is None:
+            return
+        primary = next((member["name"] for member in members if member["stateStr"] == self.PRIMARY_STATE), None)
+        members = [{"name": member["name"], "state": member["stateStr"]} for member in members]
+        self._status_writer.update(cluster_object, members=members, primary=primary)
+
     def createUsers(self, cluster_object: V1MongoClusterConfiguration) -> None:
         """
         Creates the users required for each of the pods in the replica.
@@ -170,47 +197,91 @@ class MongoService:
             ]
         )
 
+    def connect(self, cluster_object: V1MongoClusterConfiguration) -> MongoClient:
+        """
+        Gets the client for the given replica set, creating it if needed. The client connects in the background.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The mongo client.
+        """
+        name = cluster_object.metadata.name
+        if name not in self._connected_replica_sets:
+            self._connected_replica_sets[name] = self._createMongoClientForReplicaSet(cluster_object)
+        return self._connected_replica_sets[name]
+
+    def getConcurrencyLimiter(self, cluster_object: V1MongoClusterConfiguration) -> AdaptiveConcurrencyLimiter:
+        """
+        Gets the limit of concurrent commands to the given replica set, creating it if needed. Each replica set has its
+        own limit, so a degraded replica set does not slow down the commands to the other ones.
+        :param cluster_object: The cluster object from the YAML file.
+        :return: The concurrency limiter.
+        """
+        name = cluster_object.metadata.name
+        if name not in self._concurrency_limiters:
+            self._concurrency_limiters[name] = AdaptiveConcurrencyLimiter(
+                ConcurrencyLimitConfig(Settings.MONGO_MAX_CONCURRENCY, Settings.MONGO_INITIAL_CONCURRENCY),
+                is_overloaded=lambda err: isinstance(err, ConnectionFailure)
+            )
+        return self._concurrency_limiters[name]
+
+    def restoreIfNeeded(self, cluster_object: V1MongoClusterConfiguration) -> None:
+        """
+        Executes the restore of the given replica set, if it is still needed.
+        A restore is executed only once per replica set, and never for the same replica set in parallel.
+        :param cluster_object: The cluster configuration object for the replica set.
+        :raise SubprocessError: If the restore failed. It will be attempted again the next time this is called.
+        """
+        cluster_name = cluster_object.metadata.name
+        with self._restore_lock:
+            if cluster_name in self._restored_cluster_names:
+                return
+            self._restored_cluster_names.add(cluster_name)
+        try:
+            self._restore_helper.restoreIfNeeded(cluster_object)
+        except Exception:
+            with self._restore_lock:
+                self._restored_cluster_names.discard(cluster_name)
+            raise
+
     def _onReplicaSetReady(self, cluster_object: V1MongoClusterConfiguration) -> None:
         """
         Callback triggered when a replica set is ready to be operated on.
         If a restore is still needed for the given replica set, it will be executed at this stage.
+        A failed restore is not retried here, but the next time the cluster is checked.
         :param cluster_object: The cluster configuration object for the replica set.
         """
-        if cluster_object.metadata.name in self._restored_cluster_names:
-            # A restore was already done for this replica set, so we don't have to do anything.
+        if not self._is_owner(cluster_object):
             return
-        self._restore_helper.restoreIfNeeded(cluster_object)
-        self._restored_cluster_names.append(cluster_object.metadata.name)
+        try:
+            self.restoreIfNeeded(cluster_object)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.error("Could not restore cluster %s @ ns/%s: %s", cluster_object.metadata.name,
+                          cluster_object.metadata.namespace, err)
 
     def _onAllHostsReady(self, cluster_object: V1MongoClusterConfiguration) -> None:
         """
         Callback triggered when all hosts in the would-be replica set are available.
         :param cluster_object: The cluster configuration object for the hosts in the would-be replica set.
         """
-        self.checkOrCreateReplicaSet(cluster_object)
+        if self._is_owner(cluster_object):
+            self.checkOrCreateReplicaSet(cluster_object)
 
     def _executeAdminCommand(self, cluster_object: V1MongoClusterConfiguration, mongo_command: str, *args, **kwargs
                              ) -> Optional[Dict[str, any]]:
         """
         Executes the given mongo command on the MongoDB cluster.
-        Retries a few times in case we receive a handshake failure.
-        :param name: The name of the cluster.
-        :param namespace: The namespace of the cluster.
+        Connection failures are not retried here, the cluster check is retried later with a backoff instead.
+        :param cluster_object: The cluster object from the YAML file.
         :param mongo_command: The command to be executed in mongo.
         :return: The response from MongoDB. See files in `tests/fixtures/mongo_responses` for examples.
         :raise ValueError: If the result could not be parsed.
-        :raise TimeoutError: If we could not connect after retrying.
+        :raise ConnectionFailure: If we could not connect to the replica set.
         """
-        for _ in range(self.MONGO_COMMAND_RETRIES):
+        mongo_client = self.connect(cluster_object)
+        with Tracer.span("mongo." + mongo_command, cluster=cluster_object.metadata.name,
+                         namespace=cluster_object.metadata.namespace):
             try:
-                name = cluster_object.metadata.name
-                if name not in self._connected_replica_sets:
-                    self._connected_replica_sets[name] = self._createMongoClientForReplicaSet(cluster_object)
-                return self._connected_replica_sets[name].admin.command(mongo_command, *args, **kwargs)
+                return self.getConcurrencyLimiter(cluster_object).call(mongo_client.admin.command, mongo_command,
+                                                                       *args, **kwargs)
             except ConnectionFailure as err:
                 logging.error("Exception while trying to connect to Mongo: %s", str(err))
-            logging.info("Command timed out, waiting %s seconds before trying again (attempt %s/%s)",
-                         self.MONGO_COMMAND_WAIT, _, self.MONGO_COMMAND_RETRIES)
-            sleep(self.MONGO_COMMAND_WAIT)
-
-        raise TimeoutError("Could not execute command after {} retries!".format(self.MONGO_COMMAND_RETRIES))
+                raise
@@ -1,45 +1,119 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-import threading
 from unittest import TestCase
-from unittest.mock import patch, call
+from unittest.mock import MagicMock, patch, call
 
+from Settings import Settings
 from mongoOperator.MongoOperator import MongoOperator
+from mongoOperator.helpers.Metrics import Metrics
+from mongoOperator.helpers.admin.AdminServer import AdminServer
 
 
 class TestMongoOperator(TestCase):
     maxDiff = None
 
-    @patch("mongoOperator.MongoOperator.sleep")
+    @patch("mongoOperator.MongoOperator.HealthChecker")
+    @patch("mongoOperator.MongoOperator.Profiler")
+    @patch("mongoOperator.MongoOperator.AdminServer")
     @patch("mongoOperator.MongoOperator.ClusterManager")
-    def test_run(self, checker_mock, sleep_mock):
-        checker_mock.return_value.collectGarbage.side_effect = None, Exception()  # break the 2nd run
+    def test_run(self, checker_mock, admin_server_mock, profiler_mock, health_checker_mock):
+        # the 2nd run fails, which is logged and should not stop the operator. We force stop on the 3rd run.
+        checker_mock.return_value.runDueTasks.side_effect = None, Exception(), KeyboardInterrupt
+        checker_mock.return_value.getSecondsUntilNextTask.side_effect = 0.5, 200.0
+        health_checker_mock.return_value.heartbeat_interval = 100.0
 
         operator = MongoOperator(sleep_per_run=0.01)
-        with self.assertRaises(Exception):
-            operator.run_forever()
+        operator.run_forever()
 
         expected_calls = [
-            call(),
-            call().checkExistingClusters(), call().collectGarbage(),
-            call().checkExistingClusters(), call().collectGarbage(),
+            call(resync_interval=0.01, profiler=profiler_mock.return_value),
+            call().start(),
+            call().runDueTasks(), call().getSecondsUntilNextTask(), call().checkChangedClusters(0.5),
+            call().runDueTasks(),
+            call().runDueTasks(),
+            call().stop(),
         ]
         self.assertEqual(expected_calls, checker_mock.mock_calls)
-        self.assertEqual([call(0.01)], sleep_mock.mock_calls)
+        self.assertEqual([call(), call().installSignalHandlers(), call().onLoopDone()], profiler_mock.mock_calls)
+        health_checker = health_checker_mock.return_value
+        expected_admin_calls = [
+            call(Settings.ADMIN_PORT),
+            call().addRoute("/metrics", Metrics.export),
+            call().addRoute("/healthz", health_checker.checkLiveness),
+            call().addRoute("/readyz", health_checker.checkReadiness),
+            call().start(),
+            call().stop(),
+        ]
+        self.assertEqual(expected_admin_calls, admin_server_mock.mock_calls)
+        # the failing run also made progress, only the interrupted one did not.
+        self.assertEqual(2, health_checker.beat.call_count)
 
-    @patch("mongoOperator.MongoOperator.sleep")
+        # the readiness is that of the cluster manager.
+        is_synced = health_checker_mock.call_args[0][0]
+        checker_mock.return_value.has_synced = False
+        self.assertFalse(is_synced())
+        checker_mock.return_value.has_synced = True
+        self.assertTrue(is_synced())
+        # the liveness also looks at the running cluster checks.
+        self.assertEqual(checker_mock.return_value.getOldestCheckStart, health_checker_mock.call_args[0][1])
+
+    @patch("mongoOperator.MongoOperator.Settings.ADMIN_SERVER", False)
+    @patch("mongoOperator.MongoOperator.Profiler")
+    @patch("mongoOperator.MongoOperator.AdminServer")
     @patch("mongoOperator.MongoOperator.ClusterManager")
-    def test_run_with_interrupt(self, checker_mock, sleep_mock):
-        sleep_mock.side_effect = None, KeyboardInterrupt  # we force stop on the 2nd run
+    def test_run_with_interrupt(self, checker_mock, admin_server_mock, profiler_mock):
+        # we force stop on the 2nd run
+        checker_mock.return_value.checkChangedClusters.side_effect = None, KeyboardInterrupt
+        checker_mock.return_value.getSecondsUntilNextTask.return_value = 500.0
 
         operator = MongoOperator(sleep_per_run=0.01)
         operator.run_forever()
 
+        # we wait at most a third of the liveness threshold.
         expected_calls = [
-            call(),
-            call().checkExistingClusters(), call().collectGarbage(),
-            call().checkExistingClusters(), call().collectGarbage(),
+            call(resync_interval=0.01, profiler=profiler_mock.return_value),
+            call().start(),
+            call().runDueTasks(), call().getSecondsUntilNextTask(), call().checkChangedClusters(100.0),
+            call().runDueTasks(), call().getSecondsUntilNextTask(), call().checkChangedClusters(100.0),
+            call().stop(),
         ]
         self.assertEqual(expected_calls, checker_mock.mock_calls)
-        self.assertEqual([call(0.01), call(0.01)], sleep_mock.mock_calls)
+        self.assertEqual([], admin_server_mock.mock_calls)
+
+    @patch("mongoOperator.MongoOperator.Settings.PROFILING_ENDPOINTS", True)
+    @patch("mongoOperator.MongoOperator.Profiler")
+    @patch("mongoOperator.MongoOperator.AdminServer")
+    def test_startAdminServer_profiling(self, admin_server_mock, profiler_mock):
+        admin_server_mock.textResponse = AdminServer.textResponse
+        profiler_mock.return_value.loops = 3
+        profiler_mock.return_value.startCpuProfile.return_value = "/tmp/cpu.prof"
+        profiler_mock.return_value.takeMemorySnapshot.return_value = "/tmp/memory.txt"
+        profiler_mock.return_value.dumpThreads.return_value = "/tmp/threads.txt"
+
+        admin_server = MongoOperator()._startAdminServer(MagicMock())
+
+        self.assertEqual(admin_server_mock.return_value, admin_server)
+        routes = {args[0]: args[1] for _, args, _ in admin_server.addRoute.mock_calls}
+        self.assertEqual(["/debug/memory", "/debug/profile", "/debug/threads", "/healthz", "/metrics", "/readyz"],
+                         sorted(routes))
+        content_type = "text/plain; charset=utf-8"
+        self.assertEqual((200, content_type, b"Profiling the next 3 loops to /tmp/cpu.prof\n"),
+                         routes["/debug/profile"]())
+        self.assertEqual((200, content_type, b"Wrote /tmp/memory.txt\n"), routes["/debug/memory"]())
+        self.assertEqual((200, content_type, b"Wrote /tmp/threads.txt\n"), routes["/debug/threads"]())
+        admin_server.start.assert_called_once_with()
+
+    @patch("mongoOperator.MongoOperator.Settings.TRACING_EXPORTER", "jsonlines")
+    @patch("mongoOperator.MongoOperator.Tracer")
+    @patch("mongoOperator.MongoOperator.JsonLinesSpanExporter")
+    def test_startTracing(self, exporter_mock, tracer_mock):
+        MongoOperator._startTracing()
+        exporter_mock.assert_called_once_with(Settings.TRACING_FILE)
+        self.assertEqual([call.setExporter(exporter_mock.return_value)], tracer_mock.mock_calls)
+
+    @patch("mongoOperator.MongoOperator.Settings.TRACING_EXPORTER", "unknown")
+    @patch("mongoOperator.MongoOperator.Tracer")
+    def test_startTracing_unknown(self, tracer_mock):
+        MongoOperator._startTracing()
+        self.assertEqual([], tracer_mock.mock_calls)
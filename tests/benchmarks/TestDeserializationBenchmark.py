@@ -0,0 +1,32 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch
+
+from benchmarks.DeserializationBenchmark import DeserializationBenchmark, main
+from mongoOperator.models.ResourceView import ResourceView
+
+
+class TestDeserializationBenchmark(TestCase):
+
+    def test_run(self):
+        result = DeserializationBenchmark(count=20, rounds=1).run()
+        self.assertEqual({"count", "rounds", "service", "stateful_set", "secret"}, set(result))
+        stateful_sets = result["stateful_set"]
+        self.assertEqual({"cpu_seconds", "memory_bytes", "peak_memory_bytes"}, set(stateful_sets["views"]))
+        self.assertLess(stateful_sets["views"]["memory_bytes"], stateful_sets["models"]["memory_bytes"])
+        self.assertGreater(stateful_sets["memory_ratio"], 1)
+
+    def test_createResponses(self):
+        responses = DeserializationBenchmark(count=2).createResponses("secret")
+        views = [ResourceView.fromJson(response.data) for response in responses]
+        self.assertEqual(["mongo-cluster-0-admin-credentials", "mongo-cluster-1-admin-credentials"],
+                         [view.metadata.name for view in views])
+        self.assertEqual({"username": "root", "password": "cm9vdA=="}, views[0].data)
+
+    @patch("sys.argv", ["DeserializationBenchmark", "--count", "2", "--rounds", "1"])
+    def test_main(self):
+        with patch("builtins.print") as print_mock:
+            main()
+        self.assertIn('"stateful_set"', print_mock.call_args[0][0])
@@ -0,0 +1,72 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import os
+from tempfile import mkstemp
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from benchmarks.MicroBenchmarkRunner import MicroBenchmarkRunner
+from benchmarks.ModelBenchmarks import ModelBenchmarks
+
+
+class TestMicroBenchmarkRunner(TestCase):
+
+    def setUp(self):
+        self.runner = MicroBenchmarkRunner(rounds=3, min_round_time=0.001)
+        file_descriptor, self.file_name = mkstemp(suffix=".json")
+        os.close(file_descriptor)
+        self.addCleanup(os.remove, self.file_name)
+
+    def _saveBaseline(self, **minimums):
+        baseline = {"machine": MicroBenchmarkRunner.getMachineInfo(),
+                    "benchmarks": {name: {"min": value} for name, value in minimums.items()}}
+        with open(self.file_name, "w") as baseline_file:
+            json.dump(baseline, baseline_file)
+
+    def test_run(self):
+        func = MagicMock()
+        result = self.runner.run("mock", func)
+        self.assertEqual(3, result["rounds"])
+        self.assertGreaterEqual(func.call_count, 3 * result["iterations"])
+        self.assertLessEqual(result["min"], result["median"])
+        self.assertLessEqual(result["median"], result["max"])
+        self.assertGreaterEqual(result["stddev"], 0)
+        self.assertEqual({"mock": result}, self.runner.results)
+        self.assertIn("mock", self.runner.formatTable())
+
+    def test_save(self):
+        self.runner.results = {"one": {"min": 1.0}}
+        self.runner.save(self.file_name)
+        with open(self.file_name) as baseline_file:
+            self.assertEqual({"machine": MicroBenchmarkRunner.getMachineInfo(), "benchmarks": {"one": {"min": 1.0}}},
+                             json.load(baseline_file))
+
+    def test_compare(self):
+        self._saveBaseline(faster=2.0, same=1.0, slower=1.0)
+        self.runner.results = {"faster": {"min": 1.0}, "same": {"min": 1.1}, "slower": {"min": 1.3},
+                               "new": {"min": 1.0}}
+        with self.assertLogs() as logs:
+            self.assertEqual([("slower", 1.0, 1.3)], self.runner.compare(self.file_name, threshold=0.2))
+        self.assertEqual(["WARNING:root:new is not in the baseline."], logs.output)
+
+    def test_compare_other_machine(self):
+        self._saveBaseline(same=1.0)
+        with open(self.file_name) as baseline_file:
+            baseline = json.load(baseline_file)
+        baseline["machine"]["python"] = "CPython 2.7"
+        with open(self.file_name, "w") as baseline_file:
+            json.dump(baseline, baseline_file)
+        self.runner.results = {"same": {"min": 1.0}}
+        with self.assertLogs() as logs:
+            self.assertEqual([], self.runner.compare(self.file_name, threshold=0.2))
+        self.assertIn("may not be comparable", logs.output[0])
+
+    def test_model_benchmarks(self):
+        benchmarks = ModelBenchmarks().getBenchmarks()
+        self.assertIn("parse_configuration", benchmarks)
+        for func in benchmarks.values():
+            func()
+        self.assertTrue(benchmarks["model_eq"]())
+        self.assertIsNotNone(benchmarks["parse_configuration"]())
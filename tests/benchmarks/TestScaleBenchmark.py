@@ -0,0 +1,87 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch
+
+from kubernetes.client import Configuration
+
+from benchmarks.ScaleBenchmark import ScaleBenchmark
+from benchmarks.fakes.FakeKubernetesApiServer import FakeKubernetesApiServer
+
+
+class TestScaleBenchmark(TestCase):
+    maxDiff = None
+
+    def test_run(self):
+        configuration = Configuration._default
+        result = ScaleBenchmark(3, loops=2, api_latency=0.0, mongo_latency=0.0, workers=2).run()
+        self.assertIs(configuration, Configuration._default)
+
+        self.assertEqual(3, result["fleet_size"])
+        self.assertEqual({"get customresourcedefinitions": 1, "create customresourcedefinitions": 1, "list mongos": 1,
+                          "watch mongos": 1}, result["startup_api_calls"])
+        self.assertEqual({"create secrets": 3, "create services": 3, "create statefulsets": 3, "get secrets": 6,
+                          "get services": 3, "get statefulsets": 3}, result["first_loop_api_calls"])
+        self.assertEqual({}, result["api_calls_per_loop"])
+        self.assertEqual({"replSetGetStatus": 3.0}, result["mongo_commands_per_loop"])
+        self.assertEqual(result["loop_seconds_p50"], result["loop_seconds_p99"])
+        self.assertGreater(result["clusters_per_second"], 0)
+        self.assertGreater(result["peak_rss_mb"], 0)
+
+    @patch("Settings.Settings.LIST_PAGE_SIZE", 2)
+    def test_run_pages(self):
+        result = ScaleBenchmark(3, loops=1, api_latency=0.0, mongo_latency=0.0, workers=2).run()
+        self.assertEqual({"get customresourcedefinitions": 1, "create customresourcedefinitions": 1, "list mongos": 2,
+                          "watch mongos": 1}, result["startup_api_calls"])
+        self.assertEqual(3, result["first_loop_api_calls"]["create statefulsets"])
+
+    def test_api_server(self):
+        collection = ("api/v1", "services")
+        server = FakeKubernetesApiServer()
+        self.addCleanup(server.stop)
+
+        created = server.createObject(collection, "default", {"metadata": {"name": "one", "labels": {"a": "1"}},
+                                                              "spec": {"port": 1}})
+        self.assertEqual("1", created["metadata"]["resourceVersion"])
+        self.assertIsNone(server.createObject(collection, "default", {"metadata": {"name": "one"}}))
+        server.createObject(collection, "other", {"metadata": {"name": "two"}})
+
+        self.assertEqual(["one", "two"], [item["metadata"]["name"] for item in server.listObjects(collection)["items"]])
+        self.assertEqual(["one"], [item["metadata"]["name"]
+                                   for item in server.listObjects(collection, label_selector="a=1")["items"]])
+        self.assertEqual([], server.listObjects(collection, namespace="default", label_selector="a=2")["items"])
+
+        first_page = server.listObjects(collection, limit=1)
+        self.assertEqual(["one"], [item["metadata"]["name"] for item in first_page["items"]])
+        last_page = server.listObjects(collection, limit=1, continue_token=first_page["metadata"]["continue"])
+        self.assertEqual(["two"], [item["metadata"]["name"] for item in last_page["items"]])
+        self.assertNotIn("continue", last_page["metadata"])
+        self.assertEqual([{"metadata": created["metadata"]}],
+                         server.listObjects(collection, namespace="default", metadata_only=True)["items"])
+
+        status = server.updateObject(collection, "default", "one", {"status": {"ready": True}})
+        self.assertEqual(1, status["metadata"]["generation"])
+        patched = server.updateObject(collection, "default", "one", {"metadata": {"labels": {"a": None}},
+                                                                     "spec": {"port": 2}})
+        self.assertEqual({"port": 2}, patched["spec"])
+        self.assertEqual({}, patched["metadata"]["labels"])
+        self.assertEqual(2, patched["metadata"]["generation"])
+        self.assertEqual(created["metadata"]["uid"], patched["metadata"]["uid"])
+        replaced = server.updateObject(collection, "default", "one", {"spec": {"port": 3}}, merge=False)
+        self.assertEqual({"port": 3}, replaced["spec"])
+        self.assertEqual({"name", "namespace", "uid", "generation", "creationTimestamp", "resourceVersion"},
+                         set(replaced["metadata"]))
+        self.assertIsNone(server.updateObject(collection, "default", "three", {}))
+
+        self.assertEqual(replaced["spec"], server.deleteObject(collection, "default", "one")["spec"])
+        self.assertIsNone(server.getObject(collection, "default", "one"))
+        self.assertIsNone(server.deleteObject(collection, "default", "one"))
+
+    def test_api_server_secret(self):
+        server = FakeKubernetesApiServer()
+        self.addCleanup(server.stop)
+        body = {"metadata": {"name": "secret"}, "stringData": {"username": "root"}}
+        secret = server.createObject(("api/v1", "secrets"), "default", body)
+        self.assertEqual({"username": "cm9vdA=="}, secret["data"])
+        self.assertNotIn("stringData", secret)
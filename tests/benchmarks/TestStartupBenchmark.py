@@ -0,0 +1,16 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from benchmarks.StartupBenchmark import StartupBenchmark
+
+
+class TestStartupBenchmark(TestCase):
+
+    def test_run(self):
+        result = StartupBenchmark(fleet_size=2, runs=1, api_latency=0.0, mongo_latency=0.0).run()
+        self.assertEqual([], result["lazy_modules_imported"])
+        self.assertLess(result["import_seconds_median"], StartupBenchmark.IMPORT_SECONDS_BUDGET)
+        self.assertGreater(result["reconcile_seconds_median"], 0)
+        self.assertEqual(result["import_seconds_min"] + result["reconcile_seconds_min"], result["total_seconds_min"])
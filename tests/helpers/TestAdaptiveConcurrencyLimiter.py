@@ -0,0 +1,97 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import Event, Thread
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.rateLimiters.AdaptiveConcurrencyLimiter import AdaptiveConcurrencyLimiter
+from mongoOperator.helpers.rateLimiters.ConcurrencyLimitConfig import ConcurrencyLimitConfig
+
+
+class TestAdaptiveConcurrencyLimiter(TestCase):
+    def setUp(self):
+        self.clock = MagicMock(return_value=100.0)
+        config = ConcurrencyLimitConfig(max_limit=4, initial_limit=2, min_limit=1, latency_tolerance=2.0,
+                                        backoff_ratio=0.5, smoothing=0.5)
+        self.limiter = AdaptiveConcurrencyLimiter(config, is_overloaded=lambda err: isinstance(err, IOError),
+                                                  clock=self.clock)
+
+    def _release(self, *latencies, overloaded=False):
+        for latency in latencies:
+            self.limiter.acquire()
+            self.limiter.release(latency, overloaded)
+
+    def test_initial_limit(self):
+        self.assertEqual(2, self.limiter.limit)
+        self.assertEqual(1, AdaptiveConcurrencyLimiter(ConcurrencyLimitConfig(max_limit=1, initial_limit=4)).limit)
+        self.assertEqual(2, AdaptiveConcurrencyLimiter(ConcurrencyLimitConfig(max_limit=10, initial_limit=0,
+                                                                              min_limit=2)).limit)
+
+    def test_release_increase(self):
+        self._release(1.0)
+        self.assertEqual(3, self.limiter.limit)  # one call in flight uses half the limit of 2.
+        self._release(1.0)
+        self.assertEqual(3, self.limiter.limit)  # one call in flight does not use half the limit of 3.
+        self.limiter.acquire()
+        self._release(1.0)
+        self.assertEqual(4, self.limiter.limit)
+        self._release(1.0, 1.0)
+        self.assertEqual(4, self.limiter.limit)  # the limit never exceeds the maximum.
+        self.assertEqual(1, self.limiter.in_flight)
+
+    def test_release_slow(self):
+        self._release(1.0)
+        self.assertEqual(3, self.limiter.limit)
+        self._release(3.0)
+        self.assertEqual(3, self.limiter.limit)  # the limit may only decrease once per 3 calls.
+        self._release(5.0)
+        self.assertEqual(1, self.limiter.limit)
+        self._release(8.0, 12.0)
+        self.assertEqual(1, self.limiter.limit)  # the limit never goes below the minimum.
+        self._release(1.0)
+        self.assertEqual(2, self.limiter.limit)  # the baseline followed the slower calls.
+
+    def test_release_overloaded(self):
+        self._release(1.0, 1.0, 1.0, overloaded=True)
+        self.assertEqual(1, self.limiter.limit)
+        self.assertIsNone(self.limiter._baseline)
+
+    def test_call(self):
+        func = MagicMock(return_value="result")
+        self.clock.side_effect = 100.0, 101.5
+        self.assertEqual("result", self.limiter.call(func, "arg", key="value"))
+        func.assert_called_once_with("arg", key="value")
+        self.assertEqual(1.5, self.limiter._baseline)
+        self.assertEqual(0, self.limiter.in_flight)
+
+    def test_call_errors(self):
+        with self.assertRaises(ValueError):
+            self.limiter.call(MagicMock(side_effect=ValueError))
+        self.assertEqual(3, self.limiter.limit)  # the server responded normally.
+        for _ in range(2):
+            with self.assertRaises(IOError):
+                self.limiter.wrap(MagicMock(side_effect=IOError))()
+        self.assertEqual(1, self.limiter.limit)
+        self.assertEqual(0, self.limiter.in_flight)
+
+    def test_acquire_waits(self):
+        limiter = AdaptiveConcurrencyLimiter(ConcurrencyLimitConfig(max_limit=1, initial_limit=1))
+        started, finish = Event(), Event()
+
+        def slowCall():
+            started.set()
+            finish.wait(5)
+
+        thread = Thread(target=limiter.call, args=(slowCall,))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        waiting = Thread(target=limiter.call, args=(MagicMock(),))
+        waiting.start()
+        waiting.join(0.05)
+        self.assertTrue(waiting.is_alive())  # the second call waits until the first one finished.
+        finish.set()
+        waiting.join(5)
+        thread.join(5)
+        self.assertFalse(waiting.is_alive())
+        self.assertEqual(0, limiter.in_flight)
@@ -2,10 +2,12 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 from unittest import TestCase
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, patch, call
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.helpers.resourceCheckers.AdminSecretChecker import AdminSecretChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
 from tests.test_utils import getExampleClusterDefinition
 
 
@@ -21,10 +23,16 @@ class TestAdminSecretChecker(TestCase):
     def test_getClusterName(self):
         self.assertEqual("mongo_cluster", self.checker.getClusterName("mongo_cluster-admin-credentials"))
 
-    def test_listResources(self):
-        result = self.checker.listResources()
-        self.assertEqual(self.kubernetes_service.listAllSecretsWithLabels.return_value.items, result)
-        self.kubernetes_service.listAllSecretsWithLabels.assert_called_once_with()
+    def test_listResourceMetadata(self):
+        self.kubernetes_service.listMetadataWithLabels.side_effect = [
+            {"items": [{"metadata": {"name": "one"}}], "metadata": {"continue": "token"}},
+            {"items": [{"metadata": {"name": "two"}}], "metadata": {}},
+        ]
+        result = self.checker.listResourceMetadata()
+        self.assertEqual([{"name": "one"}, {"name": "two"}], list(result))
+        self.assertEqual([call(KubernetesService.SECRETS_PATH, continue_token=None),
+                          call(KubernetesService.SECRETS_PATH, continue_token="token")],
+                         self.kubernetes_service.listMetadataWithLabels.mock_calls)
 
     def test_getResource(self):
         result = self.checker.getResource(self.cluster_object)
@@ -39,18 +47,29 @@ class TestAdminSecretChecker(TestCase):
         self.assertEqual(self.kubernetes_service.createSecret.return_value, result)
         self.kubernetes_service.createSecret.assert_called_once_with(
             self.secret_name, self.cluster_object.metadata.namespace, {"username": "root",
-                                                                       "password": "random-password"}
+                                                                       "password": "random-password"},
+            owner=self.cluster_object
         )
 
     @patch("mongoOperator.helpers.resourceCheckers.AdminSecretChecker.b64encode")
     def test_updateResource(self, b64encode_mock):
-        b64encode_mock.return_value = b"random-password"
         result = self.checker.updateResource(self.cluster_object)
         self.assertEqual(self.kubernetes_service.updateSecret.return_value, result)
+        # no new password is generated, as the admin user of the replica set uses the existing one.
         self.kubernetes_service.updateSecret.assert_called_once_with(
-            self.secret_name, self.cluster_object.metadata.namespace, {"username": "root",
-                                                                       "password": "random-password"}
+            self.secret_name, self.cluster_object.metadata.namespace, ("username", "password"),
+            owner=self.cluster_object
         )
+        b64encode_mock.assert_not_called()
+
+    def test_getDesiredStateHash(self):
+        result = self.checker.getDesiredStateHash(self.cluster_object)
+        # the generated password is not part of the desired state.
+        secret = KubernetesResources.createSecret(self.secret_name, self.cluster_object.metadata.namespace,
+                                                  {"username": "root", "password": "another-password"})
+        self.assertEqual(secret.metadata.annotations["operators.ultimaker.com/desired-state-hash"], result)
+        self.assertTrue(self.checker.isUpToDate(secret, self.cluster_object))
+        self.assertEqual([], self.kubernetes_service.mock_calls)
 
     def test_deleteResource(self):
         result = self.checker.deleteResource(self.cluster_object.metadata.name,
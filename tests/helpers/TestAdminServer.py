@@ -0,0 +1,39 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from mongoOperator.helpers.admin.AdminServer import AdminServer
+
+
+class TestAdminServer(TestCase):
+
+    def setUp(self):
+        self.server = AdminServer(port=0, host="127.0.0.1")
+        self.server.addRoute("/hello", lambda: (200, "text/plain", b"Hello\n"))
+        self.server.start()
+        self.url = "http://127.0.0.1:{}".format(self.server.port)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_route(self):
+        with urlopen(self.url + "/hello?verbose=1") as response:
+            self.assertEqual(200, response.status)
+            self.assertEqual("text/plain", response.headers["Content-Type"])
+            self.assertEqual(b"Hello\n", response.read())
+
+    @patch("mongoOperator.helpers.admin.AdminRequestHandler.logging")
+    def test_not_found(self, logging_mock):
+        with self.assertRaises(HTTPError) as context:
+            urlopen(self.url + "/unknown")
+        self.assertEqual(404, context.exception.code)
+        self.assertEqual(b"Not found\n", context.exception.read())
+        self.assertEqual(1, logging_mock.debug.call_count)
+
+    def test_stop_not_started(self):
+        server = AdminServer(port=0, host="127.0.0.1")
+        server.stop()
@@ -0,0 +1,125 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+from threading import Event
+from time import sleep
+from unittest import TestCase
+from unittest.mock import patch
+
+from mongoOperator.helpers.AsyncReconcileWorkerPool import AsyncReconcileWorkerPool
+from mongoOperator.helpers.WorkQueue import WorkQueue
+from mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter import ExponentialBackoffRateLimiter
+from mongoOperator.helpers.rateLimiters.TokenBucketRateLimiter import TokenBucketRateLimiter
+
+
+class TestAsyncReconcileWorkerPool(TestCase):
+    def setUp(self):
+        self.reconciled = []
+
+        async def reconcile(key):
+            self.reconciled.append(key)
+
+        self.pool = AsyncReconcileWorkerPool(reconcile, workers=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_submit(self):
+        self.pool.submit(("mongo-1", "default"))
+        self.pool.submit(("mongo-2", "default"))
+        self.assertTrue(self.pool.join(timeout=5))
+        self.assertEqual({("mongo-1", "default"), ("mongo-2", "default")}, set(self.reconciled))
+        self.assertEqual("ReconcileLoop", self.pool._thread.name)
+
+    def test_concurrent(self):
+        keys = [("mongo-{}".format(index), "default") for index in range(50)]
+        running = []
+        calls = []
+
+        async def reconcile(key):
+            running.append(key)
+            calls.append(len(running))
+            await asyncio.sleep(0.05)
+            running.remove(key)
+
+        pool = AsyncReconcileWorkerPool(reconcile, workers=20)
+        for key in keys:
+            pool.submit(key)
+        self.assertTrue(pool.join(timeout=5))
+        pool.shutdown()
+
+        # all checks run on the single event loop, but never more than the maximum at the same time.
+        self.assertEqual(50, len(calls))
+        self.assertEqual(20, max(calls))
+
+    def test_submit_in_flight(self):
+        started = Event()
+        release = Event()
+        calls = []
+
+        async def reconcile(key):
+            calls.append(key)
+            started.set()
+            while not release.is_set():
+                await asyncio.sleep(0.001)
+
+        pool = AsyncReconcileWorkerPool(reconcile, workers=2)
+        pool.submit(("mongo", "default"))
+        self.assertTrue(started.wait(5))
+        pool.submit(("mongo", "default"))
+        pool.submit(("mongo", "default"))
+        self.assertFalse(pool.join(timeout=0.01))
+        release.set()
+        self.assertTrue(pool.join(timeout=5))
+        pool.shutdown()
+
+        # the key was checked twice: the requests during the first check are merged.
+        self.assertEqual([("mongo", "default")] * 2, calls)
+
+    def test_error_retried(self):
+        attempts = []
+        succeeded = Event()
+
+        async def reconcile(key):
+            attempts.append(key)
+            if len(attempts) < 3:
+                raise ValueError("Could not reconcile")
+            succeeded.set()
+
+        queue = WorkQueue(ExponentialBackoffRateLimiter(0.001, 0.01), TokenBucketRateLimiter(100, 10))
+        pool = AsyncReconcileWorkerPool(reconcile, workers=1, queue=queue)
+        self.assertIs(queue, pool.queue)
+        pool.submit(("mongo", "default"))
+        self.assertTrue(succeeded.wait(5))
+        self.assertTrue(pool.join(timeout=5))
+        pool.shutdown()
+        self.assertEqual([("mongo", "default")] * 3, attempts)
+        self.assertEqual(0, queue.numRequeues(("mongo", "default")))
+
+    def test_shutdown_waits_for_running(self):
+        started = Event()
+        finished = []
+
+        async def reconcile(key):
+            started.set()
+            await asyncio.get_event_loop().run_in_executor(pool.executor, sleep, 0.05)
+            finished.append(key)
+
+        pool = AsyncReconcileWorkerPool(reconcile, workers=1, io_threads=1)
+        pool.submit(("mongo", "default"))
+        self.assertTrue(started.wait(5))
+        pool.submit(("mongo-2", "default"))
+        pool.shutdown()
+        self.assertEqual([("mongo", "default")], finished)
+        self.assertFalse(pool._thread.is_alive())
+        self.assertTrue(pool._loop.is_closed())
+        self.assertTrue(pool.executor._shutdown)
+
+    @patch("mongoOperator.helpers.AsyncReconcileWorkerPool.main_thread")
+    def test_submit_from_other_thread(self, main_thread_mock):
+        with patch("mongoOperator.helpers.AsyncReconcileWorkerPool.asyncio.get_child_watcher") as watcher_mock:
+            self.pool.submit(("mongo", "default"))
+        self.assertTrue(self.pool.join(timeout=5))
+        self.assertEqual([], watcher_mock.mock_calls)
+        self.assertEqual([("mongo", "default")], self.reconciled)
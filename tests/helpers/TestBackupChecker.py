@@ -5,6 +5,7 @@ import json
 from base64 import b64encode
 
 from kubernetes.client import V1Secret
+from prometheus_client import REGISTRY
 from subprocess import CalledProcessError, SubprocessError
 
 from datetime import datetime
@@ -13,7 +14,7 @@ from unittest.mock import MagicMock, patch, call
 
 from mongoOperator.helpers.BackupHelper import BackupHelper
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
-from tests.test_utils import getExampleClusterDefinition
+from tests.test_utils import getExampleClusterDefinition, runCoroutine
 
 
 class TestBackupChecker(TestCase):
@@ -75,15 +76,45 @@ class TestBackupChecker(TestCase):
             self.assertEqual(expected_calls, backup_mock.mock_calls)
             self.assertEqual({key: current_date}, self.checker._last_backups)
 
+    @patch("croniter.croniter")
+    def test_getNextBackupDate(self, croniter_mock):
+        key = ("mongo-cluster", self.cluster_object.metadata.namespace)
+        croniter_mock.return_value.get_next.return_value = datetime(2018, 2, 28, 13, 0, 0)
+        self.assertIsNone(self.checker.getNextBackupDate(self.cluster_object))
+
+        self.checker._last_backups[key] = datetime(2018, 2, 28, 12, 30, 0)
+        self.assertEqual(datetime(2018, 2, 28, 13, 0, 0), self.checker.getNextBackupDate(self.cluster_object))
+        self.assertEqual(datetime(2018, 2, 28, 13, 0, 0), self.checker.getNextBackupDate(self.cluster_object))
+        croniter_mock.assert_called_once_with("0 * * * *", datetime(2018, 2, 28, 12, 30, 0), datetime)
+
+        # the cron is only evaluated again once it changed.
+        self.cluster_object.spec.backups.cron = "30 * * * *"
+        self.checker.getNextBackupDate(self.cluster_object)
+        self.assertEqual(2, croniter_mock.call_count)
+
+    def test_getSecondsUntilNextBackup(self):
+        key = ("mongo-cluster", self.cluster_object.metadata.namespace)
+        self.assertEqual(0.0, self.checker.getSecondsUntilNextBackup(self.cluster_object))
+        self.checker._last_backups[key] = datetime(2018, 2, 28, 12, 30, 0)
+        with patch("mongoOperator.helpers.BackupHelper.BackupHelper._utcNow",
+                   lambda _: datetime(2018, 2, 28, 12, 59, 30)):
+            self.assertEqual(30.0, self.checker.getSecondsUntilNextBackup(self.cluster_object))
+        with patch("mongoOperator.helpers.BackupHelper.BackupHelper._utcNow", lambda _: datetime(2018, 2, 28, 14)):
+            self.assertEqual(0.0, self.checker.getSecondsUntilNextBackup(self.cluster_object))
+
     @patch("mongoOperator.helpers.BackupHelper.os")
-    @patch("mongoOperator.helpers.BackupHelper.StorageClient")
-    @patch("mongoOperator.helpers.BackupHelper.ServiceCredentials")
+    @patch("google.cloud.storage.Client")
+    @patch("google.oauth2.service_account.Credentials")
     @patch("mongoOperator.helpers.BackupHelper.check_output")
     def test_backup(self, subprocess_mock, gcs_service_mock, storage_mock, os_mock):
         current_date = datetime(2018, 2, 28, 14, 0, 0)
         expected_backup_name = "mongodb-backup-mongo-operator-cluster-mongo-cluster-2018-02-28_140000.archive.gz"
+        os_mock.path.getsize.return_value = 1024
+        backed_up_bytes = REGISTRY.get_sample_value("mongo_operator_transfer_bytes_total", {"operation": "backup"})
 
         self.checker.backup(self.cluster_object, current_date)
+        self.assertEqual((backed_up_bytes or 0) + 1024,
+                         REGISTRY.get_sample_value("mongo_operator_transfer_bytes_total", {"operation": "backup"}))
 
         self.assertEqual([call.getSecret("storage-serviceaccount", "mongo-operator-cluster")],
                          self.kubernetes_service.mock_calls)
@@ -105,8 +136,77 @@ class TestBackupChecker(TestCase):
         ]
         self.assertEqual(expected_storage_calls, storage_mock.mock_calls)
 
-        expected_os_call = call.remove("/tmp/" + expected_backup_name)
-        self.assertEqual([expected_os_call], os_mock.mock_calls)
+        expected_os_calls = [call.path.getsize("/tmp/" + expected_backup_name),
+                             call.remove("/tmp/" + expected_backup_name)]
+        self.assertEqual(expected_os_calls, os_mock.mock_calls)
+
+    @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupAsync")
+    def test_backupIfNeededAsync(self, backup_mock):
+        key = ("mongo-cluster", self.cluster_object.metadata.namespace)
+        executor = MagicMock()
+
+        async def backup(cluster_object, now, executor):
+            pass
+
+        backup_mock.side_effect = backup
+        current_date = datetime(2018, 2, 28, 12, 30, 0)
+        with patch("mongoOperator.helpers.BackupHelper.BackupHelper._utcNow", lambda _: current_date):
+            self.assertTrue(runCoroutine(self.checker.backupIfNeededAsync(self.cluster_object, executor)))
+            self.assertFalse(runCoroutine(self.checker.backupIfNeededAsync(self.cluster_object, executor)))
+        self.assertEqual([call(self.cluster_object, current_date, executor)], backup_mock.mock_calls)
+        self.assertEqual({key: current_date}, self.checker._last_backups)
+
+    @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backup")
+    def test_backupIfNeeded_status(self, backup_mock):
+        status_writer = MagicMock()
+        self.checker = BackupHelper(self.kubernetes_service, status_writer)
+        current_date = datetime(2018, 2, 28, 12, 30, 0)
+        with patch("mongoOperator.helpers.BackupHelper.BackupHelper._utcNow", lambda _: current_date):
+            self.assertTrue(self.checker.backupIfNeeded(self.cluster_object))
+        self.assertEqual([call.update(self.cluster_object, lastBackup="2018-02-28T12:30:00Z")],
+                         status_writer.mock_calls)
+
+    @patch("mongoOperator.helpers.BackupHelper.os")
+    @patch("mongoOperator.helpers.BackupHelper.BackupHelper._uploadBackup")
+    @patch("mongoOperator.helpers.BackupHelper.asyncio.create_subprocess_exec")
+    def test_backupAsync(self, subprocess_mock, upload_mock, os_mock):
+        current_date = datetime(2018, 2, 28, 14, 0, 0)
+        expected_backup_file = "/tmp/mongodb-backup-mongo-operator-cluster-mongo-cluster-2018-02-28_140000.archive.gz"
+        process_mock = MagicMock(returncode=0)
+        os_mock.path.getsize.return_value = 1024
+
+        async def communicate():
+            return b"output", b""
+
+        async def create_subprocess_exec(*args, **kwargs):
+            return process_mock
+
+        process_mock.communicate = communicate
+        subprocess_mock.side_effect = create_subprocess_exec
+
+        runCoroutine(self.checker.backupAsync(self.cluster_object, current_date))
+
+        subprocess_mock.assert_called_once_with(
+            "mongodump", "--host", "mongo-cluster-2.mongo-cluster.mongo-operator-cluster.svc.cluster.local", "--gzip",
+            "--archive=" + expected_backup_file, stdout=-1, stderr=-1
+        )
+        upload_mock.assert_called_once_with(self.cluster_object, expected_backup_file)
+        self.assertEqual([call.path.getsize(expected_backup_file), call.remove(expected_backup_file)],
+                         os_mock.mock_calls)
+
+    @patch("mongoOperator.helpers.BackupHelper.BackupHelper._uploadBackup")
+    def test_backupAsync_mongo_error(self, upload_mock):
+        current_date = datetime(2018, 2, 28, 14, 0, 0)
+        with patch("mongoOperator.helpers.BackupHelper.BackupHelper._getBackupCommand",
+                   MagicMock(return_value=["sh", "-c", "echo output; echo error >&2; exit 3"])):
+            with self.assertRaises(SubprocessError) as context:
+                runCoroutine(self.checker.backupAsync(self.cluster_object, current_date))
+
+        self.assertEqual("Could not backup 'mongo-cluster-2.mongo-cluster.mongo-operator-cluster.svc.cluster.local' to "
+                         "'/tmp/mongodb-backup-mongo-operator-cluster-mongo-cluster-2018-02-28_140000.archive.gz'. "
+                         "Return code: 3\n stderr: 'b'error\\n''\n stdout: 'b'output\\n''",
+                         str(context.exception))
+        self.assertEqual([], upload_mock.mock_calls)
 
     @patch("mongoOperator.helpers.BackupHelper.check_output")
     def test_backup_mongo_error(self, subprocess_mock):
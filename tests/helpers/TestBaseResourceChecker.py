@@ -4,6 +4,7 @@
 from unittest import TestCase
 from unittest.mock import MagicMock, call
 
+from kubernetes.client import V1ObjectMeta, V1Service
 from kubernetes.client.rest import ApiException
 
 from mongoOperator.helpers.resourceCheckers.BaseResourceChecker import BaseResourceChecker
@@ -18,6 +19,7 @@ class TestBaseResourceChecker(TestCase):
         self.kubernetes_service = MagicMock()
         self.checker = BaseResourceChecker(self.kubernetes_service)
         self.cluster_object = V1MongoClusterConfiguration(**getExampleClusterDefinition())
+        self.metadata = {"name": "mongo-cluster", "namespace": "mongo-operator-cluster"}
 
     def test_getClusterName(self):
         self.assertEqual("", self.checker.getClusterName(""))
@@ -35,12 +37,68 @@ class TestBaseResourceChecker(TestCase):
 
     def test_checkResource_update(self):
         self.checker.getResource = MagicMock()
+        self.checker.getDesiredStateHash = MagicMock(return_value="desired-hash")
         self.checker.updateResource = MagicMock()
         result = self.checker.checkResource(self.cluster_object)
         self.assertEqual(self.checker.updateResource.return_value, result)
         self.checker.updateResource.assert_called_once_with(self.cluster_object)
         self.assertEqual([], self.kubernetes_service.mock_calls)
 
+    def test_checkResource_up_to_date(self):
+        resource = V1Service(metadata=V1ObjectMeta(annotations={
+            "operators.ultimaker.com/desired-state-hash": "desired-hash"
+        }))
+        self.checker.getResource = MagicMock(return_value=resource)
+        self.checker.getDesiredStateHash = MagicMock(return_value="desired-hash")
+        self.checker.updateResource = MagicMock()
+        result = self.checker.checkResource(self.cluster_object)
+        self.assertEqual(resource, result)
+        self.assertEqual([], self.checker.updateResource.mock_calls)
+        self.checker.getDesiredStateHash.assert_called_once_with(self.cluster_object)
+
+    def test_checkResource_changed(self):
+        resource = V1Service(metadata=V1ObjectMeta(annotations={
+            "operators.ultimaker.com/desired-state-hash": "previous-hash"
+        }))
+        self.checker.getResource = MagicMock(return_value=resource)
+        self.checker.getDesiredStateHash = MagicMock(return_value="desired-hash")
+        self.checker.updateResource = MagicMock()
+        result = self.checker.checkResource(self.cluster_object)
+        self.assertEqual(self.checker.updateResource.return_value, result)
+        self.checker.updateResource.assert_called_once_with(self.cluster_object)
+
+    def test_checkResource_drift(self):
+        # the live resource was edited by hand, but its annotation still has the desired state.
+        resource = V1Service(metadata=V1ObjectMeta(annotations={
+            "operators.ultimaker.com/desired-state-hash": "desired-hash"
+        }), spec={"type": "NodePort"})
+        self.checker.full_update_checks = 3
+        self.checker.getResource = MagicMock(return_value=resource)
+        self.checker.getDesiredStateHash = MagicMock(return_value="desired-hash")
+        self.checker.updateResource = MagicMock()
+        results = [self.checker.checkResource(self.cluster_object) for _ in range(4)]
+        self.assertEqual([resource, resource, self.checker.updateResource.return_value, resource], results)
+        self.checker.updateResource.assert_called_once_with(self.cluster_object)
+        self.assertEqual({("mongo-cluster", "mongo-operator-cluster"): 1}, self.checker._checks_since_update)
+
+    def test_checkResource_drift_disabled(self):
+        resource = V1Service(metadata=V1ObjectMeta(annotations={
+            "operators.ultimaker.com/desired-state-hash": "desired-hash"
+        }))
+        self.checker.full_update_checks = 0
+        self.checker.getResource = MagicMock(return_value=resource)
+        self.checker.getDesiredStateHash = MagicMock(return_value="desired-hash")
+        self.checker.updateResource = MagicMock()
+        for _ in range(20):
+            self.checker.checkResource(self.cluster_object)
+        self.assertEqual([], self.checker.updateResource.mock_calls)
+
+    def test_isUpToDate_unknown(self):
+        # resources that were written without the hash are always updated.
+        resource = V1Service(metadata=V1ObjectMeta())
+        self.checker.getDesiredStateHash = MagicMock(return_value="desired-hash")
+        self.assertFalse(self.checker.isUpToDate(resource, self.cluster_object))
+
     def test_checkResource_error(self):
         self.checker.getResource = MagicMock(side_effect=ApiException(400))
         with self.assertRaises(ApiException):
@@ -48,37 +106,56 @@ class TestBaseResourceChecker(TestCase):
         self.assertEqual([], self.kubernetes_service.mock_calls)
 
     def test_cleanResources_empty(self):
-        self.checker.listResources = MagicMock(return_value=[])
+        self.kubernetes_service.listMongoObjectKeys.return_value = set()
+        self.checker.listResourceMetadata = MagicMock(return_value=[])
         self.checker.cleanResources()
-        self.assertEqual([], self.kubernetes_service.mock_calls)
+        self.assertEqual([call.listMongoObjectKeys()], self.kubernetes_service.mock_calls)
 
     def test_cleanResources_found(self):
-        self.kubernetes_service.getMongoObject.return_value = self.cluster_object
-        self.checker.listResources = MagicMock(return_value=[self.cluster_object])
+        self.kubernetes_service.listMongoObjectKeys.return_value = {("mongo-cluster", "mongo-operator-cluster")}
+        self.checker.listResourceMetadata = MagicMock(return_value=[self.metadata])
+        self.checker.deleteResource = MagicMock()
         self.checker.cleanResources()
-        self.assertEqual([call.getMongoObject("mongo-cluster", "mongo-operator-cluster")],
-                         self.kubernetes_service.mock_calls)
+        self.assertEqual([call.listMongoObjectKeys()], self.kubernetes_service.mock_calls)
+        self.assertEqual([], self.checker.deleteResource.mock_calls)
 
     def test_cleanResources_not_found(self):
-        self.kubernetes_service.getMongoObject.side_effect = ApiException(404)
-        self.checker.listResources = MagicMock(return_value=[self.cluster_object])
+        self.kubernetes_service.listMongoObjectKeys.return_value = {("mongo-cluster", "other-namespace")}
+        self.checker.listResourceMetadata = MagicMock(return_value=[self.metadata, self.metadata])
         self.checker.deleteResource = MagicMock()
         self.checker.cleanResources()
-        self.assertEqual([call.getMongoObject("mongo-cluster", "mongo-operator-cluster")],
-                         self.kubernetes_service.mock_calls)
+        self.assertEqual([call.listMongoObjectKeys()], self.kubernetes_service.mock_calls)
         self.checker.deleteResource.assert_called_once_with("mongo-cluster", "mongo-operator-cluster")
 
     def test_cleanResources_error(self):
-        self.kubernetes_service.getMongoObject.side_effect = ApiException(400)
-        self.checker.listResources = MagicMock(return_value=[self.cluster_object])
+        self.kubernetes_service.listMongoObjectKeys.side_effect = ApiException(400)
+        self.checker.listResourceMetadata = MagicMock(return_value=[self.metadata])
+        self.checker.deleteResource = MagicMock()
         with self.assertRaises(ApiException):
             self.checker.cleanResources()
-        self.assertEqual([call.getMongoObject("mongo-cluster", "mongo-operator-cluster")],
-                         self.kubernetes_service.mock_calls)
+        self.assertEqual([], self.checker.deleteResource.mock_calls)
 
-    def test_listResources(self):
+    def test_deleteOrphans(self):
+        self.checker.getClusterName = MagicMock(side_effect=lambda name: name.replace("-suffix", ""))
+        self.checker.deleteResource = MagicMock()
+        resource_keys = {("b", "ns"), ("a", "ns"), ("a", "other"), ("c", "ns")}
+        self.checker._checks_since_update = {("a", "ns"): 2, ("b", "ns"): 3}
+        self.checker.deleteOrphans(resource_keys, {("a", "ns"), ("d", "ns")})
+        self.assertEqual({("a", "ns"): 2}, self.checker._checks_since_update)
+        self.assertEqual([call("a", "other"), call("b", "ns"), call("c", "ns")], self.checker.deleteResource.mock_calls)
+        self.assertEqual([], self.kubernetes_service.mock_calls)
+
+    def test_listResourceKeys(self):
+        self.checker.getClusterName = MagicMock(side_effect=lambda name: name.replace("-suffix", ""))
+        self.checker.listResourceMetadata = MagicMock(return_value=iter([
+            {"name": "b-suffix", "namespace": "ns"}, {"name": "a-suffix", "namespace": "ns"},
+            {"name": "b-suffix", "namespace": "ns"},
+        ]))
+        self.assertEqual({("a", "ns"), ("b", "ns")}, self.checker.listResourceKeys())
+
+    def test_listResourceMetadata(self):
         with self.assertRaises(NotImplementedError):
-            self.checker.listResources()
+            self.checker.listResourceMetadata()
 
     def test_getResource(self):
         with self.assertRaises(NotImplementedError):
@@ -92,6 +169,10 @@ class TestBaseResourceChecker(TestCase):
         with self.assertRaises(NotImplementedError):
             self.checker.updateResource(self.cluster_object)
 
+    def test_getDesiredStateHash(self):
+        with self.assertRaises(NotImplementedError):
+            self.checker.getDesiredStateHash(self.cluster_object)
+
     def test_deleteResource(self):
         with self.assertRaises(NotImplementedError):
             self.checker.deleteResource("name", "namespace")
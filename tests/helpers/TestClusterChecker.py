@@ -2,10 +2,16 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 from unittest import TestCase
-from unittest.mock import patch, call
+from unittest.mock import patch, call, MagicMock
+
+from prometheus_client import REGISTRY
+
+from Settings import Settings
 from mongoOperator.ClusterManager import ClusterManager
+from mongoOperator.helpers.AsyncReconcileWorkerPool import AsyncReconcileWorkerPool
+from mongoOperator.helpers.tracing.Tracer import Tracer
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
-from tests.test_utils import getExampleClusterDefinition
+from tests.test_utils import getExampleClusterDefinition, ListSpanExporter, runCoroutine
 from bson.json_util import loads
 
 
@@ -27,74 +33,328 @@ class TestClusterManager(TestCase):
             return loads(f.read())
 
     def test___init__(self):
-        self.assertEqual(self.kubernetes_service, self.checker._kubernetes_service)
-        self.assertEqual(self.kubernetes_service, self.checker._mongo_service._kubernetes_service)
-        self.assertEqual(3, len(self.checker._resource_checkers), self.checker._resource_checkers)
-        self.assertEqual({}, self.checker._cluster_versions)
+        self.assertEqual(self.kubernetes_service, self.checker._reconciler._kubernetes_service)
+        self.assertEqual(self.kubernetes_service, self.checker._informer._kubernetes_service)
+        self.assertIsNone(self.checker._coordinator._leader_elector)
+        self.assertIsNone(self.checker._coordinator._shard_manager)
+        self.assertTrue(self.checker.is_active)
+        self.assertTrue(self.checker._reconciler._mongo_service._is_owner(self.cluster_object))
+        self.assertFalse(self.checker._status_writer._has_cluster(("mongo-cluster", "mongo-operator-cluster")))
+
+    def test_has_synced(self):
+        self.assertFalse(self.checker.has_synced)
+        self.checker._informer._resource_version = "100"
+        self.assertTrue(self.checker.has_synced)
+
+    def test_getOldestCheckStart(self):
+        key = ("mongo-cluster", "mongo-operator-cluster")
+        self.assertIsNone(self.checker.getOldestCheckStart())
+        self.checker._worker_pool.queue.add(key)
+        self.assertEqual(key, self.checker._worker_pool.queue.get())
+        self.assertIsNotNone(self.checker.getOldestCheckStart())
+        self.checker._worker_pool.queue.done(key)
+        self.assertIsNone(self.checker.getOldestCheckStart())
+
+    def test_work_queue_depth(self):
+        self.checker._worker_pool.queue.add(("mongo-cluster", "mongo-operator-cluster"))
+        self.assertEqual(1, REGISTRY.get_sample_value("mongo_operator_work_queue_depth"))
+
+    def _listClusters(self, *cluster_dicts):
+        self.kubernetes_service.listMongoObjects.return_value = {"items": list(cluster_dicts),
+                                                                 "metadata": {"resourceVersion": "100"}}
+        self.checker._informer.relist()
 
-    def test__parseConfiguration_ok(self):
-        self.assertEqual(self.cluster_object, self.checker._parseConfiguration(self.cluster_dict))
+    @patch("mongoOperator.helpers.ClusterStatusWriter.Thread")
+    @patch("mongoOperator.helpers.informers.MongoObjectInformer.Thread")
+    def test_start(self, thread_mock, status_thread_mock):
+        self.checker.start()
+        self.assertEqual([], self.kubernetes_service.mock_calls)  # the objects are listed by the informer thread.
+        thread_mock.return_value.start.assert_called_once_with()
+        status_thread_mock.return_value.start.assert_called_once_with()
+        self.checker.stop()
+        status_thread_mock.return_value.join.assert_called_once_with(Settings.STATUS_WRITE_INTERVAL)
+        self.assertTrue(self.checker._informer._stopped.is_set())
+        self.assertTrue(self.checker._worker_pool.queue._shutting_down)
 
-    def test__parseConfiguration_error(self):
-        self.assertIsNone(self.checker._parseConfiguration({"invalid": "dict"}))
+    def test_waitForSync(self):
+        self.assertFalse(self.checker.waitForSync(timeout=0))
+        self._listClusters()
+        self.assertTrue(self.checker.waitForSync(timeout=0))
 
     def test_checkExistingClusters_empty(self):
-        self.kubernetes_service.listMongoObjects.return_value = {"items": []}
+        self._listClusters()
         self.checker.checkExistingClusters()
-        expected = [call.listMongoObjects()]
+        expected = [call.listMongoObjects(continue_token=None)]
         self.assertEqual(expected, self.kubernetes_service.mock_calls)
-        self.assertEqual({}, self.checker._cluster_versions)
+        self.assertEqual({}, self.checker._reconciler._cluster_versions)
 
     def test_checkExistingClusters_bad_format(self):
-        self.kubernetes_service.listMongoObjects.return_value = {"items": [{"invalid": "object"}]}
+        self._listClusters({"invalid": "object"})
         self.checker.checkExistingClusters()
-        expected = [call.listMongoObjects()]
+        expected = [call.listMongoObjects(continue_token=None)]
         self.assertEqual(expected, self.kubernetes_service.mock_calls)
-        self.assertEqual({}, self.checker._cluster_versions)
+        self.assertEqual({}, self.checker._reconciler._cluster_versions)
 
     @patch("mongoOperator.services.MongoService.MongoClient")
     @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
     def test_checkExistingClusters(self, backup_mock, mongo_client_mock):
-        self.checker._cluster_versions[("mongo-cluster", self.cluster_object.metadata.namespace)] = "100"
-        self.kubernetes_service.listMongoObjects.return_value = {"items": [self.cluster_dict]}
+        self.checker._reconciler._cluster_versions[("mongo-cluster", self.cluster_object.metadata.namespace)] = "100"
+        self._listClusters(self.cluster_dict)
         mongo_client_mock.return_value.admin.command.return_value = self._getMongoFixture("replica-status-ok")
         self.checker.checkExistingClusters()
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
         self.assertEqual({("mongo-cluster", self.cluster_object.metadata.namespace): "100"},
-                         self.checker._cluster_versions)
-        expected = [call.listMongoObjects()]
+                         self.checker._reconciler._cluster_versions)
+        expected = [call.listMongoObjects(continue_token=None)]
         self.assertEqual(expected, self.kubernetes_service.mock_calls)
         backup_mock.assert_called_once_with(self.cluster_object)
+        self.assertIsNotNone(self.checker._scheduler.getDeadline(("mongo-cluster", "mongo-operator-cluster")))
 
-    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.cleanResources")
-    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.listResources")
-    def test_collectGarbage(self, list_mock, clean_mock):
-        list_mock.return_value = [self.cluster_object]
-        self.checker.collectGarbage()
-        self.assertEqual([call()] * 3, clean_mock.mock_calls)
-        self.assertEqual([], self.kubernetes_service.mock_calls)  # k8s is not called because we mocked everything
+    def test_runDueTasks(self):
+        key = ("mongo-cluster", self.cluster_object.metadata.namespace)
+        self._listClusters(self.cluster_dict)
+        self.checker._reconciler.checkCluster = MagicMock()
+        self.checker.collectGarbage = MagicMock()
+        self.checker._scheduler._checks.schedule(key, 0.0)
 
-    @patch("mongoOperator.services.MongoService.MongoClient")
-    @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
-    def test_checkCluster_same_version(self, backup_mock, mongo_client_mock):
-        self.checker._cluster_versions[("mongo-cluster", "mongo-operator-cluster")] = "100"
-        mongo_client_mock.return_value.admin.command.return_value = self._getMongoFixture("replica-status-ok")
-        self.checker._checkCluster(self.cluster_object)
-        self.assertEqual({("mongo-cluster", "mongo-operator-cluster"): "100"}, self.checker._cluster_versions)
-        backup_mock.assert_called_once_with(self.cluster_object)
+        self.checker.runDueTasks()
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
+        self.checker._reconciler.checkCluster.assert_called_once_with(self.cluster_object)
+        self.checker.collectGarbage.assert_called_once_with()
+
+        # the cluster is scheduled again after the check, and the garbage collection is not due yet.
+        self.assertGreater(self.checker._scheduler.getDeadline(key), 0.0)
+        self.checker.runDueTasks()
+        self.checker._reconciler.checkCluster.assert_called_once_with(self.cluster_object)
+        self.checker.collectGarbage.assert_called_once_with()
 
     @patch("mongoOperator.services.MongoService.MongoClient")
-    @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
-    @patch("mongoOperator.helpers.MongoResources.MongoResources.createCreateAdminCommand")
-    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.checkResource")
-    def test_checkCluster_new_version(self, check_mock, admin_mock, backup_mock, mongo_client_mock):
-        admin_mock.return_value = "createUser", "foo", {}
-        self.checker._cluster_versions[("mongo-cluster", "mongo-operator-cluster")] = "50"
-        mongo_client_mock.return_value.admin.command.side_effect = (self._getMongoFixture("replica-status-ok"),
-                                                                    self._getMongoFixture("createUser-ok"))
-        self.checker._checkCluster(self.cluster_object)
-        self.assertEqual({("mongo-cluster", "mongo-operator-cluster"): "100"}, self.checker._cluster_versions)
-        expected = [call.getSecret("mongo-cluster-admin-credentials", "mongo-operator-cluster")]
-        self.assertEqual(expected, self.kubernetes_service.mock_calls)
-        self.assertEqual([call(self.cluster_object)] * 3, check_mock.mock_calls)
-        backup_mock.assert_called_once_with(self.cluster_object)
-        self.assertEqual([call(self.kubernetes_service.getSecret())], admin_mock.mock_calls)
+    def test_runDueTasks_standby(self, mongo_client_mock):
+        self._listClusters(self.cluster_dict)
+        self.checker._coordinator._leader_elector = MagicMock(is_leader=False, retry_period=2.0)
+        self.checker._reconciler.checkCluster = MagicMock()
+        self.checker.collectGarbage = MagicMock()
+
+        self.checker.runDueTasks()
+        self.checker._checkClusterByKey(("mongo-cluster", "mongo-operator-cluster"))
+        self.assertEqual(2.0, self.checker.getSecondsUntilNextTask())
+        self.assertEqual([], self.checker._reconciler.checkCluster.mock_calls)
+        self.assertEqual([], self.checker.collectGarbage.mock_calls)
+        self.assertEqual(1, mongo_client_mock.call_count)  # the connection is warmed up.
+        self.assertEqual({("mongo-cluster", "mongo-operator-cluster")}, self.checker._informer.popChangedKeys())
+
+        # once we are leading, all clusters are checked.
+        self.checker._coordinator._leader_elector.is_leader = True
+        self.checker.runDueTasks()
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
+        self.checker._reconciler.checkCluster.assert_called_once_with(self.cluster_object)
+        self.checker.collectGarbage.assert_called_once_with()
+
+    @patch("mongoOperator.helpers.ReplicaCoordinator.LeaderElector")
+    @patch("mongoOperator.helpers.ReplicaCoordinator.LeaseService")
+    @patch("mongoOperator.helpers.ReplicaCoordinator.Settings.LEADER_ELECTION", True)
+    def test_start_stop_leader_election(self, lease_service_mock, elector_mock):
+        with patch("mongoOperator.ClusterManager.KubernetesService"):
+            checker = ClusterManager()
+        checker._informer = MagicMock()
+        checker.start()
+        checker.stop()
+        lease_service_mock.assert_called_once_with(checker._reconciler._kubernetes_service)
+        self.assertEqual([call(lease_service_mock.return_value), call().start(), call().stop()],
+                         elector_mock.mock_calls)
+        elector_mock.return_value.is_leader = False
+        self.assertFalse(checker.is_active)
+
+    @patch("mongoOperator.helpers.ReplicaCoordinator.ShardManager")
+    @patch("mongoOperator.helpers.ReplicaCoordinator.LeaseService")
+    @patch("mongoOperator.helpers.ReplicaCoordinator.Settings.SHARDING", True)
+    def test_start_stop_sharding(self, lease_service_mock, shard_mock):
+        with patch("mongoOperator.ClusterManager.KubernetesService"):
+            checker = ClusterManager()
+        checker._informer = MagicMock()
+        checker.start()
+        checker.stop()
+        lease_service_mock.assert_called_once_with(checker._reconciler._kubernetes_service)
+        self.assertEqual([call(lease_service_mock.return_value), call().start(), call().stop()], shard_mock.mock_calls)
+        shard_mock.return_value.is_active = False
+        self.assertFalse(checker.is_active)
+
+    def test_runDueTasks_sharding(self):
+        key = ("mongo-cluster", "mongo-operator-cluster")
+        self._listClusters(self.cluster_dict)
+        shard_manager = MagicMock(is_active=True, version=1, retry_period=2.0)
+        shard_manager.ownsKey.return_value = False
+        shard_manager.isCoordinator.return_value = False
+        self.checker._coordinator._shard_manager = shard_manager
+        self.checker._reconciler.checkCluster = MagicMock()
+        self.checker.collectGarbage = MagicMock()
+        self.checker._scheduler._checks.schedule(key, 0.0)
+
+        # the cluster is owned by another replica, and only the coordinator collects garbage.
+        self.checker.runDueTasks()
+        self.checker._checkClusterByKey(key)
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
+        self.assertEqual([], self.checker._reconciler.checkCluster.mock_calls)
+        self.assertEqual([], self.checker.collectGarbage.mock_calls)
+        self.assertIsNone(self.checker._scheduler.getDeadline(key))
+        self.assertFalse(self.checker._reconciler._mongo_service._is_owner(self.cluster_object))
+        self.assertEqual(2.0, self.checker.getSecondsUntilNextTask())
+
+        # the cluster is checked once the clusters were divided again over the replicas.
+        shard_manager.ownsKey.return_value = True
+        self.checker.runDueTasks()
+        self.checker.waitForChecks(timeout=5)
+        self.assertEqual([], self.checker._reconciler.checkCluster.mock_calls)
+        shard_manager.version = 2
+        self.checker.runDueTasks()
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
+        self.checker._reconciler.checkCluster.assert_called_once_with(self.cluster_object)
+        shard_manager.ownsKey.assert_called_with(key)
+
+    def test_runDueTasks_sharding_coordinator(self):
+        self.checker._coordinator._shard_manager = MagicMock(is_active=True, version=1, retry_period=2.0)
+        self.checker._coordinator._shard_manager.isCoordinator.return_value = True
+        self.checker.collectGarbage = MagicMock()
+        self.checker.runDueTasks()
+        self.checker.collectGarbage.assert_called_once_with()
+
+    def test_collectGarbage(self):
+        self.checker._reconciler.collectGarbage = MagicMock()
+        self.checker.collectGarbage()
+        self.checker._reconciler.collectGarbage.assert_called_once_with()
+
+    def test_asyncio(self):
+        with patch("mongoOperator.ClusterManager.KubernetesService"):
+            checker = ClusterManager(execution_mode="asyncio")
+        self.assertIsInstance(checker._worker_pool, AsyncReconcileWorkerPool)
+        checker._informer = MagicMock()
+        checker._informer.getCluster.return_value = self.cluster_object
+        checker._reconciler = MagicMock()
+        checker._reconciler.getSecondsUntilNextBackup.return_value = 1.0
+
+        async def checkClusterAsync(cluster_object, run_blocking, executor):
+            return False
+
+        checker._reconciler.checkClusterAsync.side_effect = checkClusterAsync
+        checker.start()
+        checker.checkExistingClusters()
+        checker._informer.listKeys.return_value = [("mongo-cluster", "mongo-operator-cluster")]
+        checker.checkExistingClusters()
+        self.assertTrue(checker.waitForChecks(timeout=5))
+        checker.stop()
+
+        self.assertEqual([call.checkClusterAsync(self.cluster_object, checker._runBlocking,
+                                                 checker._worker_pool.executor),
+                          call.getSecondsUntilNextBackup(self.cluster_object)], checker._reconciler.mock_calls)
+        self.assertIsNotNone(checker._scheduler.getDeadline(("mongo-cluster", "mongo-operator-cluster")))
+        self.assertTrue(checker._worker_pool.executor._shutdown)
+
+    def test_checkClusterByKeyAsync_tracing(self):
+        exporter = ListSpanExporter()
+        Tracer.setExporter(exporter)
+        self.addCleanup(Tracer.setExporter, None)
+        with patch("mongoOperator.ClusterManager.KubernetesService"):
+            checker = ClusterManager(execution_mode="asyncio")
+        checker._informer = MagicMock()
+        checker._informer.getCluster.return_value = self.cluster_object
+        checker._reconciler = MagicMock()
+        checker._reconciler.getSecondsUntilNextBackup.return_value = 1.0
+        parents = []
+
+        async def checkClusterAsync(cluster_object, run_blocking, executor):
+            await run_blocking(lambda: parents.append(Tracer.currentSpan()))
+
+        checker._reconciler.checkClusterAsync.side_effect = checkClusterAsync
+        runCoroutine(checker._checkClusterByKeyAsync(("mongo-cluster", "mongo-operator-cluster")))
+        checker.stop()
+
+        reconcile, = exporter.spans
+        self.assertEqual("reconcile", reconcile.name)
+        self.assertEqual({"cluster": "mongo-cluster", "namespace": "mongo-operator-cluster"}, reconcile.attributes)
+        self.assertEqual([reconcile], parents)
+
+    def test_checkClusterByKey_profiling(self):
+        profiler = MagicMock()
+        with patch("mongoOperator.ClusterManager.KubernetesService"):
+            checker = ClusterManager(profiler=profiler)
+        checker._informer = MagicMock()
+        checker._informer.getCluster.return_value = self.cluster_object
+        checker._reconciler = MagicMock()
+        checker._reconciler.getSecondsUntilNextBackup.return_value = 1.0
+        checker._checkClusterByKey(("mongo-cluster", "mongo-operator-cluster"))
+        checker._reconciler.checkCluster.assert_called_once_with(self.cluster_object)
+        self.assertEqual([call.profile(), call.profile().__enter__(), call.profile().__exit__(None, None, None)],
+                         profiler.mock_calls)
+
+    def test_runBlocking_profiling(self):
+        profiler = MagicMock()
+        with patch("mongoOperator.ClusterManager.KubernetesService"):
+            checker = ClusterManager(execution_mode="asyncio", profiler=profiler)
+        result = runCoroutine(checker._runBlocking(lambda value: value * 2, 21))
+        checker.stop()
+        self.assertEqual(42, result)
+        self.assertEqual([call.profile(), call.profile().__enter__(), call.profile().__exit__(None, None, None)],
+                         profiler.mock_calls)
+
+    def test_checkClusterByKeyAsync_removed(self):
+        key = ("mongo-cluster", "mongo-operator-cluster")
+        self.checker._scheduler._checks.schedule(key, 0.0)
+        self.checker._reconciler.checkClusterAsync = MagicMock()
+        runCoroutine(self.checker._checkClusterByKeyAsync(key))
+        self.assertEqual([], self.checker._reconciler.checkClusterAsync.mock_calls)
+        self.assertIsNone(self.checker._scheduler.getDeadline(key))
+
+    def test_runDueTasks_garbage_error(self):
+        self.checker.collectGarbage = MagicMock(side_effect=ValueError("Could not collect garbage"))
+        with self.assertRaises(ValueError):
+            self.checker.runDueTasks()
+        # a failing garbage collection is only tried again at the next interval.
+        self.checker.runDueTasks()
+        self.checker.collectGarbage.assert_called_once_with()
+
+    @patch("mongoOperator.helpers.ClusterScheduler.monotonic", MagicMock(return_value=100.0))
+    def test_getSecondsUntilNextTask(self):
+        self.checker._scheduler._next_garbage_collection = 105.0
+        self.assertEqual(5.0, self.checker.getSecondsUntilNextTask())
+        self.checker._coordinator._leader_elector = MagicMock(is_leader=True, retry_period=2.0)
+        self.assertEqual(2.0, self.checker.getSecondsUntilNextTask())
+
+    @patch("mongoOperator.helpers.ClusterReconciler.ClusterReconciler.getSecondsUntilNextBackup",
+           MagicMock(return_value=1.0))
+    def test__scheduleNextCheck_backup(self):
+        key = ("mongo-cluster", "mongo-operator-cluster")
+        with patch("mongoOperator.helpers.ClusterScheduler.monotonic", MagicMock(return_value=100.0)):
+            self.checker._scheduleNextCheck(key, self.cluster_object)
+        self.assertEqual(101.0, self.checker._scheduler.getDeadline(key))
+
+    def test_checkChangedClusters_until_next_task(self):
+        self.checker.getSecondsUntilNextTask = MagicMock(return_value=0.01)
+        self._listClusters(self.cluster_dict)
+        self.checker._reconciler.checkCluster = MagicMock()
+        self.checker.checkChangedClusters()
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
+        self.checker._reconciler.checkCluster.assert_called_once_with(self.cluster_object)
+
+    def test_checkChangedClusters(self):
+        self._listClusters(self.cluster_dict)
+        self.checker._reconciler.checkCluster = MagicMock()
+        self.checker.checkChangedClusters(timeout=0.01)
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
+        self.checker._reconciler.checkCluster.assert_called_once_with(self.cluster_object)
+
+    def test_checkChangedClusters_removed(self):
+        key = ("mongo-cluster", self.cluster_object.metadata.namespace)
+        self._listClusters(self.cluster_dict)
+        self.checker._reconciler._cluster_versions[key] = "100"
+        self._listClusters()
+        self.checker._reconciler.checkCluster = MagicMock()
+        self.checker.checkChangedClusters(timeout=0.01)
+        self.assertTrue(self.checker.waitForChecks(timeout=5))
+        self.assertEqual([], self.checker._reconciler.checkCluster.mock_calls)
+        self.assertEqual({}, self.checker._reconciler._cluster_versions)
+        self.assertEqual(0, len(self.checker._scheduler))
+
+    def test_checkChangedClusters_no_changes(self):
+        self.checker._reconciler.checkCluster = MagicMock()
+        self.checker.checkChangedClusters(timeout=0.01)
+        self.assertEqual([], self.checker._reconciler.checkCluster.mock_calls)
@@ -0,0 +1,232 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch, call, MagicMock
+
+from prometheus_client import REGISTRY
+
+from mongoOperator.helpers.ClusterReconciler import ClusterReconciler
+from mongoOperator.helpers.ClusterStatusWriter import ClusterStatusWriter
+from mongoOperator.helpers.tracing.Tracer import Tracer
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
+from tests.test_utils import getExampleClusterDefinition, ListSpanExporter, runCoroutine
+from bson.json_util import loads
+
+
+class TestClusterReconciler(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.kubernetes_service = MagicMock()
+        self.status_writer = ClusterStatusWriter(self.kubernetes_service)
+        self.reconciler = ClusterReconciler(self.kubernetes_service, self.status_writer, is_owner=lambda _: True)
+        self.cluster_dict = getExampleClusterDefinition()
+        self.cluster_dict["metadata"]["resourceVersion"] = "100"
+        self.cluster_object = V1MongoClusterConfiguration(**self.cluster_dict)
+
+    @staticmethod
+    def _getMongoFixture(name):
+        with open("tests/fixtures/mongo_responses/{}.json".format(name), "rb") as f:
+            return loads(f.read())
+
+    def test___init__(self):
+        self.assertEqual(self.kubernetes_service, self.reconciler._mongo_service._kubernetes_service)
+        self.assertEqual(3, len(self.reconciler._resource_checkers), self.reconciler._resource_checkers)
+        self.assertEqual({}, self.reconciler._cluster_versions)
+
+    def test_forget(self):
+        key = ("mongo-cluster", "mongo-operator-cluster")
+        self.reconciler._cluster_versions[key] = "100"
+        self.status_writer.update(self.cluster_object, primary="mongo-cluster-0")
+        self.reconciler.forget(key)
+        self.assertEqual({}, self.reconciler._cluster_versions)
+        self.assertEqual({}, self.status_writer._pending)
+
+    @patch("mongoOperator.services.MongoService.MongoClient")
+    def test_warmUp(self, mongo_client_mock):
+        self.reconciler.warmUp(self.cluster_object)
+        self.assertEqual(1, mongo_client_mock.call_count)
+
+    def test_checkClusterAsync(self):
+        exporter = ListSpanExporter()
+        Tracer.setExporter(exporter)
+        self.addCleanup(Tracer.setExporter, None)
+        self.reconciler._mongo_service = MagicMock()
+        self.reconciler._backup_checker = MagicMock()
+        self.reconciler._resource_checkers = [MagicMock()]
+        executor = MagicMock()
+        blocking_calls = []
+
+        async def runBlocking(func, *args):
+            blocking_calls.append((func, args))
+            return func(*args)
+
+        async def backupIfNeededAsync(cluster_object, executor):
+            return False
+
+        self.reconciler._backup_checker.backupIfNeededAsync.side_effect = backupIfNeededAsync
+        runCoroutine(self.reconciler.checkClusterAsync(self.cluster_object, runBlocking, executor))
+
+        # each blocking step is awaited separately.
+        mongo_service = self.reconciler._mongo_service
+        self.assertEqual([(self.reconciler._resource_checkers[0].checkResource, (self.cluster_object,)),
+                          (mongo_service.checkOrCreateReplicaSet, (self.cluster_object,)),
+                          (mongo_service.createUsers, (self.cluster_object,)),
+                          (mongo_service.restoreIfNeeded, (self.cluster_object,))], blocking_calls)
+        self.assertEqual([call.backupIfNeededAsync(self.cluster_object, executor)],
+                         self.reconciler._backup_checker.mock_calls)
+        self.assertEqual(["MagicMock", "replicaSet", "users", "restore", "backup"],
+                         [span.name for span in exporter.spans])
+        self.assertEqual({("mongo-cluster", "mongo-operator-cluster"): "100"}, self.reconciler._cluster_versions)
+
+    def test_checkClusterAsync_error(self):
+        self.reconciler._mongo_service = MagicMock()
+        self.reconciler._mongo_service.createUsers.side_effect = ValueError("Could not create users")
+        self.reconciler._resource_checkers = []
+
+        async def runBlocking(func, *args):
+            return func(*args)
+
+        with self.assertRaises(ValueError):
+            runCoroutine(self.reconciler.checkClusterAsync(self.cluster_object, runBlocking, MagicMock()))
+        # the cluster is checked again in full, as it was not marked as checked.
+        self.assertEqual({}, self.reconciler._cluster_versions)
+        self.reconciler._mongo_service.restoreIfNeeded.assert_not_called()
+
+    def test_checkClusterAsync_handed_off(self):
+        owned = [True]
+        self.reconciler._is_owner = lambda cluster_object: owned[0]
+        self.reconciler._mongo_service = MagicMock()
+        self.reconciler._backup_checker = MagicMock()
+        self.reconciler._resource_checkers = [MagicMock()]
+
+        async def runBlocking(func, *args):
+            # the cluster is handed off to another replica while the first step is running.
+            owned[0] = False
+            return func(*args)
+
+        runCoroutine(self.reconciler.checkClusterAsync(self.cluster_object, runBlocking, MagicMock()))
+
+        self.reconciler._resource_checkers[0].checkResource.assert_called_once_with(self.cluster_object)
+        self.assertEqual([], self.reconciler._mongo_service.mock_calls)
+        self.assertEqual([], self.reconciler._backup_checker.mock_calls)
+        self.assertEqual({}, self.reconciler._cluster_versions)
+
+    def test_checkCluster_handed_off(self):
+        owned = [True, True, True, True]
+        self.reconciler._is_owner = lambda cluster_object: owned.pop(0) if owned else False
+        self.reconciler._mongo_service = MagicMock()
+        self.reconciler._backup_checker = MagicMock()
+        self.reconciler._resource_checkers = [MagicMock()]
+
+        self.reconciler.checkCluster(self.cluster_object)
+
+        # the reconcile steps were finished before the handoff, but the backup is left to the new owner.
+        mongo_service = self.reconciler._mongo_service
+        self.assertEqual([call.checkOrCreateReplicaSet(self.cluster_object), call.createUsers(self.cluster_object),
+                          call.restoreIfNeeded(self.cluster_object)], mongo_service.mock_calls)
+        self.assertEqual([], self.reconciler._backup_checker.mock_calls)
+
+    def test_checkClusterAsync_handed_off_before_backup(self):
+        owned = [True, True, True, True]
+        self.reconciler._is_owner = lambda cluster_object: owned.pop(0) if owned else False
+        self.reconciler._mongo_service = MagicMock()
+        self.reconciler._backup_checker = MagicMock()
+        self.reconciler._resource_checkers = [MagicMock()]
+
+        async def runBlocking(func, *args):
+            return func(*args)
+
+        runCoroutine(self.reconciler.checkClusterAsync(self.cluster_object, runBlocking, MagicMock()))
+
+        self.reconciler._mongo_service.restoreIfNeeded.assert_called_once_with(self.cluster_object)
+        self.assertEqual([], self.reconciler._backup_checker.mock_calls)
+
+    def test_reconcileCluster_handed_off(self):
+        self.reconciler._is_owner = lambda cluster_object: False
+        self.reconciler._mongo_service = MagicMock()
+        self.reconciler._resource_checkers = [MagicMock()]
+
+        self.reconciler.reconcileCluster(self.cluster_object)
+
+        self.assertEqual([], self.reconciler._resource_checkers[0].mock_calls)
+        self.assertEqual([], self.reconciler._mongo_service.mock_calls)
+        self.assertEqual({}, self.reconciler._cluster_versions)
+
+    def test_collectGarbage(self):
+        removed_meta = {"name": "removed-cluster", "namespace": "default"}
+        existing_meta = {"name": "mongo-cluster", "namespace": "mongo-operator-cluster"}
+        pages = {
+            KubernetesService.SERVICES_PATH: [{"metadata": removed_meta}, {"metadata": existing_meta}],
+            KubernetesService.STATEFUL_SETS_PATH: [{"metadata": existing_meta}],
+            KubernetesService.SECRETS_PATH: [{"metadata": {"name": "removed-cluster-admin-credentials",
+                                                           "namespace": "default"}}],
+        }
+        self.kubernetes_service.listMetadataWithLabels.side_effect = lambda path, continue_token: {
+            "items": pages[path], "metadata": {}
+        }
+        self.kubernetes_service.listMongoObjectKeys.return_value = {("mongo-cluster", "mongo-operator-cluster")}
+        self.reconciler.collectGarbage()
+        expected = [
+            call.listMetadataWithLabels(KubernetesService.SERVICES_PATH, continue_token=None),
+            call.listMetadataWithLabels(KubernetesService.STATEFUL_SETS_PATH, continue_token=None),
+            call.listMetadataWithLabels(KubernetesService.SECRETS_PATH, continue_token=None),
+            call.listMongoObjectKeys(),
+            call.deleteService("removed-cluster", "default"),
+            call.deleteSecret("removed-cluster-admin-credentials", "default"),
+        ]
+        self.assertEqual(expected, self.kubernetes_service.mock_calls)
+
+    @patch("mongoOperator.services.MongoService.MongoClient")
+    @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
+    def test_checkCluster_same_version(self, backup_mock, mongo_client_mock):
+        self.reconciler._cluster_versions[("mongo-cluster", "mongo-operator-cluster")] = "100"
+        mongo_client_mock.return_value.admin.command.return_value = self._getMongoFixture("replica-status-ok")
+        checks = REGISTRY.get_sample_value("mongo_operator_reconcile_duration_seconds_count", {"step": "replicaSet"})
+        self.reconciler.checkCluster(self.cluster_object)
+        self.assertEqual((checks or 0) + 1, REGISTRY.get_sample_value("mongo_operator_reconcile_duration_seconds_count",
+                                                                      {"step": "replicaSet"}))
+        self.assertEqual({("mongo-cluster", "mongo-operator-cluster"): "100"}, self.reconciler._cluster_versions)
+        self.assertEqual({"mongo-cluster"}, self.reconciler._mongo_service._restored_cluster_names)
+        backup_mock.assert_called_once_with(self.cluster_object)
+
+    @patch("mongoOperator.services.MongoService.MongoClient")
+    @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
+    @patch("mongoOperator.helpers.MongoResources.MongoResources.createCreateAdminCommand")
+    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.checkResource")
+    def test_checkCluster_generation(self, check_mock, admin_mock, backup_mock, mongo_client_mock):
+        admin_mock.return_value = "createUser", "foo", {}
+        self.cluster_object.metadata.generation = 3
+        mongo_client_mock.return_value.admin.command.side_effect = (self._getMongoFixture("replica-status-ok"),
+                                                                    self._getMongoFixture("createUser-ok"),
+                                                                    self._getMongoFixture("replica-status-ok"))
+        self.reconciler.checkCluster(self.cluster_object)
+        self.assertEqual({("mongo-cluster", "mongo-operator-cluster"): "3"}, self.reconciler._cluster_versions)
+        self.assertEqual(3, len(check_mock.mock_calls))
+
+        # writing the status changes the resource version, but not the generation.
+        self.cluster_object.metadata.resource_version = "101"
+        self.reconciler.checkCluster(self.cluster_object)
+        self.assertEqual(3, len(check_mock.mock_calls))
+        pending = self.reconciler._status_writer._pending[("mongo-cluster", "mongo-operator-cluster")]
+        self.assertEqual((3, "c87cdec35e3c:27017"), (pending["observedGeneration"], pending["primary"]))
+
+    @patch("mongoOperator.services.MongoService.MongoClient")
+    @patch("mongoOperator.helpers.BackupHelper.BackupHelper.backupIfNeeded")
+    @patch("mongoOperator.helpers.MongoResources.MongoResources.createCreateAdminCommand")
+    @patch("mongoOperator.helpers.resourceCheckers.BaseResourceChecker.BaseResourceChecker.checkResource")
+    def test_checkCluster_new_version(self, check_mock, admin_mock, backup_mock, mongo_client_mock):
+        admin_mock.return_value = "createUser", "foo", {}
+        self.reconciler._cluster_versions[("mongo-cluster", "mongo-operator-cluster")] = "50"
+        mongo_client_mock.return_value.admin.command.side_effect = (self._getMongoFixture("replica-status-ok"),
+                                                                    self._getMongoFixture("createUser-ok"))
+        self.reconciler.checkCluster(self.cluster_object)
+        self.assertEqual({("mongo-cluster", "mongo-operator-cluster"): "100"}, self.reconciler._cluster_versions)
+        expected = [call.getSecret("mongo-cluster-admin-credentials", "mongo-operator-cluster")]
+        self.assertEqual(expected, self.kubernetes_service.mock_calls)
+        self.assertEqual([call(self.cluster_object)] * 3, check_mock.mock_calls)
+        backup_mock.assert_called_once_with(self.cluster_object)
+        self.assertEqual([call(self.kubernetes_service.getSecret())], admin_mock.mock_calls)
@@ -0,0 +1,42 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from mongoOperator.helpers.ClusterScheduler import ClusterScheduler
+
+
+@patch("mongoOperator.helpers.ClusterScheduler.monotonic", MagicMock(return_value=100.0))
+class TestClusterScheduler(TestCase):
+    def setUp(self):
+        self.scheduler = ClusterScheduler(resync_interval=5.0, garbage_collection_interval=3600.0)
+
+    def test_scheduleCheck(self):
+        self.scheduler.scheduleCheck(("mongo-1", "default"), seconds_until_backup=60.0)
+        self.scheduler.scheduleCheck(("mongo-2", "default"), seconds_until_backup=1.0)
+        self.assertEqual(105.0, self.scheduler.getDeadline(("mongo-1", "default")))
+        self.assertEqual(101.0, self.scheduler.getDeadline(("mongo-2", "default")))
+        self.assertEqual(2, len(self.scheduler))
+
+    def test_popDueChecks(self):
+        self.scheduler.scheduleCheck(("mongo-1", "default"), seconds_until_backup=0.0)
+        self.scheduler.scheduleCheck(("mongo-2", "default"), seconds_until_backup=0.0)
+        self.scheduler.scheduleCheck(("mongo-3", "default"), seconds_until_backup=1.0)
+        self.scheduler.cancel(("mongo-2", "default"))
+        self.assertEqual([("mongo-1", "default")], self.scheduler.popDueChecks())
+        self.assertEqual([], self.scheduler.popDueChecks())
+        self.assertIsNone(self.scheduler.getDeadline(("mongo-1", "default")))
+
+    def test_popGarbageCollection(self):
+        self.assertTrue(self.scheduler.popGarbageCollection())
+        # the garbage collection is only a fallback for the owner references, so it runs rarely.
+        self.assertFalse(self.scheduler.popGarbageCollection())
+        self.assertEqual(3700.0, self.scheduler._next_garbage_collection)
+
+    def test_getSecondsUntilNextTask(self):
+        self.assertEqual(0.0, self.scheduler.getSecondsUntilNextTask())
+        self.scheduler.popGarbageCollection()
+        self.assertEqual(3600.0, self.scheduler.getSecondsUntilNextTask())
+        self.scheduler.scheduleCheck(("mongo-cluster", "default"), seconds_until_backup=2.0)
+        self.assertEqual(2.0, self.scheduler.getSecondsUntilNextTask())
@@ -0,0 +1,103 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock, patch, call
+
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.ClusterStatusWriter import ClusterStatusWriter
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from tests.test_utils import getExampleClusterDefinition
+
+
+class TestClusterStatusWriter(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.kubernetes_service = MagicMock()
+        self.writer = ClusterStatusWriter(self.kubernetes_service, interval=10)
+        self.cluster_object = V1MongoClusterConfiguration(**getExampleClusterDefinition())
+        self.key = ("mongo-cluster", "mongo-operator-cluster")
+
+    @staticmethod
+    def _patch(status):
+        return call.patchMongoObjectStatus("mongo-cluster", "mongo-operator-cluster", status)
+
+    def test_flush_coalesces_updates(self):
+        self.writer.update(self.cluster_object, primary="host-0", observedGeneration=1)
+        self.writer.update(self.cluster_object, primary="host-1")
+        self.writer.update(self.cluster_object, lastBackup="2018-02-28T12:30:00Z")
+        self.writer.flush()
+        self.writer.flush()
+        self.assertEqual([self._patch({
+            "primary": "host-1", "observedGeneration": 1, "lastBackup": "2018-02-28T12:30:00Z"
+        })], self.kubernetes_service.mock_calls)
+
+    def test_flush_skips_unchanged(self):
+        self.writer.update(self.cluster_object, primary="host-0", observedGeneration=1)
+        self.writer.flush()
+        self.kubernetes_service.reset_mock()
+
+        self.writer.update(self.cluster_object, primary="host-0", observedGeneration=1)
+        self.writer.flush()
+        self.assertEqual([], self.kubernetes_service.mock_calls)
+
+        self.writer.update(self.cluster_object, primary="host-1")
+        self.writer.update(self.cluster_object, primary="host-0", observedGeneration=2)
+        self.writer.flush()
+        self.assertEqual([self._patch({"observedGeneration": 2})], self.kubernetes_service.mock_calls)
+
+    def test_flush_error(self):
+        self.kubernetes_service.patchMongoObjectStatus.side_effect = ApiException(status=500), None
+        self.writer.update(self.cluster_object, primary="host-0", observedGeneration=1)
+        self.writer.flush()
+        self.assertEqual({self.key: {"primary": "host-0", "observedGeneration": 1}}, self.writer._pending)
+
+        self.writer.update(self.cluster_object, primary="host-1")
+        self.writer.flush()
+        self.assertEqual({}, self.writer._pending)
+        self.assertEqual(self._patch({"primary": "host-1", "observedGeneration": 1}),
+                         self.kubernetes_service.mock_calls[-1])
+
+    def test_flush_removed(self):
+        self.kubernetes_service.patchMongoObjectStatus.side_effect = ApiException(status=404)
+        self.writer.update(self.cluster_object, primary="host-0")
+        self.writer.flush()
+        self.assertEqual({}, self.writer._pending)
+        self.assertEqual({}, self.writer._written)
+
+    def test_flush_missing_subresource(self):
+        # the object still exists, so the definition does not have the status subresource yet.
+        self.writer._has_cluster = MagicMock(return_value=True)
+        self.kubernetes_service.patchMongoObjectStatus.side_effect = ApiException(status=404)
+        self.writer.update(self.cluster_object, primary="host-0")
+        self.writer.flush()
+        self.assertEqual({self.key: {"primary": "host-0"}}, self.writer._pending)
+        self.writer._has_cluster.assert_called_once_with(self.key)
+
+    def test_forget(self):
+        self.writer.update(self.cluster_object, primary="host-0")
+        self.writer.flush()
+        self.writer.update(self.cluster_object, primary="host-1")
+        self.writer.forget(self.key)
+        self.assertEqual({}, self.writer._pending)
+        self.assertEqual({}, self.writer._written)
+
+    @patch("mongoOperator.helpers.ClusterStatusWriter.Thread")
+    def test_start_stop(self, thread_mock):
+        self.writer.start()
+        self.assertEqual([call(target=self.writer._runForever, name="ClusterStatusWriter", daemon=True),
+                          call().start()], thread_mock.mock_calls)
+        self.writer.update(self.cluster_object, primary="host-0")
+        self.writer.stop()
+        thread_mock.return_value.join.assert_called_once_with(10)
+        self.assertEqual([self._patch({"primary": "host-0"})], self.kubernetes_service.mock_calls)
+
+    def test_runForever(self):
+        self.writer._stopped = MagicMock()
+        self.writer._stopped.wait.side_effect = False, True
+        self.writer.update(self.cluster_object, primary="host-0")
+        self.writer._runForever()
+        self.assertEqual([call(10), call(10)], self.writer._stopped.wait.mock_calls)
+        self.assertEqual([self._patch({"primary": "host-0"})], self.kubernetes_service.mock_calls)
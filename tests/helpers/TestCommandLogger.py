@@ -3,6 +3,8 @@
 # -*- coding: utf-8 -*-
 from unittest import TestCase
 
+from prometheus_client import REGISTRY
+
 from mongoOperator.helpers.listeners.mongo.CommandLogger import CommandLogger
 
 
@@ -24,4 +26,7 @@ class TestCommandLogger(TestCase):
         self.command_logger.succeeded(event=CommandEventMock())
 
     def test_failed(self):
+        failures = REGISTRY.get_sample_value("mongo_operator_mongo_command_failures_total", {"command": "foo"}) or 0
         self.command_logger.failed(event=CommandEventMock())
+        self.assertEqual(failures + 1,
+                         REGISTRY.get_sample_value("mongo_operator_mongo_command_failures_total", {"command": "foo"}))
@@ -0,0 +1,47 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from mongoOperator.helpers.DeadlineScheduler import DeadlineScheduler
+
+
+class TestDeadlineScheduler(TestCase):
+    def setUp(self):
+        self.scheduler = DeadlineScheduler()
+
+    def test_empty(self):
+        self.assertEqual(0, len(self.scheduler))
+        self.assertIsNone(self.scheduler.nextDeadline())
+        self.assertEqual([], self.scheduler.popDue(100.0))
+
+    def test_popDue(self):
+        self.scheduler.schedule("c", 30.0)
+        self.scheduler.schedule("a", 10.0)
+        self.scheduler.schedule("b", 20.0)
+        self.assertEqual(3, len(self.scheduler))
+        self.assertEqual(10.0, self.scheduler.nextDeadline())
+        self.assertEqual([], self.scheduler.popDue(5.0))
+        self.assertEqual(["a", "b"], self.scheduler.popDue(20.0))
+        self.assertEqual(30.0, self.scheduler.nextDeadline())
+        self.assertIsNone(self.scheduler.getDeadline("a"))
+        self.assertEqual(1, len(self.scheduler))
+
+    def test_schedule_replaces(self):
+        self.scheduler.schedule("a", 10.0)
+        self.scheduler.schedule("a", 50.0)
+        self.scheduler.schedule("b", 20.0)
+        self.assertEqual(50.0, self.scheduler.getDeadline("a"))
+        self.assertEqual(20.0, self.scheduler.nextDeadline())
+        self.assertEqual(["b"], self.scheduler.popDue(40.0))
+        self.scheduler.schedule("a", 5.0)
+        self.assertEqual(["a"], self.scheduler.popDue(40.0))
+        self.assertEqual([], self.scheduler.popDue(100.0))
+
+    def test_cancel(self):
+        self.scheduler.schedule("a", 10.0)
+        self.scheduler.schedule("b", 20.0)
+        self.scheduler.cancel("a")
+        self.scheduler.cancel("unknown")
+        self.assertEqual(20.0, self.scheduler.nextDeadline())
+        self.assertEqual(["b"], self.scheduler.popDue(100.0))
@@ -0,0 +1,31 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch
+
+from mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter import ExponentialBackoffRateLimiter
+
+
+class TestExponentialBackoffRateLimiter(TestCase):
+    def setUp(self):
+        self.limiter = ExponentialBackoffRateLimiter(base_delay=1.0, max_delay=10.0, jitter=0.5)
+
+    @patch("mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter.random.uniform", lambda low, high: 0)
+    def test_when(self):
+        self.assertEqual([1.0, 2.0, 4.0, 8.0, 10.0, 10.0], [self.limiter.when("key") for _ in range(6)])
+        self.assertEqual(1.0, self.limiter.when("other"))
+        self.assertEqual(6, self.limiter.numRequeues("key"))
+
+    @patch("mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter.random.uniform", lambda low, high: high)
+    def test_when_jitter(self):
+        self.assertEqual([1.5, 3.0, 6.0, 10.0], [self.limiter.when("key") for _ in range(4)])
+
+    def test_forget(self):
+        self.limiter.when("key")
+        self.limiter.when("key")
+        self.assertEqual(2, self.limiter.numRequeues("key"))
+        self.limiter.forget("key")
+        self.assertEqual(0, self.limiter.numRequeues("key"))
+        self.limiter.forget("unknown")
+        self.assertLessEqual(self.limiter.when("key"), 1.5)
@@ -0,0 +1,41 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections import Counter
+from unittest import TestCase
+
+from mongoOperator.helpers.sharding.HashRing import HashRing
+
+
+class TestHashRing(TestCase):
+    def setUp(self):
+        self.keys = ["namespace-{}/mongo-{}".format(index % 7, index) for index in range(1000)]
+
+    def test_empty(self):
+        ring = HashRing([])
+        self.assertEqual([], ring.members)
+        self.assertIsNone(ring.getOwner("default/mongo"))
+
+    def test_single_member(self):
+        ring = HashRing(["operator-1", "operator-1"])
+        self.assertEqual(["operator-1"], ring.members)
+        self.assertEqual({"operator-1"}, {ring.getOwner(key) for key in self.keys})
+
+    def test_distribution(self):
+        ring = HashRing(["operator-1", "operator-2", "operator-3"])
+        counts = Counter(ring.getOwner(key) for key in self.keys)
+        self.assertEqual({"operator-1", "operator-2", "operator-3"}, set(counts))
+        self.assertTrue(all(200 < count < 470 for count in counts.values()), counts)
+
+    def test_stable(self):
+        ring = HashRing(["operator-1", "operator-2", "operator-3"])
+        same_ring = HashRing(["operator-3", "operator-1", "operator-2"])
+        self.assertEqual([ring.getOwner(key) for key in self.keys], [same_ring.getOwner(key) for key in self.keys])
+
+    def test_member_leaves(self):
+        ring = HashRing(["operator-1", "operator-2", "operator-3"])
+        smaller_ring = HashRing(["operator-1", "operator-2"])
+        for key in self.keys:
+            # only the keys of the member that left are moved.
+            if ring.getOwner(key) != "operator-3":
+                self.assertEqual(ring.getOwner(key), smaller_ring.getOwner(key))
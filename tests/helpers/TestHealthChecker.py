@@ -0,0 +1,55 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.admin.HealthChecker import HealthChecker
+
+
+class TestHealthChecker(TestCase):
+
+    def setUp(self):
+        self.is_synced = MagicMock(return_value=False)
+        self.clock = MagicMock(return_value=100.0)
+        self.get_oldest_check = MagicMock(return_value=None)
+        self.health_checker = HealthChecker(self.is_synced, self.get_oldest_check, liveness_threshold=30.0,
+                                            reconcile_threshold=60.0, clock=self.clock)
+
+    def test_heartbeat_interval(self):
+        self.assertEqual(10.0, self.health_checker.heartbeat_interval)
+
+    def test_checkLiveness(self):
+        content_type = "text/plain; charset=utf-8"
+        self.clock.return_value = 130.0
+        self.assertEqual((200, content_type, b"The main loop made progress 30.0 seconds ago.\n"),
+                         self.health_checker.checkLiveness())
+
+        self.clock.return_value = 130.5
+        self.assertEqual((503, content_type, b"The main loop made no progress for 30.5 seconds.\n"),
+                         self.health_checker.checkLiveness())
+
+        self.health_checker.beat()
+        self.clock.return_value = 131.0
+        self.assertEqual(0.5, self.health_checker.getSecondsSinceHeartbeat())
+        self.assertEqual(200, self.health_checker.checkLiveness()[0])
+
+    def test_checkLiveness_stuck_check(self):
+        content_type = "text/plain; charset=utf-8"
+        self.assertEqual(0.0, self.health_checker.getSecondsSinceOldestCheck())
+        self.get_oldest_check.return_value = 50.0
+        self.clock.return_value = 110.0
+        self.assertEqual(60.0, self.health_checker.getSecondsSinceOldestCheck())
+        self.assertEqual(200, self.health_checker.checkLiveness()[0])
+
+        # the main loop still beats, but a worker hangs on a cluster.
+        self.clock.return_value = 110.5
+        self.assertEqual((503, content_type, b"A cluster check has been running for 60.5 seconds.\n"),
+                         self.health_checker.checkLiveness())
+
+    def test_checkReadiness(self):
+        content_type = "text/plain; charset=utf-8"
+        self.assertEqual((503, content_type, b"The Mongo objects are not loaded yet.\n"),
+                         self.health_checker.checkReadiness())
+        self.is_synced.return_value = True
+        self.assertEqual((200, content_type, b"Ready.\n"), self.health_checker.checkReadiness())
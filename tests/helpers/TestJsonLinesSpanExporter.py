@@ -0,0 +1,46 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import os
+from tempfile import mkstemp
+from unittest import TestCase
+
+from mongoOperator.helpers.tracing.JsonLinesSpanExporter import JsonLinesSpanExporter
+from mongoOperator.helpers.tracing.Span import Span
+from mongoOperator.helpers.tracing.SpanExporter import SpanExporter
+
+
+class TestJsonLinesSpanExporter(TestCase):
+
+    def setUp(self):
+        file_descriptor, self.file_name = mkstemp(suffix=".jsonl")
+        os.close(file_descriptor)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def test_export(self):
+        parent = Span("reconcile", cluster="mongo-cluster")
+        child = Span("kubernetes.getSecret", parent)
+        child.setAttribute("attempt", 1)
+        child.setError(ValueError("wrong"))
+        child.end()
+        parent.end()
+
+        exporter = JsonLinesSpanExporter(self.file_name)
+        exporter.export(child)
+        exporter.export(parent)
+        exporter.shutdown()
+
+        with open(self.file_name) as spans_file:
+            lines = [json.loads(line) for line in spans_file]
+        self.assertEqual([child.toDict(), parent.toDict()], lines)
+        self.assertEqual({"attempt": 1}, lines[0]["attributes"])
+        self.assertEqual("ValueError: wrong", lines[0]["error"])
+        self.assertEqual(lines[1]["span_id"], lines[0]["parent_id"])
+
+    def test_base_exporter(self):
+        with self.assertRaises(NotImplementedError):
+            SpanExporter().export(Span("span"))
+        SpanExporter().shutdown()
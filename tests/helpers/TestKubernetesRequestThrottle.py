@@ -0,0 +1,95 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock, call, patch
+
+from kubernetes.client.rest import ApiException
+from prometheus_client import REGISTRY
+
+from mongoOperator.helpers.KubernetesRequestThrottle import KubernetesRequestThrottle
+from mongoOperator.helpers.ThrottleConfig import ThrottleConfig
+
+
+@patch("mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter.random.uniform", MagicMock(return_value=0))
+class TestKubernetesRequestThrottle(TestCase):
+
+    def setUp(self):
+        self.wait = MagicMock()
+        config = ThrottleConfig(qps=1000.0, burst=10, retries=2, base_delay=0.5, max_delay=1.0)
+        self.throttle = KubernetesRequestThrottle(config, wait=self.wait)
+        self.request = MagicMock()
+
+    @staticmethod
+    def _error(status, headers=None):
+        err = ApiException(status=status, reason="Reason")
+        err.headers = headers
+        return err
+
+    @staticmethod
+    def _getRetries(status):
+        return REGISTRY.get_sample_value("mongo_operator_kubernetes_request_retries_total", {"status": status}) or 0
+
+    def test_wrap(self):
+        throttled = self.throttle.wrap(self.request)
+        self.assertIs(self.request.return_value, throttled("GET", "url", headers={}))
+        self.assertEqual([call("GET", "url", headers={})], self.request.mock_calls)
+        self.assertEqual([], self.wait.mock_calls)
+
+    def test_call_rate_limit(self):
+        throttle = KubernetesRequestThrottle(ThrottleConfig(qps=1.0, burst=1), wait=self.wait)
+        waits = REGISTRY.get_sample_value("mongo_operator_kubernetes_throttle_wait_seconds_count")
+        throttle.call(self.request)
+        throttle.call(self.request)
+        self.assertEqual(2, self.request.call_count)
+        self.assertEqual(1, self.wait.call_count)
+        self.assertAlmostEqual(1.0, self.wait.call_args[0][0], places=1)
+        self.assertEqual(waits + 2, REGISTRY.get_sample_value("mongo_operator_kubernetes_throttle_wait_seconds_count"))
+
+    def test_call_retries(self):
+        retries = self._getRetries("429")
+        self.request.side_effect = self._error(429, {"Retry-After": "2"}), self._error(503), "result"
+        with self.assertLogs() as logs:
+            self.assertEqual("result", self.throttle.call(self.request, "GET"))
+        self.assertEqual([call("GET")] * 3, self.request.mock_calls)
+        # the first retry waits for the Retry-After of the server, the second one for the exponential backoff.
+        self.assertEqual([call(2.0), call(1.0)], self.wait.mock_calls)
+        self.assertEqual(["WARNING:root:Kubernetes API responded with 429 Reason, retrying in 2.00 seconds.",
+                          "WARNING:root:Kubernetes API responded with 503 Reason, retrying in 1.00 seconds."],
+                         logs.output)
+        self.assertEqual(retries + 1, self._getRetries("429"))
+
+    def test_call_too_many_retries(self):
+        self.request.side_effect = self._error(500)
+        with self.assertRaises(ApiException), self.assertLogs():
+            self.throttle.call(self.request)
+        self.assertEqual(3, self.request.call_count)
+        self.assertEqual([call(0.5), call(1.0)], self.wait.mock_calls)
+
+        # the backoff starts again for the next request.
+        self.request.side_effect = self._error(500), "result"
+        with self.assertLogs():
+            self.assertEqual("result", self.throttle.call(self.request))
+        self.assertEqual(call(0.5), self.wait.call_args)
+
+    def test_call_not_retryable(self):
+        for status in (0, 404, 409):
+            self.request.side_effect = self._error(status)
+            with self.assertRaises(ApiException):
+                self.throttle.call(self.request)
+        self.assertEqual(3, self.request.call_count)
+        self.assertEqual([], self.wait.mock_calls)
+
+    def test_isOverloaded(self):
+        self.assertTrue(KubernetesRequestThrottle.isOverloaded(self._error(429)))
+        self.assertTrue(KubernetesRequestThrottle.isOverloaded(self._error(504)))
+        self.assertTrue(KubernetesRequestThrottle.isOverloaded(TimeoutError()))
+        self.assertFalse(KubernetesRequestThrottle.isOverloaded(self._error(404)))
+
+    def test_getRetryAfter(self):
+        self.assertEqual(0.0, KubernetesRequestThrottle.getRetryAfter(self._error(429)))
+        self.assertEqual(0.0, KubernetesRequestThrottle.getRetryAfter(self._error(429, {"Retry-After": "-1"})))
+        self.assertEqual(0.0, KubernetesRequestThrottle.getRetryAfter(
+            self._error(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        ))
+        self.assertEqual(1.5, KubernetesRequestThrottle.getRetryAfter(self._error(429, {"Retry-After": "1.5"})))
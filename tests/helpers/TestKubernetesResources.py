@@ -0,0 +1,54 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch
+
+from kubernetes.client import ApiClient, V1beta1JSONSchemaProps, V1Container, V1EnvVar, V1ObjectMeta, V1Secret
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from tests.test_utils import getExampleClusterDefinition
+
+
+class TestKubernetesResources(TestCase):
+
+    def test_deserialize(self):
+        stateful_set = KubernetesResources.createStatefulSet(
+            V1MongoClusterConfiguration(**getExampleClusterDefinition())
+        )
+        data = ApiClient().sanitize_for_serialization(stateful_set)
+        self.assertEqual(stateful_set, KubernetesResources.deserialize(data, "V1beta1StatefulSet"))
+
+    def test_deserialize_lists_and_dicts(self):
+        result = KubernetesResources.deserialize([{"name": "mongod", "env": [{"name": "KEY", "value": "value"}]}],
+                                                 "list[V1Container]")
+        self.assertEqual([V1Container(name="mongod", env=[V1EnvVar(name="KEY", value="value")])], result)
+        self.assertEqual({"key": V1EnvVar(name="KEY")}, KubernetesResources.deserialize({"key": {"name": "KEY"}},
+                                                                                        "dict(str, V1EnvVar)"))
+        data = {"metadata": {"labels": {"name": "unit"}}, "data": {"key": "dmFsdWU="}}
+        self.assertEqual(V1Secret(metadata=V1ObjectMeta(labels={"name": "unit"}), data={"key": "dmFsdWU="}),
+                         KubernetesResources.deserialize(data, "V1Secret"))
+
+    def test_deserialize_passes_through(self):
+        self.assertEqual("text", KubernetesResources.deserialize("text", "V1Secret"))
+        self.assertEqual({"key": "value"}, KubernetesResources.deserialize({"key": "value"}, "object"))
+        self.assertEqual("text", KubernetesResources.deserialize("text", "list[V1EnvVar]"))
+        self.assertEqual(["text"], KubernetesResources.deserialize(["text"], "dict(str, V1EnvVar)"))
+        self.assertIsNone(KubernetesResources.getDeserializer("list[dict(str, str)]"))
+
+    def test_deserialize_recursive_model(self):
+        data = {"type": "object", "properties": {"spec": {"type": "object", "required": ["mongodb"],
+                                                          "properties": {"mongodb": {"type": "object"}}}}}
+        expected = V1beta1JSONSchemaProps(type="object", properties={"spec": V1beta1JSONSchemaProps(
+            type="object", required=["mongodb"], properties={"mongodb": V1beta1JSONSchemaProps(type="object")}
+        )})
+        self.assertEqual(expected, KubernetesResources.deserialize(data, "V1beta1JSONSchemaProps"))
+
+    def test_getDeserializer_cached(self):
+        deserializer = KubernetesResources.getDeserializer("V1beta1CustomResourceDefinition")
+        self.assertIs(KubernetesResources.getDeserializer("V1beta1CustomResourceDefinitionSpec"),
+                      KubernetesResources._deserializers["V1beta1CustomResourceDefinitionSpec"])
+        with patch.object(KubernetesResources, "_compileDeserializer") as compile_mock:
+            self.assertIs(deserializer, KubernetesResources.getDeserializer("V1beta1CustomResourceDefinition"))
+        self.assertEqual([], compile_mock.mock_calls)
@@ -0,0 +1,176 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from datetime import datetime, timezone
+from unittest import TestCase
+from unittest.mock import MagicMock, patch, call
+
+from kubernetes.client import V1beta1Lease, V1beta1LeaseSpec, V1ObjectMeta
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.LeaderElector import LeaderElector
+from mongoOperator.helpers.LeaseConfig import LeaseConfig
+
+UTC_NOW = LeaderElector._utcNow
+
+
+@patch("mongoOperator.helpers.LeaderElector.LeaderElector._utcNow",
+       MagicMock(return_value=datetime(2018, 2, 28, 12, 0, 0, tzinfo=timezone.utc)))
+@patch("mongoOperator.helpers.LeaseHolder.monotonic")
+class TestLeaderElector(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.lease_service = MagicMock()
+        config = LeaseConfig(identity="operator-1", namespace="default", lease_duration=15, renew_deadline=10,
+                             retry_period=2)
+        self.elector = LeaderElector(self.lease_service, lease_name="mongo-operator", config=config)
+        self.now = datetime(2018, 2, 28, 12, 0, 0, tzinfo=timezone.utc)
+        self.earlier = datetime(2018, 2, 28, 11, 0, 0, tzinfo=timezone.utc)
+
+    def _lease(self, holder, renew_time=None, transitions=3):
+        return V1beta1Lease(metadata=V1ObjectMeta(name="mongo-operator", namespace="default"), spec=V1beta1LeaseSpec(
+            holder_identity=holder, lease_duration_seconds=15, acquire_time=self.earlier,
+            renew_time=renew_time or self.earlier, lease_transitions=transitions,
+        ))
+
+    def test__utcNow(self, monotonic_mock):
+        before = datetime.now(timezone.utc)
+        actual = UTC_NOW()
+        self.assertTrue(before <= actual <= datetime.now(timezone.utc))
+
+    def test_create(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.lease_service.getLease.side_effect = ApiException(status=404)
+        self.assertFalse(self.elector.is_leader)
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.assertTrue(self.elector.is_leader)
+        expected_spec = V1beta1LeaseSpec(holder_identity="operator-1", lease_duration_seconds=15,
+                                         acquire_time=self.now, renew_time=self.now, lease_transitions=0)
+        self.assertEqual([call.getLease("mongo-operator", "default"),
+                          call.createLease("mongo-operator", "default", expected_spec)],
+                         self.lease_service.mock_calls)
+
+    def test_get_error(self, monotonic_mock):
+        self.lease_service.getLease.side_effect = ApiException(status=500)
+        with self.assertRaises(ApiException):
+            self.elector.tryAcquireOrRenew()
+
+    def test_renew(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        lease = self._lease("operator-1")
+        self.lease_service.getLease.return_value = lease
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.assertEqual(self.now, lease.spec.renew_time)
+        self.assertEqual(self.earlier, lease.spec.acquire_time)
+        self.assertEqual(3, lease.spec.lease_transitions)
+        self.lease_service.replaceLease.assert_called_once_with(lease)
+
+        # the leader stops leading when it could not renew the lease in time.
+        monotonic_mock.return_value = 109.0
+        self.assertTrue(self.elector.is_leader)
+        monotonic_mock.return_value = 110.0
+        self.assertFalse(self.elector.is_leader)
+
+    def test_held_by_other(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.lease_service.getLease.return_value = self._lease("operator-2")
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+
+        # the other replica renewed the lease, so it does not expire.
+        monotonic_mock.return_value = 110.0
+        self.lease_service.getLease.return_value = self._lease("operator-2", renew_time=self.now)
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+        monotonic_mock.return_value = 120.0
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+        self.lease_service.replaceLease.assert_not_called()
+
+        # after the lease duration without renewal we take over, regardless of the clock of the other replica.
+        monotonic_mock.return_value = 125.5
+        lease = self._lease("operator-2", renew_time=self.now)
+        self.lease_service.getLease.return_value = lease
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.assertTrue(self.elector.is_leader)
+        self.assertEqual(V1beta1LeaseSpec(holder_identity="operator-1", lease_duration_seconds=15,
+                                          acquire_time=self.now, renew_time=self.now, lease_transitions=4),
+                         lease.spec)
+        self.lease_service.replaceLease.assert_called_once_with(lease)
+
+    def test_lost_to_other(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.lease_service.getLease.return_value = self._lease("operator-1")
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.lease_service.getLease.return_value = self._lease("operator-2", renew_time=self.now)
+        self.assertFalse(self.elector.tryAcquireOrRenew())
+        self.assertFalse(self.elector.is_leader)
+
+    def test_released(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        lease = self._lease(None, transitions=None)
+        self.lease_service.getLease.return_value = lease
+        self.assertTrue(self.elector.tryAcquireOrRenew())
+        self.assertEqual(1, lease.spec.lease_transitions)
+
+    def test_conflict(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.lease_service.getLease.return_value = self._lease(None)
+        self.lease_service.replaceLease.side_effect = ApiException(status=409)
+        with self.assertRaises(ApiException):
+            self.elector.tryAcquireOrRenew()
+        self.assertFalse(self.elector.is_leader)
+
+    @patch("mongoOperator.helpers.LeaseHolder.Thread")
+    def test_start_stop(self, thread_mock, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.elector.start()
+        self.assertEqual([call(target=self.elector._runForever, name="LeaderElector", daemon=True), call().start()],
+                         thread_mock.mock_calls)
+        self.elector.stop()
+        thread_mock.return_value.join.assert_called_once_with(2)
+        self.assertEqual([], self.lease_service.mock_calls)
+
+    def test_stop_releases(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        lease = self._lease("operator-1")
+        self.lease_service.getLease.return_value = lease
+        self.elector.tryAcquireOrRenew()
+        self.lease_service.reset_mock()
+
+        self.elector.stop()
+        self.assertFalse(self.elector.is_leader)
+        self.assertIsNone(lease.spec.holder_identity)
+        self.assertEqual(1, lease.spec.lease_duration_seconds)
+        self.assertEqual([call.getLease("mongo-operator", "default"), call.replaceLease(lease)],
+                         self.lease_service.mock_calls)
+
+    def test_stop_taken_over(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.lease_service.getLease.return_value = self._lease("operator-1")
+        self.elector.tryAcquireOrRenew()
+        self.lease_service.getLease.return_value = self._lease("operator-2")
+        self.lease_service.reset_mock()
+        self.elector.stop()
+        self.lease_service.replaceLease.assert_not_called()
+
+    def test_stop_error(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.lease_service.getLease.return_value = self._lease("operator-1")
+        self.elector.tryAcquireOrRenew()
+        self.lease_service.replaceLease.side_effect = ApiException(status=500)
+        self.elector.stop()
+        self.assertFalse(self.elector.is_leader)
+
+    def test_runForever(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        self.lease_service.getLease.side_effect = (self._lease("operator-1"), ApiException(status=500),
+                                                   self._lease("operator-2"))
+        self.elector._stopped = MagicMock()
+        self.elector._stopped.is_set.side_effect = False, False, False, True
+        with self.assertLogs(level="INFO") as logs:
+            self.elector._runForever()
+        self.assertEqual([call(2)] * 3, self.elector._stopped.wait.mock_calls)
+        self.assertEqual(3, self.lease_service.getLease.call_count)
+        self.assertEqual(["Started leading the Mongo operator as operator-1.",
+                          "Could not acquire or renew lease mongo-operator @ ns/default: (500)\nReason: None\n",
+                          "Stopped leading the Mongo operator as operator-1."],
+                         [record.getMessage() for record in logs.records])
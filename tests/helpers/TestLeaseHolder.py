@@ -0,0 +1,23 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.LeaseConfig import LeaseConfig
+from mongoOperator.helpers.LeaseHolder import LeaseHolder
+
+
+class TestLeaseHolder(TestCase):
+    def setUp(self):
+        self.lease_service = MagicMock()
+        self.holder = LeaseHolder(self.lease_service, LeaseConfig(identity="operator-1", namespace="default",
+                                                                  retry_period=2.5))
+
+    def test_retry_period(self):
+        self.assertEqual(2.5, self.holder.retry_period)
+
+    def test_runForever(self):
+        with self.assertRaises(NotImplementedError):
+            self.holder._runForever()
+        self.assertEqual([], self.lease_service.mock_calls)
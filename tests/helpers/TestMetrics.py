@@ -0,0 +1,59 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from kubernetes.client.rest import ApiException
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST
+
+from mongoOperator.helpers.Metrics import Metrics
+
+
+@Metrics.instrumentKubernetesCalls
+class FakeService:
+    """ Service whose public methods are instrumented. """
+
+    def getThing(self, name):
+        return name
+
+    def deleteThing(self, error):
+        raise error
+
+    def _private(self):
+        return "private"
+
+
+class TestMetrics(TestCase):
+
+    @staticmethod
+    def _getValue(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_export(self):
+        status, content_type, body = Metrics.export()
+        self.assertEqual((200, CONTENT_TYPE_LATEST), (status, content_type))
+        self.assertIn(b"mongo_operator_work_queue_depth", body)
+
+    def test_instrumentKubernetesCalls(self):
+        count = self._getValue("mongo_operator_kubernetes_request_duration_seconds_count", method="getThing")
+        self.assertEqual("name", FakeService().getThing("name"))
+        self.assertEqual(count + 1,
+                         self._getValue("mongo_operator_kubernetes_request_duration_seconds_count", method="getThing"))
+        self.assertEqual("getThing", FakeService.getThing.__name__)
+        self.assertEqual("private", FakeService()._private())
+        self.assertEqual(0, self._getValue("mongo_operator_kubernetes_request_duration_seconds_count",
+                                           method="_private"))
+
+    def test_instrumentKubernetesCalls_errors(self):
+        api_errors = self._getValue("mongo_operator_kubernetes_request_errors_total", method="deleteThing",
+                                    status="404")
+        other_errors = self._getValue("mongo_operator_kubernetes_request_errors_total", method="deleteThing",
+                                      status="error")
+        with self.assertRaises(ApiException):
+            FakeService().deleteThing(ApiException(status=404))
+        with self.assertRaises(ValueError):
+            FakeService().deleteThing(ValueError())
+        self.assertEqual(api_errors + 1, self._getValue("mongo_operator_kubernetes_request_errors_total",
+                                                        method="deleteThing", status="404"))
+        self.assertEqual(other_errors + 1, self._getValue("mongo_operator_kubernetes_request_errors_total",
+                                                          method="deleteThing", status="error"))
@@ -0,0 +1,193 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from copy import deepcopy
+from unittest import TestCase
+from unittest.mock import MagicMock, patch, call
+
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.informers.MongoObjectInformer import MongoObjectInformer
+from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from tests.test_utils import getExampleClusterDefinition
+
+
+class TestMongoObjectInformer(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.kubernetes_service = MagicMock()
+        self.informer = MongoObjectInformer(self.kubernetes_service)
+        self.cluster_dict = getExampleClusterDefinition()
+        self.cluster_dict["metadata"]["resourceVersion"] = "100"
+        self.cluster_object = V1MongoClusterConfiguration(**self.cluster_dict)
+        self.key = ("mongo-cluster", "mongo-operator-cluster")
+
+    def _list(self, *cluster_dicts, resource_version="100"):
+        self.kubernetes_service.listMongoObjects.return_value = {
+            "items": list(cluster_dicts), "metadata": {"resourceVersion": resource_version}
+        }
+        self.informer.relist()
+
+    def _event(self, event_type, resource_version="101"):
+        cluster_dict = deepcopy(self.cluster_dict)
+        cluster_dict["metadata"]["resourceVersion"] = resource_version
+        return {"type": event_type, "raw_object": cluster_dict}
+
+    def test__parseConfiguration_ok(self):
+        self.assertEqual(self.cluster_object, self.informer._parseConfiguration(self.cluster_dict))
+
+    def test__parseConfiguration_error(self):
+        self.assertIsNone(self.informer._parseConfiguration({"invalid": "dict"}))
+
+    @patch("mongoOperator.helpers.informers.MongoObjectInformer.Thread")
+    def test_start_stop(self, thread_mock):
+        self.informer.start()
+        self.assertFalse(self.informer.has_synced)  # the objects are listed by the thread.
+        self.assertEqual([], self.kubernetes_service.mock_calls)
+        self.assertEqual([call(target=self.informer._watchForever, name="MongoObjectInformer", daemon=True),
+                          call().start()], thread_mock.mock_calls)
+        self.informer.stop()
+        self.assertTrue(self.informer._stopped.is_set())
+
+    def test_relist(self):
+        self._list(self.cluster_dict, {"invalid": "object"})
+        self.assertEqual([self.cluster_object], self.informer.listClusters())
+        self.assertEqual(self.cluster_object, self.informer.getCluster(self.key))
+        self.assertEqual("100", self.informer._resource_version)
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+        self.assertEqual(set(), self.informer.popChangedKeys())
+
+    def test_relist_pages(self):
+        other_dict = deepcopy(self.cluster_dict)
+        other_dict["metadata"]["name"] = "other-cluster"
+        changed_keys = []
+        self.informer._markChanged = MagicMock(side_effect=lambda keys: changed_keys.append(keys))
+        self.kubernetes_service.listMongoObjects.side_effect = [
+            {"items": [self.cluster_dict], "metadata": {"resourceVersion": "100", "continue": "token"}},
+            {"items": [other_dict], "metadata": {"resourceVersion": "100"}},
+        ]
+        self.informer.relist()
+        self.assertEqual([call.listMongoObjects(continue_token=None), call.listMongoObjects(continue_token="token")],
+                         self.kubernetes_service.mock_calls)
+        # the clusters of each page are marked as changed before the next page is listed.
+        self.assertEqual([{self.key}, {("other-cluster", "mongo-operator-cluster")}, set()], changed_keys)
+        self.assertEqual(2, len(self.informer.listKeys()))
+        self.assertEqual("100", self.informer._resource_version)
+
+    def test_waitForSync(self):
+        self.assertFalse(self.informer.waitForSync(timeout=0))
+        self._list()
+        self.assertTrue(self.informer.waitForSync(timeout=0))
+
+    def test_relist_only_changed(self):
+        self._list(self.cluster_dict)
+        self.informer.popChangedKeys()
+        self._list(self.cluster_dict, resource_version="200")
+        self.assertEqual(set(), self.informer.popChangedKeys())
+        self._list(resource_version="300")
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+        self.assertEqual([], self.informer.listClusters())
+
+    def test_waitForChanges_timeout(self):
+        self.assertEqual(set(), self.informer.waitForChanges(timeout=0.01))
+
+    def test_handleEvent_added_and_modified(self):
+        self.informer._handleEvent(self._event("ADDED", "101"))
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+        self.informer._handleEvent(self._event("MODIFIED", "102"))
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+        self.assertEqual("102", self.informer.getCluster(self.key).metadata.resource_version)
+        self.assertEqual("102", self.informer._resource_version)
+
+    def test_handleEvent_same_version(self):
+        self._list(self.cluster_dict)
+        self.informer.popChangedKeys()
+        self.informer._handleEvent(self._event("MODIFIED", "100"))
+        self.assertEqual(set(), self.informer.popChangedKeys())
+
+    def test_handleEvent_status_only(self):
+        self.cluster_dict["metadata"]["generation"] = 3
+        self._list(self.cluster_dict)
+        self.informer.popChangedKeys()
+        status_event = self._event("MODIFIED", "101")
+        status_event["raw_object"]["status"] = {"observedGeneration": 3}
+        self.informer._handleEvent(status_event)
+        self.assertEqual(set(), self.informer.popChangedKeys())
+        self.assertEqual("101", self.informer.getCluster(self.key).metadata.resource_version)
+
+        spec_event = self._event("MODIFIED", "102")
+        spec_event["raw_object"]["metadata"]["generation"] = 4
+        self.informer._handleEvent(spec_event)
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+
+    def test_getGeneration(self):
+        self.assertEqual("100", MongoObjectInformer.getGeneration(self.cluster_object))
+        self.cluster_object.metadata.generation = 3
+        self.assertEqual("3", MongoObjectInformer.getGeneration(self.cluster_object))
+
+    def test_handleEvent_deleted(self):
+        self._list(self.cluster_dict)
+        self.informer.popChangedKeys()
+        self.informer._handleEvent(self._event("DELETED", "103"))
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+        self.assertIsNone(self.informer.getCluster(self.key))
+        self.informer._handleEvent(self._event("DELETED", "104"))
+        self.assertEqual(set(), self.informer.popChangedKeys())
+
+    def test_handleEvent_invalid(self):
+        self._list(self.cluster_dict)
+        self.informer.popChangedKeys()
+        event = self._event("MODIFIED", "105")
+        event["raw_object"]["spec"]["mongodb"]["replicas"] = 2
+        self.informer._handleEvent(event)
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+        self.assertEqual([], self.informer.listClusters())
+
+    def test_handleEvent_error(self):
+        with self.assertRaises(ApiException) as context:
+            self.informer._handleEvent({"type": "ERROR", "raw_object": {"code": 410, "message": "too old"}})
+        self.assertEqual(410, context.exception.status)
+
+    def test_watchForever(self):
+        self._list(self.cluster_dict)
+        self.informer.popChangedKeys()
+
+        def watch(resource_version):
+            self.assertEqual("100", resource_version)
+            yield self._event("MODIFIED", "101")
+            self.informer.stop()
+            yield self._event("MODIFIED", "102")
+
+        self.kubernetes_service.watchMongoObjects.side_effect = watch
+        self.informer._watchForever()
+        self.assertEqual({self.key}, self.informer.popChangedKeys())
+        self.assertEqual("101", self.informer._resource_version)
+
+    def test_watchForever_gone(self):
+        self._list(self.cluster_dict)
+        self.informer.popChangedKeys()
+
+        def watch(resource_version):
+            if resource_version == "100":
+                yield {"type": "ERROR", "raw_object": {"code": 410, "message": "too old"}}
+            self.informer.stop()
+            yield self._event("MODIFIED", "201")
+
+        self.kubernetes_service.watchMongoObjects.side_effect = watch
+        self.kubernetes_service.reset_mock()
+        self.kubernetes_service.listMongoObjects.return_value["metadata"]["resourceVersion"] = "200"
+        self.informer._watchForever()
+
+        self.assertEqual([call.watchMongoObjects(resource_version="100"), call.listMongoObjects(continue_token=None),
+                          call.watchMongoObjects(resource_version="200")], self.kubernetes_service.mock_calls)
+        self.assertEqual("200", self.informer._resource_version)
+
+    def test_watchForever_error(self):
+        self._list(self.cluster_dict)
+        self.informer._stopped = MagicMock()
+        self.informer._stopped.is_set.side_effect = False, True
+        self.kubernetes_service.watchMongoObjects.side_effect = ApiException(500)
+        self.informer._watchForever()
+        self.informer._stopped.wait.assert_called_once_with(MongoObjectInformer.WATCH_RETRY_WAIT)
+        self.assertEqual("100", self.informer._resource_version)
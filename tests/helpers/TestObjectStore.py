@@ -0,0 +1,39 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from kubernetes.client import V1ObjectMeta, V1Service
+
+from mongoOperator.helpers.informers.ObjectStore import ObjectStore
+
+
+class TestObjectStore(TestCase):
+    def setUp(self):
+        self.store = ObjectStore()
+        self.service1 = V1Service(metadata=V1ObjectMeta(name="mongo-1", namespace="default", resource_version="1"))
+        self.service2 = V1Service(metadata=V1ObjectMeta(name="mongo-2", namespace="default", resource_version="2"))
+        self.service3 = V1Service(metadata=V1ObjectMeta(name="mongo-1", namespace="other", resource_version="3"))
+
+    def test_getKey(self):
+        self.assertEqual(("mongo-1", "default"), ObjectStore.getKey(self.service1))
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.store.put(self.service1))
+        self.assertEqual(self.service1, self.store.get(("mongo-1", "default")))
+        self.assertIsNone(self.store.get(("mongo-1", "other")))
+        self.assertEqual([("mongo-1", "default")], self.store.keys())
+        self.assertEqual([self.service1], self.store.list())
+
+    def test_put_replaces(self):
+        updated = V1Service(metadata=V1ObjectMeta(name="mongo-1", namespace="default", resource_version="5"))
+        self.store.put(self.service1)
+        self.assertEqual(self.service1, self.store.put(updated))
+        self.assertEqual([updated], self.store.list())
+
+    def test_delete(self):
+        self.store.put(self.service1)
+        self.store.put(self.service3)
+        self.assertEqual(self.service3, self.store.delete(("mongo-1", "other")))
+        self.assertIsNone(self.store.delete(("mongo-1", "other")))
+        self.assertEqual([self.service1], self.store.list())
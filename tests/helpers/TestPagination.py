@@ -0,0 +1,21 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock, call
+
+from mongoOperator.helpers.Pagination import Pagination
+
+
+class TestPagination(TestCase):
+
+    def test_getPageQuery(self):
+        self.assertEqual([("limit", 500)], Pagination.getPageQuery(None))
+        self.assertEqual([("limit", 500), ("continue", "token")], Pagination.getPageQuery("token"))
+
+    def test_iteratePages(self):
+        pages = [{"items": [], "metadata": {"continue": "token"}}, {"items": [], "metadata": {}}]
+        list_page = MagicMock(side_effect=pages)
+        self.assertEqual(pages, list(Pagination.iteratePages(list_page, {"name": "value"})))
+        expected_calls = [call({"name": "value"}, continue_token=None), call({"name": "value"}, continue_token="token")]
+        self.assertEqual(expected_calls, list_page.mock_calls)
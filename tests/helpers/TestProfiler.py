@@ -0,0 +1,113 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import pstats
+import shutil
+import signal
+import tracemalloc
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest.mock import patch, call
+
+from mongoOperator.helpers.Profiler import Profiler
+
+
+class TestProfiler(TestCase):
+
+    def setUp(self):
+        self.output_dir = os.path.join(mkdtemp(), "profiles")
+        self.profiler = Profiler(self.output_dir, loops=2)
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.output_dir))
+
+    def test_cpu_profile(self):
+        with self.profiler.profile():
+            sorted(range(100))
+        self.profiler.onLoopDone()
+        self.assertFalse(os.path.exists(self.output_dir))
+
+        file_name = self.profiler.startCpuProfile()
+        self.assertTrue(file_name.startswith(os.path.join(self.output_dir, "cpu-")))
+        self.assertEqual(file_name, self.profiler.startCpuProfile())
+        self.assertTrue(self.profiler.is_profiling)
+
+        with self.profiler.profile():
+            sorted(range(100))
+        self.profiler.onLoopDone()
+        self.assertTrue(self.profiler.is_profiling)
+        self.assertFalse(os.path.exists(file_name))
+
+        with self.profiler.profile():
+            sum(range(100))
+        self.profiler.onLoopDone()
+        self.assertFalse(self.profiler.is_profiling)
+
+        functions = {function for _, _, function in pstats.Stats(file_name).stats}
+        self.assertIn("<built-in method builtins.sorted>", functions)
+        self.assertIn("<built-in method builtins.sum>", functions)
+        with open(file_name + ".txt") as summary_file:
+            self.assertIn("function calls", summary_file.read())
+
+    def test_cpu_profile_without_checks(self):
+        file_name = self.profiler.startCpuProfile()
+        with self.assertLogs(level="INFO") as logs:
+            self.profiler.onLoopDone()
+            self.profiler.onLoopDone()
+        self.assertEqual(["INFO:root:No cluster was checked while profiling, not writing {}.".format(file_name)],
+                         logs.output)
+        self.assertFalse(os.path.exists(file_name))
+
+    def test_cpu_profile_error(self):
+        self.profiler.startCpuProfile()
+        with self.assertRaises(ValueError), self.profiler.profile():
+            raise ValueError()
+        self.assertIsNotNone(self.profiler._stats)
+
+    def test_takeMemorySnapshot(self):
+        was_tracing = tracemalloc.is_tracing()
+        try:
+            first_file = self.profiler.takeMemorySnapshot()
+            self.assertTrue(tracemalloc.is_tracing())
+            allocations = [bytearray(1024) for _ in range(100)]
+            second_file = self.profiler.takeMemorySnapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        self.assertEqual(100, len(allocations))
+        with open(first_file) as memory_file:
+            contents = memory_file.read()
+        self.assertTrue(contents.startswith("Top 50 allocations:\n"))
+        self.assertNotIn("differences", contents)
+        with open(second_file) as memory_file:
+            contents = memory_file.read()
+        self.assertIn("Top 50 differences with the previous snapshot:\n", contents)
+        self.assertIn("TestProfiler.py", contents)
+
+    def test_dumpThreads(self):
+        file_name = self.profiler.dumpThreads()
+        self.assertTrue(file_name.startswith(os.path.join(self.output_dir, "threads-")))
+        with open(file_name) as threads_file:
+            contents = threads_file.read()
+        self.assertIn("Thread MainThread (", contents)
+        self.assertIn("in test_dumpThreads", contents)
+
+    @patch("mongoOperator.helpers.Profiler.signal")
+    def test_installSignalHandlers(self, signal_mock):
+        signal_mock.SIGUSR1 = signal.SIGUSR1
+        signal_mock.SIGUSR2 = signal.SIGUSR2
+        self.profiler.installSignalHandlers()
+        handlers = {args[0]: args[1] for _, args, _ in signal_mock.signal.mock_calls}
+        self.assertEqual({signal.SIGUSR1, signal.SIGUSR2}, set(handlers))
+
+        with patch.object(self.profiler, "startCpuProfile") as start_mock, \
+                patch.object(self.profiler, "takeMemorySnapshot") as memory_mock, \
+                patch.object(self.profiler, "dumpThreads") as threads_mock:
+            handlers[signal.SIGUSR1](signal.SIGUSR1, None)
+            self.assertEqual([call()], start_mock.mock_calls)
+            self.assertEqual([], memory_mock.mock_calls)
+            handlers[signal.SIGUSR2](signal.SIGUSR2, None)
+            self.assertEqual([call()], memory_mock.mock_calls)
+            self.assertEqual([call()], threads_mock.mock_calls)
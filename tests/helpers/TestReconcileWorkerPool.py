@@ -0,0 +1,103 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from threading import Event, Lock
+from unittest import TestCase
+
+from mongoOperator.helpers.ReconcileWorkerPool import ReconcileWorkerPool
+from mongoOperator.helpers.WorkQueue import WorkQueue
+from mongoOperator.helpers.rateLimiters.ExponentialBackoffRateLimiter import ExponentialBackoffRateLimiter
+from mongoOperator.helpers.rateLimiters.TokenBucketRateLimiter import TokenBucketRateLimiter
+
+
+class TestReconcileWorkerPool(TestCase):
+    def setUp(self):
+        self.reconciled = []
+        self.pool = ReconcileWorkerPool(self.reconciled.append, workers=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_submit(self):
+        self.pool.submit(("mongo-1", "default"))
+        self.pool.submit(("mongo-2", "default"))
+        self.assertTrue(self.pool.join(timeout=5))
+        self.assertEqual({("mongo-1", "default"), ("mongo-2", "default")}, set(self.reconciled))
+
+    def test_submit_in_flight(self):
+        started = Event()
+        release = Event()
+        lock = Lock()
+        running = []
+        calls = []
+
+        def reconcile(key):
+            with lock:
+                running.append(key)
+                calls.append(list(running))
+            started.set()
+            release.wait(5)
+            with lock:
+                running.remove(key)
+
+        pool = ReconcileWorkerPool(reconcile, workers=2)
+        pool.submit(("mongo", "default"))
+        self.assertTrue(started.wait(5))
+        pool.submit(("mongo", "default"))
+        pool.submit(("mongo", "default"))
+        self.assertFalse(pool.join(timeout=0.01))
+        release.set()
+        self.assertTrue(pool.join(timeout=5))
+        pool.shutdown()
+
+        # the key was checked twice: the requests during the first check are merged, and never in parallel.
+        self.assertEqual([[("mongo", "default")], [("mongo", "default")]], calls)
+
+    def test_error(self):
+        def reconcile(key):
+            self.reconciled.append(key)
+            raise ValueError("Could not reconcile")
+
+        pool = ReconcileWorkerPool(reconcile, workers=1)
+        pool.submit(("mongo-1", "default"))
+        pool.submit(("mongo-2", "default"))
+        self.assertTrue(pool.join(timeout=5))
+        pool.shutdown()
+        self.assertEqual([("mongo-1", "default"), ("mongo-2", "default")], self.reconciled)
+
+    def test_error_retried(self):
+        attempts = []
+        succeeded = Event()
+
+        def reconcile(key):
+            attempts.append(key)
+            if len(attempts) < 3:
+                raise ValueError("Could not reconcile")
+            succeeded.set()
+
+        queue = WorkQueue(ExponentialBackoffRateLimiter(0.001, 0.01), TokenBucketRateLimiter(100, 10))
+        pool = ReconcileWorkerPool(reconcile, workers=1, queue=queue)
+        pool.submit(("mongo", "default"))
+        self.assertTrue(succeeded.wait(5))
+        self.assertTrue(pool.join(timeout=5))
+        pool.shutdown()
+        self.assertEqual([("mongo", "default")] * 3, attempts)
+        self.assertEqual(0, queue.numRequeues(("mongo", "default")))
+
+    def test_shutdown_discards_pending(self):
+        started = Event()
+        release = Event()
+
+        def reconcile(key):
+            self.reconciled.append(key)
+            started.set()
+            release.wait(5)
+
+        pool = ReconcileWorkerPool(reconcile, workers=1)
+        pool.submit(("mongo", "default"))
+        self.assertTrue(started.wait(5))
+        pool.submit(("mongo", "default"))
+        pool.shutdown(wait=False)
+        release.set()
+        self.assertTrue(pool.join(timeout=5))
+        self.assertEqual([("mongo", "default")], self.reconciled)
@@ -0,0 +1,76 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from mongoOperator.helpers.ReplicaCoordinator import ReplicaCoordinator
+
+
+class TestReplicaCoordinator(TestCase):
+
+    def setUp(self):
+        self.coordinator = ReplicaCoordinator(MagicMock())
+
+    def test_single_replica(self):
+        self.assertIsNone(self.coordinator._leader_elector)
+        self.assertIsNone(self.coordinator._shard_manager)
+        self.assertTrue(self.coordinator.is_active)
+        self.assertIsNone(self.coordinator.retry_period)
+        self.assertTrue(self.coordinator.ownsKey(("mongo-cluster", "default")))
+        self.assertTrue(self.coordinator.isCoordinator())
+        self.assertTrue(self.coordinator.popAssignmentChange())
+        self.assertFalse(self.coordinator.popAssignmentChange())
+
+    @patch("mongoOperator.helpers.ReplicaCoordinator.ShardManager")
+    @patch("mongoOperator.helpers.ReplicaCoordinator.LeaderElector")
+    @patch("mongoOperator.helpers.ReplicaCoordinator.LeaseService")
+    @patch("mongoOperator.helpers.ReplicaCoordinator.Settings.SHARDING", True)
+    @patch("mongoOperator.helpers.ReplicaCoordinator.Settings.LEADER_ELECTION", True)
+    def test_start_stop(self, lease_service_mock, elector_mock, shard_mock):
+        kubernetes_service = MagicMock()
+        coordinator = ReplicaCoordinator(kubernetes_service)
+        lease_service_mock.assert_called_once_with(kubernetes_service)
+        elector_mock.assert_called_once_with(lease_service_mock.return_value)
+        shard_mock.assert_called_once_with(lease_service_mock.return_value)
+        elector_mock.return_value.retry_period = 2.0
+        shard_mock.return_value.retry_period = 3.0
+        self.assertEqual(2.0, coordinator.retry_period)
+        coordinator.start()
+        coordinator.stop()
+        elector_mock.return_value.start.assert_called_once_with()
+        elector_mock.return_value.stop.assert_called_once_with()
+        shard_mock.return_value.start.assert_called_once_with()
+        shard_mock.return_value.stop.assert_called_once_with()
+
+    def test_leader_election(self):
+        self.coordinator._leader_elector = MagicMock(is_leader=False)
+        self.assertFalse(self.coordinator.is_active)
+        self.assertFalse(self.coordinator.isCoordinator())
+        self.assertFalse(self.coordinator.popAssignmentChange())
+
+        # all clusters are checked when we start leading, and again after we lost and regained the lease.
+        self.coordinator._leader_elector.is_leader = True
+        self.assertTrue(self.coordinator.popAssignmentChange())
+        self.assertFalse(self.coordinator.popAssignmentChange())
+        self.coordinator._leader_elector.is_leader = False
+        self.assertFalse(self.coordinator.popAssignmentChange())
+        self.coordinator._leader_elector.is_leader = True
+        self.assertTrue(self.coordinator.popAssignmentChange())
+
+    def test_sharding(self):
+        key = ("mongo-cluster", "default")
+        self.coordinator._shard_manager = MagicMock(is_active=True, version=1)
+        self.coordinator._shard_manager.ownsKey.return_value = False
+        self.coordinator._shard_manager.isCoordinator.return_value = True
+        self.assertFalse(self.coordinator.ownsKey(key))
+        self.assertTrue(self.coordinator.isCoordinator())
+        self.assertTrue(self.coordinator.popAssignmentChange())
+        self.assertFalse(self.coordinator.popAssignmentChange())
+
+        # all clusters are checked when the clusters are divided again over the replicas.
+        self.coordinator._shard_manager.version = 2
+        self.assertTrue(self.coordinator.popAssignmentChange())
+        self.coordinator._shard_manager.is_active = False
+        self.assertFalse(self.coordinator.ownsKey(key))
+        self.assertFalse(self.coordinator.isCoordinator())
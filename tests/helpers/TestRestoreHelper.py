@@ -5,7 +5,8 @@ import json
 from base64 import b64encode
 
 from kubernetes.client import V1Secret
-from subprocess import CalledProcessError
+from prometheus_client import REGISTRY
+from subprocess import CalledProcessError, SubprocessError
 
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, call
@@ -20,7 +21,6 @@ class MockBlob:
     name = "somebackupfile.gz"
 
 
-@patch("mongoOperator.helpers.RestoreHelper.sleep", MagicMock())
 class TestRestoreHelper(TestCase):
 
     def setUp(self):
@@ -38,8 +38,8 @@ class TestRestoreHelper(TestCase):
             "mongo-cluster-2.mongo-cluster.mongo-operator-cluster.svc.cluster.local"
         ]
 
-    @patch("mongoOperator.helpers.RestoreHelper.StorageClient")
-    @patch("mongoOperator.helpers.RestoreHelper.ServiceCredentials")
+    @patch("google.cloud.storage.Client")
+    @patch("google.oauth2.service_account.Credentials")
     @patch("mongoOperator.helpers.RestoreHelper.RestoreHelper.restore")
     def test_restoreIfNeeded(self, restore_mock, gcs_service_mock, storage_mock):
         get_bucket_mock = storage_mock.return_value.get_bucket
@@ -67,13 +67,17 @@ class TestRestoreHelper(TestCase):
         self.assertFalse(restore_mock.called, "restore_mock should not have been called")
 
     @patch("mongoOperator.helpers.RestoreHelper.os")
-    @patch("mongoOperator.helpers.RestoreHelper.StorageClient")
-    @patch("mongoOperator.helpers.RestoreHelper.ServiceCredentials")
+    @patch("google.cloud.storage.Client")
+    @patch("google.oauth2.service_account.Credentials")
     @patch("mongoOperator.helpers.RestoreHelper.check_output")
     def test_restore(self, subprocess_mock, gcs_service_mock, storage_mock, os_mock):
         expected_backup_name = "mongodb-backup-mongo-operator-cluster-mongo-cluster-2018-02-28_140000.archive.gz"
+        os_mock.path.getsize.return_value = 1024
+        restored_bytes = REGISTRY.get_sample_value("mongo_operator_transfer_bytes_total", {"operation": "restore"})
 
         self.restore_helper.restore(self.cluster_object, expected_backup_name)
+        self.assertEqual((restored_bytes or 0) + 1024,
+                         REGISTRY.get_sample_value("mongo_operator_transfer_bytes_total", {"operation": "restore"}))
 
         self.assertEqual([call.getSecret("storage-serviceaccount", "mongo-operator-cluster")],
                          self.kubernetes_service.mock_calls)
@@ -95,22 +99,24 @@ class TestRestoreHelper(TestCase):
         ]
         self.assertEqual(expected_storage_calls, storage_mock.mock_calls)
 
-        expected_os_call = call.remove("/tmp/" + expected_backup_name)
-        self.assertEqual([expected_os_call], os_mock.mock_calls)
+        expected_os_calls = [call.path.getsize("/tmp/" + expected_backup_name),
+                             call.remove("/tmp/" + expected_backup_name)]
+        self.assertEqual(expected_os_calls, os_mock.mock_calls)
 
     @patch("mongoOperator.helpers.RestoreHelper.os")
-    @patch("mongoOperator.helpers.RestoreHelper.StorageClient")
-    @patch("mongoOperator.helpers.RestoreHelper.ServiceCredentials")
+    @patch("google.cloud.storage.Client")
+    @patch("google.oauth2.service_account.Credentials")
     @patch("mongoOperator.helpers.RestoreHelper.check_output")
     def test_restore_mongo_error(self, subprocess_mock, gcs_service_mock, storage_mock, os_mock):
         subprocess_mock.side_effect = CalledProcessError(3, "cmd", "output", "error")
         expected_backup_name = "mongodb-backup-mongo-cluster-mongo-cluster-2018-02-28_140000.archive.gz"
 
-        with self.assertRaises(TimeoutError) as context:
+        with self.assertRaises(SubprocessError) as context:
             self.restore_helper.restore(self.cluster_object, expected_backup_name)
 
-        self.assertEqual("Could not restore '" + expected_backup_name + "' after 4 retries!", str(context.exception))
-        self.assertEqual(4, subprocess_mock.call_count)
+        self.assertEqual("Could not restore '" + expected_backup_name + "'. Return code: 3\n stderr: 'error'\n "
+                         "stdout: 'output'", str(context.exception))
+        self.assertEqual(1, subprocess_mock.call_count)
         self.assertEqual([call.from_service_account_info({"user": "password"})], gcs_service_mock.mock_calls)
         expected_storage_calls = [
             call(gcs_service_mock.from_service_account_info.return_value.project_id,
@@ -123,12 +129,13 @@ class TestRestoreHelper(TestCase):
         self.assertFalse(os_mock.called, "os_mock should not have been called")
 
     @patch("mongoOperator.helpers.RestoreHelper.os")
-    @patch("mongoOperator.helpers.RestoreHelper.StorageClient")
-    @patch("mongoOperator.helpers.RestoreHelper.ServiceCredentials")
+    @patch("google.cloud.storage.Client")
+    @patch("google.oauth2.service_account.Credentials")
     @patch("mongoOperator.helpers.RestoreHelper.check_output")
     def test_restore_os_error(self, subprocess_mock, gcs_service_mock, storage_mock, os_mock):
         expected_backup_name = "mongodb-backup-mongo-cluster-mongo-cluster-2018-02-28_140000.archive.gz"
         os_mock.remove.side_effect = OSError()
+        os_mock.path.getsize.return_value = 1024
 
         self.restore_helper.restore(self.cluster_object, expected_backup_name)
 
@@ -0,0 +1,248 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+from unittest.mock import MagicMock, patch, call
+
+from kubernetes.client import V1beta1Lease, V1beta1LeaseList, V1beta1LeaseSpec, V1ObjectMeta
+from kubernetes.client.rest import ApiException
+
+from mongoOperator.helpers.LeaseConfig import LeaseConfig
+from mongoOperator.helpers.sharding.ShardManager import ShardManager
+
+UTC_NOW = ShardManager._utcNow
+
+
+class FakeLeaseService:
+    """ In-memory replacement of the lease methods of the Kubernetes API, shared by several replicas. """
+
+    def __init__(self):
+        self.leases = {}
+        self.resource_version = 0
+
+    def getLease(self, name, namespace):
+        if name not in self.leases:
+            raise ApiException(status=404)
+        return deepcopy(self.leases[name])
+
+    def createLease(self, name, namespace, lease_spec, labels=None):
+        if name in self.leases:
+            raise ApiException(status=409)
+        metadata = V1ObjectMeta(name=name, namespace=namespace, labels=labels)
+        return self._store(V1beta1Lease(metadata=metadata, spec=lease_spec))
+
+    def replaceLease(self, lease):
+        if self.leases[lease.metadata.name].metadata.resource_version != lease.metadata.resource_version:
+            raise ApiException(status=409)
+        return self._store(lease)
+
+    def listLeasesWithLabels(self, namespace, labels):
+        return V1beta1LeaseList(items=[deepcopy(lease) for lease in self.leases.values()
+                                       if labels.items() <= lease.metadata.labels.items()])
+
+    def deleteLease(self, name, namespace):
+        if self.leases.pop(name, None) is None:
+            raise ApiException(status=404)
+
+    def _store(self, lease):
+        self.resource_version += 1
+        lease.metadata.resource_version = str(self.resource_version)
+        self.leases[lease.metadata.name] = deepcopy(lease)
+        return lease
+
+
+@patch("mongoOperator.helpers.sharding.ShardManager.ShardManager._utcNow",
+       MagicMock(return_value=datetime(2018, 2, 28, 12, 0, 0, tzinfo=timezone.utc)))
+@patch("mongoOperator.helpers.LeaseHolder.monotonic")
+class TestShardManager(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.service = FakeLeaseService()
+        self.keys = [("mongo-{}".format(index), "namespace-{}".format(index % 3)) for index in range(100)]
+
+    def _createManager(self, identity, service=None):
+        config = LeaseConfig(identity=identity, namespace="default", lease_duration=15, renew_deadline=10,
+                             retry_period=2)
+        return ShardManager(self.service if service is None else service, group_name="operators", config=config,
+                            virtual_nodes=50)
+
+    @staticmethod
+    def _syncAll(managers, monotonic_mock, *times):
+        for time in times:
+            monotonic_mock.return_value = time
+            # the leases are renewed at every sync, so the other replicas observe the changed renew time.
+            ShardManager._utcNow.return_value = datetime(2018, 2, 28, 12, tzinfo=timezone.utc) + timedelta(0, time)
+            for manager in managers:
+                manager.sync()
+
+    def test__utcNow(self, monotonic_mock):
+        before = datetime.now(timezone.utc)
+        self.assertTrue(before <= UTC_NOW() <= datetime.now(timezone.utc))
+
+    def test_single_member(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        manager = self._createManager("operator-1")
+        self.assertFalse(manager.is_active)
+        self.assertFalse(any(manager.ownsKey(key) for key in self.keys))
+
+        manager.sync()
+        self.assertTrue(manager.is_active)
+        self.assertEqual(["operator-1"], manager.members)
+        self.assertEqual(1, manager.version)
+        self.assertTrue(manager.isCoordinator())
+
+        # the clusters are only owned after the handoff, as a previous instance of the replica may still check them.
+        self.assertFalse(any(manager.ownsKey(key) for key in self.keys))
+        monotonic_mock.return_value = 108.0
+        manager.sync()
+        self.assertFalse(any(manager.ownsKey(key) for key in self.keys))
+        monotonic_mock.return_value = 110.0
+        manager.sync()
+        self.assertEqual(2, manager.version)
+        self.assertTrue(all(manager.ownsKey(key) for key in self.keys))
+        lease = self.service.leases["operators-operator-1"]
+        self.assertEqual("operator-1", lease.spec.holder_identity)
+        self.assertEqual({"operated-by": "operators.ultimaker.com", "heritage": "mongos", "name": "",
+                          "shard-group": "operators"}, lease.metadata.labels)
+
+        # we stop owning clusters when we could not renew our lease in time.
+        monotonic_mock.return_value = 120.0
+        self.assertFalse(manager.is_active)
+        self.assertFalse(manager.isCoordinator())
+        self.assertFalse(any(manager.ownsKey(key) for key in self.keys))
+
+    def test_partitions(self, monotonic_mock):
+        managers = [self._createManager("operator-{}".format(index)) for index in range(3)]
+        self._syncAll(managers, monotonic_mock, 100.0, 100.0, 110.0)
+
+        for manager in managers:
+            self.assertEqual(["operator-0", "operator-1", "operator-2"], manager.members)
+        for key in self.keys:
+            self.assertEqual(1, sum(manager.ownsKey(key) for manager in managers), key)
+        self.assertEqual([True, False, False], [manager.isCoordinator() for manager in managers])
+        self.assertTrue(all(any(manager.ownsKey(key) for key in self.keys) for manager in managers))
+
+    def test_rebalance_on_leave(self, monotonic_mock):
+        managers = [self._createManager("operator-{}".format(index)) for index in range(3)]
+        self._syncAll(managers, monotonic_mock, 100.0, 100.0, 110.0)
+        owned_before = {key: [manager.ownsKey(key) for manager in managers] for key in self.keys}
+
+        managers[2].stop()
+        self.assertNotIn("operators-operator-2", self.service.leases)
+        for manager in managers[:2]:
+            version = manager.version
+            manager.sync()
+            self.assertEqual(["operator-0", "operator-1"], manager.members)
+            self.assertEqual(version + 1, manager.version)
+        for key in self.keys:
+            owners = [manager.ownsKey(key) for manager in managers[:2]]
+            if owned_before[key][2]:
+                self.assertEqual([False, False], owners)  # the clusters of the leaving replica are handed off.
+            else:
+                self.assertEqual(owned_before[key][:2], owners)
+
+        self._syncAll(managers[:2], monotonic_mock, 120.0)
+        for key in self.keys:
+            owners = [manager.ownsKey(key) for manager in managers[:2]]
+            self.assertEqual(1, sum(owners))
+            if not owned_before[key][2]:
+                self.assertEqual(owned_before[key][:2], owners)  # only the clusters of the leaving replica moved.
+
+    def test_handoff_on_join(self, monotonic_mock):
+        managers = [self._createManager("operator-{}".format(index)) for index in range(2)]
+        self._syncAll(managers[:1], monotonic_mock, 100.0, 110.0)
+        self.assertTrue(all(managers[0].ownsKey(key) for key in self.keys))
+
+        # operator-1 joins. The clusters that move are released by operator-0 at its next renewal, and only picked up
+        # by operator-1 after the renew deadline, so they are never owned by both.
+        for time in (120.0, 122.0, 124.0, 126.0, 128.0, 130.0):
+            self._syncAll(managers[1:] + managers[:1], monotonic_mock, time)
+            for key in self.keys:
+                self.assertLessEqual(sum(manager.ownsKey(key) for manager in managers), 1, key)
+            if time < 130.0:
+                self.assertFalse(any(managers[1].ownsKey(key) for key in self.keys))
+        for key in self.keys:
+            self.assertEqual(1, sum(manager.ownsKey(key) for manager in managers), key)
+        self.assertTrue(any(managers[1].ownsKey(key) for key in self.keys))
+
+    def test_ring_changed_during_handoff(self, monotonic_mock):
+        managers = [self._createManager("operator-{}".format(index)) for index in range(2)]
+        self._syncAll(managers[:1], monotonic_mock, 100.0, 110.0)
+        self._syncAll(managers[::-1], monotonic_mock, 120.0)
+
+        # operator-1 leaves before the handoff completed, so the clusters it took are handed back to operator-0.
+        managers[1].stop()
+        self._syncAll(managers[:1], monotonic_mock, 125.0)
+        self.assertEqual(["operator-0"], managers[0].members)
+        self.assertFalse(all(managers[0].ownsKey(key) for key in self.keys))
+        self._syncAll(managers[:1], monotonic_mock, 130.0)
+        self.assertFalse(all(managers[0].ownsKey(key) for key in self.keys))
+        self._syncAll(managers[:1], monotonic_mock, 135.0)
+        self.assertTrue(all(managers[0].ownsKey(key) for key in self.keys))
+        self.assertEqual(1, len(managers[0]._rings))
+
+    def test_expired_member(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        managers = [self._createManager("operator-{}".format(index)) for index in range(2)]
+        for manager in managers:
+            manager.sync()
+        managers[0].sync()
+        self.assertEqual(["operator-0", "operator-1"], managers[0].members)
+
+        # operator-1 stops renewing its lease, so operator-0 takes over after the lease duration.
+        monotonic_mock.return_value = 110.0
+        managers[0].sync()
+        self.assertEqual(["operator-0", "operator-1"], managers[0].members)
+        monotonic_mock.return_value = 115.5
+        managers[0].sync()
+        self.assertEqual(["operator-0"], managers[0].members)
+        self.assertNotIn("operators-operator-1", self.service.leases)  # the coordinator cleans up the lease.
+        managers[0].sync()
+        self.assertEqual({}, managers[0]._observed)
+
+    def test_delete_expired_error(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        service = MagicMock()
+        service.getLease.return_value = V1beta1Lease(metadata=V1ObjectMeta(name="operators-operator-1"),
+                                                     spec=V1beta1LeaseSpec())
+        service.listLeasesWithLabels.return_value = V1beta1LeaseList(items=[
+            V1beta1Lease(metadata=V1ObjectMeta(name="operators-gone"), spec=V1beta1LeaseSpec(holder_identity=None))
+        ])
+        service.deleteLease.side_effect = ApiException(status=500)
+        manager = self._createManager("operator-1", service)
+        manager.sync()
+        self.assertEqual(["operator-1"], manager.members)
+        service.deleteLease.assert_called_once_with("operators-gone", "default")
+
+    def test_renew_error(self, monotonic_mock):
+        service = MagicMock()
+        service.getLease.side_effect = ApiException(status=500)
+        manager = self._createManager("operator-1", service)
+        with self.assertRaises(ApiException):
+            manager.sync()
+        self.assertFalse(manager.is_active)
+
+    @patch("mongoOperator.helpers.LeaseHolder.Thread")
+    def test_start_stop(self, thread_mock, monotonic_mock):
+        service = MagicMock()
+        service.deleteLease.side_effect = ApiException(status=404)
+        manager = self._createManager("operator-1", service)
+        manager.start()
+        self.assertEqual([call(target=manager._runForever, name="ShardManager", daemon=True), call().start()],
+                         thread_mock.mock_calls)
+        manager.stop()
+        thread_mock.return_value.join.assert_called_once_with(2)
+        self.assertEqual([call.deleteLease("operators-operator-1", "default")], service.mock_calls)
+
+    def test_runForever(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        manager = self._createManager("operator-1")
+        manager.sync = MagicMock(side_effect=(None, ApiException(status=500)))
+        manager._stopped = MagicMock()
+        manager._stopped.is_set.side_effect = False, False, True
+        manager._runForever()
+        self.assertEqual(2, manager.sync.call_count)
+        self.assertEqual([call(2)] * 2, manager._stopped.wait.mock_calls)
@@ -2,10 +2,12 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
 
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.helpers.resourceCheckers.StatefulSetChecker import StatefulSetChecker
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
+from mongoOperator.services.KubernetesService import KubernetesService
 from tests.test_utils import getExampleClusterDefinition
 
 
@@ -17,10 +19,16 @@ class TestStatefulSetChecker(TestCase):
         self.checker = StatefulSetChecker(self.kubernetes_service)
         self.cluster_object = V1MongoClusterConfiguration(**getExampleClusterDefinition())
 
-    def test_listResources(self):
-        result = self.checker.listResources()
-        self.assertEqual(self.kubernetes_service.listAllStatefulSetsWithLabels.return_value.items, result)
-        self.kubernetes_service.listAllStatefulSetsWithLabels.assert_called_once_with()
+    def test_listResourceMetadata(self):
+        self.kubernetes_service.listMetadataWithLabels.side_effect = [
+            {"items": [{"metadata": {"name": "one"}}], "metadata": {"continue": "token"}},
+            {"items": [{"metadata": {"name": "two"}}], "metadata": {}},
+        ]
+        result = self.checker.listResourceMetadata()
+        self.assertEqual([{"name": "one"}, {"name": "two"}], list(result))
+        self.assertEqual([call(KubernetesService.STATEFUL_SETS_PATH, continue_token=None),
+                          call(KubernetesService.STATEFUL_SETS_PATH, continue_token="token")],
+                         self.kubernetes_service.listMetadataWithLabels.mock_calls)
 
     def test_getResource(self):
         result = self.checker.getResource(self.cluster_object)
@@ -38,6 +46,15 @@ class TestStatefulSetChecker(TestCase):
         self.assertEqual(self.kubernetes_service.updateStatefulSet.return_value, result)
         self.kubernetes_service.updateStatefulSet.assert_called_once_with(self.cluster_object)
 
+    def test_getDesiredStateHash(self):
+        result = self.checker.getDesiredStateHash(self.cluster_object)
+        resource = KubernetesResources.createStatefulSet(self.cluster_object)
+        self.assertEqual(resource.metadata.annotations["operators.ultimaker.com/desired-state-hash"], result)
+        self.assertTrue(self.checker.isUpToDate(resource, self.cluster_object))
+        self.cluster_object.spec.mongodb.replicas += 2
+        self.assertEqual(False, self.checker.isUpToDate(resource, self.cluster_object))
+        self.assertEqual([], self.kubernetes_service.mock_calls)
+
     def test_deleteResource(self):
         result = self.checker.deleteResource(self.cluster_object.metadata.name, self.cluster_object.metadata.namespace)
         self.assertEqual(self.kubernetes_service.deleteStatefulSet.return_value, result)
@@ -0,0 +1,26 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.rateLimiters.TokenBucketRateLimiter import TokenBucketRateLimiter
+
+
+class TestTokenBucketRateLimiter(TestCase):
+    def setUp(self):
+        self.clock = MagicMock(return_value=100.0)
+        self.limiter = TokenBucketRateLimiter(rate=2.0, burst=2, clock=self.clock)
+
+    def test_reserve_burst(self):
+        self.assertEqual([0.0, 0.0, 0.5, 1.0], [self.limiter.reserve() for _ in range(4)])
+
+    def test_reserve_refills(self):
+        self.assertEqual([0.0, 0.0], [self.limiter.reserve(), self.limiter.reserve()])
+        self.clock.return_value = 100.5
+        self.assertEqual(0.0, self.limiter.reserve())
+        self.assertEqual(0.5, self.limiter.reserve())
+
+    def test_reserve_max_burst(self):
+        self.clock.return_value = 1000.0
+        self.assertEqual([0.0, 0.0, 0.5], [self.limiter.reserve() for _ in range(3)])
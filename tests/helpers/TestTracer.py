@@ -0,0 +1,101 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.tracing.Tracer import Tracer
+from tests.test_utils import ListSpanExporter, runCoroutine
+
+
+@Tracer.traceMethods("fake.")
+class FakeService:
+    """ Service whose public methods are traced. """
+
+    def getThing(self):
+        return Tracer.currentSpan().name
+
+    def _private(self):
+        return Tracer.currentSpan()
+
+
+class TestTracer(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.exporter = ListSpanExporter()
+        Tracer.setExporter(self.exporter)
+
+    def tearDown(self):
+        Tracer.setExporter(None)
+
+    def test_disabled(self):
+        Tracer.setExporter(None)
+        with Tracer.span("disabled") as span:
+            self.assertIsNone(span)
+            self.assertIsNone(Tracer.currentSpan())
+        self.assertEqual([], self.exporter.spans)
+
+    def test_setExporter_shuts_down_previous(self):
+        previous = MagicMock()
+        Tracer.setExporter(previous)
+        Tracer.setExporter(None)
+        previous.shutdown.assert_called_once_with()
+
+    def test_span_children(self):
+        with Tracer.span("parent", cluster="mongo-cluster") as parent:
+            with Tracer.span("child") as child:
+                self.assertEqual(child, Tracer.currentSpan())
+            self.assertEqual(parent, Tracer.currentSpan())
+        self.assertIsNone(Tracer.currentSpan())
+
+        self.assertEqual([child, parent], self.exporter.spans)
+        self.assertEqual(parent.trace_id, child.trace_id)
+        self.assertEqual(parent.span_id, child.parent_id)
+        self.assertIsNone(parent.parent_id)
+        self.assertEqual({"cluster": "mongo-cluster"}, parent.attributes)
+        self.assertGreaterEqual(parent.duration, child.duration)
+
+    def test_span_error(self):
+        with self.assertRaises(ValueError):
+            with Tracer.span("failing"):
+                raise ValueError("wrong")
+        self.assertEqual("ValueError: wrong", self.exporter.spans[0].error)
+        self.assertIsNone(Tracer.currentSpan())
+
+    def test_bind(self):
+        with Tracer.span("parent") as parent, ThreadPoolExecutor(1) as executor:
+            child = executor.submit(Tracer.bind(self._startChild)).result()
+            self.assertIsNone(executor.submit(Tracer.currentSpan).result())
+        self.assertEqual(parent.span_id, child.parent_id)
+
+    def test_bind_without_span(self):
+        self.assertIs(self._startChild, Tracer.bind(self._startChild))
+
+    def test_traceMethods(self):
+        self.assertEqual("fake.getThing", FakeService().getThing())
+        self.assertIsNone(FakeService()._private())
+        self.assertEqual(["fake.getThing"], [span.name for span in self.exporter.spans])
+
+    def test_tasks(self):
+        async def check(name):
+            with Tracer.span(name) as parent:
+                await asyncio.sleep(0.01)
+                with Tracer.span(name + ".child") as child:
+                    await asyncio.sleep(0.01)
+            return parent, child
+
+        async def checkAll():
+            return await asyncio.gather(check("first"), check("second"))
+
+        (first, first_child), (second, second_child) = runCoroutine(checkAll())
+        self.assertEqual(first.span_id, first_child.parent_id)
+        self.assertEqual(second.span_id, second_child.parent_id)
+        self.assertNotEqual(first.trace_id, second.trace_id)
+
+    @staticmethod
+    def _startChild():
+        with Tracer.span("child") as child:
+            return child
@@ -0,0 +1,118 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.WorkQueue import WorkQueue
+
+
+class TestWorkQueue(TestCase):
+    def setUp(self):
+        self.clock = MagicMock(return_value=100.0)
+        self.backoff = MagicMock()
+        self.bucket = MagicMock()
+        self.queue = WorkQueue(self.backoff, self.bucket, clock=self.clock)
+
+    def test_add_deduplicates(self):
+        self.queue.add("a")
+        self.queue.add("b")
+        self.queue.add("a")
+        self.assertEqual(2, len(self.queue))
+        self.assertEqual(["a", "b"], [self.queue.get(), self.queue.get()])
+        self.assertEqual(0, len(self.queue))
+
+    def test_add_while_processing(self):
+        self.queue.add("a")
+        self.assertEqual("a", self.queue.get())
+        self.queue.add("a")
+        self.queue.add("a")
+        self.assertEqual(0, len(self.queue))  # not handed out twice at the same time
+        self.assertIsNone(self.queue.get(timeout=0))
+        self.assertFalse(self.queue.waitUntilIdle(timeout=0))
+        self.queue.done("a")
+        self.assertEqual(1, len(self.queue))
+        self.assertEqual("a", self.queue.get())
+        self.queue.done("a")
+        self.assertTrue(self.queue.waitUntilIdle(timeout=0))
+
+    def test_getOldestProcessingTime(self):
+        self.assertIsNone(self.queue.getOldestProcessingTime())
+        self.queue.add("a")
+        self.queue.add("b")
+        self.assertEqual("a", self.queue.get())
+        self.clock.return_value = 105.0
+        self.assertEqual("b", self.queue.get())
+        self.queue.add("a")  # adding the key again does not change when its processing started.
+        self.assertEqual(100.0, self.queue.getOldestProcessingTime())
+        self.queue.done("a")
+        self.assertEqual(105.0, self.queue.getOldestProcessingTime())
+        self.queue.done("b")
+        self.assertIsNone(self.queue.getOldestProcessingTime())
+
+    def test_get_timeout(self):
+        self.clock.side_effect = 100.0, 100.0, 100.01
+        self.assertIsNone(self.queue.get(timeout=0.01))
+
+    def test_get_waits_for_add(self):
+        self.queue._condition.wait = MagicMock(side_effect=lambda timeout: self.queue.add("a"))
+        self.assertEqual("a", self.queue.get())
+        self.queue._condition.wait.assert_called_once_with(None)
+
+    def test_addAfter(self):
+        self.queue.addAfter("a", 10)
+        self.queue.addAfter("a", 20)  # the earliest moment is kept
+        self.queue.addAfter("b", 5)
+        self.assertEqual(0, len(self.queue))
+        self.assertTrue(self.queue.waitUntilIdle(timeout=0))
+        self.assertIsNone(self.queue.get(timeout=0))
+
+        self.clock.return_value = 105.0
+        self.assertEqual("b", self.queue.get(timeout=0))
+        self.assertIsNone(self.queue.get(timeout=0))
+        self.queue.addAfter("a", 1)  # an earlier moment replaces the previous one
+        self.clock.return_value = 106.0
+        self.assertEqual("a", self.queue.get(timeout=0))
+        self.clock.return_value = 200.0
+        self.assertIsNone(self.queue.get(timeout=0))
+
+    def test_addAfter_wakes_up_consumer(self):
+        self.queue.addAfter("a", 10)
+        waits = []
+
+        def wait(timeout):
+            waits.append(timeout)
+            self.clock.return_value = 110.0
+
+        self.queue._condition.wait = MagicMock(side_effect=wait)
+        self.assertEqual("a", self.queue.get())
+        self.assertEqual([10.0], waits)
+
+    def test_addAfter_no_delay(self):
+        self.queue.addAfter("a", 0)
+        self.assertEqual(1, len(self.queue))
+
+    def test_addRateLimited(self):
+        self.backoff.when.return_value = 4.0
+        self.bucket.reserve.return_value = 2.0
+        self.queue.addRateLimited("a")
+        self.backoff.when.assert_called_once_with("a")
+        self.clock.return_value = 103.0
+        self.assertIsNone(self.queue.get(timeout=0))
+        self.clock.return_value = 104.0
+        self.assertEqual("a", self.queue.get(timeout=0))
+
+    def test_forget_and_numRequeues(self):
+        self.backoff.numRequeues.return_value = 3
+        self.assertEqual(3, self.queue.numRequeues("a"))
+        self.queue.forget("a")
+        self.backoff.forget.assert_called_once_with("a")
+
+    def test_shutDown(self):
+        self.queue.add("a")
+        self.queue.shutDown()
+        self.assertIsNone(self.queue.get())
+        self.assertTrue(self.queue.waitUntilIdle(timeout=0))
+        self.queue.add("b")
+        self.queue.addAfter("c", 1)
+        self.assertEqual(1, len(self.queue))
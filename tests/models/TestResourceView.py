@@ -0,0 +1,46 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.models.ObjectMetaView import ObjectMetaView
+from mongoOperator.models.ResourceView import ResourceView
+
+
+class TestResourceView(TestCase):
+
+    def test_fromJson(self):
+        view = ResourceView.fromJson(
+            b'{"kind": "Secret", "apiVersion": "v1", "type": "Opaque", "data": {"password": "c2VjcmV0"}, "metadata": '
+            b'{"name": "mongo-cluster-admin-credentials", "namespace": "mongo-operator-cluster", "uid": "secret-uid", '
+            b'"resourceVersion": "42", "labels": {"operated-by": "operators.ultimaker.com"}, '
+            b'"annotations": {"operators.ultimaker.com/desired-state-hash": "abc"}}}'
+        )
+        self.assertEqual(ObjectMetaView(name="mongo-cluster-admin-credentials", namespace="mongo-operator-cluster",
+                                        uid="secret-uid", resource_version="42",
+                                        labels={"operated-by": "operators.ultimaker.com"},
+                                        annotations={"operators.ultimaker.com/desired-state-hash": "abc"}),
+                         view.metadata)
+        self.assertEqual({"password": "c2VjcmV0"}, view.data)
+        self.assertEqual("abc", KubernetesResources.getDesiredStateHash(view))
+
+    def test_fromDict_empty(self):
+        view = ResourceView.fromDict({})
+        self.assertEqual(ResourceView(ObjectMetaView(None, None, None, None, None, None), None), view)
+        self.assertIsNone(KubernetesResources.getDesiredStateHash(view))
+
+    def test_read_only(self):
+        view = ResourceView.fromDict({"metadata": {"labels": {"name": "mongo-cluster"}}, "data": {"key": "value"}})
+        with self.assertRaises(TypeError):
+            view.data["key"] = "other"
+        with self.assertRaises(TypeError):
+            view.metadata.labels["name"] = "other"
+        with self.assertRaises(AttributeError):
+            view.metadata.name = "other"
+
+    def test_fromResponse(self):
+        response = MagicMock(data=b'{"metadata": {"name": "mongo-cluster"}}')
+        self.assertEqual("mongo-cluster", ResourceView.fromResponse(response).metadata.name)
+        response.release_conn.assert_called_once_with()
@@ -4,15 +4,18 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import inspect
 from unittest import TestCase
 from unittest.mock import patch, call, MagicMock
 
 from kubernetes.client import Configuration, V1Secret, V1ObjectMeta, V1Service, \
     V1ServiceSpec, V1ServicePort, V1DeleteOptions, V1beta1StatefulSet, V1beta1StatefulSetSpec, V1PodSpec, V1Container, \
     V1EnvVar, V1EnvVarSource, V1ObjectFieldSelector, V1ContainerPort, V1VolumeMount, V1ResourceRequirements, \
-    V1PersistentVolumeClaim, V1PersistentVolumeClaimSpec, V1PodTemplateSpec, V1beta1CustomResourceDefinitionList, \
+    V1PersistentVolumeClaim, V1PersistentVolumeClaimSpec, V1PodTemplateSpec, \
     V1beta1CustomResourceDefinition, V1beta1CustomResourceDefinitionSpec, V1beta1CustomResourceDefinitionNames, V1Status
+from kubernetes.client import V1OwnerReference, V1beta1CustomResourceSubresources
 from kubernetes.client.rest import ApiException
+from prometheus_client import REGISTRY
 
 from mongoOperator.helpers.KubernetesResources import KubernetesResources
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
@@ -38,7 +41,7 @@ class TestKubernetesService(TestCase):
         self.stateful_set = self._createStatefulSet()
 
     def _createStatefulSet(self) -> V1beta1StatefulSet:
-        return V1beta1StatefulSet(
+        return self._annotate(V1beta1StatefulSet(
             metadata=self._createMeta(self.name),
             spec=V1beta1StatefulSetSpec(
                 replicas=3,
@@ -75,7 +78,17 @@ class TestKubernetesService(TestCase):
                     )
                 )],
             ),
-        )
+        ))
+
+    @staticmethod
+    def _annotate(resource, hashed_resource=None):
+        annotation = KubernetesResources.hashDesiredState(resource if hashed_resource is None else hashed_resource)
+        resource.metadata.annotations = {"operators.ultimaker.com/desired-state-hash": annotation}
+        return resource
+
+    def _createSecretBody(self, name: str, secret_data: dict) -> V1Secret:
+        hashed_secret = V1Secret(metadata=self._createMeta(name), string_data=dict.fromkeys(secret_data, ""))
+        return self._annotate(V1Secret(metadata=self._createMeta(name), string_data=secret_data), hashed_secret)
 
     def _createMeta(self, name: str) -> V1ObjectMeta:
         return V1ObjectMeta(
@@ -105,6 +118,16 @@ class TestKubernetesService(TestCase):
         with patch("kubernetes.client.configuration.Configuration.__eq__", dict_eq):
             self.assertEqual(expected, client_mock.mock_calls)
 
+    def test___init__limits(self, client_mock):
+        request = client_mock.ApiClient.return_value.rest_client.request
+        service = KubernetesService()
+        throttled = service.api_client.rest_client.request
+        self.assertIs(request, inspect.unwrap(throttled))
+        self.assertIs(request.return_value, throttled("GET", "url"))
+        request.assert_called_once_with("GET", "url")
+        self.assertEqual(0, service._concurrency_limiter.in_flight)
+        self.assertEqual(16, REGISTRY.get_sample_value("mongo_operator_kubernetes_concurrency_limit"))
+
     def test_createMongoObjectDefinition(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
@@ -117,19 +140,20 @@ class TestKubernetesService(TestCase):
                 group="operators.ultimaker.com", version="v1", scope="Namespaced",
                 names=V1beta1CustomResourceDefinitionNames(
                     plural="mongos", singular="mongo", kind="Mongo", short_names=["mng"]
-                )
+                ),
+                subresources=V1beta1CustomResourceSubresources(status={})
             )
         )
 
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value = \
-            V1beta1CustomResourceDefinitionList(items=[])
+        client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.side_effect = \
+            ApiException(404)
         client_mock.ApiextensionsV1beta1Api.return_value.create_custom_resource_definition.return_value = expected_def
 
         result = service.createMongoObjectDefinition()
 
         self.assertEqual(expected_def, result)
         expected_calls = [
-            call.ApiextensionsV1beta1Api().list_custom_resource_definition(),
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.ultimaker.com"),
             call.ApiextensionsV1beta1Api().create_custom_resource_definition(expected_def),
         ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
@@ -139,47 +163,104 @@ class TestKubernetesService(TestCase):
         client_mock.reset_mock()
 
         item = MagicMock()
-        item.spec.names.plural = "mongos"
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value.items = [item]
+        client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.return_value = item
 
-        result = service.createMongoObjectDefinition()
+        # the definition is only requested once.
+        self.assertIs(item, service.createMongoObjectDefinition())
+        self.assertIs(item, service.createMongoObjectDefinition())
 
-        self.assertEqual(item, result)
+        expected_calls = [
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.ultimaker.com"),
+        ]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
 
-        expected_calls = [call.ApiextensionsV1beta1Api().list_custom_resource_definition()]
+    def test_createMongoObjectDefinition_without_status(self, client_mock):
+        service = KubernetesService()
+        client_mock.reset_mock()
+
+        # definitions created by older versions of the operator have no status subresource.
+        item = V1beta1CustomResourceDefinition(
+            metadata=V1ObjectMeta(name="mongos.operators.ultimaker.com"),
+            spec=V1beta1CustomResourceDefinitionSpec(
+                group="operators.ultimaker.com", version="v1", scope="Namespaced",
+                names=V1beta1CustomResourceDefinitionNames(plural="mongos", kind="Mongo"),
+            )
+        )
+        extensions_api = client_mock.ApiextensionsV1beta1Api.return_value
+        extensions_api.read_custom_resource_definition.return_value = item
+
+        self.assertIs(extensions_api.patch_custom_resource_definition.return_value,
+                      service.createMongoObjectDefinition())
+
+        expected_calls = [
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.ultimaker.com"),
+            call.ApiextensionsV1beta1Api().patch_custom_resource_definition(
+                "mongos.operators.ultimaker.com", {"spec": {"subresources": {"status": {}}}}
+            ),
+        ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
 
+    def test_createMongoObjectDefinition_error(self, client_mock):
+        service = KubernetesService()
+        client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.side_effect = \
+            ApiException(403)
+
+        with self.assertRaises(ApiException):
+            service.createMongoObjectDefinition()
+        self.assertIsNone(service._mongo_object_definition)
+        client_mock.ApiextensionsV1beta1Api.return_value.create_custom_resource_definition.assert_not_called()
+
+    @staticmethod
+    def _listMongoObjectsCall(*query_params):
+        return call.ApiClient().call_api(
+            "/apis/{group}/{version}/{plural}", "GET",
+            {"group": "operators.ultimaker.com", "version": "v1", "plural": "mongos"},
+            [("limit", 500)] + list(query_params), {"Accept": "application/json"}, response_type="object",
+            auth_settings=["BearerToken"], _return_http_data_only=True
+        )
+
     def test_listMongoObjects(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
         item = MagicMock()
-        item.spec.names.plural = "mongos"
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value.items = [item]
+        client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.return_value = item
 
-        result = service.listMongoObjects(param="value")
+        result = service.listMongoObjects(continue_token="token")
+        service.listMongoObjects()
         expected_calls = [
-            call.ApiextensionsV1beta1Api().list_custom_resource_definition(),
-            call.CustomObjectsApi().list_cluster_custom_object("operators.ultimaker.com", "v1", "mongos", param="value")
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.ultimaker.com"),
+            self._listMongoObjectsCall(("continue", "token")),
+            self._listMongoObjectsCall(),
         ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CustomObjectsApi().list_cluster_custom_object.return_value, result)
+        self.assertEqual(client_mock.ApiClient().call_api.return_value, result)
+
+    def test_listMongoObjectKeys(self, client_mock):
+        service = KubernetesService()
+        client_mock.reset_mock()
+        client_mock.ApiClient.return_value.call_api.side_effect = [
+            {"items": [{"metadata": {"name": "mongo-1", "namespace": "default"}}], "metadata": {"continue": "token"}},
+            {"items": [{"metadata": {"name": "mongo-2", "namespace": "other"}}], "metadata": {}},
+        ]
+        self.assertEqual({("mongo-1", "default"), ("mongo-2", "other")}, service.listMongoObjectKeys())
+        self.assertEqual([self._listMongoObjectsCall(), self._listMongoObjectsCall(("continue", "token"))],
+                         client_mock.ApiClient.return_value.call_api.mock_calls)
 
     def test_listMongoObjects_400(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
         item = MagicMock()
-        item.spec.names.plural = "mongos"
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value.items = [item]
-        client_mock.CustomObjectsApi.return_value.list_cluster_custom_object.side_effect = ApiException(400)
+        client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.return_value = item
+        client_mock.ApiClient.return_value.call_api.side_effect = ApiException(400)
 
         with self.assertRaises(ApiException):
-            service.listMongoObjects(param="value")
+            service.listMongoObjects()
 
         expected_calls = [
-            call.ApiextensionsV1beta1Api().list_custom_resource_definition(),
-            call.CustomObjectsApi().list_cluster_custom_object("operators.ultimaker.com", "v1", "mongos", param="value")
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.ultimaker.com"),
+            self._listMongoObjectsCall(),
         ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
 
@@ -188,120 +269,107 @@ class TestKubernetesService(TestCase):
         client_mock.reset_mock()
 
         item = MagicMock()
-        item.spec.names.plural = "mongos"
-        client_mock.ApiextensionsV1beta1Api.return_value.list_custom_resource_definition.return_value.items = [item]
-        client_mock.CustomObjectsApi.return_value.list_cluster_custom_object.side_effect = ApiException(404)
+        client_mock.ApiextensionsV1beta1Api.return_value.read_custom_resource_definition.return_value = item
+        client_mock.ApiClient.return_value.call_api.side_effect = ApiException(404)
 
         with self.assertRaises(TimeoutError) as context:
-            service.listMongoObjects(param="value")
+            service.listMongoObjects()
 
+        # the definition is requested again after each 404, as it may have been removed.
         expected_calls = [
-            call.ApiextensionsV1beta1Api().list_custom_resource_definition(),
-            call.CustomObjectsApi().list_cluster_custom_object("operators.ultimaker.com", "v1", "mongos",
-                                                               param="value"),
-            call.CustomObjectsApi().list_cluster_custom_object("operators.ultimaker.com", "v1", "mongos",
-                                                               param="value"),
-            call.CustomObjectsApi().list_cluster_custom_object("operators.ultimaker.com", "v1", "mongos",
-                                                               param="value"),
-        ]
+            call.ApiextensionsV1beta1Api().read_custom_resource_definition("mongos.operators.ultimaker.com"),
+            self._listMongoObjectsCall(),
+        ] * 3
         self.assertEqual(expected_calls, client_mock.mock_calls)
         self.assertEqual("Could not list the custom mongo objects after 3 retries", str(context.exception))
 
-    def test_getMongoObject(self, client_mock):
+    @patch("mongoOperator.services.KubernetesService.Watch")
+    def test_watchMongoObjects(self, watch_mock, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        result = service.getMongoObject(self.name, self.namespace)
-        expected_calls = [call.CustomObjectsApi().get_namespaced_custom_object(
-            "operators.ultimaker.com", "v1", self.namespace, "mongos", self.name
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CustomObjectsApi().get_namespaced_custom_object.return_value, result)
+        result = service.watchMongoObjects(resource_version="100")
+        expected_calls = [call(), call().stream(client_mock.CustomObjectsApi().list_cluster_custom_object,
+                                                "operators.ultimaker.com", "v1", "mongos", resource_version="100")]
+        self.assertEqual(expected_calls, watch_mock.mock_calls)
+        self.assertEqual(watch_mock.return_value.stream.return_value, result)
 
-    def test_listAllServicesWithLabels_default(self, client_mock):
+    @patch("mongoOperator.services.KubernetesService.Watch")
+    def test_watchMongoObjects_no_version(self, watch_mock, client_mock):
         service = KubernetesService()
-        client_mock.reset_mock()
+        service.watchMongoObjects()
+        expected_calls = [call(), call().stream(client_mock.CustomObjectsApi().list_cluster_custom_object,
+                                                "operators.ultimaker.com", "v1", "mongos")]
+        self.assertEqual(expected_calls, watch_mock.mock_calls)
 
-        result = service.listAllServicesWithLabels()
-        expected_calls = [call.CoreV1Api().list_service_for_all_namespaces(
-            label_selector="operated-by=operators.ultimaker.com,heritage=mongos"
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_service_for_all_namespaces.return_value, result)
-
-    def test_listAllServicesWithLabels_custom(self, client_mock):
-        service = KubernetesService()
-        client_mock.reset_mock()
-
-        labels = {"operated-by": "me", "heritage": "mongo", "name": "name"}
-        result = service.listAllServicesWithLabels(labels)
-        expected_calls = [call.CoreV1Api().list_service_for_all_namespaces(
-            label_selector = "operated-by=me,heritage=mongo,name=name"
-        )]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_service_for_all_namespaces.return_value, result)
-
-    def test_listAllStatefulSetsWithLabels_default(self, client_mock):
+    def test_getMongoObject(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        result = service.listAllStatefulSetsWithLabels()
-        expected_calls = [call.AppsV1beta1Api().list_stateful_set_for_all_namespaces(
-            label_selector="operated-by=operators.ultimaker.com,heritage=mongos"
+        result = service.getMongoObject(self.name, self.namespace)
+        expected_calls = [call.CustomObjectsApi().get_namespaced_custom_object(
+            "operators.ultimaker.com", "v1", self.namespace, "mongos", self.name
         )]
         self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.AppsV1beta1Api().list_stateful_set_for_all_namespaces.return_value, result)
+        self.assertEqual(client_mock.CustomObjectsApi().get_namespaced_custom_object.return_value, result)
 
-    def test_listAllStatefulSetsWithLabels_custom(self, client_mock):
+    def test_patchMongoObjectStatus(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        labels = {"operated-by": "me", "heritage": "mongo", "name": "name"}
-        result = service.listAllStatefulSetsWithLabels(labels)
-        expected_calls = [call.AppsV1beta1Api().list_stateful_set_for_all_namespaces(
-            label_selector = "operated-by=me,heritage=mongo,name=name"
+        result = service.patchMongoObjectStatus(self.name, self.namespace, {"primary": "host-0"})
+        expected_calls = [call.CustomObjectsApi().patch_namespaced_custom_object_status(
+            "operators.ultimaker.com", "v1", self.namespace, "mongos", self.name, {"status": {"primary": "host-0"}}
         )]
         self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.AppsV1beta1Api().list_stateful_set_for_all_namespaces.return_value, result)
+        self.assertEqual(client_mock.CustomObjectsApi().patch_namespaced_custom_object_status.return_value, result)
 
-    def test_listAllSecretsWithLabels_default(self, client_mock):
+    def test_listMetadataWithLabels(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        result = service.listAllSecretsWithLabels()
-        expected_calls = [call.CoreV1Api().list_secret_for_all_namespaces(
-            label_selector="operated-by=operators.ultimaker.com,heritage=mongos"
+        result = service.listMetadataWithLabels(KubernetesService.SECRETS_PATH, {"name": "name"},
+                                                continue_token="token")
+        expected_calls = [call.ApiClient().call_api(
+            "/api/v1/secrets", "GET", {}, [("labelSelector", "name=name"), ("limit", 500), ("continue", "token")],
+            {"Accept": "application/json;as=PartialObjectMetadataList;v=v1;g=meta.k8s.io,"
+                       "application/json;as=PartialObjectMetadataList;v=v1beta1;g=meta.k8s.io,application/json"},
+            response_type="object", auth_settings=["BearerToken"], _return_http_data_only=True
         )]
         self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_secret_for_all_namespaces.return_value, result)
+        self.assertEqual(client_mock.ApiClient().call_api.return_value, result)
 
-    def test_listAllSecretsWithLabels_custom(self, client_mock):
+    def test_getSecret(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        labels = {"operated-by": "me", "heritage": "mongo", "name": "name"}
-        result = service.listAllSecretsWithLabels(labels)
+        response = client_mock.CoreV1Api.return_value.read_namespaced_secret.return_value
+        response.data = b'{"kind": "Secret", "metadata": {"name": "mongo-cluster", "resourceVersion": "12"}, ' \
+                        b'"data": {"username": "dW5pdA=="}}'
+        result = service.getSecret(self.name, self.namespace)
         expected_calls = [
-            call.CoreV1Api().list_secret_for_all_namespaces(label_selector="operated-by=me,heritage=mongo,name=name")
+            call.CoreV1Api().read_namespaced_secret(self.name, self.namespace, _preload_content=False),
+            call.CoreV1Api().read_namespaced_secret().release_conn(),
         ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().list_secret_for_all_namespaces.return_value, result)
+        self.assertEqual("mongo-cluster", result.metadata.name)
+        self.assertEqual("12", result.metadata.resource_version)
+        self.assertEqual({"username": "dW5pdA=="}, result.data)
 
-    def test_getSecret(self, client_mock):
+    def test_getSecret_invalid(self, client_mock):
         service = KubernetesService()
-        client_mock.reset_mock()
-
-        result = service.getSecret(self.name, self.namespace)
-        expected_calls = [call.CoreV1Api().read_namespaced_secret(self.name, self.namespace)]
-        self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api().read_namespaced_secret.return_value, result)
+        response = client_mock.CoreV1Api.return_value.read_namespaced_secret.return_value
+        response.data = b"<html>"
+        with self.assertRaises(ValueError):
+            service.getSecret(self.name, self.namespace)
+        response.release_conn.assert_called_once_with()  # the connection is released even if the body is invalid.
 
     def test_createSecret(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
 
         secret_data = {"username": "unit-test", "password": "secret"}
-        expected_body = V1Secret(metadata=self._createMeta("secret-name"), string_data=secret_data)
+        expected_body = self._createSecretBody("secret-name", secret_data)
         result = service.createSecret("secret-name", self.namespace, secret_data)
 
         self.assertEqual([call.CoreV1Api().create_namespaced_secret(self.namespace, expected_body)],
@@ -317,7 +385,7 @@ class TestKubernetesService(TestCase):
         secret_data = {"username": "unit-test", "password": "secret"}
         result = service.createSecret(self.name, self.namespace, secret_data)
 
-        expected_body = V1Secret(metadata=self._createMeta(self.name), string_data=secret_data)
+        expected_body = self._createSecretBody(self.name, secret_data)
         expected_calls = [call.CoreV1Api().create_namespaced_secret(self.namespace, expected_body)]
         self.assertEqual(expected_calls, client_mock.mock_calls)
         self.assertIsNone(result)
@@ -332,19 +400,56 @@ class TestKubernetesService(TestCase):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        client_mock.CoreV1Api.return_value.read_namespaced_secret.return_value = V1Secret(kind="unit")
+        client_mock.CoreV1Api.return_value.read_namespaced_secret.return_value.data = \
+            b'{"kind": "Secret", "metadata": {"annotations": {"other": "annotation"}}}'
 
         secret_data = {"username": "unit-test", "password": "secret"}
-        expected_body = V1Secret(kind="unit", string_data=secret_data)
+        desired_hash = self._createSecretBody(self.name, secret_data).metadata.annotations
+        # only the metadata is patched, so the password in the secret is unchanged.
+        expected_body = V1Secret(metadata=V1ObjectMeta(annotations=dict(desired_hash, other="annotation")))
         expected_calls = [
-            call.CoreV1Api().read_namespaced_secret(self.name, self.namespace),
+            call.CoreV1Api().read_namespaced_secret(self.name, self.namespace, _preload_content=False),
+            call.CoreV1Api().read_namespaced_secret().release_conn(),
             call.CoreV1Api().patch_namespaced_secret(self.name, self.namespace, expected_body),
         ]
 
-        result = service.updateSecret(self.name, self.namespace, secret_data)
+        result = service.updateSecret(self.name, self.namespace, ["username", "password"])
         self.assertEqual(expected_calls, client_mock.mock_calls)
         self.assertEqual(client_mock.CoreV1Api.return_value.patch_namespaced_secret.return_value, result)
 
+    def test_updateSecret_owner(self, client_mock):
+        service = KubernetesService()
+        client_mock.reset_mock()
+        client_mock.CoreV1Api.return_value.read_namespaced_secret.return_value.data = b'{"metadata": {}}'
+        self.cluster_object.metadata.uid = "cluster-uid"
+
+        service.updateSecret(self.name, self.namespace, ["username"], owner=self.cluster_object)
+        body = client_mock.CoreV1Api.return_value.patch_namespaced_secret.call_args[0][2]
+        self.assertEqual([self._createOwnerReference()], body.metadata.owner_references)
+
+    def _createOwnerReference(self) -> V1OwnerReference:
+        return V1OwnerReference(api_version="operators.ultimaker.com/v1", kind="Mongo", name=self.name,
+                                uid="cluster-uid", controller=True, block_owner_deletion=True)
+
+    def test_createService_owner(self, client_mock):
+        service = KubernetesService()
+        client_mock.reset_mock()
+        self.cluster_object.metadata.uid = "cluster-uid"
+
+        service.createService(self.cluster_object)
+        body = client_mock.CoreV1Api.return_value.create_namespaced_service.call_args[0][1]
+        self.assertEqual([self._createOwnerReference()], body.metadata.owner_references)
+
+    def test_createStatefulSet_owner(self, client_mock):
+        service = KubernetesService()
+        client_mock.reset_mock()
+        self.cluster_object.metadata.uid = "cluster-uid"
+
+        service.createStatefulSet(self.cluster_object)
+        body = client_mock.AppsV1beta1Api.return_value.create_namespaced_stateful_set.call_args[0][1]
+        self.assertEqual([self._createOwnerReference()], body.metadata.owner_references)
+        self.assertIsNone(body.spec.template.metadata.owner_references)
+
     def test_deleteSecret(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
@@ -358,24 +463,30 @@ class TestKubernetesService(TestCase):
         service = KubernetesService()
         client_mock.reset_mock()
 
+        client_mock.CoreV1Api.return_value.read_namespaced_service.return_value.data = \
+            b'{"kind": "Service", "metadata": {"name": "mongo-cluster", "annotations": {"hash": "abc"}}}'
         result = service.getService(self.name, self.namespace)
-        expected_calls = [call.CoreV1Api().read_namespaced_service(self.name, self.namespace)]
+        expected_calls = [
+            call.CoreV1Api().read_namespaced_service(self.name, self.namespace, _preload_content=False),
+            call.CoreV1Api().read_namespaced_service().release_conn(),
+        ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.CoreV1Api.return_value.read_namespaced_service.return_value, result)
+        self.assertEqual({"hash": "abc"}, result.metadata.annotations)
+        self.assertIsNone(result.data)
 
     def test_createService(self, client_mock):
         service = KubernetesService()
         client_mock.reset_mock()
         client_mock.CoreV1Api.return_value.create_namespaced_service.return_value = V1Service(kind="unit")
 
-        expected_body = V1Service(
+        expected_body = self._annotate(V1Service(
             metadata=self._createMeta(self.name),
             spec=V1ServiceSpec(
                 cluster_ip="None",
                 ports=[V1ServicePort(name="mongod", port=27017, protocol="TCP")],
                 selector={"heritage": "mongos", "name": self.name, "operated-by": "operators.ultimaker.com"},
             )
-        )
+        ))
         expected_calls = [call.CoreV1Api().create_namespaced_service(self.namespace, expected_body)]
 
         result = service.createService(self.cluster_object)
@@ -386,14 +497,14 @@ class TestKubernetesService(TestCase):
         service = KubernetesService()
         client_mock.reset_mock()
 
-        expected_body = V1Service(
+        expected_body = self._annotate(V1Service(
             metadata=self._createMeta(self.name),
             spec=V1ServiceSpec(
                 cluster_ip="None",
                 ports=[V1ServicePort(name="mongod", port=27017, protocol="TCP")],
                 selector={"heritage": "mongos", "name": self.name, "operated-by": "operators.ultimaker.com"},
             )
-        )
+        ))
         result = service.updateService(self.cluster_object)
         expected_calls = [call.CoreV1Api().patch_namespaced_service(self.name, self.namespace, expected_body)]
         self.assertEqual(expected_calls, client_mock.mock_calls)
@@ -426,10 +537,16 @@ class TestKubernetesService(TestCase):
         service = KubernetesService()
         client_mock.reset_mock()
 
+        client_mock.AppsV1beta1Api.return_value.read_namespaced_stateful_set.return_value.data = \
+            b'{"kind": "StatefulSet", "metadata": {"name": "mongo-cluster", "uid": "set-uid"}}'
         result = service.getStatefulSet(self.name, self.namespace)
-        expected_calls = [call.AppsV1beta1Api().read_namespaced_stateful_set(self.name, self.namespace)]
+        expected_calls = [
+            call.AppsV1beta1Api().read_namespaced_stateful_set(self.name, self.namespace, _preload_content=False),
+            call.AppsV1beta1Api().read_namespaced_stateful_set().release_conn(),
+        ]
         self.assertEqual(expected_calls, client_mock.mock_calls)
-        self.assertEqual(client_mock.AppsV1beta1Api().read_namespaced_stateful_set.return_value, result)
+        self.assertEqual("set-uid", result.metadata.uid)
+        self.assertIsNone(result.metadata.annotations)
 
     def test_createStatefulSet(self, client_mock):
         service = KubernetesService()
@@ -0,0 +1,80 @@
+# Copyright (c) 2018 Ultimaker
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch, call, MagicMock
+
+from kubernetes.client import V1beta1Lease, V1beta1LeaseSpec, V1DeleteOptions, V1ObjectMeta
+
+from mongoOperator.helpers.KubernetesResources import KubernetesResources
+from mongoOperator.services.LeaseService import LeaseService
+
+
+@patch("mongoOperator.services.LeaseService.client")
+class TestLeaseService(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.metadata = V1ObjectMeta(labels=KubernetesResources.createDefaultLabels("mongo-operator"),
+                                     name="mongo-operator", namespace="default")
+
+    def test___init__(self, client_mock):
+        kubernetes_service = MagicMock()
+        LeaseService(kubernetes_service)
+        self.assertEqual([call.CoordinationV1beta1Api(kubernetes_service.api_client)], client_mock.mock_calls)
+
+    def test_getLease(self, client_mock):
+        service = LeaseService(MagicMock())
+        client_mock.reset_mock()
+
+        result = service.getLease("mongo-operator", "default")
+        expected_calls = [call.CoordinationV1beta1Api().read_namespaced_lease("mongo-operator", "default")]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+        self.assertEqual(client_mock.CoordinationV1beta1Api.return_value.read_namespaced_lease.return_value, result)
+
+    def test_createLease(self, client_mock):
+        service = LeaseService(MagicMock())
+        client_mock.reset_mock()
+
+        lease_spec = V1beta1LeaseSpec(holder_identity="operator-1", lease_duration_seconds=15)
+        result = service.createLease("mongo-operator", "default", lease_spec)
+
+        expected_body = V1beta1Lease(metadata=self.metadata, spec=lease_spec)
+        expected_calls = [call.CoordinationV1beta1Api().create_namespaced_lease("default", expected_body)]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+        self.assertEqual(client_mock.CoordinationV1beta1Api.return_value.create_namespaced_lease.return_value, result)
+
+    def test_replaceLease(self, client_mock):
+        service = LeaseService(MagicMock())
+        client_mock.reset_mock()
+
+        lease = V1beta1Lease(metadata=self.metadata, spec=V1beta1LeaseSpec())
+        result = service.replaceLease(lease)
+
+        expected_calls = [
+            call.CoordinationV1beta1Api().replace_namespaced_lease("mongo-operator", "default", lease)
+        ]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+        self.assertEqual(client_mock.CoordinationV1beta1Api.return_value.replace_namespaced_lease.return_value, result)
+
+    def test_listLeasesWithLabels(self, client_mock):
+        service = LeaseService(MagicMock())
+        client_mock.reset_mock()
+
+        result = service.listLeasesWithLabels("default", {"shard-group": "operators", "name": ""})
+        expected_calls = [
+            call.CoordinationV1beta1Api().list_namespaced_lease("default", label_selector="shard-group=operators")
+        ]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+        self.assertEqual(client_mock.CoordinationV1beta1Api.return_value.list_namespaced_lease.return_value, result)
+
+    def test_deleteLease(self, client_mock):
+        service = LeaseService(MagicMock())
+        client_mock.reset_mock()
+
+        result = service.deleteLease("mongo-operator", "default")
+        expected_calls = [
+            call.CoordinationV1beta1Api().delete_namespaced_lease("mongo-operator", "default", V1DeleteOptions())
+        ]
+        self.assertEqual(expected_calls, client_mock.mock_calls)
+        self.assertEqual(client_mock.CoordinationV1beta1Api.return_value.delete_namespaced_lease.return_value, result)
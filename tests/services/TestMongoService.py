@@ -3,10 +3,11 @@
 # -*- coding: utf-8 -*-
 import json
 from base64 import b64encode
+from subprocess import SubprocessError
 
 from kubernetes.client import V1Secret, V1ObjectMeta
 from unittest import TestCase
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, patch, call
 
 from mongoOperator.helpers.MongoResources import MongoResources
 from mongoOperator.models.V1MongoClusterConfiguration import V1MongoClusterConfiguration
@@ -16,7 +17,6 @@ from bson.json_util import loads
 from pymongo.errors import OperationFailure, ConnectionFailure
 
 
-@patch("mongoOperator.services.MongoService.sleep", MagicMock())
 @patch("mongoOperator.services.MongoService.MongoClient")
 class TestMongoService(TestCase):
     maxDiff = None
@@ -97,32 +97,25 @@ class TestMongoService(TestCase):
             ConnectionFailure("connection attempt failed"),
             self._getFixture("initiate-ok")
         )
-        result = self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
-        self.assertEqual(self.initiate_ok_response, result)
-
-    def test__mongoAdminCommand_TimeoutError(self, mongo_client_mock):
-        mongo_client_mock.return_value.admin.command.side_effect = (
-            ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"),
-            OperationFailure("no replset config has been received")
-        )
-
-        with self.assertRaises(TimeoutError) as context:
+        with self.assertRaises(ConnectionFailure) as context:
             self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
+        self.assertEqual("connection attempt failed", str(context.exception))
 
-        self.assertEqual("Could not execute command after 4 retries!", str(context.exception))
-
-    def test__mongoAdminCommand_NoPrimary(self, mongo_client_mock):
-        mongo_client_mock.return_value.admin.command.side_effect = (
-            ConnectionFailure("No replica set members match selector \"Primary()\""),
-            self._getFixture("initiate-ok"),
-            self._getFixture("initiate-ok")
+        # the connection is reused when the command is retried.
+        result = self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
+        self.assertEqual(self.initiate_ok_response, result)
+        self.assertEqual(1, mongo_client_mock.call_count)
 
-        )
+    def test_getConcurrencyLimiter(self, _):
+        limiter = self.service.getConcurrencyLimiter(self.cluster_object)
+        self.assertIs(limiter, self.service.getConcurrencyLimiter(self.cluster_object))
+        self.assertEqual(4, limiter.limit)
+        self.assertTrue(limiter._is_overloaded(ConnectionFailure("connection attempt failed")))
+        self.assertFalse(limiter._is_overloaded(OperationFailure("command failed")))
 
-        self.service._executeAdminCommand(self.cluster_object, "replSetGetStatus")
+        other_cluster = V1MongoClusterConfiguration(**getExampleClusterDefinition())
+        other_cluster.metadata.name = "other-cluster"
+        self.assertIsNot(limiter, self.service.getConcurrencyLimiter(other_cluster))
 
     def test_initializeReplicaSet(self, mongo_client_mock):
         mongo_client_mock.return_value.admin.command.return_value = self._getFixture("initiate-ok")
@@ -159,6 +152,19 @@ class TestMongoService(TestCase):
         mongo_client_mock.return_value.admin.command.return_value = self._getFixture("replica-status-ok")
         self.service.checkOrCreateReplicaSet(self.cluster_object)
 
+    def test_checkOrCreateReplicaSet_status(self, mongo_client_mock):
+        status_writer = MagicMock()
+        self.service = MongoService(self.kubernetes_service, status_writer=status_writer)
+        mongo_client_mock.return_value.admin.command.return_value = self._getFixture("replica-status-ok")
+        self.service.checkOrCreateReplicaSet(self.cluster_object)
+        expected_members = [
+            {"name": "c87cdec35e3c:27017", "state": "PRIMARY"},
+            {"name": "c87cdec35e3d:27017", "state": "SECONDARY"},
+            {"name": "c87cdec35e3e:27017", "state": "SECONDARY"},
+        ]
+        self.assertEqual([call.update(self.cluster_object, members=expected_members, primary="c87cdec35e3c:27017")],
+                         status_writer.mock_calls)
+
     def test_checkOrCreateReplicaSet_initialize(self, mongo_client_mock):
         mongo_client_mock.return_value.admin.command.side_effect = (
             OperationFailure("no replset config has been received"),
@@ -210,17 +216,15 @@ class TestMongoService(TestCase):
 
         self.assertEqual("\"createUser\" had the wrong type. Expected string, found object", str(context.exception))
 
-    def test_createUsers_TimeoutError(self, mongo_client_mock):
+    def test_createUsers_ConnectionFailure(self, mongo_client_mock):
         mongo_client_mock.return_value.admin.command.side_effect = (
-            None,
-            ConnectionFailure("connection attempt failed"), ConnectionFailure("connection attempt failed"),
-            ConnectionFailure("connection attempt failed"), ConnectionFailure("connection attempt failed")
+            None, ConnectionFailure("connection attempt failed")
         )
 
-        with self.assertRaises(TimeoutError) as context:
+        with self.assertRaises(ConnectionFailure) as context:
             self.service.createUsers(self.cluster_object)
 
-        self.assertEqual("Could not execute command after 4 retries!", str(context.exception))
+        self.assertEqual("connection attempt failed", str(context.exception))
 
     def test_onReplicaSetReady(self, mongo_client_mock):
         self.service._restore_helper.restoreIfNeeded = MagicMock()
@@ -232,13 +236,50 @@ class TestMongoService(TestCase):
 
     def test_onReplicaSetReady_alreadyRestored(self, mongo_client_mock):
         self.service._restore_helper.restoreIfNeeded = MagicMock()
-        self.service._restored_cluster_names.append("mongo-cluster")
+        self.service._restored_cluster_names.add("mongo-cluster")
 
         self.service._onReplicaSetReady(self.cluster_object)
 
         self.service._restore_helper.restoreIfNeeded.assert_not_called()
         mongo_client_mock.assert_not_called()
 
+    def test_onReplicaSetReady_failed(self, mongo_client_mock):
+        self.service._restore_helper.restoreIfNeeded = MagicMock(side_effect=SubprocessError("Could not restore"))
+
+        self.service._onReplicaSetReady(self.cluster_object)
+
+        # the restore is retried on the next check.
+        self.service._restore_helper.restoreIfNeeded.side_effect = None
+        self.service.restoreIfNeeded(self.cluster_object)
+        self.assertEqual(2, self.service._restore_helper.restoreIfNeeded.call_count)
+        self.assertEqual({"mongo-cluster"}, self.service._restored_cluster_names)
+        mongo_client_mock.assert_not_called()
+
+    def test_restoreIfNeeded_in_progress(self, mongo_client_mock):
+        self.service._restore_helper.restoreIfNeeded = MagicMock()
+        self.service._restored_cluster_names.add("mongo-cluster")
+
+        self.service.restoreIfNeeded(self.cluster_object)
+
+        self.service._restore_helper.restoreIfNeeded.assert_not_called()
+        mongo_client_mock.assert_not_called()
+
+    def test_callbacks_not_owner(self, mongo_client_mock):
+        self.service._is_owner = lambda cluster_object: False
+        self.service.checkOrCreateReplicaSet = MagicMock()
+        self.service._restore_helper.restoreIfNeeded = MagicMock()
+
+        self.service._onAllHostsReady(self.cluster_object)
+        self.service._onReplicaSetReady(self.cluster_object)
+
+        self.service.checkOrCreateReplicaSet.assert_not_called()
+        self.service._restore_helper.restoreIfNeeded.assert_not_called()
+
+    def test_connect(self, mongo_client_mock):
+        self.assertEqual(mongo_client_mock.return_value, self.service.connect(self.cluster_object))
+        self.assertEqual(mongo_client_mock.return_value, self.service.connect(self.cluster_object))
+        self.assertEqual(1, mongo_client_mock.call_count)
+
     def test_onAllHostsReady(self, mongo_client_mock):
         self.service.checkOrCreateReplicaSet = MagicMock()
 
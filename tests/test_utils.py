@@ -1,8 +1,12 @@
 # Copyright (c) 2018 Ultimaker
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
+import asyncio
+
 import yaml
 
+from mongoOperator.helpers.tracing.SpanExporter import SpanExporter
+
 
 def getExampleClusterDefinition(replicas = 3) -> dict:
     with open("./examples/mongo-{}-replicas.yaml".format(replicas)) as f:
@@ -17,3 +21,21 @@ def getExampleClusterDefinitionWithRestore() -> dict:
 def dict_eq(one, other):
     # [(k, getattr(self, k), getattr(other, k)) for k in self.__dict__ if getattr(self, k) != getattr(other, k)]
     return other and one.__dict__ == other.__dict__
+
+
+def runCoroutine(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class ListSpanExporter(SpanExporter):
+    """ Exporter that keeps the finished spans in memory. """
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)